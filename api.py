@@ -19,6 +19,7 @@ from fastapi import FastAPI, HTTPException
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.risk.ftmo_risk_manager import FTMORiskManager
+from src.risk.ftmo_rule_engine import get_ftmo_rule_engine
 from src.risk.news_filter import NewsEventFilter
 from src.ai.enhanced_context import EnhancedTradingContext
 from src.ai.intelligent_position_manager import IntelligentPositionManager
@@ -26,6 +27,13 @@ from src.utils.market_hours import MarketHours
 from src.ai.unified_trading_system import UnifiedTradingSystem
 from src.ai.elite_position_sizer import ElitePositionSizer
 from src.ai.portfolio_state import get_portfolio_state
+from src.ai.cross_asset_correlation import get_cross_asset_matrix
+from src.ai.cvar_engine import get_cvar_engine
+from src.ai.inference_broker import InferenceBroker
+from src.ai.state_store import get_state_store
+from src.ai.symbol_actors import ActorSystem, SnapshotBoard
+import src.ai.flight_recorder as flight
+from src.ai.flight_recorder import FlightRecorder
 from src.utils.trade_journal import log_closed_trade, get_trade_stats, log_entry_context, log_exit_context
 
 # ═══════════════════════════════════════════════════════════════════
@@ -206,23 +214,37 @@ elite_sizer = None  # Elite position sizer
 portfolio_state = None  # Portfolio state tracker
 market_hours = None  # Market hours detector
 news_filter = None  # News event filter for high-impact events
+ml_broker = None  # Cross-symbol micro-batching for ML inference
+decision_recorder = None  # Flight recorder for /api/ai/trade_decision (replay with replay_decisions.py)
+decision_actors = ActorSystem()  # Per-symbol actors: decisions for one symbol run in order, symbols run concurrently
 USE_ELITE_SIZER = True  # Use elite sizer for position sizing
+ML_BATCH_WINDOW_MS = 2.0  # Initial micro-batch window (adapts within 1-5ms)
 
 # ═══════════════════════════════════════════════════════════════════
 # DAILY PROFIT PROTECTION TRACKING
 # Tracks peak daily P&L to prevent giving back large gains
+# Trackers below are persisted via the state store (survive restarts, shared by workers)
+# Account-wide: only updated on the event loop thread (never offloaded), so
+# concurrent symbol actors can't interleave a read-modify-write
 # ═══════════════════════════════════════════════════════════════════
-peak_daily_pnl_tracker = {
-    'peak_pnl': 0.0,
-    'last_reset_date': None
-}
+state_store = get_state_store()
+peak_daily_pnl_tracker = state_store.mapping('peak_daily_pnl')
+peak_daily_pnl_tracker.setdefault('peak_pnl', 0.0)
+peak_daily_pnl_tracker.setdefault('last_reset_date', None)  # ISO date
+
+# ═══════════════════════════════════════════════════════════════════
+# FTMO RULE ENGINE
+# Daily-start balance, intraday worst equity and peaks maintained per
+# account event (decision requests + POST /api/account/event heartbeats)
+# ═══════════════════════════════════════════════════════════════════
+ftmo_engine = get_ftmo_rule_engine()  # Shared snapshot for every FTMO check
 
 # ═══════════════════════════════════════════════════════════════════
 # HEDGE FUND IMPROVEMENT #5: PEAK PROFIT TRACKING PER POSITION
 # Tracks the high water mark (peak profit) for each open position
 # Used to detect when a profitable trade is giving back too much
 # ═══════════════════════════════════════════════════════════════════
-position_peak_profit_tracker = {}
+position_peak_profit_tracker = state_store.mapping('position_peak_profit', key_type=int)  # ticket -> peak %
 
 def update_position_peak_profit(ticket: int, current_profit_pct: float) -> float:
     """Update and return the peak profit for a position."""
@@ -236,18 +258,39 @@ def update_position_peak_profit(ticket: int, current_profit_pct: float) -> float
     
     return position_peak_profit_tracker[ticket]
 
+# Highest closed-trade ticket registered for anti-churn, per symbol
+_recent_close_tickets = state_store.mapping('recent_close_tickets')  # symbol -> {ticket, time}
+
 def cleanup_closed_positions(open_tickets: list):
     """Remove closed positions from the peak profit tracker."""
     global position_peak_profit_tracker
     closed_tickets = [t for t in position_peak_profit_tracker if t not in open_tickets]
     for ticket in closed_tickets:
-        del position_peak_profit_tracker[ticket]
+        position_peak_profit_tracker.pop(ticket, None)  # Another symbol's request may clean up concurrently
+
+def register_recent_close(clean_symbol: str, trade_ticket: int, direction: str, current_time: float):
+    """
+    Register a closed trade for anti-churn if it is the newest seen for the symbol.
+    Mutates the symbol's state - run it on the symbol's actor (decision_actors.tell).
+    """
+    last_close = _recent_close_tickets.get(clean_symbol, {'ticket': 0, 'time': 0})
+    if trade_ticket > last_close['ticket']:
+        _recent_close_tickets[clean_symbol] = {
+            'ticket': trade_ticket,
+            'time': current_time
+        }
+        
+        # Register with unified system for anti-churn
+        if unified_system:
+            unified_system.register_close(clean_symbol, direction, 0.5, f"Stop/TP hit (ticket #{trade_ticket})")
+            logger.info(f"   🚫 ANTI-CHURN: Registered close on {clean_symbol} (ticket #{trade_ticket}, {direction})")
 
 # ═══════════════════════════════════════════════════════════════════
 # CROSS-ASSET DATA CACHE (Institutional Edge)
 # Caches recent data from each symbol for cross-asset correlation
+# Each symbol publishes its own entry; readers take an immutable snapshot
 # ═══════════════════════════════════════════════════════════════════
-cross_asset_cache = {
+cross_asset_cache = SnapshotBoard({
     # Indices - for risk sentiment
     'us30': {'h1_trend': 0.5, 'h4_trend': 0.5, 'momentum': 0.0, 'last_update': 0},
     'us100': {'h1_trend': 0.5, 'h4_trend': 0.5, 'momentum': 0.0, 'last_update': 0},
@@ -258,7 +301,7 @@ cross_asset_cache = {
     'eurusd': {'h1_trend': 0.5, 'h4_trend': 0.5, 'momentum': 0.0, 'last_update': 0},
     'gbpusd': {'h1_trend': 0.5, 'h4_trend': 0.5, 'momentum': 0.0, 'last_update': 0},
     'usdjpy': {'h1_trend': 0.5, 'h4_trend': 0.5, 'momentum': 0.0, 'last_update': 0},
-}
+})
 
 def update_cross_asset_cache(symbol: str, h1_trend: float, h4_trend: float, momentum: float):
     """Update the cross-asset cache with latest data from a symbol"""
@@ -274,12 +317,12 @@ def update_cross_asset_cache(symbol: str, h1_trend: float, h4_trend: float, mome
     elif 'jpy' in symbol_key: symbol_key = 'usdjpy'
     
     if symbol_key in cross_asset_cache:
-        cross_asset_cache[symbol_key] = {
+        cross_asset_cache.publish(symbol_key, {
             'h1_trend': h1_trend,
             'h4_trend': h4_trend,
             'momentum': momentum,
             'last_update': time.time()
-        }
+        })
 
 def calculate_cross_asset_context(symbol: str) -> dict:
     """
@@ -294,11 +337,12 @@ def calculate_cross_asset_context(symbol: str) -> dict:
     import time
     current_time = time.time()
     max_age = 300  # 5 minutes max age for cache data
+    cache = cross_asset_cache.snapshot()  # One consistent view across all symbols
     
     # Get index data for risk sentiment
-    us30 = cross_asset_cache.get('us30', {})
-    us100 = cross_asset_cache.get('us100', {})
-    us500 = cross_asset_cache.get('us500', {})
+    us30 = cache.get('us30', {})
+    us100 = cache.get('us100', {})
+    us500 = cache.get('us500', {})
     
     # Calculate risk on/off from indices
     indices_trends = []
@@ -320,9 +364,9 @@ def calculate_cross_asset_context(symbol: str) -> dict:
         indices_aligned = 0.5
     
     # Infer DXY from forex pairs (inverse relationship)
-    eurusd = cross_asset_cache.get('eurusd', {})
-    gbpusd = cross_asset_cache.get('gbpusd', {})
-    usdjpy = cross_asset_cache.get('usdjpy', {})
+    eurusd = cache.get('eurusd', {})
+    gbpusd = cache.get('gbpusd', {})
+    usdjpy = cache.get('usdjpy', {})
     
     dxy_signals = []
     if current_time - eurusd.get('last_update', 0) < max_age:
@@ -343,7 +387,7 @@ def calculate_cross_asset_context(symbol: str) -> dict:
         dxy_momentum = 0.0
     
     # Gold/Dollar divergence (normally inverse)
-    xau = cross_asset_cache.get('xau', {})
+    xau = cache.get('xau', {})
     if current_time - xau.get('last_update', 0) < max_age:
         xau_trend = xau.get('h4_trend', 0.5)
         # If both gold and DXY bullish or both bearish = divergence
@@ -365,6 +409,67 @@ def calculate_cross_asset_context(symbol: str) -> dict:
         'forex_index_correlation': 0.0  # TODO: Calculate if needed
     }
 
+def build_position_context(pos: dict, symbol: str, features: dict, request: dict,
+                           ml_direction: str, ml_confidence: float,
+                           account_balance: float) -> EnhancedTradingContext:
+    """Context for one open position: request features plus that position's data."""
+    context = EnhancedTradingContext.from_features_and_request(
+        features=features,
+        request=request,
+        ml_direction=ml_direction,
+        ml_confidence=ml_confidence
+    )
+    
+    # Override position data with this specific position
+    pos_ticket = pos.get('ticket', 0)
+    pos_profit = float(pos.get('profit', 0))
+    context.position_type = pos.get('type')  # 0=BUY, 1=SELL
+    context.position_entry_price = float(pos.get('price_open', 0))
+    context.position_current_profit = pos_profit
+    context.position_volume = float(pos.get('volume', 0))
+    context.position_dca_count = pos.get('dca_count', 0)
+    
+    # Add broker constraints to context for AI-driven position sizing
+    context.max_lot = float(request.get('symbol_info', {}).get('max_lot', 50.0))
+    context.min_lot = float(request.get('symbol_info', {}).get('min_lot', 1.0))
+    context.lot_step = float(request.get('symbol_info', {}).get('lot_step', 1.0))
+    
+    # Add MT5 metadata to context for AI decisions
+    context.position_ticket = pos_ticket
+    context.position_age_minutes = pos.get('age_minutes', 0)
+    context.position_sl = float(pos.get('sl', 0))
+    context.position_tp = float(pos.get('tp', 0))
+    context.position_swap = pos.get('swap', 0.0)  # Actual swap from broker
+    
+    # HEDGE FUND #5: Track peak profit for this position
+    # Calculate current profit as % of account
+    current_profit_pct = (pos_profit / account_balance * 100) if account_balance > 0 else 0
+    peak_profit_pct = update_position_peak_profit(pos_ticket, current_profit_pct)
+    context.peak_profit_pct = peak_profit_pct
+    
+    if peak_profit_pct > current_profit_pct + 0.05:  # Meaningful giveback
+        logger.info(f"      📊 Peak profit: {peak_profit_pct:.3f}% | Current: {current_profit_pct:.3f}% | Giveback: {peak_profit_pct - current_profit_pct:.3f}%")
+    
+    # Update cross-asset cache with this symbol's data
+    h1_trend = getattr(context, 'h1_trend', 0.5)
+    h4_trend = getattr(context, 'h4_trend', 0.5)
+    h4_momentum = getattr(context, 'h4_momentum', 0.0)
+    update_cross_asset_cache(symbol, h1_trend, h4_trend, h4_momentum)
+    
+    # Add cross-asset correlation to context
+    cross_asset = calculate_cross_asset_context(symbol)
+    context.dxy_trend = cross_asset['dxy_trend']
+    context.dxy_momentum = cross_asset['dxy_momentum']
+    context.dxy_strength = cross_asset['dxy_strength']
+    context.risk_on_off = cross_asset['risk_on_off']
+    context.indices_aligned = cross_asset['indices_aligned']
+    context.indices_momentum = cross_asset['indices_momentum']
+    context.gold_dollar_divergence = cross_asset['gold_dollar_divergence']
+    
+    # Set has_position flag so analysis runs
+    context.has_position = True
+    return context
+
 # NOTE: Anti-churn and position state tracking is now handled by UnifiedTradingSystem
 # This is the SINGLE SOURCE OF TRUTH - no duplicate tracking here
 
@@ -374,7 +479,7 @@ def calculate_cross_asset_context(symbol: str) -> dict:
 @app.on_event("startup")
 async def load_ai_system():
     """Load ML models, feature engineer, position manager, and risk systems"""
-    global ml_models, feature_engineer, position_manager, unified_system, elite_sizer, portfolio_state, market_hours
+    global ml_models, feature_engineer, position_manager, unified_system, elite_sizer, portfolio_state, market_hours, ml_broker, decision_recorder
 
     logger.info("═══════════════════════════════════════════════════════════════════")
     logger.info("AI-POWERED MULTI-SYMBOL TRADING SYSTEM - LOADING")
@@ -423,6 +528,11 @@ async def load_ai_system():
                         logger.error(f"❌ Failed to load model for {symbol}: {e}")
         
         logger.info(f"✅ Total models loaded: {len(ml_models)} symbols")
+
+        # Requests arriving together at bar close share one batched forward pass per model
+        ml_broker = InferenceBroker(run_ml_batch, window_ms=ML_BATCH_WINDOW_MS,
+                                    min_window_ms=1.0, max_window_ms=5.0)
+        logger.info(f"✅ ML inference broker ready (window {ML_BATCH_WINDOW_MS:.1f}ms, adaptive 1-5ms)")
         
     except Exception as e:
         logger.error(f"❌ Failed to load ML models: {e}")
@@ -499,6 +609,14 @@ async def load_ai_system():
         logger.error(f"❌ Failed to initialize news filter: {e}")
         news_filter = None
 
+    # 9. Initialize Decision Flight Recorder
+    try:
+        decision_recorder = FlightRecorder('logs/flight_recorder')
+        logger.info("   - Ring buffer + async spill, replay with replay_decisions.py")
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize flight recorder: {e}")
+        decision_recorder = None
+
     logger.info("═══════════════════════════════════════════════════════════════════")
     logger.info("SYSTEM READY - Regime-Aware AI Trading System")
     logger.info("═══════════════════════════════════════════════════════════════════")
@@ -583,129 +701,224 @@ def parse_market_data(request: dict) -> Dict[str, pd.DataFrame]:
     return mtf_data
 
 
-def get_ml_signal(features: dict, symbol: str = 'US30') -> Tuple[str, float]:
-    """Get ML signal (BUY/SELL/HOLD) and confidence using symbol-specific ensemble"""
+def resolve_ml_model(symbol: str) -> Tuple[Optional[str], Optional[dict]]:
+    """Return (model_key, model) for a symbol, using the shared fallback families"""
     # Get model for this symbol (lowercase to match loaded models)
     symbol_lower = symbol.lower()
     ml_model = ml_models.get(symbol_lower)
-    
+    if ml_model is not None:
+        return symbol_lower, ml_model
+
+    logger.warning(f"⚠️ No model for {symbol_lower}, trying fallbacks")
+    # Try fallbacks in order
+    for fallback in ['us30', 'us100', 'us500', 'forex', 'indices', 'commodities']:
+        ml_model = ml_models.get(fallback)
+        if ml_model is not None:
+            logger.info(f"   Using {fallback} model for {symbol}")
+            return fallback, ml_model
+
+    logger.error(f"❌ No models loaded at all")
+    return None, None
+
+
+def _build_feature_frame(ml_model: dict, features_list: list) -> pd.DataFrame:
+    """Build one feature row per request, aligned to the model's training features"""
+    # CRITICAL FIX: Align features with model expectations
+    # Models were trained on 128 features, we're sending 140
+    model_features = ml_model.get('feature_names', [])
+    if not model_features:
+        for features in features_list:
+            logger.info(f"   Features for prediction: {len(features)} features")
+        return pd.DataFrame(features_list)
+
+    # Select and reorder features to match model exactly
+    # Use default values for missing features
+    rows = []
+    for features in features_list:
+        missing = [feat for feat in model_features if feat not in features]
+        if missing:
+            logger.error(f"❌ Missing features for model: {set(missing)}")
+        elif len(features) != len(model_features):
+            logger.debug(f"   Features filtered: {len(features)} → {len(model_features)}")
+        rows.append([features.get(feat, 0.0) for feat in model_features])
+    return pd.DataFrame(rows, columns=model_features)
+
+
+def _signal_from_probabilities(ml_model: dict, model1_pred, model2_pred,
+                               model1_proba, model2_proba) -> Tuple[str, float, Dict]:
+    """Map one row of ensemble outputs to (direction, confidence, probabilities)"""
+    # NEW models have rf_model and gb_model
+    if 'rf_model' in ml_model and 'gb_model' in ml_model:
+        # Random Forest + Gradient Boosting ensemble (equal weights)
+        ensemble_proba = (model1_proba + model2_proba) / 2
+
+        # CRITICAL: Models are biased - use probability threshold instead of hard prediction
+        # If probability is close to 50%, it's actually uncertain, not confident
+        buy_prob = ensemble_proba[1]
+        sell_prob = ensemble_proba[0]
+
+        # ML returns direction based on probability
+        # Unified Trading System handles setup-specific thresholds:
+        # - SCALP: 55% (quick trades, lower conviction OK)
+        # - DAY: 57% (medium conviction)
+        # - SWING: 60% (need conviction for longer holds)
+        # Here we just return the raw signal, let unified system filter
+        MIN_CONFIDENCE = 0.55  # Base minimum - unified system applies setup-specific thresholds
+
+        if buy_prob > MIN_CONFIDENCE:
+            direction = "BUY"
+            confidence = buy_prob * 100
+        elif sell_prob > MIN_CONFIDENCE:
+            direction = "SELL"
+            confidence = sell_prob * 100
+        else:
+            # Below 55% - truly uncertain
+            direction = "HOLD"
+            confidence = max(buy_prob, sell_prob) * 100
+
+        logger.info(f"🤖 ML SIGNAL: {direction} (Confidence: {confidence:.1f}%) [BUY prob: {buy_prob:.3f}, SELL prob: {sell_prob:.3f}]")
+        return direction, confidence, {'buy': float(buy_prob), 'sell': float(sell_prob)}
+
+    # OLD models (fallback)
+    weights = ml_model.get('ensemble_weights', [0.5, 0.5])
+
+    # Ensemble prediction (weighted voting)
+    ensemble_pred = int(round(model1_pred * weights[0] + model2_pred * weights[1]))
+
+    # Get probabilities for confidence
+    ensemble_proba = model1_proba * weights[0] + model2_proba * weights[1]
+    confidence = ensemble_proba.max() * 100
+
+    # Log probabilities for debugging
+    logger.info(f"   Probabilities: BUY={ensemble_proba[0]:.3f}, HOLD={ensemble_proba[1]:.3f}, SELL={ensemble_proba[2]:.3f}")
+
+    # CRITICAL FIX: Correct mapping (models trained with 0=BUY, 1=HOLD, 2=SELL)
+    direction_map = {0: "BUY", 1: "HOLD", 2: "SELL"}
+    direction = direction_map.get(ensemble_pred, "HOLD")
+
+    logger.info(f"🤖 ML SIGNAL: {direction} (Confidence: {confidence:.1f}%)")
+
+    probabilities = {'buy': float(ensemble_proba[0]), 'hold': float(ensemble_proba[1]), 'sell': float(ensemble_proba[2])}
+    return direction, confidence, probabilities
+
+
+def run_ml_batch(model_key: str, batch: list) -> list:
+    """
+    Batched ML inference for one model.
+
+    Args:
+        model_key: Key into ml_models (symbol model or shared fallback family)
+        batch: List of feature dicts, one per waiting request
+
+    Returns:
+        List of (direction, confidence, probabilities), one per feature dict
+    """
+    ml_model = ml_models.get(model_key)
     if ml_model is None:
-        logger.warning(f"⚠️ No model for {symbol_lower}, trying fallbacks")
-        # Try fallbacks in order
-        for fallback in ['us30', 'us100', 'us500', 'forex', 'indices', 'commodities']:
-            ml_model = ml_models.get(fallback)
-            if ml_model is not None:
-                logger.info(f"   Using {fallback} model for {symbol}")
-                break
-        
-        if ml_model is None:
-            logger.error(f"❌ No models loaded at all")
-            return "HOLD", 0.0
+        return [("HOLD", 0.0, {})] * len(batch)
 
     try:
-        # NEW MODELS: Use RandomForest and GradientBoosting (trained Nov 20)
-        feature_df = pd.DataFrame([features])
-        
-        # CRITICAL FIX: Align features with model expectations
-        # Models were trained on 128 features, we're sending 140
-        model_features = ml_model.get('feature_names', [])
-        if model_features:
-            # Select and reorder features to match model exactly
-            try:
-                # Only use features the model was trained on
-                feature_df = feature_df[model_features]
-                if len(features) != len(model_features):
-                    logger.debug(f"   Features filtered: {len(features)} → {len(model_features)}")
-            except KeyError as e:
-                missing = set(model_features) - set(features.keys())
-                logger.error(f"❌ Missing features for model: {missing}")
-                # Use default values for missing features
-                for feat in missing:
-                    feature_df[feat] = 0.0
-                feature_df = feature_df[model_features]
-        else:
-            logger.info(f"   Features for prediction: {len(features)} features")
+        feature_df = _build_feature_frame(ml_model, batch)
 
-        # NEW models have rf_model and gb_model
+        # NEW models have rf_model and gb_model (trained Nov 20); OLD have xgb + lgb
         if 'rf_model' in ml_model and 'gb_model' in ml_model:
-            # Random Forest + Gradient Boosting ensemble
-            rf_pred = ml_model['rf_model'].predict(feature_df)[0]
-            gb_pred = ml_model['gb_model'].predict(feature_df)[0]
-            rf_proba = ml_model['rf_model'].predict_proba(feature_df)[0]
-            gb_proba = ml_model['gb_model'].predict_proba(feature_df)[0]
-            
-            # Ensemble prediction (equal weights)
-            ensemble_pred = int((rf_pred + gb_pred) / 2 > 0.5)
-            ensemble_proba = (rf_proba + gb_proba) / 2
-            
-            # CRITICAL: Models are biased - use probability threshold instead of hard prediction
-            # If probability is close to 50%, it's actually uncertain, not confident
-            buy_prob = ensemble_proba[1]
-            sell_prob = ensemble_proba[0]
-            
-            # ML returns direction based on probability
-            # Unified Trading System handles setup-specific thresholds:
-            # - SCALP: 55% (quick trades, lower conviction OK)
-            # - DAY: 57% (medium conviction)
-            # - SWING: 60% (need conviction for longer holds)
-            # Here we just return the raw signal, let unified system filter
-            MIN_CONFIDENCE = 0.55  # Base minimum - unified system applies setup-specific thresholds
-            
-            if buy_prob > MIN_CONFIDENCE:
-                direction = "BUY"
-                confidence = buy_prob * 100
-            elif sell_prob > MIN_CONFIDENCE:
-                direction = "SELL"
-                confidence = sell_prob * 100
-            else:
-                # Below 55% - truly uncertain
-                direction = "HOLD"
-                confidence = max(buy_prob, sell_prob) * 100
-                
-            logger.info(f"🤖 ML SIGNAL: {direction} (Confidence: {confidence:.1f}%) [BUY prob: {buy_prob:.3f}, SELL prob: {sell_prob:.3f}]")
-            return direction, confidence
-            
-        # OLD models (fallback)
-        weights = ml_model.get('ensemble_weights', [0.5, 0.5])
-        
-        # Check which models are available
-        if 'xgb_model' in ml_model and 'lgb_model' in ml_model:
-            # XGBoost + LightGBM ensemble
-            model1_pred = ml_model['xgb_model'].predict(feature_df)[0]
-            model2_pred = ml_model['lgb_model'].predict(feature_df)[0]
-            model1_proba = ml_model['xgb_model'].predict_proba(feature_df)[0]
-            model2_proba = ml_model['lgb_model'].predict_proba(feature_df)[0]
-        elif 'rf_model' in ml_model and 'gb_model' in ml_model:
-            # RandomForest + GradientBoosting ensemble
-            model1_pred = ml_model['rf_model'].predict(feature_df)[0]
-            model2_pred = ml_model['gb_model'].predict(feature_df)[0]
-            model1_proba = ml_model['rf_model'].predict_proba(feature_df)[0]
-            model2_proba = ml_model['gb_model'].predict_proba(feature_df)[0]
+            model1, model2 = ml_model['rf_model'], ml_model['gb_model']
+            model1_preds = model2_preds = [None] * len(batch)  # Probability-based, hard votes unused
+        elif 'xgb_model' in ml_model and 'lgb_model' in ml_model:
+            model1, model2 = ml_model['xgb_model'], ml_model['lgb_model']
+            model1_preds = model1.predict(feature_df)
+            model2_preds = model2.predict(feature_df)
         else:
-            logger.error(f"❌ Unknown model structure for {symbol}")
-            return "HOLD", 0.0
+            logger.error(f"❌ Unknown model structure for {model_key}")
+            return [("HOLD", 0.0, {})] * len(batch)
 
-        # Ensemble prediction (weighted voting)
-        ensemble_pred = int(round(model1_pred * weights[0] + model2_pred * weights[1]))
+        # ONE forward pass per model for the whole batch
+        model1_probas = model1.predict_proba(feature_df)
+        model2_probas = model2.predict_proba(feature_df)
 
-        # Get probabilities for confidence
-        ensemble_proba = model1_proba * weights[0] + model2_proba * weights[1]
-        confidence = ensemble_proba.max() * 100
-        
-        # Log probabilities for debugging
-        logger.info(f"   Probabilities: BUY={ensemble_proba[0]:.3f}, HOLD={ensemble_proba[1]:.3f}, SELL={ensemble_proba[2]:.3f}")
+        return [
+            _signal_from_probabilities(ml_model, model1_preds[i], model2_preds[i],
+                                       model1_probas[i], model2_probas[i])
+            for i in range(len(batch))
+        ]
+
+    except Exception as e:
+        if len(batch) > 1:
+            # Don't let one bad row fail every waiting request
+            logger.warning(f"⚠️ Batched ML prediction failed ({e}) - retrying {len(batch)} rows individually")
+            return [run_ml_batch(model_key, [features])[0] for features in batch]
+        logger.error(f"❌ ML prediction failed: {e}")
+        return [("HOLD", 0.0, {})]
+
+
+def get_ml_signal(features: dict, symbol: str = 'US30') -> Tuple[str, float]:
+    """Get ML signal (BUY/SELL/HOLD) and confidence using symbol-specific ensemble"""
+    model_key, ml_model = resolve_ml_model(symbol)
+    if ml_model is None:
+        return "HOLD", 0.0
+    direction, confidence, probabilities = run_ml_batch(model_key, [features])[0]
+    _record_ml_signal(symbol, model_key, direction, confidence, probabilities)
+    return direction, confidence
 
-        # CRITICAL FIX: Correct mapping (models trained with 0=BUY, 1=HOLD, 2=SELL)
-        direction_map = {0: "BUY", 1: "HOLD", 2: "SELL"}
-        direction = direction_map.get(ensemble_pred, "HOLD")
 
-        logger.info(f"🤖 ML SIGNAL: {direction} (Confidence: {confidence:.1f}%)")
+async def get_ml_signal_async(features: dict, symbol: str = 'US30') -> Tuple[str, float]:
+    """
+    Same as get_ml_signal, but micro-batched across concurrent requests.
 
-        return direction, confidence
+    Requests that resolve to the same model (including shared fallback
+    families) within the broker window share one batched forward pass.
+    """
+    if ml_broker is None:
+        return get_ml_signal(features, symbol)
 
+    model_key, ml_model = resolve_ml_model(symbol)
+    if ml_model is None:
+        return "HOLD", 0.0
+    try:
+        direction, confidence, probabilities = await ml_broker.submit(model_key, features)
     except Exception as e:
         logger.error(f"❌ ML prediction failed: {e}")
         return "HOLD", 0.0
+    # Noted here, not in run_ml_batch: the executor thread doesn't see the request's record
+    _record_ml_signal(symbol, model_key, direction, confidence, probabilities)
+    return direction, confidence
+
+
+def _record_ml_signal(symbol: str, model_key: str, direction: str, confidence: float, probabilities: dict):
+    """Attach an ML result to the current flight recorder record"""
+    flight.note_append('ml', {
+        'symbol': symbol,
+        'model': model_key,
+        'direction': direction,
+        'confidence': float(confidence),
+        'probabilities': probabilities,
+    })
+
+# ═══════════════════════════════════════════════════════════════════
+# SYMBOL NAMES
+# ═══════════════════════════════════════════════════════════════════
+
+def request_symbol(request: dict) -> str:
+    """Raw broker symbol of a trade decision request (EA sends this in symbol_info)"""
+    return request.get('symbol_info', {}).get('symbol', request.get('symbol', 'US30'))
+
+
+def normalize_symbol(raw_symbol: str) -> str:
+    """
+    Clean a broker symbol to match model files (and actor keys).
+    Broker format: XAUZ25.sim, US30Z25.sim, USOILF26.sim, etc.
+    """
+    import re
+    
+    # Step 1: Remove .sim suffix
+    symbol = raw_symbol.replace('.sim', '').replace('.SIM', '')
+    
+    # Step 2: Remove contract codes (Z25, F26, G26, H26, etc.) - case insensitive
+    # Contract codes are: Z=Dec, F=Jan, G=Feb, H=Mar, J=Apr, K=May, M=Jun, N=Jul, Q=Aug, U=Sep, V=Oct, X=Nov
+    symbol = re.sub(r'[ZFGHJKMNQUVX]\d{2}$', '', symbol, flags=re.IGNORECASE)
+    
+    # Step 3: Convert to lowercase (XAU → xau, USOIL → usoil)
+    return symbol.lower()
 
 # ═══════════════════════════════════════════════════════════════════
 # MAIN TRADING ENDPOINT
@@ -713,6 +926,30 @@ def get_ml_signal(features: dict, symbol: str = 'US30') -> Tuple[str, float]:
 
 @app.post("/api/ai/trade_decision")
 async def ai_trade_decision(request: dict):
+    """
+    Trade decision endpoint.
+
+    Every call is captured by the flight recorder (request, features, context,
+    ML probabilities, exit EVs, final action and stage timings) when it is loaded.
+
+    Runs on the symbol's actor: requests for one symbol are processed in order,
+    requests for different symbols concurrently.
+    """
+    symbol = normalize_symbol(request_symbol(request))
+    if decision_recorder is None:
+        return await decision_actors.ask(symbol, _ai_trade_decision, request)
+
+    handle = decision_recorder.begin(request)
+    try:
+        response = await decision_actors.ask(symbol, _ai_trade_decision, request)
+    except Exception as e:
+        decision_recorder.finish(handle, error=str(e))
+        raise
+    decision_recorder.finish(handle, response)
+    return response
+
+
+async def _ai_trade_decision(request: dict):
     """
     THE PERFECT AI TRADING SYSTEM
 
@@ -740,6 +977,7 @@ async def ai_trade_decision(request: dict):
         
         # Log account data even when market closed (for verification)
         account_data = request.get('account', {})
+        ftmo_engine.on_account(account_data, phase=request.get('ftmo_phase'))
         if account_data:
             logger.info(f"   📊 Account data received: initial_balance={account_data.get('initial_balance', 'NOT SET')}, "
                        f"balance={account_data.get('balance')}, equity={account_data.get('equity')}, "
@@ -846,7 +1084,7 @@ async def ai_trade_decision(request: dict):
         
         # Extract symbol from request (EA sends this in symbol_info)
         symbol_info = request.get('symbol_info', {})
-        raw_symbol = symbol_info.get('symbol', request.get('symbol', 'US30'))
+        raw_symbol = request_symbol(request)
         
         # Extract broker constraints early (needed for context)
         min_lot = float(symbol_info.get('min_lot', 1.0))
@@ -857,24 +1095,8 @@ async def ai_trade_decision(request: dict):
         logger.info(f"   📊 Broker contract_size: {contract_size}")
         
         # Clean symbol name to match model files
-        # Broker format: XAUZ25.sim, US30Z25.sim, USOILF26.sim, etc.
         import re
-        
-        # Step 1: Remove .sim suffix
-        symbol = raw_symbol.replace('.sim', '').replace('.SIM', '')
-        
-        # Step 2: Remove contract codes (Z25, F26, G26, H26, etc.) - case insensitive
-        # Contract codes are: Z=Dec, F=Jan, G=Feb, H=Mar, J=Apr, K=May, M=Jun, N=Jul, Q=Aug, U=Sep, V=Oct, X=Nov
-        symbol = re.sub(r'[ZFGHJKMNQUVX]\d{2}$', '', symbol, flags=re.IGNORECASE)
-        
-        # Step 3: Convert to lowercase
-        symbol = symbol.lower()
-        
-        # Step 4: Handle broker-specific symbol names
-        if symbol == 'xau':
-            symbol = 'xau'  # Gold: XAU → xau (already correct)
-        elif symbol == 'usoil':
-            symbol = 'usoil'  # Oil: USOIL → usoil (already correct)
+        symbol = normalize_symbol(raw_symbol)
         
         logger.info(f"📊 Symbol: {raw_symbol} → {symbol}")
         
@@ -952,19 +1174,10 @@ async def ai_trade_decision(request: dict):
                     trade_exit_price = float(trade.get('price_close', 0))
                     
                     # Get session context for the trade
-                    from datetime import datetime
-                    import pytz
-                    utc_now = datetime.now(pytz.UTC)
-                    is_friday = utc_now.weekday() == 4
-                    current_hour = utc_now.hour
-                    if 13 <= current_hour < 16:
-                        trade_session = 'overlap'
-                    elif 13 <= current_hour < 21:
-                        trade_session = 'new_york'
-                    elif 8 <= current_hour < 16:
-                        trade_session = 'london'
-                    else:
-                        trade_session = 'asian'
+                    from src.utils.session_calendar import get_session_calendar
+                    session_state = get_session_calendar().lookup(trade_symbol)
+                    trade_session = session_state.session
+                    is_friday = session_state.is_friday
                     
                     # Log to persistent journal
                     log_closed_trade(
@@ -998,33 +1211,17 @@ async def ai_trade_decision(request: dict):
                 clean_symbol = re.sub(r'[ZFGHJKMNQUVX]\d{2}', '', trade_symbol.replace('.sim', ''), flags=re.IGNORECASE).lower()
                 direction = 'BUY' if trade_type == 0 else 'SELL'
                 
-                # Track the highest ticket we've seen per symbol using a module-level dict
-                global _recent_close_tickets
-                if '_recent_close_tickets' not in globals():
-                    _recent_close_tickets = {}
-                
-                symbol_key = clean_symbol
-                if symbol_key not in _recent_close_tickets:
-                    _recent_close_tickets[symbol_key] = {'ticket': 0, 'time': 0}
-                
-                # If this is a newer ticket than we've seen, register the close
-                if trade_ticket > _recent_close_tickets[symbol_key]['ticket']:
-                    _recent_close_tickets[symbol_key] = {
-                        'ticket': trade_ticket,
-                        'time': current_time
-                    }
-                    
-                    # Register with unified system for anti-churn
-                    if unified_system:
-                        unified_system.register_close(clean_symbol, direction, 0.5, f"Stop/TP hit (ticket #{trade_ticket})")
-                        logger.info(f"   🚫 ANTI-CHURN: Registered close on {clean_symbol} (ticket #{trade_ticket}, {direction})")
+                # Track the highest ticket we've seen per symbol (persisted - see _recent_close_tickets)
+                # The trade's symbol owns that state - register on its actor (inline if it is this symbol)
+                decision_actors.tell(clean_symbol, register_recent_close, clean_symbol, trade_ticket, direction, current_time)
                 
                 # Also check time_close if available (backup method)
                 if trade_close_time > 0:
                     seconds_since_close = current_time - trade_close_time
                     if seconds_since_close < 300:  # Closed in last 5 minutes
                         if unified_system:
-                            unified_system.register_close(clean_symbol, direction, 0.5, f"Recent close ({seconds_since_close:.0f}s ago)")
+                            decision_actors.tell(clean_symbol, unified_system.register_close,
+                                                 clean_symbol, direction, 0.5, f"Recent close ({seconds_since_close:.0f}s ago)")
                             logger.info(f"   🚫 Anti-churn: Recent close on {clean_symbol} ({seconds_since_close:.0f}s ago)")
                 
                 # Log large losses for investigation
@@ -1044,6 +1241,64 @@ async def ai_trade_decision(request: dict):
             open_tickets = [pos.get('ticket', 0) for pos in open_positions]
             cleanup_closed_positions(open_tickets)
             
+            # ═══════════════════════════════════════════════════════════
+            # BATCH EXIT ANALYSIS
+            # Contexts for every position on the scanned symbol first, then ONE
+            # portfolio-level EV exit analysis for all of them
+            # (analyze_positions -> EVExitManagerV2.analyze_exits)
+            # ═══════════════════════════════════════════════════════════
+            position_analyses = {}  # id(pos) -> (context, decision)
+            scanned_positions = [
+                pos for pos in open_positions
+                if re.sub(r'[ZFGHJKMNQUVX]\d{2}$', '', pos.get('symbol', '').replace('.sim', '').upper(),
+                          flags=re.IGNORECASE).lower() == symbol
+            ]
+            if scanned_positions:
+                try:
+                    # Features and ML signal depend on the request only - once for all positions
+                    with flight.stage('features'):
+                        features = await decision_actors.offload(feature_engineer.engineer_features, request)
+                    flight.note('features', features)
+                    
+                    with flight.stage('ml'):
+                        ml_direction, ml_confidence = await get_ml_signal_async(features, symbol)
+                    
+                    position_contexts = [
+                        build_position_context(pos, symbol, features, request, ml_direction, ml_confidence, account_balance)
+                        for pos in scanned_positions
+                    ]
+                    
+                    # ACTUAL EXIT ANALYSIS - use intelligent position manager
+                    try:
+                        if position_manager is not None:
+                            with flight.stage('position_analysis'):
+                                position_decisions = await decision_actors.offload(
+                                    position_manager.analyze_positions, position_contexts)
+                        else:
+                            position_decisions = [{'action': 'HOLD', 'reason': 'Position manager not loaded', 'priority': 'LOW', 'confidence': 0}
+                                                  for _ in scanned_positions]
+                    except Exception as e:
+                        logger.error(f"❌ Exit analysis error for {symbol}: {e}")
+                        import traceback
+                        traceback.print_exc()
+                        position_decisions = [{'action': 'HOLD', 'reason': f'Analysis error: {str(e)}', 'priority': 'LOW', 'confidence': 0}
+                                              for _ in scanned_positions]
+                    
+                    for pos, context, position_decision in zip(scanned_positions, position_contexts, position_decisions):
+                        if position_manager is not None:
+                            flight.note_append('positions', {
+                                'ticket': pos.get('ticket', 0),
+                                'symbol': symbol,
+                                'context': flight.context_fields(context),
+                                'decision': position_decision,
+                            })
+                        position_analyses[id(pos)] = (context, position_decision)
+                except Exception as e:
+                    logger.error(f"   ❌ Error analyzing positions on {symbol}: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    # Continue to check for new trade opportunities
+            
             for pos in open_positions:
                 # Keep ORIGINAL symbol for EA to find position (includes .sim suffix)
                 pos_symbol_original = pos.get('symbol', '')
@@ -1082,77 +1337,11 @@ async def ai_trade_decision(request: dict):
                 
                 logger.info(f"      ✅ Analyzing position for {pos_symbol_clean} (matches current symbol)")
                 
+                if id(pos) not in position_analyses:
+                    continue  # Context could not be built (logged above)
+                
                 try:
-                    # Get features for this position's symbol
-                    features = feature_engineer.engineer_features(request)
-                    
-                    ml_direction, ml_confidence = get_ml_signal(features, pos_symbol_clean)
-                    
-                    # Create context for this position
-                    context = EnhancedTradingContext.from_features_and_request(
-                        features=features,
-                        request=request,
-                        ml_direction=ml_direction,
-                        ml_confidence=ml_confidence
-                    )
-                    
-                    # Override position data with this specific position
-                    context.position_type = pos_type
-                    context.position_entry_price = pos_entry
-                    context.position_current_profit = pos_profit
-                    context.position_volume = pos_volume
-                    context.position_dca_count = pos.get('dca_count', 0)
-                    
-                    # Add broker constraints to context for AI-driven position sizing
-                    context.max_lot = float(request.get('symbol_info', {}).get('max_lot', 50.0))
-                    context.min_lot = float(request.get('symbol_info', {}).get('min_lot', 1.0))
-                    context.lot_step = float(request.get('symbol_info', {}).get('lot_step', 1.0))
-                    
-                    # Add MT5 metadata to context for AI decisions
-                    context.position_ticket = pos_ticket
-                    context.position_age_minutes = pos_age_minutes
-                    context.position_sl = pos_sl
-                    context.position_tp = pos_tp
-                    context.position_swap = pos.get('swap', 0.0)  # Actual swap from broker
-                    
-                    # HEDGE FUND #5: Track peak profit for this position
-                    # Calculate current profit as % of account
-                    current_profit_pct = (pos_profit / account_balance * 100) if account_balance > 0 else 0
-                    peak_profit_pct = update_position_peak_profit(pos_ticket, current_profit_pct)
-                    context.peak_profit_pct = peak_profit_pct
-                    
-                    if peak_profit_pct > current_profit_pct + 0.05:  # Meaningful giveback
-                        logger.info(f"      📊 Peak profit: {peak_profit_pct:.3f}% | Current: {current_profit_pct:.3f}% | Giveback: {peak_profit_pct - current_profit_pct:.3f}%")
-                    
-                    # Update cross-asset cache with this symbol's data
-                    h1_trend = getattr(context, 'h1_trend', 0.5)
-                    h4_trend = getattr(context, 'h4_trend', 0.5)
-                    h4_momentum = getattr(context, 'h4_momentum', 0.0)
-                    update_cross_asset_cache(pos_symbol_clean, h1_trend, h4_trend, h4_momentum)
-                    
-                    # Add cross-asset correlation to context
-                    cross_asset = calculate_cross_asset_context(pos_symbol_clean)
-                    context.dxy_trend = cross_asset['dxy_trend']
-                    context.dxy_momentum = cross_asset['dxy_momentum']
-                    context.dxy_strength = cross_asset['dxy_strength']
-                    context.risk_on_off = cross_asset['risk_on_off']
-                    context.indices_aligned = cross_asset['indices_aligned']
-                    context.indices_momentum = cross_asset['indices_momentum']
-                    context.gold_dollar_divergence = cross_asset['gold_dollar_divergence']
-                    
-                    # ACTUAL EXIT ANALYSIS - use intelligent position manager
-                    try:
-                        # Set has_position flag so analysis runs
-                        context.has_position = True
-                        if position_manager is not None:
-                            position_decision = position_manager.analyze_position(context)
-                        else:
-                            position_decision = {'action': 'HOLD', 'reason': 'Position manager not loaded', 'priority': 'LOW', 'confidence': 0}
-                    except Exception as e:
-                        logger.error(f"❌ Exit analysis error for {pos_symbol_raw}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        position_decision = {'action': 'HOLD', 'reason': f'Analysis error: {str(e)}', 'priority': 'LOW', 'confidence': 0}
+                    context, position_decision = position_analyses[id(pos)]
                     
                     # ═══════════════════════════════════════════════════════════
                     # AI-DRIVEN POSITION SIZING - NO HARDCODED SAFETY OVERRIDES
@@ -1400,15 +1589,14 @@ async def ai_trade_decision(request: dict):
                 
                 # Calculate FTMO metrics for EA display
                 account_data = request.get('account', {})
-                account_balance = float(account_data.get('balance', 200000))
-                account_equity = float(account_data.get('equity', account_balance))
-                daily_pnl = float(account_data.get('daily_pnl', 0))
+                ftmo = ftmo_engine.snapshot()
+                account_balance = ftmo.balance
+                account_equity = ftmo.equity
                 
-                # FTMO limits: 5% daily, 10% total DD
-                ftmo_daily_limit = account_balance * 0.05
-                ftmo_total_limit = account_balance * 0.10
-                ftmo_daily_used_pct = abs(min(0, daily_pnl)) / ftmo_daily_limit * 100 if ftmo_daily_limit > 0 else 0
-                ftmo_total_dd_pct = (account_balance - account_equity) / account_balance * 100 if account_balance > 0 else 0
+                # FTMO limits: 5% daily, 10% total DD (of initial balance)
+                ftmo_daily_limit = ftmo.max_daily_loss
+                ftmo_daily_used_pct = ftmo.daily_used_pct
+                ftmo_total_dd_pct = ftmo.total_dd_pct
                 
                 # Expected return = EV(HOLD) which is the best action's expected value
                 expected_return = all_evs.get('HOLD', 0)
@@ -1496,6 +1684,9 @@ async def ai_trade_decision(request: dict):
             from src.ai.portfolio_state import get_portfolio_state
             portfolio_state = get_portfolio_state()
             portfolio_state.update_price(symbol, current_price)
+            get_cross_asset_matrix().update_price(symbol, current_price)
+            get_cvar_engine().update_contract(symbol, float(symbol_info.get('tick_value', 0)),
+                                              float(symbol_info.get('tick_size', 0)), current_price)
         except Exception as e:
             pass  # Non-critical, continue without correlation update
 
@@ -1510,7 +1701,9 @@ async def ai_trade_decision(request: dict):
 
         try:
             # Enhanced feature engineer generates 100+ features
-            features = feature_engineer.engineer_features(request)
+            with flight.stage('features'):
+                features = await decision_actors.offload(feature_engineer.engineer_features, request)
+            flight.note('features', features)
             logger.info(f"✅ Features extracted: {len(features)}")
             
             # DEBUG: Log sample features to verify real data
@@ -1523,7 +1716,8 @@ async def ai_trade_decision(request: dict):
         # ═══════════════════════════════════════════════════════════════════
         # STEP 3: ML SIGNAL GENERATION (Symbol-Specific Model)
         # ═══════════════════════════════════════════════════════════════════
-        ml_direction, ml_confidence = get_ml_signal(features, symbol)
+        with flight.stage('ml'):
+            ml_direction, ml_confidence = await get_ml_signal_async(features, symbol)
         logger.info(f"🤖 ML Signal ({symbol}): {ml_direction} @ {ml_confidence:.1f}%")
         
         # ═══════════════════════════════════════════════════════════════════
@@ -1568,9 +1762,8 @@ async def ai_trade_decision(request: dict):
                 context.news_currency = high_impact_events[0]['currency']
             
             # DAILY PROFIT PROTECTION: Track peak daily P&L
-            global peak_daily_pnl_tracker
             from datetime import date
-            today = date.today()
+            today = date.today().isoformat()
             
             # Reset tracker at start of new day
             if peak_daily_pnl_tracker['last_reset_date'] != today:
@@ -1771,7 +1964,14 @@ async def ai_trade_decision(request: dict):
                 logger.info(f"🎯 Entry analysis on {trigger_tf} trigger (HTF alignment required)")
                 
                 # Use unified system for entry decision (regime-aware AI trading)
-                entry_decision = unified_system.should_enter_trade(context, market_analysis)
+                entry_context = flight.context_fields(context)  # Before the unified system annotates it
+                with flight.stage('entry_analysis'):
+                    entry_decision = await decision_actors.offload(unified_system.should_enter_trade, context, market_analysis)
+                flight.note('entry', {
+                    'context': entry_context,
+                    'market_analysis': market_analysis,
+                    'decision': entry_decision,
+                })
                 
                 if not entry_decision['should_enter']:
                     logger.info(f"❌ Entry rejected: {entry_decision['reason']}")
@@ -2105,6 +2305,35 @@ async def ai_trade_decision(request: dict):
 # EXIT DECISION ENDPOINT
 # ═══════════════════════════════════════════════════════════════════
 
+@app.post("/api/account/event")
+async def account_event(event: dict):
+    """
+    Account event stream for the FTMO rule engine (EA heartbeat / OnTradeTransaction).
+
+    Body: {"type": "account", "account": {...}, "ftmo_phase": "challenge_1"}
+          {"type": "equity", "equity": 198450.0, "balance": 200000.0}
+          {"type": "balance", "balance": 199680.0}
+          {"type": "trade_close", "profit": -320.0, "balance": 199680.0}
+    Optional "time": unix timestamp (default now).
+    """
+    event_type = event.get('type', 'account')
+    timestamp = event.get('time')
+    try:
+        if event_type == 'equity':
+            snapshot = ftmo_engine.on_equity(float(event['equity']), event.get('balance'), timestamp)
+        elif event_type == 'balance':
+            snapshot = ftmo_engine.on_balance(float(event['balance']), timestamp)
+        elif event_type == 'trade_close':
+            snapshot = ftmo_engine.on_trade_close(float(event['profit']), event.get('balance'), timestamp)
+        elif event_type == 'account':
+            snapshot = ftmo_engine.on_account(event.get('account', {}), event.get('ftmo_phase'), timestamp)
+        else:
+            return {"ok": False, "error": f"Unknown event type: {event_type}"}
+    except (KeyError, TypeError, ValueError) as e:
+        return {"ok": False, "error": f"Invalid {event_type} event: {e}"}
+    return {"ok": True, "ftmo": snapshot.to_dict()}
+
+
 @app.post("/api/ai/exit_decision")
 async def ai_exit_decision(request: dict):
     """
@@ -2201,6 +2430,15 @@ async def health_check():
         "unified_system": unified_system is not None,
         "elite_sizer": elite_sizer is not None,
         "market_hours": market_hours is not None,
+        "ml_broker": ml_broker.get_stats() if ml_broker is not None else None,
+        "flight_recorder": decision_recorder.get_stats() if decision_recorder is not None else None,
+        "state_store": state_store.get_stats(),
+        "actors": decision_actors.get_stats(),
+        "covariance": portfolio_state.covariance.get_stats() if portfolio_state is not None else None,
+        "cvar": get_cvar_engine().get_stats(),
+        "ftmo": ftmo_engine.get_stats(),
+        "ev_surface": position_manager.ev_exit_manager.get_surface_stats()
+                      if position_manager is not None and position_manager.ev_exit_manager is not None else None,
         "system": "ai_powered_v5.0"
     }
 
@@ -32,6 +32,7 @@ from src.data.mt5_data_fetcher import MT5DataFetcher
 from src.ai.portfolio_manager import AdaptiveAIPortfolioManager, MLOpportunity
 from src.market_analysis.regime_detector import RegimeDetector
 from src.risk.ftmo_rules import FTMORuleValidator
+from src.risk.ftmo_rule_engine import FTMORuleEngine
 from src.risk.currency_exposure import CurrencyExposureTracker
 from src.risk.weekend_manager import WeekendRiskManager
 from src.risk.circuit_breaker import FlashCrashCircuitBreaker
@@ -43,6 +44,7 @@ from src.monitoring.position_monitor import PositionMonitor
 from src.execution.trade_executor import TradeExecutor
 from src.execution.execution_monitor import ExecutionQualityMonitor
 from src.utils.logger import get_logger
+from src.utils.scan_scheduler import ScanScheduler
 
 console = Console()
 logger = get_logger(__name__)
@@ -110,12 +112,18 @@ class AutonomousTrader:
             starting_balance=starting_balance,
             challenge_start_date=self.challenge_start_date
         )
+        # Incremental rule state (daily start, intraday/ever equity peaks) per equity event
+        self.ftmo_engine = FTMORuleEngine(
+            initial_balance=starting_balance,
+            phase={1: 'challenge_1', 2: 'challenge_2'}.get(phase, 'funded')
+        )
 
         # 6. Consistency Rule Validator (NEW - Phase 2 protection)
         console.print("  [cyan]6/15[/cyan] Initializing consistency rule validator...")
         self.consistency_validator = ConsistencyRuleValidator(
             warning_threshold=40.0,
-            critical_threshold=45.0
+            critical_threshold=45.0,
+            rule_engine=self.ftmo_engine
         )
 
         # 7. News Event Filter (NEW - Avoid high-impact news)
@@ -132,7 +140,9 @@ class AutonomousTrader:
         console.print("  [cyan]8/16[/cyan] Initializing profit pacing manager...")
         self.pacing_manager = ProfitPacingManager(
             phase=phase,
-            challenge_days=30
+            challenge_days=30,
+            challenge_start_date=self.challenge_start_date,
+            rule_engine=self.ftmo_engine
         )
 
         # 9. Currency Exposure Tracker
@@ -201,14 +211,13 @@ class AutonomousTrader:
         # Trading state
         self.is_running = False
         self.trading_days = []
-        self.max_equity_today = starting_balance
-        self.max_equity_ever = starting_balance
 
         # Multi-speed scanning state
         self.symbol_tiers = {}  # Will be organized by tier: {HIGH_PRIORITY: [], MEDIUM: [], LOW: []}
         self.ml_opportunities_queue = []  # Thread-safe queue for ML opportunities
         self.opportunities_lock = threading.Lock()  # Protect queue access
         self.scan_threads = []  # Keep track of scanning threads
+        self.scan_scheduler = None  # Adaptive (symbol, timeframe) scan jobs, created in run()
 
     def run(self, scan_interval_seconds: int = 180, enable_multi_speed: bool = True):
         """
@@ -241,22 +250,26 @@ class AutonomousTrader:
             console.print(f"  MEDIUM (90s): {len(self.symbol_tiers['MEDIUM_PRIORITY'])} symbols - {', '.join(self.symbol_tiers['MEDIUM_PRIORITY'][:5])}")
             console.print(f"  LOW (180s): {len(self.symbol_tiers['LOW_PRIORITY'])} symbols\n")
 
-            # Start tier-specific scanning threads (TESTING: Only HIGH and MEDIUM)
+            # Adaptive scan scheduler replaces the per-tier loops (TESTING: Only HIGH and MEDIUM)
+            config = symbol_config.SCAN_SCHEDULER
+            self.scan_scheduler = ScanScheduler(
+                self._scan_symbol_job,
+                timeframes=config['timeframes'],
+                rate=config['ea_scans_per_second'],
+                burst=config['burst'],
+                max_in_flight=config['max_in_flight'],
+                min_interval=config['min_interval'],
+                max_interval=config['max_interval'],
+                position_factor=config['position_interval_factor'],
+                server_offset=config['server_utc_offset_hours'] * 3600
+            )
             for tier_name in ['HIGH_PRIORITY', 'MEDIUM_PRIORITY']:  # Disabled LOW_PRIORITY for testing
-                symbols = self.symbol_tiers[tier_name]
-                if not symbols:
-                    continue
-
                 interval = symbol_config.SYMBOL_TIERS[tier_name]['scan_interval']
-                thread = threading.Thread(
-                    target=self._scan_tier_loop,
-                    args=(tier_name, symbols, interval),
-                    daemon=True,
-                    name=f"Scanner-{tier_name}"
-                )
-                thread.start()
-                self.scan_threads.append(thread)
-                logger.info(f"✓ Started {tier_name} scanner (interval: {interval}s, symbols: {len(symbols)})")
+                for symbol in self.symbol_tiers[tier_name]:
+                    self.scan_scheduler.add_symbol(symbol, interval, tier_name)
+            self.scan_scheduler.start()
+            logger.info(f"✓ Started scan scheduler ({self.scan_scheduler.get_stats()['symbols']} symbols, "
+                        f"{config['ea_scans_per_second']} EA scans/s, {config['max_in_flight']} in flight)")
 
             # Start exit monitoring thread
             exit_thread = threading.Thread(
@@ -268,7 +281,7 @@ class AutonomousTrader:
             self.scan_threads.append(exit_thread)
             logger.info("✓ Started exit monitoring thread (dynamic AI exits)")
 
-            console.print(f"[bold green]✓ All {len(self.scan_threads)} threads started (3 scanners + 1 exit monitor)[/bold green]\n")
+            console.print(f"[bold green]✓ Scan scheduler + {len(self.scan_threads)} exit monitor started[/bold green]\n")
 
         else:
             console.print(f"Scan Interval: {scan_interval_seconds}s (single-speed mode)\n")
@@ -316,14 +329,11 @@ class AutonomousTrader:
         equity = account_info['equity']
         open_positions = self.trade_executor.get_open_positions() or []
 
-        # Update equity tracking
-        if equity > self.max_equity_today:
-            self.max_equity_today = equity
-        if equity > self.max_equity_ever:
-            self.max_equity_ever = equity
+        # Update equity tracking (one O(1) event; rolls the day at midnight CE(S)T)
+        ftmo = self.ftmo_engine.on_equity(equity, balance=balance)
 
-        # Calculate daily P&L
-        daily_pnl_pct = ((equity - self.max_equity_today + (equity - balance)) / self.starting_balance) * 100
+        # Calculate daily P&L (vs the midnight balance, floating included)
+        daily_pnl_pct = ftmo.daily_pnl / self.starting_balance * 100
 
         # Track trading days
         today = datetime.now().date()
@@ -339,8 +349,8 @@ class AutonomousTrader:
             current_balance=balance,
             equity=equity,
             daily_pnl_pct=daily_pnl_pct,
-            max_equity_today=self.max_equity_today,
-            max_equity_ever=self.max_equity_ever,
+            max_equity_today=ftmo.max_equity_today,
+            max_equity_ever=ftmo.peak_equity,
             trading_days=self.trading_days
         )
 
@@ -354,12 +364,8 @@ class AutonomousTrader:
         # STEP 2: Check Profit Pacing (NEW - SMART TARGET TRACKING)
         # ========================================
         self.current_activity = f"Starting scan cycle - Balance: ${balance:,.0f}, Profit: {((equity - self.starting_balance) / self.starting_balance) * 100:.2f}%"
-        current_profit_pct = ((equity - self.starting_balance) / self.starting_balance) * 100
-        pacing_status = self.pacing_manager.assess_pacing(
-            current_profit_pct=current_profit_pct,
-            challenge_start_date=self.challenge_start_date,
-            current_date=datetime.now()
-        )
+        pacing_status = self.pacing_manager.assess_pacing()
+        current_profit_pct = pacing_status.current_profit_pct
 
         # Display pacing status
         console.print(f"\n[bold cyan]📈 PROFIT PACING: {pacing_status.urgency_level}[/bold cyan]")
@@ -367,11 +373,7 @@ class AutonomousTrader:
         console.print(f"[cyan]Progress: {current_profit_pct:.1f}% / {pacing_status.target_profit_pct:.0f}% ({pacing_status.progress_pct:.0f}%)[/cyan]\n")
 
         # Check if should stop trading (target exceeded)
-        should_stop, stop_reason = self.pacing_manager.should_stop_trading(
-            current_profit_pct=current_profit_pct,
-            current_date=datetime.now(),
-            challenge_start_date=self.challenge_start_date
-        )
+        should_stop, stop_reason = self.pacing_manager.should_stop_trading(current_profit_pct=current_profit_pct)
 
         if should_stop:
             logger.info(f"🎉 {stop_reason}")
@@ -388,12 +390,8 @@ class AutonomousTrader:
         # ========================================
         # STEP 3: Check Consistency Rule (NEW)
         # ========================================
-        # Calculate today's profit
-        today_profit = equity - balance  # Unrealized P&L
-        consistency_status = self.consistency_validator.check_consistency(
-            current_date=today,
-            current_day_profit=today_profit
-        )
+        # Today's profit = the engine's daily P&L (equity vs the midnight balance)
+        consistency_status = self.consistency_validator.check_consistency()
 
         if not consistency_status.is_compliant:
             logger.warning(f"⚠️  CONSISTENCY RISK: {consistency_status.recommendation}")
@@ -538,29 +536,26 @@ class AutonomousTrader:
         self.current_activity = f"Scanning {len(symbols)} symbols from market watch for ML signals..."
         logger.info(f"Scanning symbols: {symbols}")
 
+        # Multi-timeframe market data for every symbol in one GET_BARS_BULK round-trip
+        # (ML model needs H1, H4, D1) - request-id files, so no spacing delays needed
+        market_data = self.data_fetcher.fetch_multi_timeframe(symbols, ['H1', 'H4', 'D1'], bars=100)
+
         ml_opportunities = []
         for i, symbol in enumerate(symbols):
             self.current_activity = f"Analyzing {symbol} with ML model ({i+1}/{len(symbols)})..."
             try:
-                # CRITICAL FIX: Add delay BEFORE fetching to prevent command file overwriting
-                # Multiple simultaneous GET_BARS requests were overwriting each other
-                if i > 0:  # Skip delay for first request
-                    time.sleep(3.0)  # 3 second delay between requests for stability
-
-                # Get multi-timeframe market data (ML model needs H1, H4, D1)
-                mtf_data = {}
-                for tf in ['H1', 'H4', 'D1']:
-                    data = self.data_fetcher.fetch_symbol_data(symbol, timeframe=tf, bars=100)
-                    if data is not None and len(data) >= 50:
-                        mtf_data[tf] = data
-                    if i > 0 and tf != 'D1':  # Small delay between timeframe requests
-                        time.sleep(1.5)
+                mtf_data = {tf: data for tf, data in market_data.get(symbol, {}).items() if len(data) >= 50}
 
                 # Skip if we don't have all required timeframes
                 if len(mtf_data) < 3:
                     logger.warning(f"{symbol}: Missing timeframes (got {list(mtf_data.keys())})")
                     continue
 
+                # Flash crash threshold scales with the symbol's H1 ATR
+                h1 = mtf_data['H1']
+                if 'high' in h1.columns and 'low' in h1.columns:
+                    self.circuit_breaker.update_atr(symbol, float((h1['high'] - h1['low']).tail(14).mean()))
+
                 # Run ML prediction (pass as list of 1 symbol with market_data dict)
                 predictions = self.ml_scanner.scan_opportunities([symbol], {symbol: mtf_data})
 
@@ -800,14 +795,11 @@ class AutonomousTrader:
         equity = account_info['equity']
         open_positions = self.trade_executor.get_open_positions() or []
 
-        # Update equity tracking
-        if equity > self.max_equity_today:
-            self.max_equity_today = equity
-        if equity > self.max_equity_ever:
-            self.max_equity_ever = equity
+        # Update equity tracking (one O(1) event; rolls the day at midnight CE(S)T)
+        ftmo = self.ftmo_engine.on_equity(equity, balance=balance)
 
-        # Calculate daily P&L
-        daily_pnl_pct = ((equity - self.max_equity_today + (equity - balance)) / self.starting_balance) * 100
+        # Calculate daily P&L (vs the midnight balance, floating included)
+        daily_pnl_pct = ftmo.daily_pnl / self.starting_balance * 100
 
         # Track trading days
         today = datetime.now().date()
@@ -821,8 +813,8 @@ class AutonomousTrader:
             current_balance=balance,
             equity=equity,
             daily_pnl_pct=daily_pnl_pct,
-            max_equity_today=self.max_equity_today,
-            max_equity_ever=self.max_equity_ever,
+            max_equity_today=ftmo.max_equity_today,
+            max_equity_ever=ftmo.peak_equity,
             trading_days=self.trading_days
         )
 
@@ -908,6 +900,7 @@ class AutonomousTrader:
         gate_result = self.execution_gate.validate_trade(
             symbol=symbol,
             direction=direction,
+            risk_pct=risk_pct,
             open_positions=open_positions,
             account_balance=balance,
             current_time=datetime.now(),
@@ -988,6 +981,7 @@ class AutonomousTrader:
         gate_result = self.execution_gate.validate_trade(
             symbol=symbol,
             direction=direction,
+            risk_pct=risk_pct,
             open_positions=open_positions,
             account_balance=balance,
             current_time=datetime.now(),
@@ -1038,22 +1032,20 @@ class AutonomousTrader:
             self.current_activity = f"Trade failed: {message}"
             return False
 
-    def _scan_single_symbol(self, symbol: str, tier_name: str) -> None:
+    def _scan_single_symbol(self, symbol: str, tier_name: str, market_data: dict = None) -> None:
         """
         Scan a single symbol for ML opportunities (thread-safe)
 
         Args:
             symbol: Symbol to scan
             tier_name: Priority tier (HIGH_PRIORITY, MEDIUM_PRIORITY, LOW_PRIORITY)
+            market_data: Prefetched {timeframe: DataFrame} (fetched here if None)
         """
         try:
-            # Get multi-timeframe market data (ML model requires H1, H4, D1)
-            mtf_data = {}
-            for tf in ['H1', 'H4', 'D1']:
-                data = self.data_fetcher.fetch_symbol_data(symbol, timeframe=tf, bars=100)
-                if data is not None and len(data) >= 50:
-                    mtf_data[tf] = data
-                time.sleep(2.5)  # Optimized delay for EA reliability
+            # Get multi-timeframe market data (ML model requires H1, H4, D1) - one round-trip
+            if market_data is None:
+                market_data = self.data_fetcher.fetch_multi_timeframe([symbol], ['H1', 'H4', 'D1'], bars=100).get(symbol, {})
+            mtf_data = {tf: data for tf, data in market_data.items() if len(data) >= 50}
 
             # Skip if we don't have all required timeframes
             if len(mtf_data) < 3:
@@ -1088,47 +1080,48 @@ class AutonomousTrader:
         except Exception as e:
             logger.warning(f"[{tier_name}] Error scanning {symbol}: {e}")
 
-    def _scan_tier_loop(self, tier_name: str, symbols: list, scan_interval: int) -> None:
+    def _scan_symbol_job(self, symbol: str, timeframes: tuple) -> float:
         """
-        Continuously scan symbols in a specific tier
+        Scan job run by the scan scheduler (worker thread)
 
         Args:
-            tier_name: Priority tier name
-            symbols: List of symbols to scan
-            scan_interval: Seconds between scans
-        """
-        logger.info(f"[{tier_name}] Starting scan loop: {len(symbols)} symbols, {scan_interval}s interval")
-
-        while self.is_running:
-            try:
-                scan_start = time.time()
+            symbol: Symbol to scan
+            timeframes: Timeframes that came due (bar close or re-scan interval);
+                        unchanged ones are served by the bar cache
 
-                # Clear old opportunities from this tier
-                with self.opportunities_lock:
-                    self.ml_opportunities_queue = [
-                        opp for opp in self.ml_opportunities_queue
-                        if opp.symbol not in symbols
-                    ]
-
-                # Scan all symbols SEQUENTIALLY (not parallel) to avoid EA overload
-                # TESTING: Parallel execution causes too many concurrent GET_BARS requests
-                for i, symbol in enumerate(symbols):
-                    self._scan_single_symbol(symbol, tier_name)
-                    # Small delay between symbols for EA stability
-                    if i < len(symbols) - 1:  # Don't delay after last symbol
-                        time.sleep(1.0)
-
-                scan_duration = time.time() - scan_start
-                logger.info(f"[{tier_name}] Scan complete: {len(symbols)} symbols in {scan_duration:.1f}s")
-
-                # Sleep until next scan
-                sleep_time = max(0, scan_interval - scan_duration)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+        Returns:
+            Volatility ratio (recent H1 range / average range) for the next interval
+        """
+        tier_name = symbol_config.get_symbol_tier(symbol)
 
-            except Exception as e:
-                logger.error(f"[{tier_name}] Error in scan loop: {e}", exc_info=True)
-                time.sleep(60)  # Wait 1 min before retry
+        # Clear this symbol's old opportunity
+        with self.opportunities_lock:
+            self.ml_opportunities_queue = [
+                opp for opp in self.ml_opportunities_queue
+                if opp.symbol != symbol
+            ]
+
+        # Only the timeframes whose bar closed (or whose interval elapsed) go to the EA;
+        # the others have not changed since their last fetch
+        bar_cache = getattr(self.data_fetcher, 'bar_cache', None)
+        market_data = {}
+        stale = []
+        for tf in ('H1', 'H4', 'D1'):
+            cached = bar_cache.peek(symbol, tf, 100) if bar_cache and tf not in timeframes else None
+            if cached is None:
+                stale.append(tf)
+            else:
+                market_data[tf] = cached
+        if stale:
+            market_data.update(self.data_fetcher.fetch_multi_timeframe([symbol], stale, bars=100).get(symbol, {}))
+        self._scan_single_symbol(symbol, tier_name, market_data)
+
+        h1 = market_data.get('H1')
+        if h1 is None or len(h1) < 20:
+            return 1.0
+        ranges = h1['high'] - h1['low']
+        average = ranges.mean()
+        return float(ranges.tail(14).mean() / average) if average > 0 else 1.0
 
     def _monitor_exits_loop(self):
         """
@@ -1149,6 +1142,8 @@ class AutonomousTrader:
             try:
                 # Get open positions
                 positions = self.trade_executor.get_open_positions()
+                if self.scan_scheduler:
+                    self.scan_scheduler.set_open_positions(p['symbol'] for p in positions or [])
                 if not positions:
                     time.sleep(10)
                     continue
@@ -1326,6 +1321,9 @@ class AutonomousTrader:
         console.print("\n[yellow]Shutting down...[/yellow]\n")
 
         self.is_running = False
+        if self.scan_scheduler:
+            logger.info(self.scan_scheduler.format_staleness())
+            self.scan_scheduler.stop(wait=False)
 
         # Close all positions
         open_positions = self.trade_executor.get_open_positions() or []
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET_BARS_BULK against one GET_BARS per (symbol, timeframe)
+
+Runs MT5DataFetcher over the request-id file protocol against the local EA
+stand-in (no MT5 needed) and compares, for one scan of N symbols x H1/H4/D1:
+- old cadence: the fixed sleeps the scan loop used to add (estimate, not run)
+- per window:  one GET_BARS per (symbol, timeframe), back to back
+- bulk:        one GET_BARS_BULK for the whole scan
+- bulk+since:  the same with a since-cursor at the newest bar already held
+- cached scan: fetch_multi_timeframe() through the bar cache - fresh windows
+               are served from memory, stale ones fetch only their new bars
+
+Usage:
+    python benchmark_bars_bulk.py
+    python benchmark_bars_bulk.py --symbols 14 --latency 0.005 --repeats 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.brokers.mt5_standin import MT5StandInFileServer, SyntheticMarket
+from src.data.bar_cache import BarCache
+from src.data.bars_bulk import BarRequest
+from src.data.mt5_data_fetcher import MT5DataFetcher
+
+TIMEFRAMES = ['H1', 'H4', 'D1']
+
+
+def timed(fn, repeats: int) -> float:
+    """Median ms per call"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GET_BARS_BULK')
+    parser.add_argument('--symbols', type=int, default=14)
+    parser.add_argument('--bars', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005, help='Simulated EA seconds per command')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    market = SyntheticMarket()
+    symbols = [f"{market.symbols[i % len(market.symbols)]}{'' if i < len(market.symbols) else i}"
+               for i in range(args.symbols)]
+    requests = [BarRequest(s, tf, args.bars) for s in symbols for tf in TIMEFRAMES]
+
+    print("=" * 70)
+    print(f"BARS FETCH BENCHMARK ({len(symbols)} symbols x {len(TIMEFRAMES)} timeframes, "
+          f"EA latency {args.latency * 1000:.1f}ms)")
+    print("=" * 70)
+
+    # Old _trading_cycle: 3.0s before each symbol after the first, 1.5s after H1 and H4
+    old_sleep_ms = (len(symbols) - 1) * (3.0 + 2 * 1.5) * 1000
+    print(f"\n   old cadence  {old_sleep_ms:10.0f} ms of fixed sleeps alone")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with MT5StandInFileServer(directory, latency=args.latency, interval=0.001) as ea:
+            fetcher = MT5DataFetcher(files_dir=directory)
+
+            def per_window():
+                for r in requests:
+                    assert fetcher._fetch_bar_list(r.symbol, r.timeframe, r.count)
+
+            def bulk():
+                assert len(fetcher.get_bars_bulk(requests)) == len(requests)
+
+            held = fetcher.get_bars_bulk(requests)
+            cursors = [BarRequest(r.symbol, r.timeframe, r.count, held[(r.symbol, r.timeframe)]['time'][-1])
+                       for r in requests]
+
+            def bulk_since():
+                assert len(fetcher.get_bars_bulk(cursors)) == len(requests)
+
+            per_ms = timed(per_window, args.repeats)
+            bulk_ms = timed(bulk, args.repeats)
+            since_ms = timed(bulk_since, args.repeats)
+            new_bars = sum(len(c['time']) for c in fetcher.get_bars_bulk(cursors).values())
+
+            print(f"   per window   {per_ms:10.1f} ms   ({len(requests)} round-trips)")
+            print(f"   bulk         {bulk_ms:10.1f} ms   (1 round-trip, {per_ms / bulk_ms:.1f}x)")
+            print(f"   bulk+since   {since_ms:10.1f} ms   ({new_bars} bars returned vs "
+                  f"{len(requests) * args.bars})")
+
+            # Cached scan: max_age=0 forces the incremental path on every read
+            for label, max_age in (('cache hit', 30.0), ('cache incr', 0.0)):
+                fetcher.bar_cache = BarCache(max_age=max_age)
+                fetcher.fetch_multi_timeframe(symbols, TIMEFRAMES, args.bars)
+                scan_ms = timed(lambda: fetcher.fetch_multi_timeframe(symbols, TIMEFRAMES, args.bars), args.repeats)
+                print(f"   {label:<12} {scan_ms:10.1f} ms   ({fetcher.bar_cache.get_stats()['bars_fetched']} bars "
+                      f"fetched in total)")
+
+            print(f"\n   Transport: {fetcher.transport.get_stats()}")
+            print(f"   EA stand-in: {ea.standin.commands} commands")
+
+    print("\n" + "=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Load/integration test of the decision API against a simulated MT5 EA
+
+Replays historical bars (CSV exports from Export_Training_Data.mq5, or
+synthetic history) through SimulatedEA and POSTs the EA's WebRequest payload
+for every symbol on every bar, executing the responses on a simulated
+account. Reports API latency percentiles, throughput, late bars (scans that
+took longer than a bar at --bar-speed) and the resulting trades.
+
+Optionally the same simulated account is served over the EA socket protocol
+(--socket-port, normally 9090) and/or the file protocol (--files-dir), so the
+trading loop can run against it at the same time.
+
+Usage:
+    python benchmark_ea_simulator.py --stub
+    python benchmark_ea_simulator.py --symbols US30 EURUSD XAUUSD --bars 300 --concurrency 4
+    python benchmark_ea_simulator.py --data-dir training_data --payload multi --bar-speed 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.brokers.ea_simulator import DEFAULT_API_URL, EADriver, ReplayMarket, SimulatedEA
+from src.brokers.mt5_standin import MT5StandInFileServer, MT5StandInServer
+
+
+class StubDecisionHandler(BaseHTTPRequestHandler):
+    """Minimal /api/ai/trade_decision: trend-following on the last M1 bars, to exercise the harness"""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        bars = payload.get('timeframes', {}).get('m1', [])
+        held = any(p.get('symbol') == payload.get('symbol_info', {}).get('symbol')
+                   for p in payload.get('positions', []))
+        response = {'action': 'HOLD', 'lot_size': 0.0, 'reason': 'stub'}
+        if len(bars) >= 10 and not held:
+            move = bars[-1]['close'] - bars[-10]['close']
+            rng = max(b['high'] for b in bars[-10:]) - min(b['low'] for b in bars[-10:])
+            price = payload['current_price']['ask'] if move > 0 else payload['current_price']['bid']
+            if rng and abs(move) > 0.5 * rng:
+                side = 1 if move > 0 else -1
+                response = {'action': 'BUY' if side > 0 else 'SELL', 'lot_size': 0.1, 'reason': 'stub',
+                            'stop_loss': price - side * rng, 'take_profit': price + side * 2 * rng}
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the decision API with a simulated MT5 EA')
+    parser.add_argument('--url', default=DEFAULT_API_URL)
+    parser.add_argument('--payload', choices=['ultimate', 'multi'], default='ultimate',
+                        help='AI_Trading_EA_Ultimate or AI_MultiSymbol_EA request format')
+    parser.add_argument('--symbols', nargs='+', default=['US30', 'US100', 'XAUUSD', 'EURUSD'])
+    parser.add_argument('--bars', type=int, default=120, help='M1 bars to replay')
+    parser.add_argument('--bar-speed', type=float, default=0.0, help='Bars per second (0 = as fast as the API answers)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight')
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--data-dir', help='Directory of <SYMBOL>_<TF>.csv exports (default: synthetic history)')
+    parser.add_argument('--slippage', type=float, default=1.0, help='Slippage per fill in points')
+    parser.add_argument('--commission', type=float, default=0.0, help='Commission per lot')
+    parser.add_argument('--socket-port', type=int, help='Also serve the EA socket protocol on this port')
+    parser.add_argument('--files-dir', help='Also serve the EA file protocol in this directory')
+    parser.add_argument('--stub', action='store_true', help='Answer with a local stub API instead of --url')
+    args = parser.parse_args()
+
+    if args.data_dir:
+        market = ReplayMarket.from_csv(args.data_dir, args.symbols)
+    else:
+        market = ReplayMarket.synthetic(args.symbols, bars=args.bars + 1)
+    ea = SimulatedEA(market, slippage_points=args.slippage, commission_per_lot=args.commission)
+
+    stub = None
+    url = args.url
+    if args.stub:
+        stub = ThreadingHTTPServer(('127.0.0.1', 0), StubDecisionHandler)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{stub.server_address[1]}/api/ai/trade_decision"
+
+    servers = []
+    if args.socket_port is not None:
+        servers.append(MT5StandInServer(ea, port=args.socket_port))
+    if args.files_dir:
+        servers.append(MT5StandInFileServer(args.files_dir, ea))
+    for server in servers:
+        server.start()
+
+    print("=" * 70)
+    print(f"EA SIMULATOR ({len(market.symbols)} symbols, {args.payload} payload, "
+          f"concurrency {args.concurrency}, {'stub API' if stub else url})")
+    print("=" * 70)
+
+    try:
+        report = EADriver(ea, url=url, style=args.payload, concurrency=args.concurrency,
+                          timeout=args.timeout, bars_per_second=args.bar_speed).run(args.bars)
+    finally:
+        for server in servers:
+            server.stop()
+        if stub:
+            stub.shutdown()
+
+    latency = report['latency_ms']
+    print(f"\n   requests     {report['requests']:8d}   errors {sum(report['errors'].values())} {report['errors'] or ''}")
+    print(f"   throughput   {report['throughput_rps']:8.1f} req/s   payload {report['payload_kb']:.1f} KB")
+    print(f"   latency ms   p50 {latency['p50']:7.1f}   p90 {latency['p90']:7.1f}   p99 {latency['p99']:7.1f}   "
+          f"max {latency['max']:7.1f}")
+    if args.bar_speed:
+        print(f"   late bars    {report['late_bars']:8d}   (scan slower than 1/{args.bar_speed:g}s)")
+    print(f"\n   decisions    {report['actions']}")
+    print(f"   executed     {report['executed']}")
+    print(f"   balance      {report['balance']:12,.2f}   equity {report['equity']:12,.2f}   "
+          f"open positions {report['open_positions']}")
+
+    print("\n" + "=" * 70)
+    return 1 if report['requests'] and sum(report['errors'].values()) == report['requests'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark MT5SocketClient against the local MT5 stand-in server
+
+Compares, for the same simulated EA processing time per command:
+- reconnect:  a new TCP connection per command (the old client behaviour)
+- persistent: one framed connection, one command at a time
+- pipelined:  request_many() batches on the persistent connection
+- async:      AsyncMT5SocketClient.request_many() batches
+- bars:       a large GET_BARS response (framed, parsed once)
+
+The stand-in, like the EA, handles one command at a time, so pipelining is
+bounded by 1 / latency: it only removes the per-command round-trip and
+connection overhead.
+
+Usage:
+    python benchmark_mt5_socket.py
+    python benchmark_mt5_socket.py --requests 500 --batch 50 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.brokers.mt5_socket_client import AsyncMT5SocketClient, MT5SocketClient
+from src.brokers.mt5_standin import MT5StandInServer
+
+COMMAND = {"command": "get_tick", "symbol": "EURUSD"}
+
+
+def percentiles(samples_ms: list) -> str:
+    ordered = sorted(samples_ms)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {p50:7.3f}ms   p99 {p99:7.3f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MT5 socket client')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.002, help='Simulated EA seconds per command')
+    parser.add_argument('--bars', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"MT5 SOCKET BENCHMARK ({args.requests} requests, EA latency {args.latency * 1000:.1f}ms)")
+    print("=" * 70)
+
+    with MT5StandInServer(latency=args.latency) as server:
+        # Old behaviour: connect, send, receive, close - per command
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            client = MT5SocketClient(port=server.port)
+            client._send_command(COMMAND)
+            client.disconnect()
+            samples.append((time.perf_counter() - start) * 1000.0)
+        reconnect_rate = args.requests / (sum(samples) / 1000.0)
+        print(f"\n   reconnect    {percentiles(samples)}   {reconnect_rate:9.0f} req/s")
+
+        client = MT5SocketClient(port=server.port)
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            client._send_command(COMMAND)
+            samples.append((time.perf_counter() - start) * 1000.0)
+        rate = args.requests / (sum(samples) / 1000.0)
+        print(f"   persistent   {percentiles(samples)}   {rate:9.0f} req/s")
+
+        start = time.perf_counter()
+        done = 0
+        while done < args.requests:
+            n = min(args.batch, args.requests - done)
+            results = client.request_many([COMMAND] * n)
+            assert all(r and r.get('success') for r in results)
+            done += n
+        rate = args.requests / (time.perf_counter() - start)
+        print(f"   pipelined    batch of {args.batch:<4}{'':26}{rate:9.0f} req/s  ({rate / reconnect_rate:.1f}x)")
+
+        async def run_async():
+            aclient = AsyncMT5SocketClient(port=server.port)
+            begin = time.perf_counter()
+            remaining = args.requests
+            while remaining > 0:
+                n = min(args.batch, remaining)
+                results = await aclient.request_many([COMMAND] * n)
+                assert all(r and r.get('success') for r in results)
+                remaining -= n
+            elapsed = time.perf_counter() - begin
+            await aclient.close()
+            return args.requests / elapsed
+
+        rate = asyncio.run(run_async())
+        print(f"   async        batch of {args.batch:<4}{'':26}{rate:9.0f} req/s  ({rate / reconnect_rate:.1f}x)")
+
+        samples = []
+        for _ in range(5):
+            start = time.perf_counter()
+            response = client._send_command({"command": "get_rates", "symbol": "US30", "timeframe": "M1",
+                                             "count": args.bars})
+            samples.append((time.perf_counter() - start) * 1000.0)
+        print(f"   bars x{len(response['bars']):<5} median {statistics.median(samples):7.2f}ms")
+
+        client.disconnect()
+        print(f"\n   Server: {server.standin.commands} commands over {server.connections} connections")
+
+    print("\n" + "=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
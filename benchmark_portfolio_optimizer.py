@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark PortfolioOptimizer solve times for 5-50 symbol portfolios
+
+For each portfolio size, compares:
+- cold:        SLSQP from confidence weights (the old path, now with analytic gradients)
+- closed form: tangency when it is long-only (falls through to SLSQP otherwise -
+               see the solver usage line)
+- warm start:  SLSQP from the previous solution after a small signal change
+- cache hit:   same signals, same correlation epoch
+
+Usage:
+    python benchmark_portfolio_optimizer.py
+    python benchmark_portfolio_optimizer.py --sizes 5 10 20 50 --repeats 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.portfolio.portfolio_optimizer import PortfolioOptimizer
+
+
+def random_portfolio(n: int, rng: np.random.Generator):
+    """Symbols, a factor-model correlation matrix and signals"""
+    symbols = [f"SYM{i:02d}" for i in range(n)]
+    loadings = rng.normal(0, 1, (n, 3))
+    cov = loadings @ loadings.T + np.diag(rng.uniform(0.5, 2.0, n))
+    std = np.sqrt(np.diag(cov))
+    correlations = cov / np.outer(std, std)
+    signals = [{
+        'symbol': symbol,
+        'confidence': rng.uniform(0.5, 0.9),
+        'expected_return': rng.uniform(0.005, 0.03),
+        'risk': rng.uniform(0.01, 0.03),
+    } for symbol in symbols]
+    return symbols, correlations, signals
+
+
+def perturb(signals: list, rng: np.random.Generator, scale: float = 0.02) -> list:
+    return [{**s, 'expected_return': s['expected_return'] * (1 + rng.uniform(-scale, scale))} for s in signals]
+
+
+def timed(fn, repeats: int) -> float:
+    """Median ms per call"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PortfolioOptimizer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20, 30, 50])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("PORTFOLIO OPTIMIZER BENCHMARK (median ms per solve)")
+    print("=" * 70)
+    print(f"\n   {'symbols':>8}{'cold':>10}{'closed':>10}{'warm':>10}{'cache':>10}{'risk par':>10}")
+
+    rng = np.random.default_rng(args.seed)
+    for n in args.sizes:
+        symbols, correlations, signals = random_portfolio(n, rng)
+        cap = max(0.30, 2.0 / n)  # Keep sum(w) = 1 feasible and the cap occasionally binding
+
+        optimizer = PortfolioOptimizer(symbols)
+        optimizer.set_correlations(correlations)
+        expected_returns = np.array([s['expected_return'] for s in signals])
+        risks = np.array([s['risk'] for s in signals])
+        confidences = np.array([s['confidence'] for s in signals])
+        cov = correlations * np.outer(risks, risks)
+
+        def cold():
+            optimizer._previous = None
+            optimizer._solve_numeric(tuple(symbols), expected_returns, risks, confidences, cov, 1.0, cap)
+
+        def closed_form():
+            optimizer._cache.clear()
+            optimizer.optimize_weights(signals, max_total_risk=1.0, max_per_symbol=1.0)
+
+        cold_ms = timed(cold, args.repeats)
+        closed_ms = timed(closed_form, args.repeats)
+
+        # Previous solution in place, then a small signal change
+        cold()
+        solved = optimizer._previous
+        moved_returns = np.array([s['expected_return'] for s in perturb(signals, rng)])
+
+        def warm():
+            optimizer._previous = solved
+            optimizer._solve_numeric(tuple(symbols), moved_returns, risks, confidences, cov, 1.0, cap)
+
+        warm_ms = timed(warm, args.repeats)
+
+        optimizer.optimize_weights(signals, max_total_risk=1.0, max_per_symbol=cap)
+        cache_ms = timed(lambda: optimizer.optimize_weights(signals, max_total_risk=1.0, max_per_symbol=cap),
+                         args.repeats)
+
+        def risk_parity():
+            optimizer._cache.clear()
+            optimizer.optimize_weights(signals, max_total_risk=1.0, max_per_symbol=1.0, method='risk_parity')
+
+        parity_ms = timed(risk_parity, args.repeats)
+        print(f"   {n:>8}{cold_ms:>10.2f}{closed_ms:>10.3f}{warm_ms:>10.2f}{cache_ms:>10.4f}{parity_ms:>10.3f}")
+
+    print(f"\n   Solver usage: {optimizer.stats}")
+    print("\n" + "=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Build the precomputed EV decision surface for the exit fast path
+
+Sweeps EVExitManagerV2._calculate_all_evs over the grid in
+src/ai/ev_surface.py (profit %, one swing ATR in account %, TP/SL distance
+in swing ATRs, continuation, reversal, session multiplier) for every setup
+type and side. Each cell is evaluated on several random samples of everything
+the grid does not index (trends, momentum, RSI, ADX, symbol, price, volume,
+boosts, drawdown, age, peak giveback and target capture within GUARD_LIMITS).
+Cells where HOLD wins every sample get --confirm more samples; a cell is
+marked clear only if HOLD beat every other action by MIN_HOLD_MARGIN in ALL
+of them.
+
+After the build, a parity check replays fresh random samples in clear cells
+through the full calculation and reports how often it agrees.
+
+Usage:
+    make ev-surface                                 # build models/ev_surface.npz (git-ignored)
+    python build_ev_surface.py                      # same, unconditionally
+    python build_ev_surface.py --workers 6 --confirm 96
+    python build_ev_surface.py --check-only --check 5000   # parity check an existing table
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import src.ai.ev_exit_manager_v2 as ev_module
+import src.ai.regime_detector as regime_module
+from src.ai.enhanced_context import EnhancedTradingContext
+from src.ai.ev_surface import (
+    CAPTURE_INDEX, EV_KEYS, EXPECTED_HOLD_MINUTES, GUARD_LIMITS, HOLD_INDEX, MIN_HOLD_MARGIN,
+    SETUP_TYPES, SURFACE_AXES, EVSurface, surface_inputs, surface_shape,
+)
+
+SYMBOLS = ('US30', 'US100', 'US500', 'EURUSD', 'GBPUSD', 'USDJPY', 'XAUUSD')
+ACCOUNT_BALANCE = 200000.0
+
+
+def fresh_manager(tmp_dir: str) -> ev_module.EVExitManagerV2:
+    """Manager with isolated peak storage, a clean regime detector and no fast path"""
+    ev_module.PEAK_TRACKING_FILE = os.path.join(tmp_dir, f'sweep_peaks_{os.getpid()}.json')
+    ev_module.EV_SURFACE_FILE = os.path.join(tmp_dir, 'no_surface.npz')
+    regime_module._regime_detectors.clear()
+    return ev_module.EVExitManagerV2()
+
+
+def sample_point(cell: tuple, rng: random.Random) -> dict:
+    """Uniform random grid inputs inside a cell"""
+    return {
+        name: rng.uniform(edges[i], edges[i + 1])
+        for (name, edges), i in zip(SURFACE_AXES, cell)
+    }
+
+
+def evaluate(manager, setup_type: str, is_buy: bool, point: dict, rng: random.Random):
+    """Full EVs for one synthesized position at the given grid inputs (None if not on the grid)"""
+    sign = 1 if is_buy else -1
+    symbol = rng.choice(SYMBOLS)
+    price = rng.uniform(50.0, 50000.0)
+
+    context = EnhancedTradingContext(symbol=symbol, current_price=price,
+                                     account_balance=ACCOUNT_BALANCE, contract_size=1.0)
+    context.ml_direction = rng.choice(['BUY', 'SELL', 'HOLD'])
+    context.ml_confidence = rng.uniform(50, 80)
+    context.market_score = rng.uniform(30, 80)
+    for tf in ('m15', 'm30', 'h1', 'h4', 'd1'):
+        setattr(context, f'{tf}_trend', rng.random())
+        setattr(context, f'{tf}_momentum', rng.uniform(-1, 1))
+        setattr(context, f'{tf}_rsi', rng.uniform(25, 75))
+    for tf in ('h1', 'h4', 'd1', 'htf'):
+        setattr(context, f'{tf}_adx', rng.uniform(10, 50))
+    context.h4_volume_divergence = rng.uniform(0, 0.5)
+    context.d1_volume_divergence = rng.uniform(0, 0.5)
+    context.h4_market_structure = rng.uniform(-1, 1)
+    context.d1_market_structure = rng.uniform(-1, 1)
+    context.risk_on_off = rng.random()
+    context.dxy_trend = rng.random()
+
+    # Swing ATR (0.2-1% of price) widened where needed to keep the target capture
+    # (profit % / ATR target %) inside its guard limit
+    atr_mult = manager._calculate_ai_atr_mult(context, setup_type, is_buy)
+    min_atr_pct = max(0.0, point['profit_pct']) / (GUARD_LIMITS['target_capture'] * atr_mult)
+    atr_pct = rng.uniform(max(0.2, min_atr_pct), max(1.0, 2 * min_atr_pct))
+    atr = price * atr_pct / 100
+    context.atr = atr / 3.0
+    context.h4_volatility = atr
+
+    # Position at the requested profit / leverage / TP / SL distances
+    profit_pct = point['profit_pct']
+    leverage = point['atr_account'] / atr_pct  # Account % per price %
+    price_move_pct = profit_pct / leverage
+    context.has_position = True
+    context.position_type = 0 if is_buy else 1
+    context.position_entry_price = price / (1 + sign * price_move_pct / 100)
+    context.position_tp = price + sign * point['target_atr'] * atr
+    context.position_sl = price - sign * point['stop_atr'] * atr
+    context.position_volume = rng.uniform(1.0, 20.0)
+    context.position_age_minutes = rng.uniform(0, GUARD_LIMITS['age_ratio']) * EXPECTED_HOLD_MINUTES[setup_type]
+
+    # Unswept factors inside the guard limits
+    severity = rng.uniform(0, GUARD_LIMITS['drawdown_severity'])
+    context.daily_pnl = -(severity / 0.6) * context.max_daily_loss
+    if profit_pct > 0.1:
+        context.peak_profit_pct = profit_pct / (1 - rng.uniform(0, GUARD_LIMITS['peak_giveback']))
+
+    manager.position_peaks.clear()
+    profit_dollars = profit_pct / 100 * ACCOUNT_BALANCE
+    profit_metrics = manager._calculate_profit_metrics(context, profit_dollars, is_buy, symbol)
+    market_data = manager._extract_market_data(context, is_buy)
+    probabilities = manager._calculate_probabilities(market_data, is_buy, profit_metrics, setup_type)
+    probabilities['continuation'] = point['continuation']
+    probabilities['reversal'] = point['reversal']
+    probabilities['flat'] = max(0.0, 1.0 - point['continuation'] - point['reversal'])
+    probabilities['news_close_boost'] = rng.uniform(0, GUARD_LIMITS['close_boost'])
+    probabilities['news_scale_out_boost'] = rng.uniform(0, GUARD_LIMITS['scale_out_boost'])
+    probabilities['daily_profit_protection_boost'] = 0.0
+
+    session_context = {
+        'session_mult': point['session_mult'],
+        'patience_boost': rng.choice([0.8, 1.0, 1.3]),
+        'is_optimal': rng.random() < 0.5,
+        'session_name': 'sweep',
+    }
+
+    # The synthesized position must land in the cell it was sampled for
+    inputs = surface_inputs(context, profit_metrics, probabilities, market_data, session_context, is_buy)
+    if inputs is None:
+        return None  # Too close to entry to measure leverage - never looked up
+    for name, _ in SURFACE_AXES:
+        assert abs(inputs[name] - point[name]) < 1e-6, f"{name}: {inputs[name]} != {point[name]}"
+
+    evs = manager._calculate_all_evs(
+        profit_metrics, probabilities, market_data, context.position_volume, is_buy, context,
+        can_scale_in=rng.random() < 0.5,
+        setup_type=setup_type,
+        atr_mult=atr_mult,
+        max_lots=50.0,
+        session_context=session_context,
+    )
+    return [evs[key] for key in EV_KEYS]
+
+
+def sweep(task):
+    """Evaluate every cell of one (setup, side) table"""
+    setup_idx, side, samples, confirm, seed = task
+    setup_type, is_buy = SETUP_TYPES[setup_idx], side == 0
+    logging.disable(logging.CRITICAL)  # EV code logs heavily at INFO
+
+    bins = surface_shape()[2:]
+    evs = np.zeros(bins + (len(EV_KEYS),), dtype=np.float32)
+    margin = np.zeros(bins, dtype=np.float32)
+    hold_floor = np.zeros(bins, dtype=np.float32)
+    rng = random.Random(seed * 1000 + setup_idx * 2 + side)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = fresh_manager(tmp_dir)
+        for cell in itertools.product(*(range(n) for n in bins)):
+            rows = []
+            for target in (samples, samples + confirm):
+                while len(rows) < target:
+                    row = evaluate(manager, setup_type, is_buy, sample_point(cell, rng), rng)
+                    if row is not None:
+                        rows.append(row)
+                table = np.array(rows)
+                others = np.delete(table, [HOLD_INDEX, CAPTURE_INDEX], axis=1).max(axis=1)
+                margin[cell] = (table[:, HOLD_INDEX] - others).min()
+                if margin[cell] < MIN_HOLD_MARGIN:
+                    break  # Not HOLD - no need to confirm
+            evs[cell] = table.mean(axis=0)
+            hold_floor[cell] = table[:, HOLD_INDEX].min()
+    return setup_idx, side, evs, margin, hold_floor
+
+
+def build(samples: int, confirm: int, workers: int, seed: int) -> EVSurface:
+    shape = surface_shape()
+    evs = np.zeros(shape + (len(EV_KEYS),), dtype=np.float32)
+    margin = np.zeros(shape, dtype=np.float32)
+    hold_floor = np.zeros(shape, dtype=np.float32)
+    tasks = [(s, side, samples, confirm, seed) for s in range(len(SETUP_TYPES)) for side in (0, 1)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for setup_idx, side, table_evs, table_margin, table_floor in pool.map(sweep, tasks):
+            evs[setup_idx, side] = table_evs
+            margin[setup_idx, side] = table_margin
+            hold_floor[setup_idx, side] = table_floor
+            print(f"   ✅ {SETUP_TYPES[setup_idx]} {'BUY' if side == 0 else 'SELL'}: "
+                  f"{(table_margin >= MIN_HOLD_MARGIN).mean():.1%} clear HOLD cells")
+
+    clear = margin >= MIN_HOLD_MARGIN
+    meta = {'samples_per_cell': samples, 'confirm_samples': confirm, 'seed': seed, 'built': time.strftime('%Y-%m-%d %H:%M:%S')}
+    return EVSurface(evs, margin, hold_floor, clear, meta)
+
+
+def parity_check(surface: EVSurface, checks: int, seed: int) -> dict:
+    """Fresh samples the fast path would answer, through the full calculation"""
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(seed + 7)
+    clear_cells = np.argwhere(surface.clear)
+    if len(clear_cells) == 0:
+        return {'checked': 0, 'agree': 0, 'rate': 0.0}
+
+    checked = agree = attempts = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = fresh_manager(tmp_dir)
+        while checked < checks and attempts < checks * 20:
+            attempts += 1
+            setup_idx, side, *cell = clear_cells[rng.randrange(len(clear_cells))]
+            point = sample_point(tuple(cell), rng)
+            evs = evaluate(manager, SETUP_TYPES[setup_idx], side == 0, point, rng)
+            if evs is None:
+                continue
+            # Same decision as the runtime lookup, with the sample's actual target capture
+            status, _ = surface.lookup(SETUP_TYPES[setup_idx], side == 0, point, evs[CAPTURE_INDEX])
+            if status != 'hit':
+                continue
+            checked += 1
+            if int(np.argmax(evs)) == HOLD_INDEX:
+                agree += 1
+    return {'checked': checked, 'agree': agree, 'rate': agree / checked if checked else 0.0,
+            'hit_rate': checked / attempts if attempts else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the EV decision surface')
+    parser.add_argument('--out', default='models/ev_surface.npz', help='Output table')
+    parser.add_argument('--samples', type=int, default=4, help='Random samples per cell')
+    parser.add_argument('--confirm', type=int, default=48, help='Extra samples for cells that look clear')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Sweep processes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--check', type=int, default=2000, help='Parity samples after build (0 = skip)')
+    parser.add_argument('--check-only', action='store_true', help='Only parity check the existing table')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("EV DECISION SURFACE")
+    print("=" * 70)
+
+    if args.check_only:
+        surface = EVSurface.load(args.out)
+        if surface is None:
+            print(f"❌ No usable surface at {args.out}")
+            return 1
+    else:
+        cells = int(np.prod(surface_shape()))
+        print(f"\n1. Sweep ({cells:,} cells x {args.samples} samples, +{args.confirm} to confirm clear cells, "
+              f"{args.workers} workers)")
+        print("-" * 70)
+        start = time.time()
+        surface = build(args.samples, args.confirm, args.workers, args.seed)
+        print(f"   Done in {time.time() - start:.0f}s - fast path covers {surface.coverage():.1%} of cells")
+
+    if args.check:
+        print(f"\n2. Parity check ({args.check} fresh samples in clear cells)")
+        print("-" * 70)
+        parity = parity_check(surface, args.check, args.seed)
+        surface.meta['parity'] = parity
+        print(f"   {'✅' if parity['rate'] >= 0.99 else '❌'} Full calculation agrees: "
+              f"{parity['agree']}/{parity['checked']} ({parity['rate']:.2%})")
+
+    if not args.check_only:
+        surface.save(args.out)
+        print(f"\n💾 Saved {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+
+    print("\n" + "=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Replay recorded trade decisions through the current code
+
+Reads flight recorder segments (logs/flight_recorder/*.seg, written by api.py)
+and feeds the recorded inputs back through today's decision code:
+
+- exits:   recorded context -> IntelligentPositionManager.analyze_position()
+- entries: recorded context + market_analysis -> UnifiedTradingSystem.should_enter_trade()
+- features (--features): recorded request -> LiveFeatureEngineer.engineer_features()
+
+ML outputs are taken from the recording (they live in the context fields), so
+replay needs no model files. Reports action diffs, EV diffs and per-stage
+timings (live vs replay).
+
+Each worker starts with fresh managers and an empty peak file. Records are
+partitioned by symbol and replayed in recorded order, so per-symbol state
+(peaks, regime history) evolves as it did live - but peaks reached before
+the recording window are unknown, so early exits on such positions may diff.
+
+Usage:
+    python replay_decisions.py                       # all segments, serial
+    python replay_decisions.py --workers 4           # process pool
+    python replay_decisions.py --symbol US30 --limit 500 --features
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.ai.flight_recorder import iter_records
+
+EV_TOLERANCE = 1e-6
+FEATURE_TOLERANCE = 1e-6
+
+_replayer = None  # Per-process Replayer (pool initializer)
+
+
+class Replayer:
+    """Fresh decision components with isolated state for one process"""
+
+    def __init__(self, peaks_dir: str, with_features: bool = False):
+        import src.ai.ev_exit_manager_v2 as ev_module
+        import src.ai.regime_detector as regime_module
+        from src.ai.intelligent_position_manager import IntelligentPositionManager
+        from src.ai.unified_trading_system import UnifiedTradingSystem
+
+        # Never touch live peak or anti-churn state
+        os.environ['STATE_BACKEND'] = 'memory'
+        ev_module.PEAK_TRACKING_FILE = os.path.join(peaks_dir, f'replay_peaks_{os.getpid()}.json')
+        regime_module._regime_detectors.clear()
+
+        self.position_manager = IntelligentPositionManager()
+        self.unified_system = UnifiedTradingSystem()
+        self.feature_engineer = None
+        if with_features:
+            from src.features.live_feature_engineer import LiveFeatureEngineer
+            self.feature_engineer = LiveFeatureEngineer()
+
+    def build_context(self, fields: dict, request: dict):
+        from src.ai.enhanced_context import EnhancedTradingContext
+
+        known = EnhancedTradingContext.field_names()
+        kwargs = {k: v for k, v in fields.items() if k in known}
+        return EnhancedTradingContext(**kwargs, request=request)
+
+    def replay(self, record: dict) -> dict:
+        """Replay one record; returns diffs and replay timings"""
+        request = record.get('request') or {}
+        result = {'id': record.get('id'), 'symbol': request.get('symbol', '?'),
+                  'diffs': [], 'timings': {}, 'checked': 0}
+
+        if self.feature_engineer is not None and record.get('features'):
+            start = time.perf_counter()
+            try:
+                features = self.feature_engineer.engineer_features(request)
+                changed = [k for k, v in record['features'].items()
+                           if not _close(v, features.get(k), FEATURE_TOLERANCE)]
+                if changed:
+                    result['diffs'].append(('features', f"{len(changed)} changed (e.g. {', '.join(changed[:5])})"))
+            except Exception as e:
+                result['diffs'].append(('features', f"error: {e}"))
+            result['timings']['features'] = (time.perf_counter() - start) * 1000.0
+
+        for position in record.get('positions', []):
+            start = time.perf_counter()
+            try:
+                context = self.build_context(position['context'], request)
+                decision = self.position_manager.analyze_position(context)
+            except Exception as e:
+                decision = {'action': 'ERROR', 'reason': str(e)}
+            result['timings']['position_analysis'] = (
+                result['timings'].get('position_analysis', 0.0) + (time.perf_counter() - start) * 1000.0)
+            result['checked'] += 1
+            result['diffs'].extend(
+                _diff_decision(f"exit #{position.get('ticket')}", position.get('decision') or {}, decision))
+
+        entry = record.get('entry')
+        if entry:
+            start = time.perf_counter()
+            try:
+                context = self.build_context(entry['context'], request)
+                decision = self.unified_system.should_enter_trade(context, entry.get('market_analysis') or {})
+            except Exception as e:
+                decision = {'should_enter': None, 'reason': str(e)}
+            result['timings']['entry_analysis'] = (time.perf_counter() - start) * 1000.0
+            result['checked'] += 1
+            recorded = entry.get('decision') or {}
+            if recorded.get('should_enter') != decision.get('should_enter') or \
+                    recorded.get('direction') != decision.get('direction'):
+                result['diffs'].append((
+                    'entry',
+                    f"{recorded.get('should_enter')}/{recorded.get('direction')} -> "
+                    f"{decision.get('should_enter')}/{decision.get('direction')} ({decision.get('reason', '')})"
+                ))
+
+        return result
+
+
+def _close(a, b, tolerance: float) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(float(a) - float(b)) <= tolerance
+    return a == b
+
+
+def _diff_decision(label: str, recorded: dict, replayed: dict) -> list:
+    diffs = []
+    if recorded.get('action') != replayed.get('action'):
+        diffs.append((label, f"{recorded.get('action')} -> {replayed.get('action')} ({replayed.get('reason', '')})"))
+    recorded_evs = recorded.get('all_evs') or {}
+    replayed_evs = replayed.get('all_evs') or {}
+    ev_changes = [
+        f"{k} {recorded_evs.get(k)}->{replayed_evs.get(k)}"
+        for k in sorted(set(recorded_evs) | set(replayed_evs))
+        if not _close(recorded_evs.get(k), replayed_evs.get(k), EV_TOLERANCE)
+    ]
+    if ev_changes:
+        diffs.append((label, "EVs " + ', '.join(ev_changes)))
+    return diffs
+
+
+def _init_worker(peaks_dir: str, with_features: bool):
+    global _replayer
+    _replayer = Replayer(peaks_dir, with_features)
+
+
+def _replay_partition(records: list) -> list:
+    return [_replayer.replay(record) for record in records]
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def load_records(paths: list, symbol: str = None, limit: int = None) -> list:
+    records = []
+    for record in iter_records(paths):
+        rec_symbol = (record.get('request') or {}).get('symbol', '')
+        if symbol and symbol.upper() not in str(rec_symbol).upper():
+            continue
+        records.append(record)
+        if limit and len(records) >= limit:
+            break
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded trade decisions')
+    parser.add_argument('paths', nargs='*', default=['logs/flight_recorder'],
+                        help='Segment files or directories (default: logs/flight_recorder)')
+    parser.add_argument('--workers', type=int, default=1, help='Replay processes (partitioned by symbol)')
+    parser.add_argument('--symbol', help='Only replay this symbol')
+    parser.add_argument('--limit', type=int, help='Max records to replay')
+    parser.add_argument('--features', action='store_true', help='Also recompute and diff features')
+    parser.add_argument('--show', type=int, default=20, help='Diffs to print')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("DECISION REPLAY")
+    print("=" * 70)
+
+    records = load_records(args.paths, args.symbol, args.limit)
+    if not records:
+        print("❌ No recorded decisions found")
+        return 1
+    print(f"\n📊 {len(records)} recorded decisions")
+
+    # Partition by symbol: per-symbol state must see its records in order
+    partitions = defaultdict(list)
+    for record in records:
+        partitions[(record.get('request') or {}).get('symbol', '?')].append(record)
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as peaks_dir:
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                     initargs=(peaks_dir, args.features)) as pool:
+                results = [r for part in pool.map(_replay_partition, partitions.values()) for r in part]
+        else:
+            _init_worker(peaks_dir, args.features)
+            results = [r for part in partitions.values() for r in _replay_partition(part)]
+    elapsed = time.perf_counter() - start
+
+    # ═══════════════════════════════════════════════════════════
+    # REPORT
+    # ═══════════════════════════════════════════════════════════
+    checked = sum(r['checked'] for r in results)
+    with_diffs = [r for r in results if r['diffs']]
+    print(f"\n1. Decisions ({len(partitions)} symbols, {args.workers} worker(s), {elapsed:.1f}s)")
+    print("-" * 70)
+    print(f"   Decisions checked: {checked}")
+    print(f"   {'✅' if not with_diffs else '❌'} Records with diffs: {len(with_diffs)}/{len(results)}")
+    shown = 0
+    for r in with_diffs:
+        for label, detail in r['diffs']:
+            if shown >= args.show:
+                break
+            print(f"   {r['id']} {r['symbol']} {label}: {detail}")
+            shown += 1
+
+    print("\n2. Stage timings (ms)")
+    print("-" * 70)
+    recorded = defaultdict(list)
+    for record in records:
+        for name, ms in (record.get('timings') or {}).items():
+            recorded[name].append(ms)
+    replayed = defaultdict(list)
+    for r in results:
+        for name, ms in r['timings'].items():
+            replayed[name].append(ms)
+    print(f"   {'stage':<20}{'live p50':>10}{'live p95':>10}{'replay p50':>12}{'replay p95':>12}")
+    for name in sorted(set(recorded) | set(replayed)):
+        print(f"   {name:<20}{_percentile(recorded[name], 0.5):>10.2f}{_percentile(recorded[name], 0.95):>10.2f}"
+              f"{_percentile(replayed[name], 0.5):>12.2f}{_percentile(replayed[name], 0.95):>12.2f}")
+
+    print("\n" + "=" * 70)
+    print("REPLAY OK - no decision diffs" if not with_diffs else f"REPLAY DIFFS in {len(with_diffs)} records")
+    print("=" * 70)
+    return 1 if with_diffs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,22 @@ Based on institutional approaches:
 - Regime-dependent correlation shifts (correlations change in crisis)
 - Cross-asset class analysis (Forex, Indices, Commodities, Bonds proxy)
 - Portfolio risk decomposition
+
+Returns are stored as one time-aligned 2-D array (grid slot x symbol, NaN
+where a symbol has no return for a slot). Correlations for every rolling
+window come from a single masked, vectorized pass over that array and are
+cached per update epoch (one epoch per closed slot), together with the
+blended base/dynamic/regime matrix that all portfolio queries index into.
 """
 import logging
+import threading
 import numpy as np
 from typing import Dict, List, Tuple, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
 
+from src.risk.factor_loadings import FactorLoadings, clean_symbol
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,7 +38,13 @@ class CrossAssetCorrelationMatrix:
     5. Correlation breakdown alerts
     """
     
-    def __init__(self):
+    def __init__(self, bar_seconds: int = 300, windows: Tuple[int, ...] = (20, 50, 100)):
+        """
+        Args:
+            bar_seconds: Shared clock grid for sampling returns (EA bar closes)
+            windows: Rolling correlation windows in grid slots; the longest
+                     one feeds the blended matrix
+        """
         # Asset class definitions
         self.asset_classes = {
             'FOREX_MAJOR': ['eurusd', 'gbpusd', 'usdjpy', 'usdchf', 'audusd', 'usdcad'],
@@ -47,6 +62,9 @@ class CrossAssetCorrelationMatrix:
             for symbol in symbols:
                 self.symbol_to_class[symbol] = asset_class
         
+        # Symbol -> factor (currency legs, USD sensitivity, asset class) loadings
+        self.factor_loadings = FactorLoadings(self.asset_classes, clean=self._clean_symbol)
+        
         # ═══════════════════════════════════════════════════════════
         # INSTITUTIONAL CORRELATION MATRIX
         # Based on historical analysis of asset correlations
@@ -124,81 +142,224 @@ class CrossAssetCorrelationMatrix:
             ('audusd', 'us500'): 0.65,
         }
         
-        # Price history for dynamic correlation calculation
-        self.price_history: Dict[str, List[Tuple[datetime, float]]] = defaultdict(list)
-        self.return_history: Dict[str, List[float]] = defaultdict(list)
-        self.max_history = 500  # Keep 500 data points per symbol
-        
-        # Dynamic correlation cache
-        self.dynamic_correlations: Dict[Tuple[str, str], float] = {}
-        self.last_correlation_update = datetime.now()
-        self.correlation_update_interval = timedelta(minutes=5)
+        # ═══════════════════════════════════════════════════════════
+        # TIME-ALIGNED RETURN HISTORY
+        # Row = grid slot (ring buffer), column = symbol, NaN = no return
+        # ═══════════════════════════════════════════════════════════
+        self.bar_seconds = bar_seconds
+        self.windows = tuple(sorted(windows))
+        self.max_history = 500  # Grid slots kept
+        self.min_observations = 20  # Paired returns needed for a dynamic correlation
+        
+        self.symbols: List[str] = []
+        self.symbol_index: Dict[str, int] = {}
+        for pair in list(self.base_correlations) + list(self.stress_correlations):
+            for symbol in pair:
+                self._register_symbol(symbol)
+        for symbols in self.asset_classes.values():
+            for symbol in symbols:
+                self._register_symbol(symbol)
+        
+        self._returns = np.full((self.max_history, len(self.symbols)), np.nan)
+        self._rows = 0  # Slots written so far (ring position = _rows % max_history)
+        self._last_close = np.full(len(self.symbols), np.nan)
+        self._last_slot = np.full(len(self.symbols), -1, dtype=np.int64)
+        self._slot: Optional[int] = None
+        self._slot_prices: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        
+        # Per-epoch caches: rolling correlation matrices and the blended matrix
+        self.epoch = 0
+        self._rolling_cache: Tuple[int, Dict[int, np.ndarray]] = (-1, {})
+        self._blended_cache: Dict[Tuple[int, str], np.ndarray] = {}  # (epoch, regime) -> matrix
+        self._base_matrix = self._pair_matrix(self.base_correlations, 0.0)
+        self._stress_matrix = self._pair_matrix(self.stress_correlations, np.nan)
         
         # Current regime
         self.current_regime = 'NORMAL'  # NORMAL, STRESS, RISK_ON, RISK_OFF
         self.regime_history: List[Tuple[datetime, str]] = []
         
     def _clean_symbol(self, symbol: str) -> str:
-        """Normalize symbol name"""
-        s = symbol.lower()
-        # Remove broker suffixes
-        for suffix in ['.sim', 'z25', 'f26', 'g26', 'h26', 'j26', 'k26', 'm26', 'n26', 'q26', 'u26', 'v26', 'x26', '.pro']:
-            s = s.replace(suffix, '')
-        return s
+        """Normalize symbol name (broker suffixes and contract codes removed)"""
+        return clean_symbol(symbol)
+    
+    def _register_symbol(self, symbol: str) -> int:
+        index = self.symbol_index.get(symbol)
+        if index is None:
+            index = self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return index
+    
+    def _pair_matrix(self, pairs: Dict[Tuple[str, str], float], fill: float) -> np.ndarray:
+        """Symmetric symbol x symbol matrix from a pair dict"""
+        n = len(self.symbols)
+        matrix = np.full((n, n), fill, dtype=float)
+        for (s1, s2), corr in pairs.items():
+            i, j = self.symbol_index[s1], self.symbol_index[s2]
+            matrix[i, j] = matrix[j, i] = corr
+        np.fill_diagonal(matrix, 1.0)
+        return matrix
+    
+    def _add_column_locked(self, symbol: str) -> int:
+        """New symbol seen in live prices - grow every per-symbol array by one column"""
+        index = self._register_symbol(symbol)
+        self._returns = np.pad(self._returns, ((0, 0), (0, 1)), constant_values=np.nan)
+        self._last_close = np.append(self._last_close, np.nan)
+        self._last_slot = np.append(self._last_slot, -1)
+        self._base_matrix = np.pad(self._base_matrix, ((0, 1), (0, 1)))
+        self._stress_matrix = np.pad(self._stress_matrix, ((0, 1), (0, 1)), constant_values=np.nan)
+        self._base_matrix[index, index] = self._stress_matrix[index, index] = 1.0
+        self.epoch += 1
+        return index
     
     def update_price(self, symbol: str, price: float, timestamp: datetime = None):
         """
-        Update price history and recalculate correlations
+        Sample a price onto the shared clock grid
         
-        Called by the API on each price update
+        Called by the API on each price update. The last price in a grid slot
+        is its close; when the clock moves on, the closed slot becomes one row
+        of aligned returns and a new update epoch starts.
         """
         if timestamp is None:
             timestamp = datetime.now()
+        if not price or price <= 0:
+            return
         
         symbol_clean = self._clean_symbol(symbol)
+        slot = int(timestamp.timestamp() // self.bar_seconds)
+        
+        with self._lock:
+            if self._slot is None:
+                self._slot = slot
+            elif slot > self._slot:
+                self._close_slot_locked()
+                self._slot = slot
+            elif slot < self._slot:
+                return  # Slot already closed - can't be aligned any more
+            
+            index = self.symbol_index.get(symbol_clean)
+            if index is None or index >= self._returns.shape[1]:
+                index = self._add_column_locked(symbol_clean)
+            self._slot_prices[index] = float(price)
+    
+    def _close_slot_locked(self):
+        """Write the finished slot's returns as one row of the history"""
+        row = np.full(self._returns.shape[1], np.nan)
+        if self._slot_prices:
+            indices = np.fromiter(self._slot_prices.keys(), dtype=np.int64)
+            closes = np.fromiter(self._slot_prices.values(), dtype=float)
+            
+            # Return only for symbols that also closed the previous slot
+            adjacent = self._last_slot[indices] == self._slot - 1
+            row[indices[adjacent]] = closes[adjacent] / self._last_close[indices[adjacent]] - 1.0
+            
+            self._last_close[indices] = closes
+            self._last_slot[indices] = self._slot
+            self._slot_prices = {}
         
-        # Add to price history
-        self.price_history[symbol_clean].append((timestamp, price))
+        self._returns[self._rows % self.max_history] = row
+        self._rows += 1
+        self.epoch += 1
+    
+    def _recent_returns(self, window: int) -> np.ndarray:
+        """Last `window` rows in time order"""
+        rows = min(self._rows, self.max_history, window)
+        if rows == 0:
+            return self._returns[:0]
+        end = self._rows % self.max_history
+        order = np.arange(end - rows, end) % self.max_history
+        return self._returns[order]
+    
+    def _masked_correlation(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Pairwise-complete Pearson correlation of all columns in one pass.
+        Each pair uses only the rows where both symbols have a return; NaN
+        where fewer than min_observations rows overlap.
+        """
+        observed = ~np.isnan(returns)
+        mask = observed.astype(float)
+        x = np.where(observed, returns, 0.0)
+        
+        count = mask.T @ mask            # rows where both i and j observed
+        sum_x = x.T @ mask               # sum of i over rows where j observed
+        sum_xx = (x * x).T @ mask
+        sum_xy = x.T @ x
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_xy - sum_x * sum_x.T / count
+            var_i = sum_xx - sum_x ** 2 / count
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        corr[(count < self.min_observations) | ~np.isfinite(corr)] = np.nan
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+    
+    def get_rolling_correlations(self) -> Dict[int, np.ndarray]:
+        """
+        Dynamic correlation matrix per rolling window (indexed like self.symbols),
+        computed once per update epoch
+        """
+        epoch, cached = self._rolling_cache
+        if epoch == self.epoch:
+            return cached
+        with self._lock:
+            epoch = self.epoch
+            history = self._recent_returns(self.windows[-1])
+        rolling = {}
+        for window in self.windows:
+            rolling[window] = self._masked_correlation(history[-window:])
+        self._rolling_cache = (epoch, rolling)
+        return rolling
+    
+    def _blended_matrix(self, use_regime: bool = True) -> np.ndarray:
+        """
+        Base + dynamic (60/40) + regime adjusted correlations for every symbol
+        pair, cached per epoch and regime - portfolio queries index into this
+        """
+        epoch = self.epoch
+        regime = self.current_regime if use_regime else 'NORMAL'
+        cached = self._blended_cache.get((epoch, regime))
+        if cached is not None:
+            return cached
         
-        # Trim to max size
-        if len(self.price_history[symbol_clean]) > self.max_history:
-            self.price_history[symbol_clean] = self.price_history[symbol_clean][-self.max_history:]
+        dynamic = self.get_rolling_correlations()[self.windows[-1]]
+        base = self._base_matrix
+        n = min(dynamic.shape[0], base.shape[0])  # A column may have been added meanwhile
+        base, stress, dynamic = base[:n, :n], self._stress_matrix[:n, :n], dynamic[:n, :n]
         
-        # Calculate returns if we have enough data
-        if len(self.price_history[symbol_clean]) >= 2:
-            prices = [p[1] for p in self.price_history[symbol_clean]]
-            returns = np.diff(prices) / prices[:-1]
-            self.return_history[symbol_clean] = list(returns[-self.max_history:])
+        # Blend base and dynamic (60% dynamic, 40% base for stability)
+        corr = np.where(np.isnan(dynamic), base, dynamic * 0.6 + base * 0.4)
         
-        # Periodically update correlations
-        if datetime.now() - self.last_correlation_update > self.correlation_update_interval:
-            self._update_all_correlations()
-            self.last_correlation_update = datetime.now()
+        # Apply regime adjustment
+        if regime == 'STRESS':
+            # In stress, shift toward stress correlation; otherwise risk assets correlate more
+            amplified = np.where(np.abs(corr) > 0.3, np.clip(corr * 1.3, -1.0, 1.0), corr)
+            corr = np.where(np.isnan(stress), amplified, corr * 0.5 + stress * 0.5)
+        np.fill_diagonal(corr, 1.0)
+        
+        corr.setflags(write=False)
+        self._blended_cache = {key: m for key, m in self._blended_cache.items() if key[0] == epoch}
+        self._blended_cache[(epoch, regime)] = corr
+        return corr
     
-    def _update_all_correlations(self):
-        """
-        Recalculate all dynamic correlations from return data
-        """
-        symbols_with_data = [s for s in self.return_history if len(self.return_history[s]) >= 20]
-        
-        for i, sym1 in enumerate(symbols_with_data):
-            for sym2 in symbols_with_data[i+1:]:
-                try:
-                    returns1 = np.array(self.return_history[sym1][-100:])
-                    returns2 = np.array(self.return_history[sym2][-100:])
-                    
-                    # Align lengths
-                    min_len = min(len(returns1), len(returns2))
-                    if min_len < 20:
-                        continue
-                    
-                    corr = np.corrcoef(returns1[-min_len:], returns2[-min_len:])[0, 1]
-                    
-                    if not np.isnan(corr):
-                        pair = tuple(sorted([sym1, sym2]))
-                        self.dynamic_correlations[pair] = corr
-                except Exception:
-                    pass
+    def _position_vectors(self, positions: List[Dict]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Clean symbols, matrix indices (-1 = unknown), symbol codes and direction signs"""
+        symbols = [self._clean_symbol(pos.get('symbol', '')) for pos in positions]
+        indices = np.array([self.symbol_index.get(sym, -1) for sym in symbols], dtype=np.int64)
+        codes = {sym: k for k, sym in enumerate(dict.fromkeys(symbols))}  # Same symbol = same code, known or not
+        symbol_codes = np.array([codes[sym] for sym in symbols], dtype=np.int64)
+        signs = np.array([1.0 if pos.get('type', 0) == 0 else -1.0 for pos in positions])
+        return symbols, indices, symbol_codes, signs
+    
+    def _correlation_block(self, rows: np.ndarray, cols: np.ndarray, use_regime: bool = True) -> np.ndarray:
+        """Correlations between two index vectors (0 for unknown symbols)"""
+        matrix = self._blended_matrix(use_regime)
+        n = matrix.shape[0]
+        known_rows = (rows >= 0) & (rows < n)
+        known_cols = (cols >= 0) & (cols < n)
+        block = np.zeros((len(rows), len(cols)))
+        block[np.ix_(known_rows, known_cols)] = matrix[np.ix_(rows[known_rows], cols[known_cols])]
+        return block
     
     def get_correlation(
         self,
@@ -225,33 +386,11 @@ class CrossAssetCorrelationMatrix:
         if s1 == s2:
             return 1.0 if direction1 == direction2 else -1.0
         
-        pair = tuple(sorted([s1, s2]))
-        
-        # Get base correlation
-        base_corr = self.base_correlations.get(pair, 0.0)
-        if base_corr == 0.0:
-            base_corr = self.base_correlations.get((pair[1], pair[0]), 0.0)
-        
-        # Get dynamic correlation if available
-        dynamic_corr = self.dynamic_correlations.get(pair, None)
-        
-        # Blend base and dynamic (60% dynamic, 40% base for stability)
-        if dynamic_corr is not None:
-            corr = dynamic_corr * 0.6 + base_corr * 0.4
-        else:
-            corr = base_corr
-        
-        # Apply regime adjustment
-        if use_regime and self.current_regime == 'STRESS':
-            stress_corr = self.stress_correlations.get(pair, None)
-            if stress_corr is not None:
-                # In stress, shift toward stress correlation
-                corr = corr * 0.5 + stress_corr * 0.5
-            else:
-                # Risk assets correlate more in stress
-                if abs(corr) > 0.3:
-                    corr = corr * 1.3  # Amplify existing correlation
-                    corr = max(-1.0, min(1.0, corr))
+        # Look up in the blended matrix (O(1) once cached for this epoch)
+        matrix = self._blended_matrix(use_regime)
+        i = self.symbol_index.get(s1, len(matrix))
+        j = self.symbol_index.get(s2, len(matrix))
+        corr = float(matrix[i, j]) if max(i, j) < len(matrix) else 0.0
         
         # Adjust for direction
         if direction1 != direction2:
@@ -291,32 +430,24 @@ class CrossAssetCorrelationMatrix:
                 'diversification_score': 1.0
             }
         
-        symbols = []
-        directions = []
-        
-        for pos in positions:
-            sym = self._clean_symbol(pos.get('symbol', ''))
-            direction = 'BUY' if pos.get('type', 0) == 0 else 'SELL'
-            symbols.append(sym)
-            directions.append(direction)
-        
+        symbols, indices, codes, signs = self._position_vectors(positions)
         n = len(symbols)
-        matrix = np.eye(n)  # Diagonal = 1
         
-        correlations = []
-        for i in range(n):
-            for j in range(i+1, n):
-                corr = self.get_correlation(symbols[i], symbols[j], directions[i], directions[j])
-                matrix[i, j] = corr
-                matrix[j, i] = corr
-                correlations.append(abs(corr))
+        # Index the blended matrix, then flip sign for opposite directions
+        # (same symbol = +1 same direction, -1 opposite)
+        direction_signs = np.outer(signs, signs)
+        matrix = self._correlation_block(indices, indices) * direction_signs
+        same_symbol = codes[:, None] == codes[None, :]
+        matrix[same_symbol] = direction_signs[same_symbol]
+        np.fill_diagonal(matrix, 1.0)
         
-        avg_corr = np.mean(correlations) if correlations else 0.0
-        max_corr = np.max(correlations) if correlations else 0.0
+        correlations = np.abs(matrix[np.triu_indices(n, k=1)])
+        
+        avg_corr = float(correlations.mean()) if correlations.size else 0.0
+        max_corr = float(correlations.max()) if correlations.size else 0.0
         
         # Risk concentration: high if many positions highly correlated
-        high_corr_count = sum(1 for c in correlations if c > 0.7)
-        risk_concentration = high_corr_count / len(correlations) if correlations else 0.0
+        risk_concentration = float((correlations > 0.7).mean()) if correlations.size else 0.0
         
         # Diversification score: inverse of average correlation
         diversification_score = 1.0 - avg_corr
@@ -339,20 +470,24 @@ class CrossAssetCorrelationMatrix:
         
         Returns exposure breakdown and concentration warnings
         """
-        exposure_by_class = defaultdict(float)
-        positions_by_class = defaultdict(list)
+        symbols = [self._clean_symbol(pos.get('symbol', '')) for pos in positions]
+        volumes = np.array([float(pos.get('volume', 0)) for pos in positions])
         
-        for pos in positions:
-            sym = self._clean_symbol(pos.get('symbol', ''))
-            asset_class = self.get_asset_class(sym)
-            volume = float(pos.get('volume', 0))
-            profit = float(pos.get('profit', 0))
-            
-            exposure_by_class[asset_class] += volume
+        # Class exposure: gross volume through the factor loading matrix
+        signed, gross = self.factor_loadings.notionals(zip(symbols, volumes))
+        factor_exposure = self.factor_loadings.exposure(signed, gross)
+        classes = [self.factor_loadings.asset_class(sym) for sym in symbols]
+        
+        exposure_by_class = {
+            asset_class: float(factor_exposure[self.factor_loadings.factor_index[asset_class]])
+            for asset_class in dict.fromkeys(classes)
+        }
+        positions_by_class = defaultdict(list)
+        for pos, sym, asset_class, volume in zip(positions, symbols, classes, volumes):
             positions_by_class[asset_class].append({
                 'symbol': sym,
-                'volume': volume,
-                'profit': profit
+                'volume': float(volume),
+                'profit': float(pos.get('profit', 0))
             })
         
         total_exposure = sum(exposure_by_class.values())
@@ -414,21 +549,21 @@ class CrossAssetCorrelationMatrix:
                 'reason': 'First position - no correlation concerns'
             }
         
-        correlations = []
-        high_corr_positions = []
+        symbols, indices, _, signs = self._position_vectors(positions)
+        new_clean = self._clean_symbol(new_symbol)
+        new_sign = 1.0 if new_direction == 'BUY' else -1.0
         
-        for pos in positions:
-            sym = self._clean_symbol(pos.get('symbol', ''))
-            direction = 'BUY' if pos.get('type', 0) == 0 else 'SELL'
-            
-            corr = self.get_correlation(new_symbol, sym, new_direction, direction)
-            correlations.append(abs(corr))
-            
-            if abs(corr) > 0.7:
-                high_corr_positions.append((sym, corr))
+        # One row of the blended matrix against every open position
+        row = self._correlation_block(np.array([self.symbol_index.get(new_clean, -1)]), indices)[0]
+        same_symbol = np.array([sym == new_clean for sym in symbols])
+        row[same_symbol] = 1.0
+        signed = row * new_sign * signs
+        correlations = np.abs(signed)
+        
+        high_corr_positions = [(symbols[k], float(signed[k])) for k in np.flatnonzero(correlations > 0.7)]
         
-        avg_corr = np.mean(correlations)
-        max_corr = np.max(correlations)
+        avg_corr = float(correlations.mean())
+        max_corr = float(correlations.max())
         
         # Recommendation logic
         if max_corr > 0.85:
@@ -7,6 +7,7 @@ Enhanced with:
 - Cross-Asset Correlation Matrix (institutional grade)
 - AI Regime Detection (sophisticated market state classification)
 - News Sentiment Analysis (NLP-based impact assessment)
+- Monte Carlo portfolio CVaR (correlated Student-t scenarios, cvar_engine.py)
 """
 import logging
 from typing import Dict, List
@@ -15,6 +16,7 @@ from .portfolio_state import get_portfolio_state
 from .ftmo_strategy import get_ftmo_strategy
 from .ai_market_analyzer import get_ai_analyzer, AIMarketState
 from .cross_asset_correlation import get_cross_asset_matrix
+from .cvar_engine import get_cvar_engine
 from .regime_detector import get_regime_detector, MarketRegime
 from .news_sentiment_analyzer import get_news_analyzer
 
@@ -40,7 +42,7 @@ class ElitePositionSizer:
         
         # NEW: Hedge fund grade modules
         self.cross_asset_matrix = get_cross_asset_matrix()
-        self.regime_detector = get_regime_detector()
+        self.cvar_engine = get_cvar_engine()
         self.news_analyzer = get_news_analyzer()
         
         # Risk parameters (HEDGE FUND STANDARD)
@@ -425,8 +427,9 @@ class ElitePositionSizer:
         
         # Detect current market regime using all available data
         if context is not None:
-            regime_state = self.regime_detector.detect_regime(context)
-            regime_params = self.regime_detector.get_regime_parameters(regime_state.regime)
+            regime_detector = get_regime_detector(getattr(context, 'symbol', None))
+            regime_state = regime_detector.detect_regime(context)
+            regime_params = regime_detector.get_regime_parameters(regime_state.regime)
             
             logger.info(f"   📊 REGIME DETECTION (Hedge Fund Grade):")
             logger.info(f"      Regime: {regime_state.regime.value}")
@@ -438,7 +441,7 @@ class ElitePositionSizer:
             regime_multiplier = regime_params['position_size_mult']
             
             # Check if regime suggests reducing exposure
-            should_reduce, reduce_reason = self.regime_detector.should_reduce_exposure()
+            should_reduce, reduce_reason = regime_detector.should_reduce_exposure()
             if should_reduce:
                 regime_multiplier *= 0.7
                 logger.warning(f"      ⚠️ {reduce_reason} → reducing size by 30%")
@@ -569,14 +572,40 @@ class ElitePositionSizer:
         # STEP 5: Calculate CVaR (Tail Risk)
         # ═══════════════════════════════════════════════════════════
         
-        # Estimate 95% CVaR (average loss in worst 5% scenarios)
-        uncertainty = 1.0 - (ml_confidence / 100.0)
-        tail_risk_multiplier = 1.0 + (uncertainty ** 2)  # Higher uncertainty = bigger tail
-        
-        # CVaR is typically 1.5-2.5x the stop loss in tail scenarios
-        cvar_95 = risk_distance * tail_risk_multiplier * 1.5
-        
-        logger.info(f"   CVaR (95%): {cvar_95:.5f} (vs stop: {risk_distance:.5f})")
+        # Monte Carlo: correlated Student-t returns for the open portfolio plus
+        # this trade (live EWMA covariance), stops capped with gap slippage
+        point_value = tick_value / tick_size if tick_size > 0 else 0.0
+        cvar_analysis = None
+        try:
+            cvar_analysis = self.cvar_engine.analyze(
+                symbol, direction,
+                entry_price=entry_price,
+                stop_loss=stop_loss,
+                point_value=point_value,
+                positions=open_positions,
+                headroom=ftmo_distance_to_daily,
+                max_lots=max_lot_broker,
+                candidate_bar_vol=current_atr / entry_price if entry_price > 0 and current_atr > 0 else None
+            )
+        except Exception as e:
+            logger.warning(f"   ⚠️ CVaR simulation failed ({e}) - using stop-based estimate")
+        
+        if cvar_analysis is not None:
+            # Standalone per-lot CVaR expressed as a price distance
+            cvar_95 = cvar_analysis['cvar_per_lot'] / point_value
+            logger.info(f"   CVaR (95%, MC): ${cvar_analysis['cvar_per_lot']:,.2f}/lot = {cvar_95:.5f} (vs stop: {risk_distance:.5f})")
+            logger.info(f"   Portfolio CVaR: ${cvar_analysis['portfolio_cvar']:,.0f} → ${cvar_analysis['cvar']:,.0f} "
+                       f"at {cvar_analysis['max_lots']:.2f} lots (headroom ${ftmo_distance_to_daily:,.0f}, "
+                       f"marginal ${cvar_analysis['marginal_cvar']:,.2f}/lot, {cvar_analysis['ms']:.1f}ms)")
+        else:
+            # Estimate 95% CVaR (average loss in worst 5% scenarios)
+            uncertainty = 1.0 - (ml_confidence / 100.0)
+            tail_risk_multiplier = 1.0 + (uncertainty ** 2)  # Higher uncertainty = bigger tail
+            
+            # CVaR is typically 1.5-2.5x the stop loss in tail scenarios
+            cvar_95 = risk_distance * tail_risk_multiplier * 1.5
+            
+            logger.info(f"   CVaR (95%): {cvar_95:.5f} (vs stop: {risk_distance:.5f})")
         
         # ═══════════════════════════════════════════════════════════
         # STEP 6: Dynamic Risk Budget Allocation
@@ -723,7 +752,10 @@ class ElitePositionSizer:
         )
         concentration_max = concentration_max_risk / risk_per_lot if risk_per_lot > 0 else max_lot_broker
         
-        # Constraint 4: Broker max (from MT5 - this is the ONLY hard limit)
+        # Constraint 4: Portfolio CVaR within the FTMO daily-loss headroom
+        cvar_max = cvar_analysis['max_lots'] if cvar_analysis is not None else max_lot_broker
+        
+        # Constraint 5: Broker max (from MT5 - this is the ONLY hard limit)
         broker_max = max_lot_broker
         
         # Take minimum of AI-driven constraints (NO hardcoded max_lots!)
@@ -732,10 +764,11 @@ class ElitePositionSizer:
             notional_max,     # Notional exposure limit
             ftmo_max,         # FTMO DD protection
             concentration_max, # Portfolio concentration
+            cvar_max,         # Simulated portfolio tail loss
             broker_max        # Broker limit (only hard constraint)
         )
         
-        logger.info(f"   📊 AI Lot Sizing: base={base_size:.1f}, notional={notional_max:.1f}, ftmo={ftmo_max:.1f}, conc={concentration_max:.1f}, broker={broker_max:.1f}")
+        logger.info(f"   📊 AI Lot Sizing: base={base_size:.1f}, notional={notional_max:.1f}, ftmo={ftmo_max:.1f}, conc={concentration_max:.1f}, cvar={cvar_max:.1f}, broker={broker_max:.1f}")
         
         logger.info(f"   📊 After constraints: {final_size:.2f} lots")
         
@@ -866,6 +899,7 @@ class ElitePositionSizer:
         logger.info(f"      Notional max: {notional_max:.1f} lots (${max_notional:,.0f})")
         logger.info(f"      FTMO max: {ftmo_max:.1f} lots")
         logger.info(f"      Concentration max: {concentration_max:.1f} lots")
+        logger.info(f"      CVaR max: {cvar_max:.1f} lots")
         logger.info(f"      Broker max: {broker_max:.1f} lots")
         logger.info(f"")
         logger.info(f"   ✅ FINAL SIZE: {final_size:.2f} lots")
@@ -889,6 +923,8 @@ class ElitePositionSizer:
             'diversification_factor': diversification_factor,
             'performance_multiplier': performance_multiplier,
             'cvar_95': cvar_95,
+            'portfolio_cvar': cvar_analysis['cvar'] if cvar_analysis is not None else None,
+            'marginal_cvar': cvar_analysis['marginal_cvar'] if cvar_analysis is not None else None,
             'avg_correlation': avg_correlation,
             'recent_win_rate': performance_metrics['win_rate'],
             'comprehensive_score': comprehensive_score if 'comprehensive_score' in dir() else strategy_quality,
@@ -15,19 +15,27 @@ This ensures Position Manager, Trade Manager, Risk Manager, and Exit Logic
 all make decisions based on the SAME comprehensive data.
 """
 
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, fields
+from typing import Any, Dict, FrozenSet, Optional
 import numpy as np
 import logging
 
+from src.risk.ftmo_rule_engine import get_ftmo_rule_engine
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class EnhancedTradingContext:
     """
     Complete market context with all 100 features.
     Every AI component receives this - no more fragmented data.
+    
+    Slotted: every field is declared here with its type and default, so
+    attribute access skips the instance dict and assigning an undeclared
+    field (e.g. a typo like `context.h4_trnd = ...`) raises AttributeError
+    instead of silently creating a new attribute. Fields set after
+    construction by api.py / the unified system must be declared below.
     """
     
     # ═══════════════════════════════════════════════════════════
@@ -244,12 +252,20 @@ class EnhancedTradingContext:
     position_age_minutes: float = 0.0
     position_dca_count: int = 0
     
+    # ═══════════════════════════════════════════════════════════
+    # BROKER CONSTRAINTS (from symbol_info, set per request)
+    # ═══════════════════════════════════════════════════════════
+    max_lot: float = 100.0
+    min_lot: float = 1.0
+    lot_step: float = 1.0
+    
     # ═══════════════════════════════════════════════════════════
     # ML PREDICTIONS
     # ═══════════════════════════════════════════════════════════
     ml_direction: str = "HOLD"
     ml_confidence: float = 50.0
-    
+    market_score: float = 50.0  # 0-100 market quality (EV exit inputs, offline replays)
+
     # ═══════════════════════════════════════════════════════════
     # RAW REQUEST DATA (for legacy code compatibility)
     # ═══════════════════════════════════════════════════════════
@@ -371,6 +387,19 @@ class EnhancedTradingContext:
     position_peak_profit_pct: float = 0.0
     position_decline_from_peak: float = 0.0
     position_decline_from_peak_pct: float = 0.0
+    peak_profit_pct: Optional[float] = None  # Per-ticket peak (% of account) from api.py; None = not tracked
+    
+    # ═══════════════════════════════════════════════════════════
+    # REGIME (set by unified trading system during entry analysis)
+    # ═══════════════════════════════════════════════════════════
+    detected_regime: Optional[Any] = None  # MarketRegime
+    regime_params: Optional[Dict] = None
+    regime_allows_counter_trend: bool = False
+    
+    @classmethod
+    def field_names(cls) -> FrozenSet[str]:
+        """All declared context fields"""
+        return _FIELD_NAMES
     
     def update_peak_tracking(self):
         """Update peak profit tracking and calculate decline"""
@@ -432,85 +461,40 @@ class EnhancedTradingContext:
         # - Includes floating P&L, commissions, and swaps
         # ═══════════════════════════════════════════════════════════
         
-        # INITIAL BALANCE - The balance when the challenge/account started
-        # This is the CRITICAL value - it NEVER changes during the challenge
-        # EA should send this, otherwise use a reasonable default
-        initial_balance = float(account_data.get('initial_balance', 200000.0))
-        
-        # Get other FTMO data from EA
-        daily_pnl = float(account_data.get('daily_pnl', 0.0))
-        daily_start_balance = float(account_data.get('daily_start_balance', account_balance))
-        daily_realized_pnl = float(account_data.get('daily_realized_pnl', 0.0))
-        peak_balance = float(account_data.get('peak_balance', initial_balance))
-        
-        # ═══════════════════════════════════════════════════════════
-        # FTMO RULES - EXACT FORMULAS FROM FTMO.COM
-        # ═══════════════════════════════════════════════════════════
-        
-        # ═══════════════════════════════════════════════════════════
-        # RULE 1: MAXIMUM DAILY LOSS (5% Rule)
-        # 
-        # Formula: Daily Loss Limit = Balance at midnight CE(S)T - (5% of initial balance)
-        # 
-        # Example for $200K account, if balance at midnight was $205K:
-        #   Daily Loss Limit = $205,000 - $10,000 = $195,000
-        #   Equity cannot drop below $195,000 today
-        # 
-        # This means if you made profits, you have MORE room before violation
-        # The 5% is ALWAYS based on initial balance, not current
-        # ═══════════════════════════════════════════════════════════
+        # The rule state (midnight balance, intraday worst equity, peaks) lives in
+        # the shared FTMO rule engine. It is fed by the API (every decision request
+        # and the EA account heartbeat); building a context only reads the latest
+        # snapshot. INITIAL BALANCE never changes during the challenge - EA sends
+        # it, otherwise the engine keeps its configured default.
+        ftmo = get_ftmo_rule_engine().snapshot()
+        ftmo_phase = request.get('ftmo_phase', ftmo.phase)
         
-        five_percent_of_initial = initial_balance * 0.05  # Always $10K for $200K account
+        initial_balance = ftmo.initial_balance
+        daily_pnl = float(account_data.get('daily_pnl', ftmo.daily_pnl))
+        daily_start_balance = ftmo.daily_start_balance
+        peak_balance = float(account_data.get('peak_balance', ftmo.peak_balance))
         
-        # The minimum equity allowed TODAY = balance at midnight - 5% of initial
-        min_equity_today = daily_start_balance - five_percent_of_initial
+        # Daily loss = drop from the midnight balance (floating, commissions and
+        # swaps included), limited to 5% of INITIAL balance
+        daily_loss = ftmo.daily_loss
+        max_daily_loss = ftmo.max_daily_loss
         
-        # Daily loss = how much we've dropped from midnight balance
-        # Includes closed positions + floating P&L + commissions + swaps
-        daily_loss = max(0.0, daily_start_balance - account_equity)
+        # Total loss = drop below INITIAL balance, limited to 10% of it (absolute)
+        total_drawdown = ftmo.total_drawdown
+        max_total_drawdown = ftmo.max_total_drawdown
         
-        # Max daily loss is 5% of initial (the amount we can lose from midnight balance)
-        max_daily_loss = five_percent_of_initial
+        distance_to_daily_limit = ftmo.distance_to_daily_limit
+        distance_to_dd_limit = ftmo.distance_to_dd_limit
         
-        # ═══════════════════════════════════════════════════════════
-        # RULE 2: MAXIMUM LOSS (10% Rule)
-        # 
-        # Formula: Equity cannot drop below 90% of INITIAL balance
-        # 
-        # Example for $200K account:
-        #   Min Equity Allowed = $200,000 * 0.90 = $180,000
-        #   If equity drops to $179,999, you're violated
-        # 
-        # This is ABSOLUTE - doesn't matter if you made profits before
-        # Includes closed positions + floating P&L + commissions + swaps
-        # ═══════════════════════════════════════════════════════════
-        
-        min_equity_allowed = initial_balance * 0.90  # $180K for $200K account
-        max_total_drawdown = initial_balance * 0.10  # $20K for $200K account
-        
-        # Total drawdown = how far equity has dropped below initial
-        total_drawdown = max(0.0, initial_balance - account_equity)
-        
-        # Calculate distances to limits
-        distance_to_daily_limit = max(0.0, max_daily_loss - daily_loss)
-        distance_to_dd_limit = max(0.0, max_total_drawdown - total_drawdown)
-        
-        # FTMO phase and targets (% based on initial balance)
-        ftmo_phase = request.get('ftmo_phase', 'funded')
-        if ftmo_phase == 'challenge_1':
-            profit_target = initial_balance * 0.10  # 10% of initial
-        elif ftmo_phase == 'challenge_2':
-            profit_target = initial_balance * 0.05  # 5% of initial
-        else:
-            profit_target = 0.0  # Funded has no target
+        # FTMO phase target (% of initial balance; funded has none)
+        profit_target = ftmo.profit_target
         
         # Calculate progress toward profit target
-        current_profit = account_balance - initial_balance
         daily_target = initial_balance * 0.01  # 1% daily target
         progress_to_target = (daily_pnl / daily_target) if daily_target > 0 else 0.0
         
         # Check violations
-        ftmo_violated = (daily_loss >= max_daily_loss or total_drawdown >= max_total_drawdown)
+        ftmo_violated = ftmo.violated
         can_trade = not ftmo_violated
         
         return cls(
@@ -889,3 +873,6 @@ class EnhancedTradingContext:
         
         # Clamp to 0-100
         return max(0.0, min(100.0, score))
+
+
+_FIELD_NAMES: FrozenSet[str] = frozenset(f.name for f in fields(EnhancedTradingContext))
@@ -9,21 +9,32 @@ NO HARDCODED THRESHOLDS - All decisions based on:
 Every decision is a comparison of EVs - the action with highest EV wins.
 """
 import logging
-import json
 import os
-from typing import Dict
+from typing import Dict, List
 from datetime import datetime
-import pytz
+import numpy as np
 from .enhanced_context import EnhancedTradingContext
 from .ai_market_analyzer import get_ai_analyzer, AIMarketState
 from .ftmo_strategy import get_ftmo_strategy
 from .regime_detector import get_regime_detector, MarketRegime
+from . import flight_recorder
+from src.utils.json_state import JSONDocument, get_json_state_writer
+from src.utils.session_calendar import SESSIONS, get_session_calendar
+from .ev_surface import EVSurface, surface_inputs, guards_pass, swing_atr, target_capture
 
 logger = logging.getLogger(__name__)
 
-# Persistent peak tracking file
+# Persistent peak tracking file (JSONDocument - dirty keys, coalesced atomic rewrites)
 PEAK_TRACKING_FILE = os.path.join(os.path.dirname(__file__), '../../cache/position_peaks.json')
 
+# Volume changes kept per symbol in peak tracking
+MAX_VOLUME_HISTORY = 20
+
+# Precomputed EV decision surface (not in git: make ev-surface - fast path is off without it)
+EV_SURFACE_FILE = os.path.join(os.path.dirname(__file__), '../../models/ev_surface.npz')
+SURFACE_VERIFY_EVERY = 20  # Shadow-check every Nth fast-path hit against the full calculation
+SURFACE_MAX_MISMATCH_RATE = 0.02  # Disable the fast path above this (after 50 shadow checks)
+
 
 class EVExitManagerV2:
     """
@@ -47,29 +58,34 @@ class EVExitManagerV2:
         self.position_peaks = self._load_peaks()  # Track peak profit per symbol (persistent)
         self.last_action_state = {}  # Track market state at last action for anti-churn
         self.ftmo_strategy = get_ftmo_strategy()  # Session awareness
+        self.ev_surface = EVSurface.load(EV_SURFACE_FILE) if os.path.exists(EV_SURFACE_FILE) else None
+        self.surface_stats = {'lookups': 0, 'hits': 0, 'outside': 0, 'boundary': 0, 'guarded': 0,
+                              'verified': 0, 'mismatches': 0}
         logger.info("🤖 EV Exit Manager V2 - Pure AI-driven, zero hardcoded thresholds")
         logger.info(f"   📊 Loaded {len(self.position_peaks)} position peaks from persistent storage")
+        if self.ev_surface is not None:
+            logger.info(f"   ⚡ EV surface loaded: fast path covers {self.ev_surface.coverage():.1%} of cells")
+        else:
+            logger.info("   EV surface not built (make ev-surface) - every exit runs the full EV calculation")
+    
+    def _load_peaks(self) -> JSONDocument:
+        """Peak tracking dict bound to the peaks file (shared JSON state writer)"""
+        peaks = get_json_state_writer().document(PEAK_TRACKING_FILE)
+        logger.info(f"📊 Loaded position peaks from {PEAK_TRACKING_FILE}")
+        return peaks
     
-    def _load_peaks(self) -> Dict:
-        """Load peak tracking from persistent file"""
-        try:
-            if os.path.exists(PEAK_TRACKING_FILE):
-                with open(PEAK_TRACKING_FILE, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"📊 Loaded position peaks from {PEAK_TRACKING_FILE}")
-                    return data
-        except Exception as e:
-            logger.warning(f"Could not load peaks file: {e}")
-        return {}
+    def _save_peaks(self, key: str):
+        """Queue one changed peak entry for the next coalesced write (deletes are tracked by the document)"""
+        if key in self.position_peaks:
+            self.position_peaks[key] = self.position_peaks[key]  # Re-encode after in-place changes
     
-    def _save_peaks(self):
-        """Save peak tracking to persistent file"""
-        try:
-            os.makedirs(os.path.dirname(PEAK_TRACKING_FILE), exist_ok=True)
-            with open(PEAK_TRACKING_FILE, 'w') as f:
-                json.dump(self.position_peaks, f, indent=2)
-        except Exception as e:
-            logger.warning(f"Could not save peaks file: {e}")
+    @staticmethod
+    def _append_volume_history(history: list, volume: float) -> list:
+        """Record a volume change (bounded)"""
+        history = list(history or [])
+        if volume > 0 and (not history or history[-1]['volume'] != volume):
+            history.append({'time': datetime.now().isoformat(), 'volume': volume})
+        return history[-MAX_VOLUME_HISTORY:]
     
     def update_peak(self, symbol: str, profit_pct: float, current_price: float = 0, current_volume: float = 0):
         """Update peak profit for a symbol and persist to file
@@ -83,6 +99,7 @@ class EVExitManagerV2:
         current_peak = stored_data.get('peak_profit_pct', float('-inf'))
         stored_volume = stored_data.get('volume', 0)
         realized_profit_pct = stored_data.get('realized_profit_pct', 0.0)
+        volume_history = stored_data.get('volume_history', [])
         
         # If volume decreased, a scale-out occurred - reset peak to current
         if current_volume > 0 and stored_volume > 0 and current_volume < stored_volume * 0.95:
@@ -104,9 +121,10 @@ class EVExitManagerV2:
                 'peak_time': datetime.now().isoformat(),
                 'updated': datetime.now().isoformat(),
                 'volume': current_volume,
-                'realized_profit_pct': new_realized_total
+                'realized_profit_pct': new_realized_total,
+                'volume_history': self._append_volume_history(volume_history, current_volume)
             }
-            self._save_peaks()
+            self._save_peaks(symbol_key)
         elif profit_pct > current_peak:
             self.position_peaks[symbol_key] = {
                 'peak_profit_pct': profit_pct,
@@ -114,15 +132,17 @@ class EVExitManagerV2:
                 'peak_time': datetime.now().isoformat(),
                 'updated': datetime.now().isoformat(),
                 'volume': current_volume if current_volume > 0 else stored_volume,
-                'realized_profit_pct': realized_profit_pct
+                'realized_profit_pct': realized_profit_pct,
+                'volume_history': self._append_volume_history(volume_history, current_volume)
             }
-            self._save_peaks()
+            self._save_peaks(symbol_key)
             logger.info(f"   📈 NEW PEAK for {symbol_key}: {profit_pct:.3f}% (saved to disk)")
         elif current_volume > 0 and stored_volume == 0:
             # First time tracking volume - just update volume without changing peak
             self.position_peaks[symbol_key]['volume'] = current_volume
             self.position_peaks[symbol_key]['realized_profit_pct'] = realized_profit_pct
-            self._save_peaks()
+            self.position_peaks[symbol_key]['volume_history'] = self._append_volume_history(volume_history, current_volume)
+            self._save_peaks(symbol_key)
     
     def get_peak(self, symbol: str) -> float:
         """Get peak profit for a symbol"""
@@ -139,12 +159,29 @@ class EVExitManagerV2:
         realized = self.get_realized_profit(symbol)
         return realized + current_unrealized_pct
     
+    def _track_peak_profit(self, context, profit_pct: float) -> float:
+        """Peak profit (% of account) for the context's symbol; persists a new peak"""
+        peak_symbol_key = getattr(context, 'symbol', 'UNKNOWN').upper()  # Get from context
+        stored_peak = self.get_peak(peak_symbol_key)
+        context_peak = getattr(context, 'peak_profit_pct', None)
+        if context_peak is None:
+            context_peak = profit_pct
+        
+        # Use the higher of stored peak or context peak
+        peak_profit_pct = max(stored_peak, context_peak, profit_pct)
+        
+        # Update persistent storage if current profit is new peak
+        if profit_pct > stored_peak:
+            current_price = getattr(context, 'current_price', 0)
+            self.update_peak(peak_symbol_key, profit_pct, current_price)
+        return peak_profit_pct
+    
     def clear_peak(self, symbol: str):
         """Clear peak when position is closed"""
         symbol_key = symbol.upper()
         if symbol_key in self.position_peaks:
             del self.position_peaks[symbol_key]
-            self._save_peaks()
+            self._save_peaks(symbol_key)
             logger.info(f"   🗑️ Cleared peak for {symbol_key} (position closed)")
     
     # ═══════════════════════════════════════════════════════════
@@ -156,12 +193,7 @@ class EVExitManagerV2:
     # - SCALE_IN thresholds (more conservative during low liquidity)
     # ═══════════════════════════════════════════════════════════
     
-    SESSIONS = {
-        'asian': {'start': 0, 'end': 8, 'indices_mult': 0.5, 'forex_mult': 0.7, 'patience_boost': 1.3},
-        'london': {'start': 8, 'end': 16, 'indices_mult': 0.8, 'forex_mult': 1.0, 'patience_boost': 1.0},
-        'new_york': {'start': 13, 'end': 21, 'indices_mult': 1.0, 'forex_mult': 1.0, 'patience_boost': 1.0},
-        'overlap': {'start': 13, 'end': 16, 'indices_mult': 1.2, 'forex_mult': 1.2, 'patience_boost': 0.8},
-    }
+    SESSIONS = SESSIONS
     
     def get_session_context(self, symbol: str) -> Dict:
         """
@@ -173,35 +205,22 @@ class EVExitManagerV2:
         - patience_boost: How much more patient to be (>1 = more patient)
         - is_optimal: Whether this is optimal trading time for this symbol
         """
-        symbol_lower = symbol.lower().replace('.sim', '').replace('z25', '').replace('g26', '')
-        
-        # Determine symbol type
-        is_index = any(s in symbol_lower for s in ['us30', 'us100', 'us500', 'dax', 'ftse'])
-        is_forex = any(s in symbol_lower for s in ['eur', 'gbp', 'jpy', 'aud', 'nzd', 'cad', 'chf'])
-        is_gold = 'xau' in symbol_lower or 'gold' in symbol_lower
-        
-        # Get current UTC hour and day
-        utc_now = datetime.now(pytz.UTC)
-        current_hour = utc_now.hour
-        day_of_week = utc_now.weekday()  # 0=Monday, 4=Friday, 5=Saturday, 6=Sunday
-        
         # ═══════════════════════════════════════════════════════════
         # HEDGE FUND WEEKEND RISK MANAGEMENT
         # 
         # Friday afternoon = increased gap risk over weekend
         # Hedge funds typically:
-        # 1. Reduce position sizes after 2 PM EST (19:00 UTC)
+        # 1. Reduce position sizes in the last 3 hours before the close
         # 2. Avoid new entries in last 2-3 hours
         # 3. Tighten stops on existing positions
         # 4. Close speculative/weak thesis positions
         # 
-        # Market closes Friday 5 PM EST (22:00 UTC)
+        # Market closes Friday 5 PM New York (DST-aware in the session calendar)
         # ═══════════════════════════════════════════════════════════
-        
-        is_friday = (day_of_week == 4)
-        is_friday_afternoon = is_friday and current_hour >= 19  # After 2 PM EST
-        is_friday_close = is_friday and current_hour >= 21  # Last hour before close
-        hours_to_close = max(0, 22 - current_hour) if is_friday else 999
+        context = get_session_calendar().session_context(symbol)
+        is_friday_afternoon = context['is_friday_afternoon']
+        is_friday_close = context['is_friday_close']
+        hours_to_close = context['hours_to_close']
         
         # ═══════════════════════════════════════════════════════════
         # WEEKEND RISK MULTIPLIER - INFORMATIONAL ONLY
@@ -222,51 +241,11 @@ class EVExitManagerV2:
         elif is_friday_afternoon:
             logger.info(f"   📊 FRIDAY AFTERNOON ({hours_to_close}h to weekend) - AI will decide based on thesis/reversal")
         
-        # Determine session
-        if 13 <= current_hour < 16:
-            session_name = 'overlap'
-            session_config = self.SESSIONS['overlap']
-        elif 13 <= current_hour < 21:
-            session_name = 'new_york'
-            session_config = self.SESSIONS['new_york']
-        elif 8 <= current_hour < 16:
-            session_name = 'london'
-            session_config = self.SESSIONS['london']
-        else:
-            session_name = 'asian'
-            session_config = self.SESSIONS['asian']
-        
-        # Get multiplier based on symbol type
-        if is_index:
-            session_mult = session_config['indices_mult']
-        elif is_forex:
-            session_mult = session_config['forex_mult']
-        elif is_gold:
-            # Gold trades well in all sessions
-            session_mult = max(0.8, session_config['forex_mult'])
-        else:
-            session_mult = session_config['forex_mult']
-        
-        patience_boost = session_config['patience_boost']
-        is_optimal = session_mult >= 1.0
-        
         # Apply weekend risk adjustment to patience
         # Lower patience = more likely to exit
-        patience_boost = patience_boost * weekend_risk_mult
-        
-        return {
-            'session_name': session_name,
-            'session_mult': session_mult,
-            'patience_boost': patience_boost,
-            'is_optimal': is_optimal,
-            'current_hour_utc': current_hour,
-            'symbol_type': 'index' if is_index else ('forex' if is_forex else ('gold' if is_gold else 'other')),
-            'is_friday': is_friday,
-            'is_friday_afternoon': is_friday_afternoon,
-            'is_friday_close': is_friday_close,
-            'hours_to_close': hours_to_close,
-            'weekend_risk_mult': weekend_risk_mult
-        }
+        context['patience_boost'] = context['patience_boost'] * weekend_risk_mult
+        context['weekend_risk_mult'] = weekend_risk_mult
+        return context
     
     # AI-DRIVEN SETUP CONFIG
     # 
@@ -376,7 +355,8 @@ class EVExitManagerV2:
         initial_volume: float = None,  # Original position size
         add_count: int = 0,  # How many times we've already added
         setup_type: str = None,  # SCALP, DAY, or SWING
-        max_lots: float = 10.0  # Max position size for this symbol
+        max_lots: float = 10.0,  # Max position size for this symbol
+        precomputed: Dict = None  # Batch-computed inputs from analyze_exits()
     ) -> Dict:
         """
         Pure AI-driven position analysis.
@@ -399,6 +379,9 @@ class EVExitManagerV2:
         - Max 2 adds per position
         - Max 2.5x initial position size
         - Position size limits per symbol type
+        
+        `precomputed` is filled in by analyze_exits() for portfolio-level
+        calls (setup type, ATR mult, session, market data, probabilities).
         """
         
         is_buy = (position_type == 0)
@@ -480,13 +463,21 @@ class EVExitManagerV2:
         
         logger.info(f"   📊 Setup Type: {setup_type} (D1={d1_trend:.2f}, H4={h4_trend:.2f}, size={size_ratio:.2f})")
         
+        # Batch inputs are only valid if they were derived from the same setup type
+        if precomputed is not None and precomputed.get('setup_type') != setup_type:
+            logger.warning(f"   ⚠️ Batch setup type {precomputed.get('setup_type')} != {setup_type} - recomputing inputs")
+            precomputed = None
+        
         # Get config for this setup type
         setup_config = self.SETUP_CONFIG.get(setup_type, self.SETUP_CONFIG['DAY'])
         early_exit_tf = setup_config['early_exit_tf']
         patience = setup_config['patience']
         
         # AI-DRIVEN ATR MULTIPLIER - derived from market conditions, not hardcoded
-        atr_mult = self._calculate_ai_atr_mult(context, setup_type, is_buy)
+        if precomputed is not None:
+            atr_mult = precomputed['atr_mult']
+        else:
+            atr_mult = self._calculate_ai_atr_mult(context, setup_type, is_buy)
         
         # ═══════════════════════════════════════════════════════════
         # SESSION AWARENESS - Adjust patience based on trading session
@@ -497,7 +488,10 @@ class EVExitManagerV2:
         # This ensures exit logic matches entry logic
         # ═══════════════════════════════════════════════════════════
         
-        session_context = self.get_session_context(symbol)
+        if precomputed is not None:
+            session_context = precomputed['session_context']
+        else:
+            session_context = self.get_session_context(symbol)
         session_name = session_context['session_name']
         session_mult = session_context['session_mult']
         patience_boost = session_context['patience_boost']
@@ -721,7 +715,10 @@ class EVExitManagerV2:
         # STEP 1: Extract ALL market data from context
         # ═══════════════════════════════════════════════════════════
         
-        market_data = self._extract_market_data(context, is_buy)
+        if precomputed is not None:
+            market_data = precomputed['market_data']
+        else:
+            market_data = self._extract_market_data(context, is_buy)
         
         # Calculate profit metrics
         profit_metrics = self._calculate_profit_metrics(
@@ -765,7 +762,10 @@ class EVExitManagerV2:
         # STEP 2: Calculate probabilities from AI/market analysis
         # ═══════════════════════════════════════════════════════════
         
-        probabilities = self._calculate_probabilities(market_data, is_buy, profit_metrics, setup_type)
+        if precomputed is not None:
+            probabilities = precomputed['probabilities']
+        else:
+            probabilities = self._calculate_probabilities(market_data, is_buy, profit_metrics, setup_type)
         
         logger.info(f"   📈 Probabilities:")
         logger.info(f"      Continuation: {probabilities['continuation']:.1%}")
@@ -1061,17 +1061,40 @@ class EVExitManagerV2:
         # STEP 3: Calculate EV for ALL possible actions
         # ═══════════════════════════════════════════════════════════
         
-        evs = self._calculate_all_evs(
-            profit_metrics, probabilities, market_data, current_volume, is_buy, context, can_scale_in,
-            setup_type=setup_type, atr_mult=atr_mult, max_lots=max_lots,
-            session_context=session_context,
-            time_since_scale=time_since_scale,
-            price_move_since_scale=price_move_since_scale
+        # Fast path: clear HOLD regions come straight from the precomputed surface
+        evs = self._lookup_ev_surface(
+            context, profit_metrics, probabilities, market_data, session_context,
+            setup_type, is_buy, atr_mult, time_since_scale
         )
+        ev_source = 'surface'
+        verify = evs is not None and self.surface_stats['hits'] % SURFACE_VERIFY_EVERY == 0
+        if evs is None or verify:
+            full_evs = self._calculate_all_evs(
+                profit_metrics, probabilities, market_data, current_volume, is_buy, context, can_scale_in,
+                setup_type=setup_type, atr_mult=atr_mult, max_lots=max_lots,
+                session_context=session_context,
+                time_since_scale=time_since_scale,
+                price_move_since_scale=price_move_since_scale
+            )
+            if verify:
+                self._verify_ev_surface(full_evs)
+            evs = full_evs
+            ev_source = 'full'
+        else:
+            # _calculate_all_evs feeds the regime detector (volatility history, transitions) - keep it fed
+            get_regime_detector(getattr(context, 'symbol', None)).detect_regime(context)
         
-        logger.info(f"   💰 Expected Values (% of account):")
+        logger.info(f"   💰 Expected Values (% of account, {ev_source}):")
         for action, ev in evs.items():
             logger.info(f"      {action}: {ev:.4f}%")
+        flight_recorder.note_append('exit_evs', {
+            'symbol': symbol,
+            'setup_type': setup_type,
+            'atr_mult': atr_mult,
+            'source': ev_source,
+            'evs': dict(evs),
+            'probabilities': {k: v for k, v in probabilities.items() if isinstance(v, (int, float))},
+        })
         
         # ═══════════════════════════════════════════════════════════
         # STEP 4: Choose action with HIGHEST EV
@@ -1356,7 +1379,7 @@ class EVExitManagerV2:
         dist_to_support = getattr(context, 'd1_dist_to_support', 0) or getattr(context, 'h4_dist_to_support', 0)
         dist_to_resistance = getattr(context, 'd1_dist_to_resistance', 0) or getattr(context, 'h4_dist_to_resistance', 0)
         
-        return self._create_decision(
+        decision = self._create_decision(
             best_action, best_ev, evs, profit_metrics, current_volume, dynamic_stop,
             symbol=symbol, current_price=current_price, probabilities=probabilities,
             setup_type=setup_type,
@@ -1367,6 +1390,352 @@ class EVExitManagerV2:
             dist_to_support=dist_to_support,
             dist_to_resistance=dist_to_resistance
         )
+        decision['ev_source'] = ev_source
+        return decision
+    
+    # ═══════════════════════════════════════════════════════════
+    # EV SURFACE FAST PATH
+    # 
+    # Clear HOLD cells of the precomputed surface (ev_surface.py) skip
+    # _calculate_all_evs. Every SURFACE_VERIFY_EVERY-th hit is shadow-checked
+    # against the full calculation; the fast path switches itself off if the
+    # table disagrees too often (stale table after an EV logic change).
+    # Side effects of the full path (peak tracking, regime detector) still run.
+    # ═══════════════════════════════════════════════════════════
+    
+    def _lookup_ev_surface(self, context, profit_metrics: Dict, probabilities: Dict, market_data: Dict,
+                           session_context: Dict, setup_type: str, is_buy: bool,
+                           atr_mult: float, time_since_scale: float):
+        """EVs from the surface for a clear HOLD cell, else None"""
+        if self.ev_surface is None:
+            return None
+        self.surface_stats['lookups'] += 1
+        
+        # Peak tracking normally happens inside _calculate_all_evs - keep it on the fast path
+        profit_pct = profit_metrics['profit_pct']
+        peak_profit_pct = self._track_peak_profit(context, profit_pct)
+        
+        capture = target_capture(context, market_data, profit_pct, atr_mult)
+        if not guards_pass(context, probabilities, session_context, setup_type,
+                           profit_pct, peak_profit_pct, time_since_scale, capture):
+            self.surface_stats['guarded'] += 1
+            return None
+        
+        inputs = surface_inputs(context, profit_metrics, probabilities, market_data, session_context, is_buy)
+        if inputs is None:
+            self.surface_stats['outside'] += 1
+            return None
+        
+        status, evs = self.ev_surface.lookup(setup_type, is_buy, inputs, capture)
+        if evs is None:
+            self.surface_stats[status] += 1
+            return None
+        self.surface_stats['hits'] += 1
+        
+        # Display values _calculate_all_evs fills in for the EA
+        current_price = market_data['current_price']
+        probabilities['thesis_quality'] = probabilities.get('thesis_quality', 0.5)
+        probabilities['ai_target'] = (swing_atr(context, market_data) * atr_mult / current_price * 100) if current_price > 0 else 1.0
+        probabilities['current_profit_pct'] = profit_pct
+        return evs
+    
+    def _verify_ev_surface(self, full_evs: Dict):
+        """Shadow check of a fast-path hit: the full calculation must also pick HOLD"""
+        self.surface_stats['verified'] += 1
+        if max(full_evs, key=full_evs.get) != 'HOLD':
+            self.surface_stats['mismatches'] += 1
+            logger.warning(f"   ⚠️ EV surface mismatch: surface HOLD, full calculation {max(full_evs, key=full_evs.get)}")
+        
+        verified = self.surface_stats['verified']
+        if verified >= 50 and self.surface_stats['mismatches'] / verified > SURFACE_MAX_MISMATCH_RATE:
+            logger.warning(f"   🚨 EV surface disabled: {self.surface_stats['mismatches']}/{verified} shadow checks disagreed "
+                           f"- rebuild with make ev-surface")
+            self.ev_surface = None
+    
+    def get_surface_stats(self) -> Dict:
+        """Fast-path usage and parity counters"""
+        stats = dict(self.surface_stats)
+        stats['enabled'] = self.ev_surface is not None
+        stats['hit_rate'] = stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0
+        stats['mismatch_rate'] = stats['mismatches'] / stats['verified'] if stats['verified'] else 0.0
+        return stats
+    
+    # ═══════════════════════════════════════════════════════════
+    # PORTFOLIO BATCH ANALYSIS
+    # 
+    # analyze_exits() evaluates ALL open positions in one call.
+    # Setup classification, AI ATR multiplier and continuation/reversal
+    # probabilities are computed with array math across positions, and
+    # session context once per symbol. The EV/decision stage then runs
+    # per position on those inputs, so every decision dict is identical
+    # to calling analyze_exit() position by position.
+    # ═══════════════════════════════════════════════════════════
+    
+    BATCH_SETUP_TYPES = ('SCALP', 'DAY', 'SWING')
+    
+    # Momentum/RSI weights per setup type (m15, m30, h1, h4, d1): lower TFs for SCALP, higher for SWING
+    BATCH_TF_WEIGHTS = np.array([
+        [0.25, 0.25, 0.25, 0.15, 0.10],  # SCALP
+        [0.10, 0.15, 0.25, 0.30, 0.20],  # DAY
+        [0.05, 0.10, 0.15, 0.30, 0.40],  # SWING
+    ])
+    
+    def analyze_exits(self, positions: List[Dict], contexts: List) -> List[Dict]:
+        """
+        Portfolio-level exit analysis.
+        
+        Args:
+            positions: One dict per position with the analyze_exit() arguments -
+                       current_profit, current_volume, position_type, symbol and
+                       optionally initial_volume, add_count, setup_type, max_lots
+            contexts: EnhancedTradingContext for each position (same order)
+        
+        Returns:
+            Decision dicts in the same order as positions
+        """
+        if len(positions) != len(contexts):
+            raise ValueError(f"Got {len(positions)} positions but {len(contexts)} contexts")
+        if not positions:
+            return []
+        
+        logger.info(f"🤖 EV BATCH EXIT ANALYSIS - {len(positions)} positions")
+        batch_inputs = self._precompute_exit_inputs(positions, contexts)
+        
+        decisions = []
+        for position, context, precomputed in zip(positions, contexts, batch_inputs):
+            try:
+                decision = self.analyze_exit(
+                    context=context,
+                    current_profit=position['current_profit'],
+                    current_volume=position['current_volume'],
+                    position_type=position['position_type'],
+                    symbol=position['symbol'],
+                    initial_volume=position.get('initial_volume'),
+                    add_count=position.get('add_count', 0),
+                    setup_type=position.get('setup_type'),
+                    max_lots=position.get('max_lots', 10.0),
+                    precomputed=precomputed
+                )
+            except Exception as e:
+                logger.error(f"❌ Batch exit analysis failed for {position.get('symbol')}: {e}")
+                decision = {
+                    'action': 'HOLD',
+                    'reason': f'Analysis error: {str(e)}',
+                    'confidence': 50,
+                    'dynamic_stop': {},
+                    'modify_stop': False,
+                    'recommended_stop': 0,
+                }
+            decisions.append(decision)
+        
+        return decisions
+    
+    def _precompute_exit_inputs(self, positions: List[Dict], contexts: List) -> List[Dict]:
+        """
+        Compute the per-position inputs of analyze_exit() for the whole portfolio.
+        
+        Mirrors the scalar setup classification and _calculate_ai_atr_mult()
+        operation for operation; probabilities come from the same
+        _calculate_probabilities_batch() the scalar path uses.
+        """
+        is_buy = np.array([p['position_type'] == 0 for p in positions], dtype=bool)
+        current_volume = np.array([float(p['current_volume']) for p in positions])
+        max_lots = np.array([float(p.get('max_lots', 10.0)) for p in positions])
+        
+        def context_array(name: str, default: float) -> np.ndarray:
+            return np.array([getattr(c, name, default) for c in contexts], dtype=float)
+        
+        # Raw context trends (setup classification and ATR mult read these directly,
+        # before the trend_alignment fallback in _extract_market_data)
+        h1_trend = context_array('h1_trend', 0.5)
+        h4_trend = context_array('h4_trend', 0.5)
+        d1_trend = context_array('d1_trend', 0.5)
+        
+        # ─── Setup type classification ───
+        d1_support = np.where(is_buy, d1_trend, 1.0 - d1_trend)
+        h4_support = np.where(is_buy, h4_trend, 1.0 - h4_trend)
+        h1_support = np.where(is_buy, h1_trend, 1.0 - h1_trend)
+        htf_alignment_score = d1_support * 0.45 + h4_support * 0.35 + h1_support * 0.20
+        
+        safe_max_lots = np.where(max_lots > 0, max_lots, 1.0)
+        size_ratio = np.where(max_lots > 0, current_volume / safe_max_lots, 0.5)
+        size_risk_factor = np.maximum(0.3, 1.0 - size_ratio * 0.7)
+        setup_score = htf_alignment_score * 0.8 * size_risk_factor + 0.2
+        setup_idx = np.where(setup_score >= 0.65, 2, np.where(setup_score >= 0.45, 1, 0))
+        
+        # ─── AI ATR multiplier ───
+        base_mult = np.array([self.SETUP_CONFIG[s]['base_atr_mult'] for s in self.BATCH_SETUP_TYPES])[setup_idx]
+        htf_strength = np.where(
+            is_buy,
+            d1_trend * 0.4 + h4_trend * 0.35 + h1_trend * 0.25,
+            (1 - d1_trend) * 0.4 + (1 - h4_trend) * 0.35 + (1 - h1_trend) * 0.25
+        )
+        trend_factor = 0.8 + (htf_strength * 0.7)
+        adx_factor = 0.8 + (np.minimum(context_array('h4_adx', 25.0), 50) / 50) * 0.6
+        ml_factor = 0.9 + ((context_array('ml_confidence', 50.0) / 100.0) * 0.3)
+        
+        sr_dist = np.array([
+            (getattr(c, 'h4_dist_to_resistance', 0) or getattr(c, 'd1_dist_to_resistance', 0)) if buy
+            else (getattr(c, 'h4_dist_to_support', 0) or getattr(c, 'd1_dist_to_support', 0))
+            for c, buy in zip(contexts, is_buy)
+        ], dtype=float)
+        sr_factor = np.where((sr_dist > 0) & (sr_dist < 2.0), sr_dist / 2.0, 1.0)
+        
+        atr_mult = base_mult * trend_factor * adx_factor * ml_factor * sr_factor
+        atr_mult = np.maximum(np.array([1.0, 1.5, 3.0])[setup_idx],
+                              np.minimum(np.array([3.0, 6.0, 12.0])[setup_idx], atr_mult))
+        
+        # ─── Market data + probabilities ───
+        market_rows = [self._extract_market_data(c, bool(buy)) for c, buy in zip(contexts, is_buy)]
+        probabilities = self._calculate_probabilities_batch(market_rows, is_buy, setup_idx)
+        
+        # ─── Session context (once per symbol) ───
+        sessions = {}
+        for p in positions:
+            if p['symbol'] not in sessions:
+                sessions[p['symbol']] = self.get_session_context(p['symbol'])
+        
+        return [
+            {
+                'setup_type': self.BATCH_SETUP_TYPES[setup_idx[i]],
+                'atr_mult': float(atr_mult[i]),
+                'session_context': dict(sessions[positions[i]['symbol']]),
+                'market_data': market_rows[i],
+                'probabilities': probabilities[i],
+            }
+            for i in range(len(positions))
+        ]
+    
+    def _calculate_probabilities_batch(self, market_rows: List[Dict], is_buy: np.ndarray, setup_idx: np.ndarray) -> List[Dict]:
+        """
+        Continuation/reversal probabilities, one row per position.
+        
+        The only implementation - _calculate_probabilities() calls it with a
+        batch of one. ML is trained on the HTF features, so HTF trends enter
+        as a thesis check whose weight grows with the number of timeframes
+        that strongly support the position (ML noise matters less then), and
+        ADX shifts weight from ML to HTF as the trend strengthens.
+        """
+        
+        def col(key: str, default: float = None) -> np.ndarray:
+            return np.array([m[key] if default is None else m.get(key, default) for m in market_rows], dtype=float)
+        
+        ml_direction = np.array([m['ml_direction'] for m in market_rows], dtype=object)
+        ml_confidence = col('ml_confidence') / 100.0
+        h1_trend, h4_trend, d1_trend = col('h1_trend'), col('h4_trend'), col('d1_trend')
+        
+        # ML factor (HOLD supports existing positions; disagreement softened if HTF supports)
+        ml_is_hold = ml_direction == 'HOLD'
+        ml_strongly_agrees = np.where(is_buy, ml_direction == 'BUY', ml_direction == 'SELL').astype(bool)
+        ml_agrees = ml_strongly_agrees | ml_is_hold
+        htf_supports = np.where(
+            is_buy,
+            (d1_trend > 0.55) | (h4_trend > 0.52),
+            (d1_trend < 0.45) | (h4_trend < 0.48)
+        )
+        ml_factor = np.select(
+            [ml_strongly_agrees, ml_is_hold, htf_supports],
+            [ml_confidence, 0.6, 0.45],
+            default=1.0 - ml_confidence
+        )
+        
+        trend_factor = np.where(is_buy, (h1_trend + h4_trend + d1_trend) / 3.0,
+                                (3.0 - h1_trend - h4_trend - d1_trend) / 3.0)
+        
+        # Momentum / RSI with setup-type weights
+        weights = self.BATCH_TF_WEIGHTS[setup_idx]
+        weighted_momentum = (
+            col('m15_momentum') * weights[:, 0] +
+            col('m30_momentum') * weights[:, 1] +
+            col('h1_momentum') * weights[:, 2] +
+            col('h4_momentum') * weights[:, 3] +
+            col('d1_momentum') * weights[:, 4]
+        )
+        momentum_factor = np.where(is_buy, (weighted_momentum + 1.0) / 2.0, (1.0 - weighted_momentum) / 2.0)
+        momentum_factor = np.maximum(0.0, np.minimum(1.0, momentum_factor))
+        
+        weighted_rsi = (
+            col('m15_rsi') * weights[:, 0] +
+            col('m30_rsi') * weights[:, 1] +
+            col('h1_rsi') * weights[:, 2] +
+            col('h4_rsi') * weights[:, 3] +
+            col('d1_rsi') * weights[:, 4]
+        )
+        exhaustion_factor = np.where(is_buy, np.maximum(0.0, (weighted_rsi - 50.0) / 50.0),
+                                     np.maximum(0.0, (50.0 - weighted_rsi) / 50.0))
+        
+        # HTF support count → ML/HTF weights
+        htf_support_count = np.where(
+            is_buy,
+            (h1_trend > 0.55).astype(int) + (h4_trend > 0.55) + (d1_trend > 0.55),
+            (h1_trend < 0.45).astype(int) + (h4_trend < 0.45) + (d1_trend < 0.45)
+        )
+        ml_weight = np.select([htf_support_count >= 3, htf_support_count >= 2], [0.30, 0.45], default=0.60)
+        htf_weight = np.select([htf_support_count >= 3, htf_support_count >= 2], [0.55, 0.40], default=0.25)
+        
+        htf_volume_divergence = np.maximum(col('h4_volume_divergence', 0.0), col('d1_volume_divergence', 0.0))
+        htf_adx = col('htf_adx', 25.0)
+        h4_structure = col('h4_market_structure', 0.0)
+        d1_structure = col('d1_market_structure', 0.0)
+        
+        # Continuation
+        adjusted_trend = np.where(is_buy, trend_factor, 1.0 - trend_factor)
+        adx_factor = np.minimum(1.0, htf_adx / 50.0)
+        
+        dynamic_htf_weight = htf_weight * (0.8 + adx_factor * 0.4)
+        dynamic_ml_weight = ml_weight * (1.2 - adx_factor * 0.4)
+        total_weight = dynamic_htf_weight + dynamic_ml_weight + 0.15 + 0.10
+        dynamic_htf_weight = dynamic_htf_weight / total_weight
+        dynamic_ml_weight = dynamic_ml_weight / total_weight
+        momentum_weight = 0.15 / total_weight
+        exhaustion_weight = 0.10 / total_weight
+        
+        base_continuation = (
+            ml_factor * dynamic_ml_weight +
+            adjusted_trend * dynamic_htf_weight +
+            momentum_factor * momentum_weight +
+            (1.0 - exhaustion_factor) * exhaustion_weight
+        )
+        structure_bonus = np.where(is_buy, (h4_structure + d1_structure) / 2.0 * 0.10,
+                                   -(h4_structure + d1_structure) / 2.0 * 0.10)
+        vol_div_penalty = htf_volume_divergence * 0.15
+        adx_boost = 0.8 + adx_factor * 0.2
+        continuation = (base_continuation + structure_bonus) * (1.0 - vol_div_penalty) * adx_boost
+        
+        # Reversal
+        ml_disagree = 1.0 - ml_factor
+        htf_weakness = 1.0 - adjusted_trend
+        ml_reversal_weight = 0.15 + (htf_weakness * 0.30)
+        base_reversal = (
+            htf_weakness * 0.35 +
+            ml_disagree * ml_reversal_weight +
+            exhaustion_factor * 0.15 +
+            htf_volume_divergence * 0.10 +
+            (1.0 - adx_factor) * 0.05
+        )
+        reversal = np.minimum(0.85, base_reversal)
+        
+        total = continuation + reversal
+        over = total > 1.0
+        safe_total = np.where(over, total, 1.0)
+        continuation = np.where(over, continuation / safe_total, continuation)
+        reversal = np.where(over, reversal / safe_total, reversal)
+        flat = np.maximum(0.0, 1.0 - continuation - reversal)
+        
+        thesis_quality = ml_factor * 0.5 + adjusted_trend * 0.5
+        
+        return [
+            {
+                'continuation': float(continuation[i]),
+                'reversal': float(reversal[i]),
+                'flat': float(flat[i]),
+                'ml_agrees': bool(ml_agrees[i]),
+                'trend_aligned': bool(adjusted_trend[i] > 0.5),
+                'thesis_quality': float(thesis_quality[i]),
+                'ai_target': 0,
+            }
+            for i in range(len(market_rows))
+        ]
     
     def _extract_market_data(self, context, is_buy: bool) -> Dict:
         """Extract all market data from context for AI analysis."""
@@ -1535,331 +1904,14 @@ class EVExitManagerV2:
         So ML prediction ALREADY incorporates HTF data. We use HTF separately only as a
         sanity check / thesis validation, not as a separate weighted factor.
         """
-        
-        # ═══════════════════════════════════════════════════════════
-        # ML MODEL - PRIMARY SIGNAL (70% weight)
-        # ML is trained on ALL 138 features INCLUDING HTF (h1/h4/d1 trends)
-        # So ML prediction already incorporates multi-timeframe analysis
-        # ═══════════════════════════════════════════════════════════
-        
-        ml_direction = market_data['ml_direction']
-        ml_confidence = market_data['ml_confidence'] / 100.0  # Normalize to 0-1
-        
-        # ML agreement logic for EXISTING positions:
-        # - BUY position + ML says BUY = strongly agrees
-        # - BUY position + ML says HOLD = agrees (HOLD means don't close!)
-        # - BUY position + ML says SELL = disagrees
-        # 
-        # CRITICAL: HOLD does NOT mean "close the position"
-        # HOLD means "don't open new positions" - it's neutral/supportive for existing positions
-        
-        if is_buy:
-            ml_agrees = (ml_direction in ['BUY', 'HOLD'])  # HOLD supports existing BUY
-            ml_strongly_agrees = (ml_direction == 'BUY')
-        else:
-            ml_agrees = (ml_direction in ['SELL', 'HOLD'])  # HOLD supports existing SELL
-            ml_strongly_agrees = (ml_direction == 'SELL')
-        
-        if ml_strongly_agrees:
-            ml_factor = ml_confidence  # ML strongly agrees, use full confidence
-        elif ml_direction == 'HOLD':
-            ml_factor = 0.6  # HOLD is supportive of existing position (slightly above neutral)
-        else:
-            # ML disagrees (opposite direction)
-            # BUT: Check if HTF still supports the position
-            # If HTF supports, don't let ML alone trigger a close
-            # This prevents churn from ML flip-flopping
-            h1_trend = market_data['h1_trend']
-            h4_trend = market_data['h4_trend']
-            d1_trend = market_data['d1_trend']
-            
-            if is_buy:
-                htf_supports = (d1_trend > 0.55 or h4_trend > 0.52)
-            else:
-                htf_supports = (d1_trend < 0.45 or h4_trend < 0.48)
-            
-            if htf_supports:
-                # HTF still supports position - reduce ML disagreement impact
-                # Don't close just because ML flipped - wait for HTF confirmation
-                ml_factor = 0.45  # Slightly below neutral, but not as harsh
-                logger.info(f"   ⚠️ ML disagrees but HTF supports → reduced ML penalty (factor=0.45)")
-            else:
-                # Both ML and HTF disagree - full penalty
-                ml_factor = 1.0 - ml_confidence
-        
-        # ═══════════════════════════════════════════════════════════
-        # HTF THESIS VALIDATION (sanity check, not separate factor)
-        # Since ML already uses HTF, we only use this to validate the thesis
-        # If HTF strongly disagrees with ML, something is wrong
-        # ═══════════════════════════════════════════════════════════
-        
-        h1_trend = market_data['h1_trend']
-        h4_trend = market_data['h4_trend']
-        d1_trend = market_data['d1_trend']
-        
-        if is_buy:
-            # For BUY, higher trend values = more bullish = better
-            trend_factor = (h1_trend + h4_trend + d1_trend) / 3.0
-        else:
-            # For SELL, lower trend values = more bearish = better
-            trend_factor = (3.0 - h1_trend - h4_trend - d1_trend) / 3.0
-        
-        # ═══════════════════════════════════════════════════════════
-        # Factor 3: Momentum - DYNAMIC WEIGHTS BY SETUP TYPE
-        # 
-        # The ML model receives ALL timeframe data and learns the optimal
-        # weighting. Here we create a COMPOSITE SCORE that the AI uses
-        # as one input among many - NOT the final decision.
-        # 
-        # Weights adjust based on setup type:
-        # - SCALP: Lower TFs matter more (M15/M30/H1)
-        # - DAY: Mid TFs matter more (H1/H4)
-        # - SWING: Higher TFs matter more (H4/D1)
-        # ═══════════════════════════════════════════════════════════
-        
-        m15_momentum = market_data['m15_momentum']
-        m30_momentum = market_data['m30_momentum']
-        h1_momentum = market_data['h1_momentum']
-        h4_momentum = market_data['h4_momentum']
-        d1_momentum = market_data['d1_momentum']
-        
-        # Dynamic weights based on setup type
-        setup_type_weights = {
-            'SCALP': {'m15': 0.25, 'm30': 0.25, 'h1': 0.25, 'h4': 0.15, 'd1': 0.10},
-            'DAY':   {'m15': 0.10, 'm30': 0.15, 'h1': 0.25, 'h4': 0.30, 'd1': 0.20},
-            'SWING': {'m15': 0.05, 'm30': 0.10, 'h1': 0.15, 'h4': 0.30, 'd1': 0.40}
-        }
-        weights = setup_type_weights.get(setup_type, setup_type_weights['DAY'])
-        
-        # Weighted momentum (dynamic based on setup type)
-        weighted_momentum = (
-            m15_momentum * weights['m15'] +
-            m30_momentum * weights['m30'] +
-            h1_momentum * weights['h1'] +
-            h4_momentum * weights['h4'] +
-            d1_momentum * weights['d1']
-        )
-        
-        if is_buy:
-            momentum_factor = (weighted_momentum + 1.0) / 2.0  # Normalize -1 to 1 → 0 to 1
-        else:
-            momentum_factor = (1.0 - weighted_momentum) / 2.0
-        
-        momentum_factor = max(0.0, min(1.0, momentum_factor))  # Clamp to 0-1
-        
-        # ═══════════════════════════════════════════════════════════
-        # Factor 4: RSI Exhaustion - DYNAMIC WEIGHTS BY SETUP TYPE
-        # Overbought/oversold increases reversal probability
-        # Uses same dynamic weights as momentum for consistency
-        # ═══════════════════════════════════════════════════════════
-        
-        m15_rsi = market_data['m15_rsi']
-        m30_rsi = market_data['m30_rsi']
-        h1_rsi = market_data['h1_rsi']
-        h4_rsi = market_data['h4_rsi']
-        d1_rsi = market_data['d1_rsi']
-        
-        # Weighted RSI (dynamic based on setup type - uses same weights as momentum)
-        weighted_rsi = (
-            m15_rsi * weights['m15'] +
-            m30_rsi * weights['m30'] +
-            h1_rsi * weights['h1'] +
-            h4_rsi * weights['h4'] +
-            d1_rsi * weights['d1']
-        )
-        
-        if is_buy:
-            # For BUY, high RSI = overbought = reversal risk
-            # Map RSI 50-100 to exhaustion 0-1
-            exhaustion_factor = max(0.0, (weighted_rsi - 50.0) / 50.0)
-        else:
-            # For SELL, low RSI = oversold = reversal risk
-            exhaustion_factor = max(0.0, (50.0 - weighted_rsi) / 50.0)
-        
-        # ═══════════════════════════════════════════════════════════
-        # SWING TRADING: HTF STRUCTURE IS PRIMARY
-        # For swing trades, the HTF thesis (H1/H4/D1) is what we entered on
-        # ML includes M1 noise which can flip-flop minute to minute
-        # Trust the structure over short-term noise
-        # ═══════════════════════════════════════════════════════════
-        
-        # Count how many HTF timeframes STRONGLY support the position
-        # Require > 0.55 for bullish, < 0.45 for bearish (not just barely above/below 0.5)
-        # 0.51 is essentially neutral, not real support
-        STRONG_BULLISH = 0.55
-        STRONG_BEARISH = 0.45
-        
-        if is_buy:
-            htf_support_count = sum([h1_trend > STRONG_BULLISH, h4_trend > STRONG_BULLISH, d1_trend > STRONG_BULLISH])
-        else:
-            htf_support_count = sum([h1_trend < STRONG_BEARISH, h4_trend < STRONG_BEARISH, d1_trend < STRONG_BEARISH])
-        
-        # Log the actual trend values for debugging
-        logger.info(f"   📊 Trends: H1={h1_trend:.2f} H4={h4_trend:.2f} D1={d1_trend:.2f} (need >{STRONG_BULLISH} for BUY support)")
-        
-        # SWING TRADING LOGIC:
-        # - If HTF strongly supports (3/3 or 2/3), trust structure over ML noise
-        # - If HTF is weak (0/3 or 1/3), ML becomes more important
-        # - This prevents M1 noise from closing swing trades prematurely
-        
-        if htf_support_count >= 3:
-            # STRONG HTF SUPPORT: Structure is solid, ML noise is irrelevant
-            # The thesis we entered on is still valid
-            ml_weight = 0.30  # Reduce ML influence (it's noisy)
-            htf_weight = 0.55  # HTF structure is primary
-            logger.info(f"   📊 STRONG HTF ({htf_support_count}/3): Trusting structure over ML noise (ML={ml_factor:.2f} HTF={trend_factor:.2f})")
-        elif htf_support_count >= 2:
-            # MODERATE HTF SUPPORT: Structure still valid, but watch ML
-            ml_weight = 0.45
-            htf_weight = 0.40
-            logger.info(f"   📊 MODERATE HTF ({htf_support_count}/3): Balanced ML/HTF (ML={ml_factor:.2f} HTF={trend_factor:.2f})")
-        else:
-            # WEAK HTF SUPPORT: Structure breaking down, ML becomes important
-            ml_weight = 0.60
-            htf_weight = 0.25
-            logger.info(f"   ⚠️ WEAK HTF ({htf_support_count}/3): ML more important (ML={ml_factor:.2f} HTF={trend_factor:.2f})")
-        
-        # ═══════════════════════════════════════════════════════════
-        # SWING TRADING: Use NEW HTF-stable indicators
-        # 
-        # NEW INDICATORS (from H4/D1, not M1):
-        # - h4_volume_divergence: HTF volume divergence (stable)
-        # - htf_adx: Trend strength (0-100)
-        # - h4_market_structure: Market structure (-1 to 1)
-        # ═══════════════════════════════════════════════════════════
-        
-        # Use HTF volume divergence (from H4, not M1)
-        h4_vol_div = market_data.get('h4_volume_divergence', 0.0)
-        d1_vol_div = market_data.get('d1_volume_divergence', 0.0)
-        htf_volume_divergence = max(h4_vol_div, d1_vol_div)  # Use worst case
-        
-        # ADX for trend strength (>25 = trending, <20 = ranging)
-        htf_adx = market_data.get('htf_adx', 25.0)
-        is_trending = htf_adx > 25
-        
-        # Market structure (positive = uptrend, negative = downtrend)
-        h4_structure = market_data.get('h4_market_structure', 0.0)
-        d1_structure = market_data.get('d1_market_structure', 0.0)
-        
-        logger.info(f"   📊 HTF Indicators: vol_div={htf_volume_divergence:.2f}, ADX={htf_adx:.1f}, structure_h4={h4_structure:.2f}")
-        
-        # ═══════════════════════════════════════════════════════════
-        # AI-DRIVEN CONTINUATION PROBABILITY
-        # 
-        # NO hardcoded thresholds (0.50, 0.55, 0.45, etc.)
-        # Uses continuous scoring based on position direction alignment
-        # ═══════════════════════════════════════════════════════════
-        
-        # AI-driven trend alignment: continuous 0-1 score
-        # For BUY: trend_factor directly represents support (0=bearish, 1=bullish)
-        # For SELL: inverted (0=bullish opposition, 1=bearish support)
-        if is_buy:
-            adjusted_trend = trend_factor  # Direct: higher = more bullish support
-        else:
-            adjusted_trend = 1.0 - trend_factor  # Inverted: higher = more bearish support
-        
-        # AI-driven weights based on market conditions (not hardcoded)
-        # When ADX is high (trending), trust HTF more
-        # When ADX is low (ranging), trust ML more
-        adx_factor = min(1.0, htf_adx / 50.0)  # Continuous 0-1
-        
-        # Dynamic weights based on trend strength
-        dynamic_htf_weight = htf_weight * (0.8 + adx_factor * 0.4)  # 0.8-1.2x HTF weight
-        dynamic_ml_weight = ml_weight * (1.2 - adx_factor * 0.4)   # 0.8-1.2x ML weight
-        
-        # Normalize weights
-        total_weight = dynamic_htf_weight + dynamic_ml_weight + 0.15 + 0.10
-        dynamic_htf_weight /= total_weight
-        dynamic_ml_weight /= total_weight
-        momentum_weight = 0.15 / total_weight
-        exhaustion_weight = 0.10 / total_weight
-        
-        base_continuation = (
-            ml_factor * dynamic_ml_weight +
-            adjusted_trend * dynamic_htf_weight +
-            momentum_factor * momentum_weight +
-            (1.0 - exhaustion_factor) * exhaustion_weight
-        )
-        
-        # Market structure bonus (continuous, not threshold-based)
-        if is_buy:
-            structure_bonus = (h4_structure + d1_structure) / 2.0 * 0.10
-        else:
-            structure_bonus = -(h4_structure + d1_structure) / 2.0 * 0.10
-        
-        # Volume divergence penalty (continuous)
-        vol_div_penalty = htf_volume_divergence * 0.15
-        
-        # ADX confidence boost (stronger trends = more confidence)
-        adx_boost = 0.8 + adx_factor * 0.2
-        
-        continuation = (base_continuation + structure_bonus) * (1.0 - vol_div_penalty) * adx_boost
-        
-        logger.info(f"   🧠 AI Continuation: trend={adjusted_trend:.2f}, ml={ml_factor:.2f}, adx_factor={adx_factor:.2f}")
-        
-        # ═══════════════════════════════════════════════════════════
-        # AI-DRIVEN REVERSAL PROBABILITY
-        # 
-        # NO hardcoded thresholds or fixed weights
-        # Weights dynamically adjust based on HTF support strength
-        # ═══════════════════════════════════════════════════════════
-        
-        # ML disagreement factor (continuous 0-1)
-        ml_disagree = 1.0 - ml_factor
-        
-        # HTF weakness factor (continuous 0-1, based on position direction)
-        htf_weakness = 1.0 - adjusted_trend
-        
-        # AI-driven ML reversal weight based on HTF strength (continuous)
-        # When HTF is strong (adjusted_trend high), ML disagreement matters less
-        # When HTF is weak (adjusted_trend low), ML disagreement matters more
-        ml_reversal_weight = 0.15 + (htf_weakness * 0.30)  # 0.15 to 0.45 based on HTF
-        
-        # Remaining weight goes to other factors
-        htf_reversal_weight = 0.35
-        exhaustion_rev_weight = 0.15
-        vol_div_rev_weight = 0.10
-        adx_rev_weight = 0.05
-        
-        base_reversal = (
-            htf_weakness * htf_reversal_weight +
-            ml_disagree * ml_reversal_weight +
-            exhaustion_factor * exhaustion_rev_weight +
-            htf_volume_divergence * vol_div_rev_weight +
-            (1.0 - adx_factor) * adx_rev_weight
-        )
-        
-        # No hard cap - let the math determine reversal probability
-        reversal = min(0.85, base_reversal)  # Soft cap at 85%
-        
-        # Normalize so they sum to <= 1.0
-        total = continuation + reversal
-        if total > 1.0:
-            continuation /= total
-            reversal /= total
-        
-        flat = max(0.0, 1.0 - continuation - reversal)
-        
-        # AI-DRIVEN THESIS QUALITY (continuous, not threshold-based)
-        # Combines ML agreement strength with HTF alignment strength
-        
-        # ML thesis contribution (continuous 0-0.5)
-        ml_thesis = ml_factor * 0.5  # Direct use of ml_factor (0-1) scaled to 0-0.5
-        
-        # HTF thesis contribution (continuous 0-0.5)
-        htf_thesis = adjusted_trend * 0.5  # Direct use of adjusted_trend (0-1) scaled to 0-0.5
-        
-        thesis_quality = ml_thesis + htf_thesis  # 0 to 1.0
-        
-        return {
-            'continuation': continuation,
-            'reversal': reversal,
-            'flat': flat,
-            'ml_agrees': ml_agrees,
-            'trend_aligned': adjusted_trend > 0.5,  # Continuous comparison
-            'thesis_quality': thesis_quality,
-            'ai_target': 0,  # Will be set later in analyze_exit
-        }
+        setup_idx = self.BATCH_SETUP_TYPES.index(setup_type) if setup_type in self.BATCH_SETUP_TYPES else 1
+        probabilities = self._calculate_probabilities_batch([market_data], np.array([is_buy]), np.array([setup_idx]))[0]
+        
+        logger.info(f"   📊 Trends: H1={market_data['h1_trend']:.2f} H4={market_data['h4_trend']:.2f} "
+                    f"D1={market_data['d1_trend']:.2f} (need >0.55 for BUY support)")
+        logger.info(f"   🧠 AI Continuation: {probabilities['continuation']:.2f}, reversal {probabilities['reversal']:.2f}, "
+                    f"thesis {probabilities['thesis_quality']:.2f} (ML {market_data['ml_direction']}, ADX {market_data.get('htf_adx', 25.0):.1f})")
+        return probabilities
     
     def _calculate_comprehensive_exit_score(self, context, is_buy: bool, profit_metrics: Dict, probabilities: Dict) -> float:
         """
@@ -3118,17 +3170,7 @@ class EVExitManagerV2:
         # ═══════════════════════════════════════════════════════════
         
         # Get peak profit from PERSISTENT storage (survives API restarts)
-        peak_symbol_key = getattr(context, 'symbol', 'UNKNOWN').upper()  # Get from context
-        stored_peak = self.get_peak(peak_symbol_key)
-        context_peak = getattr(context, 'peak_profit_pct', profit_pct)
-        
-        # Use the higher of stored peak or context peak
-        peak_profit_pct = max(stored_peak, context_peak, profit_pct)
-        
-        # Update persistent storage if current profit is new peak
-        if profit_pct > stored_peak:
-            current_price = getattr(context, 'current_price', 0)
-            self.update_peak(peak_symbol_key, profit_pct, current_price)
+        peak_profit_pct = self._track_peak_profit(context, profit_pct)
         
         # Calculate giveback from peak
         peak_giveback = 0.0
@@ -3550,7 +3592,7 @@ class EVExitManagerV2:
         # momentum, market structure) - NOT hardcoded thresholds.
         # ═══════════════════════════════════════════════════════════
         
-        regime_detector = get_regime_detector()
+        regime_detector = get_regime_detector(getattr(context, 'symbol', None))
         regime_state = regime_detector.detect_regime(context)
         detected_regime = regime_state.regime
         regime_params = regime_detector.get_regime_parameters(detected_regime)
@@ -5363,6 +5405,7 @@ class EVExitManagerV2:
                 'time': time.time(),
                 'profit_pct': profit_metrics.get('profit_pct', 0)
             }
+            self._save_peaks(f"{symbol_key}_scale")
             logger.info(f"   📝 Recording scale-in at price {current_price:.2f} for {symbol}")
         
         # ═══════════════════════════════════════════════════════════
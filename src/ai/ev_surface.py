@@ -0,0 +1,270 @@
+"""
+EV Surface - Precomputed exit decision surface for the EV fast path
+
+Most exit checks end in HOLD, and for those `_calculate_all_evs` mostly
+answers from a handful of inputs:
+
+- profit as % of account
+- one swing ATR in account % (position leverage x ATR / price)
+- distance to the position's TP and SL in swing ATRs
+- continuation / reversal probability
+- session multiplier
+- setup type and position side
+
+build_ev_surface.py sweeps the real EV function over a grid of those inputs
+(sampling everything else - trends, volume, boosts, drawdown, age, peak
+giveback, target capture - within the guard limits below) and stores one
+table per setup type and side (models/ev_surface.npz - a build artifact
+kept out of git: `make ev-surface` rebuilds it whenever the EV code changes):
+
+- mean EVs per cell
+- the minimum HOLD margin over the other actions seen across all samples
+- the minimum HOLD EV seen across all samples
+- a "clear" flag: HOLD won every sample by at least MIN_HOLD_MARGIN
+
+target_capture_ratio rides along in the EV dict and takes part in the
+argmax, but it is known exactly at lookup time - so it is compared against
+the cell's minimum HOLD EV there instead of being averaged into the table.
+
+At runtime a lookup is O(1). Only clear HOLD cells are answered from the
+table - HOLD is the one action the post-EV logic never overrides. Inputs
+outside the grid, cells near a decision boundary and positions where an
+unswept factor is active (guards) run the full calculation.
+"""
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EV_KEYS = ('HOLD', 'SCALE_OUT_25', 'SCALE_OUT_50', 'CLOSE', 'SCALE_IN', 'DCA', 'target_capture_ratio')
+SETUP_TYPES = ('SCALP', 'DAY', 'SWING')
+
+# Bin edges per input - values outside the first/last edge are not covered
+# (4,320 cells per table)
+SURFACE_AXES = (
+    ('profit_pct', (-1.0, -0.5, -0.2, 0.0, 0.2, 0.5, 1.0)),
+    ('atr_account', (0.2, 0.5, 1.0, 2.0, 4.0, 10.0)),
+    ('target_atr', (0.0, 1.0, 2.0, 4.0, 8.0)),
+    ('stop_atr', (0.0, 1.0, 2.0, 4.0)),
+    ('continuation', (0.2, 0.4, 0.6, 0.8)),
+    ('reversal', (0.1, 0.3, 0.6)),
+    ('session_mult', (0.4, 0.9, 1.3)),
+)
+
+# Factors the grid does not index - the sweep samples them in [0, limit],
+# so a lookup is only valid while they stay within these limits
+GUARD_LIMITS = {
+    'close_boost': 0.10,        # news/thesis close boost
+    'scale_out_boost': 0.20,    # news/thesis scale-out boost
+    'drawdown_severity': 0.20,  # daily/total drawdown vs FTMO limits
+    'age_ratio': 0.50,          # position age / expected hold time
+    'peak_giveback': 0.10,      # share of peak profit given back
+    'target_capture': 1.0,      # profit % / ATR target % (> 1 = target exceeded)
+}
+
+# HOLD must beat every other action by this much (% of account) in every sample
+MIN_HOLD_MARGIN = 0.02
+
+HOLD_INDEX = EV_KEYS.index('HOLD')
+CAPTURE_INDEX = EV_KEYS.index('target_capture_ratio')
+
+
+# Expected hold times per setup (minutes) - same as _calculate_all_evs position age decay
+EXPECTED_HOLD_MINUTES = {'SCALP': 60, 'DAY': 480, 'SWING': 2880}
+
+
+def swing_atr(context, market_data: Dict) -> float:
+    """H4 ATR, falling back to H1, then M1 * 3 - same as _calculate_all_evs"""
+    h4_volatility = getattr(context, 'h4_volatility', 0)
+    h1_volatility = getattr(context, 'h1_volatility', 0)
+    if h4_volatility > 0:
+        return h4_volatility
+    if h1_volatility > 0:
+        return h1_volatility
+    current_price = market_data['current_price']
+    m1_atr = market_data['atr'] if market_data['atr'] > 0 else current_price * 0.01
+    return m1_atr * 3.0
+
+
+def target_capture(context, market_data: Dict, profit_pct: float, atr_mult: float) -> float:
+    """Share of the ATR target already captured - same as _calculate_all_evs"""
+    current_price = market_data['current_price']
+    target_pct = (swing_atr(context, market_data) * atr_mult / current_price * 100) if current_price > 0 else 1.0
+    if profit_pct <= 0 or target_pct <= 0:
+        return 0.0
+    return profit_pct / target_pct
+
+
+def surface_inputs(context, profit_metrics: Dict, probabilities: Dict, market_data: Dict,
+                   session_context: Dict, is_buy: bool) -> Optional[Dict[str, float]]:
+    """
+    Grid inputs for a position, or None if it has no live TP/SL to measure
+    against or has not moved enough to measure its leverage
+    """
+    current_price = market_data['current_price']
+    position_tp = getattr(context, 'position_tp', 0.0) or 0.0
+    position_sl = getattr(context, 'position_sl', 0.0) or 0.0
+    if current_price <= 0 or position_tp <= 0 or position_sl <= 0:
+        return None
+
+    atr = swing_atr(context, market_data)
+    price_move_pct = profit_metrics.get('price_move_pct', 0.0)
+    if atr <= 0 or abs(price_move_pct) <= 0.001:  # _calculate_all_evs uses setup defaults there
+        return None
+    leverage = abs(profit_metrics['profit_pct'] / price_move_pct)
+    if is_buy:
+        dist_to_target, dist_to_stop = position_tp - current_price, current_price - position_sl
+    else:
+        dist_to_target, dist_to_stop = current_price - position_tp, position_sl - current_price
+
+    return {
+        'profit_pct': profit_metrics['profit_pct'],
+        'atr_account': leverage * atr / current_price * 100,
+        'target_atr': dist_to_target / atr,
+        'stop_atr': dist_to_stop / atr,
+        'continuation': probabilities['continuation'],
+        'reversal': probabilities['reversal'],
+        'session_mult': session_context.get('session_mult', 1.0),
+    }
+
+
+def guards_pass(context, probabilities: Dict, session_context: Dict, setup_type: str,
+                profit_pct: float, peak_profit_pct: float, time_since_scale: float,
+                capture: float = 0.0) -> bool:
+    """True if every factor the grid doesn't index is within the swept range"""
+    if probabilities.get('news_close_boost', 0) > GUARD_LIMITS['close_boost']:
+        return False
+    if probabilities.get('news_scale_out_boost', 0) > GUARD_LIMITS['scale_out_boost']:
+        return False
+    if probabilities.get('daily_profit_protection_boost', 0) > 0:
+        return False
+    if probabilities.get('thesis_broken_exit') or probabilities.get('ftmo_protection_exit'):
+        return False
+
+    # Same drawdown severity as _calculate_all_evs
+    max_daily_loss = getattr(context, 'max_daily_loss', 10000.0)
+    max_total_drawdown = getattr(context, 'max_total_drawdown', 20000.0)
+    daily_dd = abs(min(0, getattr(context, 'daily_pnl', 0.0))) / max_daily_loss if max_daily_loss > 0 else 0
+    total_dd = getattr(context, 'total_drawdown', 0.0) / max_total_drawdown if max_total_drawdown > 0 else 0
+    if daily_dd * 0.6 + total_dd * 0.4 > GUARD_LIMITS['drawdown_severity']:
+        return False
+
+    age_ratio = getattr(context, 'position_age_minutes', 0.0) / EXPECTED_HOLD_MINUTES.get(setup_type, 480)
+    if age_ratio > GUARD_LIMITS['age_ratio']:
+        return False
+
+    if peak_profit_pct > 0.1 and (peak_profit_pct - profit_pct) / peak_profit_pct > GUARD_LIMITS['peak_giveback']:
+        return False
+
+    # Target-exceeded penalties depend on capture, which the grid does not index
+    if capture > GUARD_LIMITS['target_capture']:
+        return False
+
+    # Weekend handling and recent scale-ins are not swept
+    if session_context.get('is_friday_afternoon') or session_context.get('is_friday_close'):
+        return False
+    if session_context.get('weekend_risk_mult', 1.0) != 1.0:
+        return False
+    return time_since_scale > 60
+
+
+def surface_shape() -> Tuple[int, ...]:
+    """Table shape: (setup, side, *bins)"""
+    return (len(SETUP_TYPES), 2) + tuple(len(edges) - 1 for _, edges in SURFACE_AXES)
+
+
+class EVSurface:
+    """
+    Lookup table of exit EVs over the surface grid.
+
+    Usage:
+        surface = EVSurface.load('models/ev_surface.npz')
+        status, evs = surface.lookup('DAY', True, inputs, capture)  # evs None -> run the full calculation
+    """
+
+    def __init__(self, evs: np.ndarray, margin: np.ndarray, hold_floor: np.ndarray,
+                 clear: np.ndarray, meta: Dict = None):
+        """
+        Args:
+            evs: Mean EVs per cell, shape surface_shape() + (len(EV_KEYS),)
+            margin: Min (HOLD EV - best other action EV) per cell across samples
+            hold_floor: Min HOLD EV per cell across samples
+            clear: True where HOLD won every sample by MIN_HOLD_MARGIN
+            meta: Build settings and parity results
+        """
+        self.evs = evs
+        self.margin = margin
+        self.hold_floor = hold_floor
+        self.clear = clear
+        self.meta = meta or {}
+        self._edges = [np.asarray(edges) for _, edges in SURFACE_AXES]
+
+    def cell(self, inputs: Dict[str, float]) -> Optional[Tuple[int, ...]]:
+        """Bin index per axis, or None if any input is outside the grid"""
+        index = []
+        for (name, _), edges in zip(SURFACE_AXES, self._edges):
+            value = inputs[name]
+            if not (edges[0] <= value < edges[-1]):
+                return None
+            index.append(int(np.searchsorted(edges, value, side='right')) - 1)
+        return tuple(index)
+
+    def lookup(self, setup_type: str, is_buy: bool, inputs: Dict[str, float],
+               capture: float = 0.0) -> Tuple[str, Optional[Dict[str, float]]]:
+        """
+        Returns (status, evs):
+            ('hit', evs)        - clear HOLD cell, evs from the table (with the actual capture)
+            ('outside', None)   - inputs not covered by the grid
+            ('boundary', None)  - cell is not clearly HOLD, or capture could beat HOLD
+        """
+        if setup_type not in SETUP_TYPES:
+            return 'outside', None
+        index = self.cell(inputs)
+        if index is None:
+            return 'outside', None
+        key = (SETUP_TYPES.index(setup_type), 0 if is_buy else 1) + index
+        if not self.clear[key] or self.hold_floor[key] < capture + MIN_HOLD_MARGIN:
+            return 'boundary', None
+        evs = {name: float(ev) for name, ev in zip(EV_KEYS, self.evs[key])}
+        evs['target_capture_ratio'] = capture
+        return 'hit', evs
+
+    def coverage(self) -> float:
+        """Share of cells answered by the fast path"""
+        return float(self.clear.mean()) if self.clear.size else 0.0
+
+    # ═══════════════════════════════════════════════════════════
+    # PERSISTENCE
+    # ═══════════════════════════════════════════════════════════
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        layout = {'axes': [[name, list(edges)] for name, edges in SURFACE_AXES],
+                  'ev_keys': list(EV_KEYS), 'setup_types': list(SETUP_TYPES),
+                  'guard_limits': GUARD_LIMITS, 'min_hold_margin': MIN_HOLD_MARGIN}
+        np.savez_compressed(
+            path, evs=self.evs.astype(np.float32), margin=self.margin.astype(np.float32),
+            hold_floor=self.hold_floor.astype(np.float32), clear=self.clear, layout=json.dumps(layout), meta=json.dumps(self.meta),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Optional['EVSurface']:
+        """Load a table; returns None if it was built for a different grid"""
+        try:
+            data = np.load(path, allow_pickle=False)
+            layout = json.loads(str(data['layout']))
+            expected = {'axes': [[name, list(edges)] for name, edges in SURFACE_AXES],
+                        'ev_keys': list(EV_KEYS), 'setup_types': list(SETUP_TYPES),
+                        'guard_limits': GUARD_LIMITS, 'min_hold_margin': MIN_HOLD_MARGIN}
+            if layout != expected:
+                logger.warning(f"⚠️ EV surface {path} was built for a different grid - rebuild with make ev-surface")
+                return None
+            return cls(data['evs'], data['margin'], data['hold_floor'], data['clear'],
+                       json.loads(str(data['meta'])))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load EV surface {path}: {e}")
+            return None
@@ -0,0 +1,186 @@
+"""
+EWMA Covariance - Online cross-symbol covariance on a shared clock grid
+
+Prices arrive with whatever timestamp a decision request happened to have.
+Correlating those directly pairs returns from different moments. Instead:
+
+1. Prices are sampled on a shared clock grid (default 5 minutes - the EA
+   sends requests on bar closes, so each grid slot holds every symbol's
+   latest price for the same bar). The last price seen in a slot is the
+   slot's close.
+2. When the clock moves to a new slot, the closed slot yields one aligned
+   return per symbol (close-to-close over adjacent slots). Symbols that
+   skipped the previous slot just re-base - a return spanning a gap is never
+   paired with single-slot returns.
+3. EWMA means and the covariance matrix for all symbols are updated in one
+   step: O(N) per sampled return, O(N^2) per slot.
+4. After each slot an immutable CovarianceSnapshot is published - O(1)
+   correlation lookups and the full matrix, safe to read from any thread.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CovarianceSnapshot:
+    """Read-only EWMA covariance/correlation matrices at one grid slot"""
+
+    def __init__(self, symbols: Tuple[str, ...], cov: np.ndarray, obs: np.ndarray,
+                 slot: Optional[int], min_obs: int):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.slot = slot
+        self.min_obs = min_obs
+
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr[~np.isfinite(corr) | (obs < min_obs)] = np.nan
+        np.fill_diagonal(corr, 1.0)
+
+        self.cov = cov
+        self.corr = np.clip(corr, -1.0, 1.0)
+        self.obs = obs
+        for array in (self.cov, self.corr, self.obs):
+            array.setflags(write=False)
+
+    def correlation(self, symbol1: str, symbol2: str) -> Optional[float]:
+        """EWMA correlation, or None if either symbol lacks min_obs paired returns"""
+        i = self.index.get(symbol1)
+        j = self.index.get(symbol2)
+        if i is None or j is None:
+            return None
+        value = self.corr[i, j]
+        return None if np.isnan(value) else float(value)
+
+    def correlation_matrix(self, symbols) -> np.ndarray:
+        """Correlation sub-matrix for the given symbols (NaN where unknown)"""
+        result = np.full((len(symbols), len(symbols)), np.nan)
+        known = [(k, self.index[s]) for k, s in enumerate(symbols) if s in self.index]
+        if known:
+            rows, cols = zip(*known)
+            result[np.ix_(rows, rows)] = self.corr[np.ix_(cols, cols)]
+        np.fill_diagonal(result, 1.0)
+        return result
+
+
+class EWMACovariance:
+    """
+    Incremental EWMA covariance of grid-aligned returns for a growing symbol set.
+
+    Usage:
+        engine = EWMACovariance(bar_seconds=300, halflife_bars=60)
+        engine.update('us30', 44120.5)        # from any thread
+        engine.snapshot().correlation('us30', 'us100')
+    """
+
+    def __init__(self, bar_seconds: int = 300, halflife_bars: float = 60.0, min_obs: int = 20):
+        """
+        Args:
+            bar_seconds: Clock grid slot size (match the EA's decision timeframe)
+            halflife_bars: EWMA half-life in grid slots
+            min_obs: Paired returns needed before a correlation is reported
+        """
+        self.bar_seconds = bar_seconds
+        self.decay = 0.5 ** (1.0 / halflife_bars)
+        self.min_obs = min_obs
+
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, int] = {}
+        self._mean = np.zeros(0)
+        self._cov = np.zeros((0, 0))
+        self._obs = np.zeros((0, 0), dtype=np.int64)
+        self._last_close = np.zeros(0)            # Close of each symbol's last slot
+        self._last_slot = np.zeros(0, dtype=np.int64) - 1
+        self._slot: Optional[int] = None          # Slot currently being filled
+        self._slot_prices: Dict[int, float] = {}  # symbol index -> latest price in slot
+
+        self.slots_closed = 0
+        self.late_samples = 0
+        self._snapshot = CovarianceSnapshot((), np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64), None, min_obs)
+
+    def update(self, symbol: str, price: float, timestamp: datetime = None) -> bool:
+        """
+        Record a price; returns True if it closed a grid slot (new snapshot published).
+        """
+        if price is None or not np.isfinite(price) or price <= 0:
+            return False
+        ts = (timestamp or datetime.now()).timestamp()
+        slot = int(ts // self.bar_seconds)
+
+        with self._lock:
+            closed = False
+            if self._slot is None:
+                self._slot = slot
+            elif slot > self._slot:
+                self._close_slot_locked()
+                self._slot = slot
+                closed = True
+            elif slot < self._slot:
+                self.late_samples += 1  # Slot already closed - can't be aligned any more
+                return False
+
+            i = self._symbols.get(symbol)
+            if i is None:
+                i = self._add_symbol_locked(symbol)
+            self._slot_prices[i] = float(price)
+            return closed
+
+    def _add_symbol_locked(self, symbol: str) -> int:
+        n = len(self._symbols)
+        self._symbols[symbol] = n
+        self._mean = np.append(self._mean, 0.0)
+        self._cov = np.pad(self._cov, ((0, 1), (0, 1)))
+        self._obs = np.pad(self._obs, ((0, 1), (0, 1)))
+        self._last_close = np.append(self._last_close, np.nan)
+        self._last_slot = np.append(self._last_slot, -1)
+        return n
+
+    def _close_slot_locked(self):
+        """Turn the finished slot's closes into aligned returns and update the EWMA"""
+        slot = self._slot
+        if self._slot_prices:
+            indices = np.fromiter(self._slot_prices.keys(), dtype=np.int64)
+            closes = np.fromiter(self._slot_prices.values(), dtype=float)
+
+            # Returns only for symbols that also closed the previous slot
+            adjacent = self._last_slot[indices] == slot - 1
+            if adjacent.any():
+                idx = indices[adjacent]
+                returns = closes[adjacent] / self._last_close[idx] - 1.0
+                self._ewma_update_locked(idx, returns)
+
+            self._last_close[indices] = closes
+            self._last_slot[indices] = slot
+            self._slot_prices = {}
+
+        self.slots_closed += 1
+        self._snapshot = CovarianceSnapshot(
+            tuple(self._symbols), self._cov.copy(), self._obs.copy(), slot, self.min_obs)
+
+    def _ewma_update_locked(self, idx: np.ndarray, returns: np.ndarray):
+        """EWMA mean/covariance update restricted to the symbols that have a return"""
+        alpha = 1.0 - self.decay
+        deviation = returns - self._mean[idx]
+        self._mean[idx] += alpha * deviation
+        block = np.ix_(idx, idx)
+        self._cov[block] = self.decay * (self._cov[block] + alpha * np.outer(deviation, deviation))
+        self._obs[block] += 1
+
+    def snapshot(self) -> CovarianceSnapshot:
+        """Latest published snapshot (no lock - a single reference read)"""
+        return self._snapshot
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'symbols': len(snapshot.symbols),
+            'slots_closed': self.slots_closed,
+            'late_samples': self.late_samples,
+            'bar_seconds': self.bar_seconds,
+        }
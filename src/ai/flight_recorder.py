@@ -0,0 +1,314 @@
+"""
+Flight Recorder - Low-overhead capture of every trade decision
+
+When an exit goes wrong we used to reconstruct the "why" from megabytes of
+prose logs. The flight recorder captures one structured record per
+/api/ai/trade_decision call instead:
+
+- raw request, computed feature vector, context fields per analyzed position
+- ML probabilities, every EV from EVExitManagerV2._calculate_all_evs
+- the final response, plus per-stage timings
+
+Recording is cheap on the request path: components attach data to the
+current record through a ContextVar (`note`, `note_append`, `stage`), and the
+finished record is pushed to an in-memory ring buffer. A background thread
+spills records to compact binary segments (zlib-compressed JSON batches in
+length + CRC framed chunks), so serialization and disk I/O never block the
+event loop. A torn frame at the end of a segment (crash mid-write) is
+skipped on read.
+
+Replay the segments with `python replay_decisions.py`.
+"""
+import atexit
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b'FLTREC1\n'
+SEGMENT_SUFFIX = '.seg'
+_FRAME_HEADER = struct.Struct('<II')  # payload length, crc32
+
+# Record being built by the current request (per asyncio task / thread)
+_current_record: ContextVar[Optional[Dict]] = ContextVar('flight_record', default=None)
+
+
+# ═══════════════════════════════════════════════════════════
+# REQUEST-PATH HOOKS (no-ops when nothing is being recorded)
+# ═══════════════════════════════════════════════════════════
+
+def note(key: str, value: Any):
+    """Set a field on the current decision record"""
+    record = _current_record.get()
+    if record is not None:
+        record[key] = value
+
+
+def note_append(key: str, value: Any):
+    """Append to a list field on the current decision record"""
+    record = _current_record.get()
+    if record is not None:
+        record.setdefault(key, []).append(value)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the current record (ms, accumulated)"""
+    record = _current_record.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = record['timings']
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+def context_fields(context) -> Dict[str, Any]:
+    """Snapshot the scalar fields of an EnhancedTradingContext (request excluded)"""
+    snapshot = {}
+    for name in context.field_names():
+        if name == 'request':
+            continue
+        value = getattr(context, name, None)
+        if value is None or isinstance(value, (str, bool, int, float)):
+            snapshot[name] = value
+        elif hasattr(value, 'item'):
+            snapshot[name] = value.item()  # numpy scalar
+    return snapshot
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+# ═══════════════════════════════════════════════════════════
+# RECORDER
+# ═══════════════════════════════════════════════════════════
+
+class FlightRecorder:
+    """
+    Ring buffer of decision records with asynchronous spill to binary segments.
+
+    Usage:
+        recorder = FlightRecorder('logs/flight_recorder')
+        handle = recorder.begin(request)
+        ...  # note()/note_append()/stage() from anywhere in the request
+        recorder.finish(handle, response)
+    """
+
+    def __init__(
+        self,
+        directory: str = 'logs/flight_recorder',
+        capacity: int = 4096,
+        spill_interval: float = 1.0,
+        max_batch: int = 256,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        Args:
+            directory: Where segment files are written
+            capacity: Records kept in memory (ring) and max unspilled backlog
+            spill_interval: Seconds between background spills
+            max_batch: Wake the spill thread early once this many records are queued
+            segment_max_bytes: Rotate to a new segment file after this size
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.spill_interval = spill_interval
+        self.max_batch = max_batch
+        self.segment_max_bytes = segment_max_bytes
+
+        self._ring: deque = deque(maxlen=capacity)
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._segment = None
+        self._segment_path: Optional[str] = None
+        self._segment_day: Optional[str] = None
+        self._seq = 0
+
+        # Stats
+        self.recorded = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.spill_errors = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._spill_loop, name='flight-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        logger.info(f"✅ Flight recorder active → {directory}")
+
+    def begin(self, request: Dict):
+        """Start a record for this request; returns a handle for finish()"""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        record = {
+            'id': f"{int(time.time() * 1000)}-{seq}",
+            'ts': time.time(),
+            'request': request,
+            'timings': {},
+            '_start': time.perf_counter(),
+        }
+        token = _current_record.set(record)
+        return record, token
+
+    def finish(self, handle, response: Any = None, error: Optional[str] = None):
+        """Close the record and queue it for spilling"""
+        record, token = handle
+        _current_record.reset(token)
+        record['timings']['total'] = (time.perf_counter() - record.pop('_start')) * 1000.0
+        record['response'] = response
+        if error is not None:
+            record['error'] = error
+
+        with self._lock:
+            self._ring.append(record)
+            if len(self._queue) >= self.capacity:
+                self._queue.popleft()  # Spill can't keep up - drop oldest, never block requests
+                self.dropped += 1
+            self._queue.append(record)
+            self.recorded += 1
+            backlog = len(self._queue)
+        if backlog >= self.max_batch:
+            self._wake.set()
+
+    def recent(self, n: int = 20) -> List[Dict]:
+        """Most recent records still in the ring buffer"""
+        with self._lock:
+            return list(self._ring)[-n:]
+
+    # ═══════════════════════════════════════════════════════════
+    # SPILL
+    # ═══════════════════════════════════════════════════════════
+
+    def _spill_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.spill_interval)
+            self._wake.clear()
+            self.spill()
+
+    def spill(self):
+        """Write all queued records as one compressed frame"""
+        with self._lock:
+            if not self._queue:
+                return
+            batch = list(self._queue)
+            self._queue.clear()
+
+        try:
+            payload = json.dumps(batch, separators=(',', ':'), default=_json_default).encode()
+            compressed = zlib.compress(payload, 6)
+            frame = _FRAME_HEADER.pack(len(compressed), zlib.crc32(compressed)) + compressed
+
+            segment = self._open_segment()
+            segment.write(frame)
+            segment.flush()
+            self.bytes_written += len(frame)
+            self.spilled += len(batch)
+
+            if segment.tell() >= self.segment_max_bytes:
+                self._close_segment()
+        except Exception as e:
+            self.spill_errors += 1
+            logger.warning(f"⚠️ Flight recorder spill failed ({len(batch)} records lost): {e}")
+
+    def _open_segment(self):
+        day = datetime.utcnow().strftime('%Y%m%d')
+        if self._segment is not None and day != self._segment_day:
+            self._close_segment()
+        if self._segment is None:
+            stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            self._segment_path = os.path.join(self.directory, f"decisions_{stamp}_{os.getpid()}{SEGMENT_SUFFIX}")
+            self._segment = open(self._segment_path, 'ab')
+            if self._segment.tell() == 0:
+                self._segment.write(SEGMENT_MAGIC)
+            self._segment_day = day
+        return self._segment
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def close(self):
+        """Stop the spill thread and flush everything queued"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5.0)
+        self.spill()
+        self._close_segment()
+
+    def get_stats(self) -> Dict:
+        """Recording/spill counters"""
+        with self._lock:
+            backlog = len(self._queue)
+        return {
+            'recorded': self.recorded,
+            'spilled': self.spilled,
+            'backlog': backlog,
+            'dropped': self.dropped,
+            'spill_errors': self.spill_errors,
+            'bytes_written': self.bytes_written,
+            'segment': self._segment_path,
+        }
+
+
+# ═══════════════════════════════════════════════════════════
+# READING
+# ═══════════════════════════════════════════════════════════
+
+def read_segment(path: str) -> Iterator[Dict]:
+    """Yield records from one segment file (stops at a torn/corrupt frame)"""
+    with open(path, 'rb') as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            logger.warning(f"⚠️ {path} is not a flight recorder segment")
+            return
+        while True:
+            header = f.read(_FRAME_HEADER.size)
+            if len(header) < _FRAME_HEADER.size:
+                return
+            length, crc = _FRAME_HEADER.unpack(header)
+            compressed = f.read(length)
+            if len(compressed) < length or zlib.crc32(compressed) != crc:
+                logger.warning(f"⚠️ Torn frame at end of {path} - skipped")
+                return
+            for record in json.loads(zlib.decompress(compressed)):
+                yield record
+
+
+def list_segments(path: str) -> List[str]:
+    """Segment files under a directory (sorted), or the path itself if it is a file"""
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def iter_records(paths: List[str]) -> Iterator[Dict]:
+    """Yield records from segment files and/or directories, in file order"""
+    for path in paths:
+        for segment in list_segments(path):
+            yield from read_segment(segment)
@@ -9,9 +9,8 @@ Features:
 4. Drawdown Recovery Mode
 """
 import logging
-from datetime import datetime
 from typing import Dict, List, Optional
-import pytz
+from src.utils.session_calendar import SESSIONS, get_session_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -42,13 +41,8 @@ class FTMOStrategy:
         'forex_eur': 0.6,     # 60% size for 2nd position
     }
     
-    # Trading sessions (UTC times)
-    SESSIONS = {
-        'asian': {'start': 0, 'end': 8, 'indices_mult': 0.5, 'forex_mult': 0.7},
-        'london': {'start': 8, 'end': 16, 'indices_mult': 0.8, 'forex_mult': 1.0},
-        'new_york': {'start': 13, 'end': 21, 'indices_mult': 1.0, 'forex_mult': 1.0},
-        'overlap': {'start': 13, 'end': 16, 'indices_mult': 1.2, 'forex_mult': 1.2},  # Best liquidity
-    }
+    # Trading sessions (UTC times) - shared with the session calendar
+    SESSIONS = SESSIONS
     
     def __init__(self):
         self.win_rate_tracker: Dict[str, Dict] = {}  # symbol -> {wins, losses, streak}
@@ -170,37 +164,11 @@ class FTMOStrategy:
         Best liquidity during London/NY overlap = larger positions allowed.
         Asian session = reduce size for indices.
         """
-        symbol_lower = symbol.lower().replace('.sim', '').replace('z25', '')
-        
-        # Determine symbol type
-        is_index = any(s in symbol_lower for s in ['us30', 'us100', 'us500', 'dax', 'ftse'])
-        is_forex = any(s in symbol_lower for s in ['eur', 'gbp', 'jpy', 'aud', 'nzd', 'cad', 'chf'])
-        
-        # Get current UTC hour
-        utc_now = datetime.now(pytz.UTC)
-        current_hour = utc_now.hour
-        
-        # Check which session we're in
-        session_name = 'asian'  # Default
-        session_mult = 0.7
-        
-        # Check for overlap first (highest priority)
-        if 13 <= current_hour < 16:
-            session_name = 'overlap'
-            session_mult = self.SESSIONS['overlap']['indices_mult' if is_index else 'forex_mult']
-        elif 13 <= current_hour < 21:
-            session_name = 'new_york'
-            session_mult = self.SESSIONS['new_york']['indices_mult' if is_index else 'forex_mult']
-        elif 8 <= current_hour < 16:
-            session_name = 'london'
-            session_mult = self.SESSIONS['london']['indices_mult' if is_index else 'forex_mult']
-        else:
-            session_name = 'asian'
-            session_mult = self.SESSIONS['asian']['indices_mult' if is_index else 'forex_mult']
+        state = get_session_calendar().lookup(symbol)
         
-        logger.info(f"   📊 Session: {session_name.upper()} (UTC {current_hour}:00) → {session_mult:.2f}x for {'index' if is_index else 'forex'}")
+        logger.info(f"   📊 Session: {state.session.upper()} (UTC {state.hour_utc}:00) → {state.liquidity:.2f}x for {state.instrument_class}")
         
-        return session_mult
+        return state.liquidity
     
     def get_win_rate_multiplier(self, symbol: str) -> float:
         """
@@ -0,0 +1,161 @@
+"""
+Inference Broker - Cross-symbol micro-batching for ML inference.
+
+At every bar close the EA fires one request per symbol within a few
+milliseconds. Each used to run its own RF/GB `predict_proba` on a single
+row. The broker holds compatible requests for a short window (1-5ms),
+groups them by model key (symbol model, or a shared fallback family such
+as 'indices'/'forex'), runs ONE batched forward pass per group and hands
+each waiting request its own result.
+
+The window adapts to load: singleton batches shrink it toward the minimum
+(no concurrency - don't make requests wait), multi-request batches grow it
+toward the maximum (concurrency - catch more of the burst).
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBroker:
+    """
+    Micro-batching broker for async request handlers.
+
+    batch_fn(group_key, items) -> results is called with all items collected
+    for a group during the window and must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[Hashable, List[Any]], List[Any]],
+        window_ms: float = 2.0,
+        min_window_ms: float = 1.0,
+        max_window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            batch_fn: Batched inference function
+            window_ms: Initial batching window
+            min_window_ms: Lower bound for the adaptive window
+            max_window_ms: Upper bound for the adaptive window
+            max_batch_size: Flush immediately once a group reaches this size
+            executor: Executor for batch_fn (None = event loop default thread pool)
+        """
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.min_window_ms = min_window_ms
+        self.max_window_ms = max_window_ms
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+
+        self._pending: Dict[Hashable, list] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+        # Stats
+        self.batch_sizes = Counter()
+        self.group_batches = Counter()
+        self.total_requests = 0
+        self.total_batches = 0
+        self.failed_batches = 0
+        self._wait_ms: List[float] = []  # Recent queue waits (bounded)
+
+    async def submit(self, group_key: Hashable, item: Any) -> Any:
+        """Queue an item for its group and wait for the batched result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(group_key, [])
+        pending.append((item, future, time.perf_counter()))
+        self.total_requests += 1
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(group_key)
+        elif len(pending) == 1:
+            self._timers[group_key] = loop.call_later(
+                self.window_ms / 1000.0, self._flush, group_key
+            )
+
+        return await future
+
+    def _flush(self, group_key: Hashable):
+        """Close the group's window and dispatch its batch"""
+        timer = self._timers.pop(group_key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(group_key, [])
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self._wait_ms.extend((now - queued) * 1000.0 for _, _, queued in batch)
+        if len(self._wait_ms) > 1000:
+            del self._wait_ms[:-1000]
+
+        size = len(batch)
+        self.batch_sizes[size] += 1
+        self.group_batches[group_key] += 1
+        self.total_batches += 1
+        self._adapt_window(size)
+
+        asyncio.get_running_loop().create_task(self._run_batch(group_key, batch))
+
+    async def _run_batch(self, group_key: Hashable, batch: list):
+        """Run batch_fn off the event loop and resolve the waiting futures"""
+        items = [item for item, _, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, group_key, items)
+            if len(results) != len(items):
+                raise ValueError(f"batch_fn returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"❌ Batched inference failed for {group_key} ({len(items)} items): {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _adapt_window(self, batch_size: int):
+        """Shrink the window when nothing coalesces, grow it when bursts do"""
+        if batch_size >= self.max_batch_size:
+            return  # Flushed on size - window was not the limit
+        if batch_size == 1:
+            self.window_ms = max(self.min_window_ms, self.window_ms * 0.9)
+        else:
+            self.window_ms = min(self.max_window_ms, self.window_ms * 1.1)
+
+    def get_stats(self) -> Dict:
+        """Batch-size distribution and queueing stats"""
+        waits = sorted(self._wait_ms)
+
+        def pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        batched = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            'window_ms': round(self.window_ms, 3),
+            'total_requests': self.total_requests,
+            'total_batches': self.total_batches,
+            'failed_batches': self.failed_batches,
+            'avg_batch_size': batched / self.total_batches if self.total_batches else 0.0,
+            'batch_size_distribution': dict(sorted(self.batch_sizes.items())),
+            'batches_per_group': {str(k): v for k, v in self.group_batches.items()},
+            'wait_ms_p50': round(pct(0.50), 3),
+            'wait_ms_p95': round(pct(0.95), 3),
+            'pending_groups': len(self._pending),
+        }
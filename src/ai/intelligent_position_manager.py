@@ -1175,6 +1175,73 @@ class IntelligentPositionManager:
             traceback.print_exc()
             return {'should_exit': False, 'reason': f'Analysis error: {e}', 'exit_type': 'error', 'score': 0.0}
     
+    def _ev_exit_args(self, context: EnhancedTradingContext) -> Dict:
+        """analyze_exit() arguments for a position context (analyze_exits() position dict)"""
+        symbol = getattr(context, 'symbol', 'UNKNOWN')
+        
+        # AI-DRIVEN POSITION SIZING - NO HARDCODED LOT LIMITS
+        # Position sizing is handled by elite_position_sizer.py using:
+        # - Market analysis (volatility, regime, session)
+        # - Portfolio analysis (correlation, concentration)
+        # - FTMO risk limits (daily DD, total DD, margin level)
+        # - ML confidence and market score
+        # - S/R based stop distances for risk calculation
+        # 
+        # max_lots is set to broker max (from symbol_info) - AI decides actual size
+        max_lots = getattr(context, 'max_lot', 100.0)
+        
+        # Get setup_type from unified system if available
+        setup_type = None
+        try:
+            from .unified_trading_system import UnifiedTradingSystem
+            # Try to get from global unified_system instance
+            import sys
+            if 'api' in sys.modules:
+                api_module = sys.modules['api']
+                if hasattr(api_module, 'unified_system') and api_module.unified_system:
+                    setup_type = api_module.unified_system.get_position_setup_type(symbol)
+        except:
+            pass  # Will use fallback in analyze_exit
+        
+        return {
+            'current_profit': context.position_current_profit,
+            'current_volume': context.position_volume,
+            'position_type': context.position_type,
+            'symbol': symbol,
+            'setup_type': setup_type,
+            'max_lots': max_lots,
+        }
+    
+    def analyze_positions(self, contexts: List[EnhancedTradingContext]) -> List[Dict]:
+        """
+        analyze_position() for several positions with ONE portfolio-level
+        EV exit analysis (EVExitManagerV2.analyze_exits) for all of them.
+        
+        Positions decided before the EV step (no position, FTMO violated) and
+        the no-EV-manager fallback go through analyze_position() unchanged.
+        
+        Returns decisions in the same order as contexts
+        """
+        if self.ev_exit_manager is None:
+            return [self.analyze_position(context) for context in contexts]
+        
+        decisions: List[Optional[Dict]] = [None] * len(contexts)
+        batch = []
+        for i, context in enumerate(contexts):
+            if not context.has_position or context.ftmo_violated or not context.can_trade:
+                decisions[i] = self.analyze_position(context)
+            else:
+                batch.append(i)
+        
+        if batch:
+            logger.info(f"")
+            logger.info(f"🤖 USING EV EXIT MANAGER - BATCH EXIT ANALYSIS ({len(batch)} positions)")
+            batch_contexts = [contexts[i] for i in batch]
+            positions = [self._ev_exit_args(context) for context in batch_contexts]
+            for i, decision in zip(batch, self.ev_exit_manager.analyze_exits(positions, batch_contexts)):
+                decisions[i] = decision
+        return decisions
+    
     def analyze_position(self, context: EnhancedTradingContext) -> Dict:
         """
         AI analyzes position using ALL 100 features and makes ACTIVE decision
@@ -1249,43 +1316,18 @@ class IntelligentPositionManager:
         # ═══════════════════════════════════════════════════════════
         
         if self.ev_exit_manager is not None:
-            symbol = getattr(context, 'symbol', 'UNKNOWN')
-            
             logger.info(f"")
             logger.info(f"🤖 USING EV EXIT MANAGER - AI-DRIVEN EXIT ANALYSIS")
             
-            # AI-DRIVEN POSITION SIZING - NO HARDCODED LOT LIMITS
-            # Position sizing is handled by elite_position_sizer.py using:
-            # - Market analysis (volatility, regime, session)
-            # - Portfolio analysis (correlation, concentration)
-            # - FTMO risk limits (daily DD, total DD, margin level)
-            # - ML confidence and market score
-            # - S/R based stop distances for risk calculation
-            # 
-            # max_lots is set to broker max (from symbol_info) - AI decides actual size
-            max_lots = getattr(context, 'max_lot', 100.0)
-            
-            # Get setup_type from unified system if available
-            setup_type = None
-            try:
-                from .unified_trading_system import UnifiedTradingSystem
-                # Try to get from global unified_system instance
-                import sys
-                if 'api' in sys.modules:
-                    api_module = sys.modules['api']
-                    if hasattr(api_module, 'unified_system') and api_module.unified_system:
-                        setup_type = api_module.unified_system.get_position_setup_type(symbol)
-            except:
-                pass  # Will use fallback in analyze_exit
-            
+            exit_args = self._ev_exit_args(context)
             ev_decision = self.ev_exit_manager.analyze_exit(
                 context=context,
-                current_profit=context.position_current_profit,
-                current_volume=current_volume,
-                position_type=context.position_type,
-                symbol=symbol,
-                setup_type=setup_type,
-                max_lots=max_lots
+                current_profit=exit_args['current_profit'],
+                current_volume=exit_args['current_volume'],
+                position_type=exit_args['position_type'],
+                symbol=exit_args['symbol'],
+                setup_type=exit_args['setup_type'],
+                max_lots=exit_args['max_lots']
             )
             
             # Return the EV decision directly - it already has all the logic
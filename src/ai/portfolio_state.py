@@ -7,6 +7,8 @@ from typing import Dict, List
 import numpy as np
 from datetime import datetime
 
+from .ewma_covariance import CovarianceSnapshot, EWMACovariance
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,12 @@ class PortfolioState:
     - Risk attribution per position
     - Recent performance metrics
     - Dynamic risk budget allocation
+
+    Symbols update this concurrently (one actor per symbol, see
+    symbol_actors.py), so every update publishes a new dict/list instead of
+    mutating the current one in place - readers iterating position_risks or
+    recent_trades always see a complete snapshot. Correlations come from an
+    EWMA covariance engine that publishes immutable snapshots per grid slot.
     """
     
     def __init__(self):
@@ -46,12 +54,9 @@ class PortfolioState:
             ('eurusd', 'xau'): 0.3,
         }
         
-        # Dynamic correlation matrix (updated from real-time data)
-        self.dynamic_correlation_matrix = {}
-        
-        # Price history for real-time correlation calculation
-        self.price_history = {}  # symbol -> list of (timestamp, price)
-        self.max_history_size = 100  # Keep last 100 prices per symbol
+        # Dynamic correlations: EWMA covariance of returns on a shared 5-minute
+        # grid (bar closes), blended 70/30 with the static matrix once known
+        self.covariance = EWMACovariance(bar_seconds=300, halflife_bars=60, min_obs=20)
         
         # Recent trades for performance tracking
         self.recent_trades = []  # Last 20 trades
@@ -59,30 +64,15 @@ class PortfolioState:
         # Current risk attribution
         self.position_risks = {}  # symbol -> risk_dollars
         
-        # Correlation matrix (combined static + dynamic)
+        # Static lookup used until the EWMA engine has enough paired returns
         self.correlation_matrix = self.static_correlation_matrix.copy()
     
     def update_price(self, symbol: str, price: float, timestamp: datetime = None):
         """
-        Update price history for real-time correlation calculation
+        Sample a price onto the covariance grid (O(1); a slot close costs O(N^2))
         """
-        if timestamp is None:
-            timestamp = datetime.now()
-        
-        symbol_clean = self._clean_symbol(symbol)
-        
-        if symbol_clean not in self.price_history:
-            self.price_history[symbol_clean] = []
-        
-        self.price_history[symbol_clean].append((timestamp, price))
-        
-        # Keep only last N prices
-        if len(self.price_history[symbol_clean]) > self.max_history_size:
-            self.price_history[symbol_clean] = self.price_history[symbol_clean][-self.max_history_size:]
-        
-        # Recalculate correlations if we have enough data
-        if len(self.price_history[symbol_clean]) >= 20:
-            self._update_dynamic_correlations(symbol_clean)
+        if self.covariance.update(self._clean_symbol(symbol), price, timestamp):
+            logger.debug(f"   📈 Covariance slot closed ({self.covariance.get_stats()['symbols']} symbols)")
     
     def _clean_symbol(self, symbol: str) -> str:
         """Clean symbol name for correlation lookup"""
@@ -92,58 +82,25 @@ class PortfolioState:
             s = s.replace(suffix, '')
         return s
     
-    def _update_dynamic_correlations(self, symbol: str):
-        """
-        Calculate real-time correlations with other symbols
-        """
-        if symbol not in self.price_history or len(self.price_history[symbol]) < 20:
-            return
-        
-        symbol_prices = [p[1] for p in self.price_history[symbol][-50:]]
-        symbol_returns = np.diff(symbol_prices) / symbol_prices[:-1] if len(symbol_prices) > 1 else []
-        
-        if len(symbol_returns) < 10:
-            return
-        
-        for other_symbol, other_history in self.price_history.items():
-            if other_symbol == symbol or len(other_history) < 20:
-                continue
-            
-            other_prices = [p[1] for p in other_history[-50:]]
-            other_returns = np.diff(other_prices) / other_prices[:-1] if len(other_prices) > 1 else []
-            
-            if len(other_returns) < 10:
-                continue
-            
-            # Align lengths
-            min_len = min(len(symbol_returns), len(other_returns))
-            if min_len < 10:
-                continue
-            
-            try:
-                corr = np.corrcoef(symbol_returns[-min_len:], other_returns[-min_len:])[0, 1]
-                if not np.isnan(corr):
-                    # Update dynamic correlation
-                    pair = tuple(sorted([symbol, other_symbol]))
-                    self.dynamic_correlation_matrix[pair] = corr
-                    
-                    # Blend with static (70% dynamic, 30% static for stability)
-                    static_corr = self.static_correlation_matrix.get(pair, 0.0)
-                    if static_corr == 0.0:
-                        static_corr = self.static_correlation_matrix.get((pair[1], pair[0]), 0.0)
-                    
-                    blended = corr * 0.7 + static_corr * 0.3
-                    self.correlation_matrix[pair] = blended
-            except Exception:
-                pass  # Skip on calculation errors
-        
-    def get_correlation(self, symbol1: str, symbol2: str, direction1: str, direction2: str) -> float:
+    def get_correlation_snapshot(self) -> CovarianceSnapshot:
+        """Full EWMA covariance/correlation matrices as of the last closed grid slot"""
+        return self.covariance.snapshot()
+    
+    def _static_correlation(self, s1: str, s2: str) -> float:
+        corr = self.static_correlation_matrix.get((s1, s2), 0.0)
+        if corr == 0.0:
+            corr = self.static_correlation_matrix.get((s2, s1), 0.0)
+        return corr
+    
+    def get_correlation(self, symbol1: str, symbol2: str, direction1: str, direction2: str,
+                        snapshot: CovarianceSnapshot = None) -> float:
         """
         Get correlation between two positions
         
         Args:
             symbol1, symbol2: Trading symbols (cleaned)
             direction1, direction2: 'BUY' or 'SELL'
+            snapshot: Covariance snapshot to read (default: latest)
             
         Returns:
             Correlation coefficient (-1 to 1)
@@ -156,10 +113,16 @@ class PortfolioState:
         if s1 == s2:
             return 1.0 if direction1 == direction2 else -1.0
         
-        # Look up in matrix
-        base_corr = self.correlation_matrix.get((s1, s2), 0.0)
-        if base_corr == 0.0:
-            base_corr = self.correlation_matrix.get((s2, s1), 0.0)
+        # Dynamic EWMA correlation (O(1)), blended with static for stability
+        c1, c2 = self._clean_symbol(symbol1), self._clean_symbol(symbol2)
+        dynamic_corr = (snapshot or self.covariance.snapshot()).correlation(c1, c2)
+        if dynamic_corr is not None:
+            base_corr = dynamic_corr * 0.7 + self._static_correlation(c1, c2) * 0.3
+        else:
+            # Look up in matrix
+            base_corr = self.correlation_matrix.get((s1, s2), 0.0)
+            if base_corr == 0.0:
+                base_corr = self.correlation_matrix.get((s2, s1), 0.0)
         
         # Adjust for direction
         if direction1 != direction2:
@@ -182,13 +145,14 @@ class PortfolioState:
         if not open_positions:
             return 0.0  # No correlation with empty portfolio
         
+        snapshot = self.covariance.snapshot()  # One consistent matrix for all positions
         correlations = []
         for pos in open_positions:
             pos_symbol = pos.get('symbol', '').lower()
             pos_type = pos.get('type', 0)
             pos_direction = 'BUY' if pos_type == 0 else 'SELL'
             
-            corr = self.get_correlation(new_symbol, pos_symbol, new_direction, pos_direction)
+            corr = self.get_correlation(new_symbol, pos_symbol, new_direction, pos_direction, snapshot)
             correlations.append(abs(corr))  # Use absolute value
         
         avg_corr = np.mean(correlations) if correlations else 0.0
@@ -220,16 +184,13 @@ class PortfolioState:
     
     def add_trade_result(self, symbol: str, profit: float, win: bool):
         """Track trade result for performance feedback"""
-        self.recent_trades.append({
+        # Keep only last 20
+        self.recent_trades = self.recent_trades[-19:] + [{
             'symbol': symbol,
             'profit': profit,
             'win': win,
             'timestamp': datetime.now()
-        })
-        
-        # Keep only last 20
-        if len(self.recent_trades) > 20:
-            self.recent_trades = self.recent_trades[-20:]
+        }]
     
     def calculate_recent_performance(self, last_n: int = 10) -> Dict:
         """
@@ -284,7 +245,7 @@ class PortfolioState:
     
     def update_position_risk(self, symbol: str, risk_dollars: float):
         """Update risk attribution for a position"""
-        self.position_risks[symbol] = risk_dollars
+        self.position_risks = {**self.position_risks, symbol: risk_dollars}
     
     def get_total_portfolio_risk(self) -> float:
         """Get total risk across all positions"""
@@ -9,6 +9,7 @@ Based on institutional approaches:
 - Cross-asset regime confirmation
 """
 import logging
+import threading
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -527,12 +528,15 @@ class RegimeDetector:
         return False, "Regime stable"
 
 
-# Global instance
-_regime_detector = None
+# One detector per symbol - regime/volatility history must not mix symbols,
+# and each symbol's history is owned by that symbol's actor (symbol_actors.py)
+_regime_detectors: Dict[Optional[str], RegimeDetector] = {}
+_regime_detectors_lock = threading.Lock()
 
-def get_regime_detector() -> RegimeDetector:
-    """Get global regime detector instance"""
-    global _regime_detector
-    if _regime_detector is None:
-        _regime_detector = RegimeDetector()
-    return _regime_detector
+def get_regime_detector(symbol: Optional[str] = None) -> RegimeDetector:
+    """Get the regime detector for a symbol (None = shared default instance)"""
+    detector = _regime_detectors.get(symbol)
+    if detector is None:
+        with _regime_detectors_lock:
+            detector = _regime_detectors.setdefault(symbol, RegimeDetector())
+    return detector
@@ -0,0 +1,424 @@
+"""
+State Store - Durable, shared state for anti-churn and loss cooldowns
+
+Anti-churn state (UnifiedTradingSystem.position_state / recent_closes /
+recent_losses) and api.py's per-position peak, recent-close ticket and
+daily peak P&L trackers used to live only in process memory. A restart
+wiped the loss cooldown that stops the "US500 re-entered 11 times" pattern.
+
+1. PersistentDict - drop-in dict for those trackers. Reads hit a local cache
+   (no I/O on the request path), writes are queued for the store.
+2. Write-behind - a background thread flushes queued writes every
+   `flush_interval` seconds, coalesced per key, in one transaction/pipeline.
+3. Restore - each PersistentDict loads its namespace on creation.
+4. Multi-process - the same thread polls the backend for namespaces changed
+   by other workers (SQLite data_version / Redis version counters) and
+   reloads them, so workers converge within `sync_interval` seconds.
+   Concurrent writes to the same key are last-writer-wins.
+
+Backends (STATE_BACKEND env var):
+- sqlite (default): embedded, WAL mode, STATE_DB_PATH (default
+  cache/trading_state.db, git-ignored)
+- redis: shared Redis from docker-compose (REDIS_* settings)
+- memory: no persistence (tests/replay)
+
+Values must be JSON-serializable. Nested dicts read from a PersistentDict must
+be assigned back (d[key] = value) after being changed in place.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.getenv('STATE_DB_PATH') or os.path.join(os.path.dirname(__file__), '../../cache/trading_state.db')
+
+_DELETED = object()  # Pending tombstone
+
+
+class StateStore:
+    """
+    Write-behind key/value store grouped by namespace.
+
+    Subclasses implement the backend calls: _load_namespace, _write_batch,
+    _changed_namespaces and _close_backend.
+    """
+
+    def __init__(self, flush_interval: float = 0.25, sync_interval: float = 1.0):
+        """
+        Args:
+            flush_interval: Max seconds a write waits before reaching the backend
+            sync_interval: Seconds between checks for changes from other processes
+        """
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._mappings: Dict[str, 'PersistentDict'] = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_sync = 0.0
+
+        # Stats
+        self.writes = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+        self.reloads = 0
+
+        self._thread = threading.Thread(target=self._run, name=f'{type(self).__name__}-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ═══════════════════════════════════════════════════════════
+    # PUBLIC API
+    # ═══════════════════════════════════════════════════════════
+
+    def mapping(self, namespace: str, key_type: Callable[[str], Any] = str) -> 'PersistentDict':
+        """Dict view of a namespace, restored from the backend"""
+        with self._lock:
+            existing = self._mappings.get(namespace)
+            if existing is not None:
+                return existing
+            mapping = PersistentDict(self, namespace, key_type)
+            self._mappings[namespace] = mapping
+        mapping._replace(self.load(namespace))
+        return mapping
+
+    def load(self, namespace: str) -> Dict[str, Any]:
+        """Current backend contents of a namespace (pending writes applied)"""
+        with self._io_lock:
+            data = self._load_namespace(namespace)
+        with self._lock:
+            for (ns, key), value in self._pending.items():
+                if ns != namespace:
+                    continue
+                if value is _DELETED:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+        return data
+
+    def put(self, namespace: str, key: str, value: Any):
+        """Queue a write (returns immediately)"""
+        encoded = json.dumps(value, default=str)  # Snapshot now - callers mutate in place
+        with self._lock:
+            self._pending[(namespace, key)] = encoded
+            self.writes += 1
+
+    def delete(self, namespace: str, key: str):
+        """Queue a delete (returns immediately)"""
+        with self._lock:
+            self._pending[(namespace, key)] = _DELETED
+            self.writes += 1
+
+    def flush(self):
+        """Write all queued changes now"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = self._pending
+            self._pending = {}
+
+        puts = [(ns, key, value) for (ns, key), value in batch.items() if value is not _DELETED]
+        deletes = [(ns, key) for (ns, key), value in batch.items() if value is _DELETED]
+        try:
+            with self._io_lock:
+                self._write_batch(puts, deletes)
+            self.flushes += 1
+            self.rows_written += len(batch)
+        except Exception as e:
+            self.flush_errors += 1
+            logger.warning(f"⚠️ State store flush failed ({len(batch)} changes re-queued): {e}")
+            with self._lock:
+                for item, value in batch.items():
+                    self._pending.setdefault(item, value)  # Newer writes win
+
+    def close(self):
+        """Stop the writer thread and flush everything queued"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+        with self._io_lock:
+            self._close_backend()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'backend': self.backend_name,
+            'namespaces': sorted(self._mappings),
+            'pending': pending,
+            'writes': self.writes,
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'flush_errors': self.flush_errors,
+            'reloads': self.reloads,
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # WRITER THREAD
+    # ═══════════════════════════════════════════════════════════
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if time.time() - self._last_sync >= self.sync_interval:
+                self._last_sync = time.time()
+                self._sync()
+
+    def _sync(self):
+        """Reload namespaces other processes changed since the last check"""
+        try:
+            with self._io_lock:
+                changed = self._changed_namespaces(list(self._mappings))
+        except Exception as e:
+            logger.debug(f"State store sync check failed: {e}")
+            return
+        for namespace in changed:
+            mapping = self._mappings.get(namespace)
+            if mapping is not None:
+                mapping._replace(self.load(namespace))
+                self.reloads += 1
+
+    # ═══════════════════════════════════════════════════════════
+    # BACKEND HOOKS
+    # ═══════════════════════════════════════════════════════════
+
+    backend_name = 'memory'
+
+    def _load_namespace(self, namespace: str) -> Dict[str, Any]:
+        return {}
+
+    def _write_batch(self, puts: List[Tuple[str, str, str]], deletes: List[Tuple[str, str]]):
+        pass
+
+    def _changed_namespaces(self, namespaces: List[str]) -> List[str]:
+        return []
+
+    def _close_backend(self):
+        pass
+
+
+class SQLiteStateStore(StateStore):
+    """Embedded SQLite (WAL) backend - shared by processes on the same host"""
+
+    backend_name = 'sqlite'
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, **kwargs):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            ' namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS namespace_version (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+        )
+        self._data_version = self._read_data_version()
+        self._versions: Dict[str, int] = {}
+        super().__init__(**kwargs)
+        logger.info(f"✅ State store: SQLite WAL ({path})")
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _load_namespace(self, namespace: str) -> Dict[str, Any]:
+        rows = self._conn.execute('SELECT key, value FROM state WHERE namespace = ?', (namespace,)).fetchall()
+        row = self._conn.execute('SELECT version FROM namespace_version WHERE namespace = ?', (namespace,)).fetchone()
+        self._versions[namespace] = row[0] if row else 0
+        return {key: json.loads(value) for key, value in rows}
+
+    def _write_batch(self, puts, deletes):
+        now = time.time()
+        namespaces = {ns for ns, _, _ in puts} | {ns for ns, _ in deletes}
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany(
+                'INSERT INTO state (namespace, key, value, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated = excluded.updated',
+                [(ns, key, value, now) for ns, key, value in puts]
+            )
+            self._conn.executemany('DELETE FROM state WHERE namespace = ? AND key = ?', deletes)
+            self._conn.executemany(
+                'INSERT INTO namespace_version (namespace, version) VALUES (?, 1) '
+                'ON CONFLICT(namespace) DO UPDATE SET version = version + 1',
+                [(ns,) for ns in namespaces]
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        # Our own writes are already in the local caches
+        for ns in namespaces:
+            self._versions[ns] = self._versions.get(ns, 0) + 1
+
+    def _changed_namespaces(self, namespaces):
+        # data_version only moves when ANOTHER connection commits - cheap no-change check
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        rows = dict(self._conn.execute('SELECT namespace, version FROM namespace_version').fetchall())
+        return [ns for ns in namespaces if rows.get(ns, 0) != self._versions.get(ns, 0)]
+
+    def _close_backend(self):
+        self._conn.close()
+
+
+class RedisStateStore(StateStore):
+    """Redis backend - one hash per namespace plus a version counter"""
+
+    backend_name = 'redis'
+
+    def __init__(self, url: str, prefix: str = 'trading_state', **kwargs):
+        import redis  # Optional dependency - only needed for this backend
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True, socket_timeout=2.0)
+        self._redis.ping()
+        self.prefix = prefix
+        self._versions: Dict[str, int] = {}
+        super().__init__(**kwargs)
+        logger.info(f"✅ State store: Redis ({prefix}:*)")
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}:version"
+
+    def _load_namespace(self, namespace: str) -> Dict[str, Any]:
+        pipe = self._redis.pipeline()
+        pipe.hgetall(self._hash(namespace))
+        pipe.get(self._version_key(namespace))
+        values, version = pipe.execute()
+        self._versions[namespace] = int(version or 0)
+        return {key: json.loads(value) for key, value in values.items()}
+
+    def _write_batch(self, puts, deletes):
+        namespaces = {ns for ns, _, _ in puts} | {ns for ns, _ in deletes}
+        pipe = self._redis.pipeline(transaction=True)
+        for ns, key, value in puts:
+            pipe.hset(self._hash(ns), key, value)
+        for ns, key in deletes:
+            pipe.hdel(self._hash(ns), key)
+        ordered = sorted(namespaces)
+        for ns in ordered:
+            pipe.incr(self._version_key(ns))
+        results = pipe.execute()
+        # Skip a reload only if nobody else wrote in between (our INCR was the next version)
+        for ns, version in zip(ordered, results[-len(ordered):]):
+            if version == self._versions.get(ns, 0) + 1:
+                self._versions[ns] = version
+
+    def _changed_namespaces(self, namespaces):
+        if not namespaces:
+            return []
+        versions = self._redis.mget([self._version_key(ns) for ns in namespaces])
+        return [ns for ns, v in zip(namespaces, versions) if int(v or 0) != self._versions.get(ns, 0)]
+
+    def _close_backend(self):
+        self._redis.close()
+
+
+class PersistentDict(dict):
+    """
+    dict whose writes are persisted through a StateStore.
+
+    Reads are plain dict reads. Keys are stored as strings and converted back
+    with `key_type` on restore (e.g. int for MT5 tickets).
+    """
+
+    def __init__(self, store: StateStore, namespace: str, key_type: Callable[[str], Any] = str):
+        super().__init__()
+        self._store = store
+        self._namespace = namespace
+        self._key_type = key_type
+
+    def _replace(self, data: Dict[str, Any]):
+        """Swap in backend contents (restore / reload) without writing back"""
+        restored = {}
+        for key, value in data.items():
+            try:
+                restored[self._key_type(key)] = value
+            except (TypeError, ValueError):
+                logger.warning(f"⚠️ Dropping unreadable key {key!r} from state namespace {self._namespace}")
+        # Update before removing stale keys - readers never see a half-empty dict
+        dict.update(self, restored)
+        for key in [k for k in dict.keys(self) if k not in restored]:
+            dict.pop(self, key, None)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._store.put(self._namespace, str(key), value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._store.delete(self._namespace, str(key))
+
+    def pop(self, key, *default):
+        had_key = key in self
+        value = super().pop(key, *default)
+        if had_key:
+            self._store.delete(self._namespace, str(key))
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(list(dict.keys(self)))  # Safe against a concurrent reload
+
+
+# ═══════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════
+
+_state_store = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Shared store for this process, backend chosen by STATE_BACKEND (sqlite/redis/memory)"""
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            backend = os.getenv('STATE_BACKEND', 'sqlite').lower()
+            try:
+                if backend == 'redis':
+                    from src.config import get_settings
+                    _state_store = RedisStateStore(get_settings().redis_url)
+                elif backend == 'memory':
+                    _state_store = StateStore()
+                else:
+                    _state_store = SQLiteStateStore(DEFAULT_SQLITE_PATH)
+            except Exception as e:
+                logger.error(f"❌ State store backend '{backend}' unavailable ({e}) - state will NOT survive restarts")
+                _state_store = StateStore()
+        return _state_store
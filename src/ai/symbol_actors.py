@@ -0,0 +1,247 @@
+"""
+Symbol Actors - Per-symbol ownership of mutable decision state
+
+Trade decisions for different symbols can run concurrently, but much of the
+decision state is mutable (anti-churn maps, peak trackers, regime history).
+Instead of a global lock, that state is partitioned by symbol:
+
+1. Every symbol gets an actor with its own mailbox. Messages for a symbol
+   run one at a time, in arrival order, so a symbol's state is only ever
+   touched by its own actor.
+2. A message is either a coroutine function (runs on the event loop - e.g.
+   a whole /api/ai/trade_decision call) or a plain function (runs on a shared
+   thread pool). Inside a message, `offload()` moves CPU-heavy stateless work
+   (feature engineering, EV analysis) to the pool, so several symbols use
+   several cores wherever numpy/pandas/XGBoost release the GIL.
+3. Changing another symbol's state means sending a message to that symbol's
+   actor (`tell`) - never writing to it directly.
+4. Cross-symbol reads (cross-asset trends, portfolio state) go through
+   SnapshotBoard: writers publish a new immutable snapshot after each update,
+   readers grab one reference and never see a half-applied update.
+
+Never `ask` your own symbol from inside one of its messages - the mailbox is
+busy with the caller and would wait forever. `tell` on your own symbol runs
+inline, since the caller already owns the state.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Symbol whose actor is running the current message (None outside actors)
+_current_symbol: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('actor_symbol', default=None)
+
+
+def current_symbol() -> Optional[str]:
+    """Symbol owning the message being processed, if any"""
+    return _current_symbol.get()
+
+
+# ═══════════════════════════════════════════════════════════
+# IMMUTABLE SNAPSHOTS FOR CROSS-SYMBOL READS
+# ═══════════════════════════════════════════════════════════
+
+class SnapshotBoard:
+    """
+    Copy-on-write key -> read-only dict board.
+
+    Usage:
+        board = SnapshotBoard({'us30': {'h4_trend': 0.5}})
+        board.publish('us30', {'h4_trend': 0.62})   # writer (owning actor)
+        view = board.snapshot()                      # reader - consistent view
+        view['us30']['h4_trend']
+    """
+
+    def __init__(self, initial: Dict[str, Dict] = None):
+        self._lock = threading.Lock()  # Serializes writers only
+        self._snapshot: Mapping[str, Mapping] = MappingProxyType(
+            {key: MappingProxyType(dict(value)) for key, value in (initial or {}).items()}
+        )
+        self.version = 0
+
+    def publish(self, key: str, value: Dict):
+        """Replace one entry; readers holding the old snapshot are unaffected"""
+        frozen = MappingProxyType(dict(value))
+        with self._lock:
+            updated = dict(self._snapshot)
+            updated[key] = frozen
+            self._snapshot = MappingProxyType(updated)
+            self.version += 1
+
+    def snapshot(self) -> Mapping[str, Mapping]:
+        """Current immutable view (a single reference read - no lock)"""
+        return self._snapshot
+
+    def get(self, key: str, default=None):
+        return self._snapshot.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._snapshot
+
+
+# ═══════════════════════════════════════════════════════════
+# ACTORS
+# ═══════════════════════════════════════════════════════════
+
+class SymbolActor:
+    """Mailbox + worker task processing one symbol's messages in order"""
+
+    def __init__(self, symbol: str, executor: ThreadPoolExecutor):
+        self.symbol = symbol
+        self._executor = executor
+        self._mailbox: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Stats
+        self.processed = 0
+        self.errors = 0
+        self.max_backlog = 0
+        self.busy_ms = 0.0
+
+    def send(self, fn: Callable, args: tuple, kwargs: dict) -> asyncio.Future:
+        """Queue a message (event loop thread only); returns its result future"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            self._mailbox = asyncio.Queue()
+            self._worker = loop.create_task(self._run(), name=f'actor-{self.symbol}')
+
+        # The message runs in a copy of the sender's context (flight recorder etc.)
+        ctx = contextvars.copy_context()
+        ctx.run(_current_symbol.set, self.symbol)
+        future = loop.create_future()
+        self._mailbox.put_nowait((fn, args, kwargs, ctx, future))
+        self.max_backlog = max(self.max_backlog, self._mailbox.qsize())
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, kwargs, ctx, future = await self._mailbox.get()
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(fn):
+                    result = await asyncio.create_task(fn(*args, **kwargs), context=ctx)
+                else:
+                    result = await loop.run_in_executor(
+                        self._executor, functools.partial(ctx.run, fn, *args, **kwargs))
+                if not future.done():  # Sender may have given up (client disconnect)
+                    future.set_result(result)
+            except Exception as e:
+                self.errors += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.processed += 1
+                self.busy_ms += (time.perf_counter() - start) * 1000.0
+
+    @property
+    def backlog(self) -> int:
+        return self._mailbox.qsize() if self._mailbox is not None else 0
+
+
+class ActorSystem:
+    """
+    Per-symbol actors sharing one worker thread pool.
+
+    Usage:
+        actors = ActorSystem()
+        response = await actors.ask('us30', decide, request)      # wait for result
+        actors.tell('us100', unified_system.register_close, ...)  # fire and forget
+        features = await actors.offload(engineer_features, request)  # inside a message
+    """
+
+    def __init__(self, workers: int = None):
+        """
+        Args:
+            workers: Thread pool size for sync messages and offloaded work
+                     (default: CPU count, capped at 8)
+        """
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='symbol-actor')
+        self._actors: Dict[str, SymbolActor] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.offloaded = 0
+
+    def actor(self, symbol: str) -> SymbolActor:
+        actor = self._actors.get(symbol)
+        if actor is None:
+            actor = self._actors[symbol] = SymbolActor(symbol, self._executor)
+        return actor
+
+    async def ask(self, symbol: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the symbol's actor and wait for its result"""
+        self._loop = asyncio.get_running_loop()
+        return await self.actor(symbol).send(fn, args, kwargs)
+
+    def tell(self, symbol: str, fn: Callable, *args, **kwargs):
+        """
+        Send fn to the symbol's actor without waiting.
+
+        Runs inline if the caller already is that symbol's actor. Safe to call
+        from worker threads (hops to the event loop). Errors are logged.
+        """
+        if current_symbol() == symbol:
+            fn(*args, **kwargs)
+            return
+
+        def _send():
+            future = self.actor(symbol).send(fn, args, kwargs)
+            future.add_done_callback(functools.partial(self._log_failure, symbol, fn))
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is None:
+                raise RuntimeError("ActorSystem.tell() before the event loop has started")
+            self._loop.call_soon_threadsafe(_send)
+            return
+        _send()
+
+    async def offload(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run sync work from the current message on the thread pool.
+
+        The calling actor stays busy until it returns, so the work still owns
+        the caller's symbol state - it just doesn't hold up other symbols.
+        """
+        self.offloaded += 1
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+    @staticmethod
+    def _log_failure(symbol: str, fn: Callable, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"❌ Actor {symbol}: {getattr(fn, '__name__', fn)} failed: {future.exception()}")
+
+    def get_stats(self) -> Dict:
+        """Per-actor message counters"""
+        return {
+            'workers': self.workers,
+            'offloaded': self.offloaded,
+            'actors': {
+                symbol: {
+                    'processed': actor.processed,
+                    'errors': actor.errors,
+                    'backlog': actor.backlog,
+                    'max_backlog': actor.max_backlog,
+                    'busy_ms': round(actor.busy_ms, 1),
+                }
+                for symbol, actor in list(self._actors.items())
+            },
+        }
+
+    def close(self):
+        """Stop the worker pool (pending messages are dropped)"""
+        for actor in self._actors.values():
+            if actor._worker is not None:
+                actor._worker.cancel()
+        self._executor.shutdown(wait=False)
@@ -11,13 +11,13 @@ SINGLE SOURCE OF TRUTH for:
 """
 import logging
 import time
-from datetime import datetime
-import pytz
 from typing import Dict, Optional
 from .enhanced_context import EnhancedTradingContext
 from .ftmo_strategy import get_ftmo_strategy
 from .ai_market_analyzer import get_ai_analyzer, AIMarketState
 from .regime_detector import get_regime_detector, MarketRegime
+from .state_store import get_state_store
+from src.utils.session_calendar import SESSIONS, get_session_calendar
 # Position sizing delegated to ElitePositionSizer in api.py
 
 logger = logging.getLogger(__name__)
@@ -92,79 +92,34 @@ class UnifiedTradingSystem:
         # ═══════════════════════════════════════════════════════════
         # SESSION AWARENESS - Same logic as EV Exit Manager
         # ═══════════════════════════════════════════════════════════
-        self.SESSIONS = {
-            'asian': {'start': 0, 'end': 8, 'indices_mult': 0.5, 'forex_mult': 0.7, 'entry_boost': 0.7},
-            'london': {'start': 8, 'end': 16, 'indices_mult': 0.8, 'forex_mult': 1.0, 'entry_boost': 1.0},
-            'new_york': {'start': 13, 'end': 21, 'indices_mult': 1.0, 'forex_mult': 1.0, 'entry_boost': 1.0},
-            'overlap': {'start': 13, 'end': 16, 'indices_mult': 1.2, 'forex_mult': 1.2, 'entry_boost': 1.2},
-        }
+        self.SESSIONS = SESSIONS
         
         # ═══════════════════════════════════════════════════════════
         # POSITION STATE TRACKING
         # Tracks setup type, entry conditions, and last actions
         # This is the SINGLE SOURCE OF TRUTH for anti-churn
+        # Persisted via the state store - survives restarts, shared by workers
         # ═══════════════════════════════════════════════════════════
-        self.position_state = {}  # symbol -> {setup_type, entry_time, entry_price, last_action, ...}
-        self.recent_closes = {}   # symbol -> {time, direction, cont_prob, reason}
+        state_store = get_state_store()
+        self.position_state = state_store.mapping('position_state')  # symbol -> {setup_type, entry_time, entry_price, last_action, ...}
+        self.recent_closes = state_store.mapping('recent_closes')    # symbol -> {time, direction, cont_prob, reason}
         
         # ═══════════════════════════════════════════════════════════
         # LOSS COOLDOWN TRACKING - Prevents rapid re-entry after losses
         # This is CRITICAL for preventing the US500-style disaster where
         # the system re-entered 11 times in 30 minutes, losing each time
         # ═══════════════════════════════════════════════════════════
-        self.recent_losses = {}   # symbol -> {count, last_loss_time, total_loss, direction}
+        self.recent_losses = state_store.mapping('recent_losses')    # symbol -> {count, last_loss_time, total_loss, direction}
+        if self.recent_losses:
+            restored = ', '.join(f"{k} x{v['count']}" for k, v in self.recent_losses.items())
+            logger.info(f"   📊 Restored loss cooldowns: {restored}")
     
     def get_session_context(self, symbol: str) -> Dict:
         """
         Get current session context for a symbol.
         Same logic as EV Exit Manager for consistency.
         """
-        symbol_lower = symbol.lower().replace('.sim', '').replace('z25', '').replace('g26', '')
-        
-        # Determine symbol type
-        is_index = any(s in symbol_lower for s in ['us30', 'us100', 'us500', 'dax', 'ftse'])
-        is_forex = any(s in symbol_lower for s in ['eur', 'gbp', 'jpy', 'aud', 'nzd', 'cad', 'chf'])
-        is_gold = 'xau' in symbol_lower or 'gold' in symbol_lower
-        
-        # Get current UTC hour
-        utc_now = datetime.now(pytz.UTC)
-        current_hour = utc_now.hour
-        
-        # Determine session
-        if 13 <= current_hour < 16:
-            session_name = 'overlap'
-            session_config = self.SESSIONS['overlap']
-        elif 13 <= current_hour < 21:
-            session_name = 'new_york'
-            session_config = self.SESSIONS['new_york']
-        elif 8 <= current_hour < 16:
-            session_name = 'london'
-            session_config = self.SESSIONS['london']
-        else:
-            session_name = 'asian'
-            session_config = self.SESSIONS['asian']
-        
-        # Get multiplier based on symbol type
-        if is_index:
-            session_mult = session_config['indices_mult']
-        elif is_forex:
-            session_mult = session_config['forex_mult']
-        elif is_gold:
-            session_mult = max(0.8, session_config['forex_mult'])
-        else:
-            session_mult = session_config['forex_mult']
-        
-        entry_boost = session_config['entry_boost']
-        is_optimal = session_mult >= 1.0
-        
-        return {
-            'session_name': session_name,
-            'session_mult': session_mult,
-            'entry_boost': entry_boost,
-            'is_optimal': is_optimal,
-            'current_hour_utc': current_hour,
-            'symbol_type': 'index' if is_index else ('forex' if is_forex else ('gold' if is_gold else 'other'))
-        }
+        return get_session_calendar().session_context(symbol)
     
     # ═══════════════════════════════════════════════════════════
     # SETUP CLASSIFICATION - SIMPLE
@@ -320,11 +275,13 @@ class UnifiedTradingSystem:
         """Register a position action (SCALE_IN, SCALE_OUT, etc.)."""
         symbol_key = symbol.lower().split('.')[0]
         if symbol_key in self.position_state:
-            self.position_state[symbol_key]['last_action'] = action
-            self.position_state[symbol_key]['last_action_time'] = time.time()
-            self.position_state[symbol_key]['last_cont_prob'] = cont_prob
+            state = self.position_state[symbol_key]
+            state['last_action'] = action
+            state['last_action_time'] = time.time()
+            state['last_cont_prob'] = cont_prob
             if price > 0:
-                self.position_state[symbol_key]['last_action_price'] = price
+                state['last_action_price'] = price
+            self.position_state[symbol_key] = state  # Persist the nested change
     
     def register_close(self, symbol: str, direction: str, cont_prob: float, reason: str, pnl: float = 0):
         """Register a position close for anti-churn tracking."""
@@ -358,6 +315,7 @@ class UnifiedTradingSystem:
                 loss_info['count'] += 1
                 loss_info['total_loss'] += abs(pnl)
                 loss_info['last_loss_time'] = now
+                self.recent_losses[symbol_key] = loss_info  # Persist the nested change
             else:
                 # Different direction or too long ago - reset
                 self.recent_losses[symbol_key] = {
@@ -834,7 +792,7 @@ class UnifiedTradingSystem:
         # momentum, market structure) - NOT hardcoded thresholds.
         # ═══════════════════════════════════════════════════════════
         
-        regime_detector = get_regime_detector()
+        regime_detector = get_regime_detector(getattr(context, 'symbol', None))
         regime_state = regime_detector.detect_regime(context)
         regime = regime_state.regime
         regime_params = regime_detector.get_regime_parameters(regime)
@@ -0,0 +1,755 @@
+"""
+EA Simulator - Historical-replay MT5 EA for load and integration testing
+
+Builds on the MT5 stand-in (mt5_standin.py) so everything that normally needs
+a live MetaTrader terminal can run on a CI box:
+
+1. ReplayClock - simulated server time, stepped one base bar at a time
+2. ReplayMarket - replays historical OHLCV per (symbol, timeframe): CSV files
+   in the Export_Training_Data.mq5 format (<SYMBOL>_<TF>.csv), or synthetic
+   history from SyntheticMarket. The bar containing "now" is served as a
+   forming bar (OHLC revealed in proportion to elapsed time); spreads come
+   from the exported spread column, else widen with the bar range
+3. SimulatedEA - MT5StandIn with replay fills (slippage, commission), SL/TP
+   hits checked against each closed bar, partial closes, SL modification and
+   deal history. It plugs into MT5StandInServer (socket protocol, port 9090)
+   and MT5StandInFileServer (file command/response protocol) unchanged
+4. WebRequest payloads - decision_payload() builds the JSON that
+   AI_MultiSymbol_EA.mq5 ('multi') and AI_Trading_EA_Ultimate.mq5
+   ('ultimate') POST to /api/ai/trade_decision, and apply_decision() executes
+   the response the way ExecuteAIDecision() does
+5. EADriver - drives N symbols through the API at a configurable bar speed
+   and reports latency percentiles and throughput
+
+Usage:
+    market = ReplayMarket.synthetic(['US30', 'EURUSD'], bars=500)
+    ea = SimulatedEA(market)
+    with MT5StandInServer(ea, port=9090):
+        report = EADriver(ea, style='ultimate', concurrency=2).run(bars=100)
+"""
+import csv
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from .mt5_standin import MT5StandIn, SyntheticMarket
+from ..data.bars_bulk import BAR_COLUMNS, TIMEFRAME_SECONDS
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_API_URL = "http://127.0.0.1:5007/api/ai/trade_decision"
+
+# Timeframes and bar counts each EA puts in its payload
+MULTI_TIMEFRAMES = [('m1', 'M1', 50), ('m5', 'M5', 50), ('m15', 'M15', 50), ('m30', 'M30', 50),
+                    ('h1', 'H1', 50), ('h4', 'H4', 50), ('d1', 'D1', 50)]
+ULTIMATE_TIMEFRAMES = MULTI_TIMEFRAMES + [('w1', 'W1', 20)]
+REPLAY_TIMEFRAMES = [tf for _, tf, _ in ULTIMATE_TIMEFRAMES]
+
+_WEEK_OFFSET = 3 * 86400  # MT5 weeks open on Sunday; the epoch was a Thursday
+
+Series = Dict[str, list]  # Columnar bars: time, open, high, low, close, volume[, spread]
+
+
+def bar_open_time(t: float, seconds: int) -> int:
+    """Open time of the bar containing t"""
+    offset = _WEEK_OFFSET if seconds == TIMEFRAME_SECONDS['W1'] else 0
+    return int((t - offset) // seconds * seconds + offset)
+
+
+def _parse_time(value: str) -> int:
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    for fmt in ('%Y.%m.%d %H:%M:%S', '%Y.%m.%d %H:%M', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return int(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised bar time: {value}")
+
+
+def load_csv_history(directory: Union[str, Path], symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Series]]:
+    """
+    {symbol: {timeframe: series}} from <SYMBOL>_<TF>.csv files (Export_Training_Data.mq5:
+    timestamp, open, high, low, close, tick_volume, spread, real_volume)
+    """
+    wanted = {s.upper() for s in symbols} if symbols else None
+    history: Dict[str, Dict[str, Series]] = {}
+    for path in sorted(Path(directory).glob('*_*.csv')):
+        symbol, _, timeframe = path.stem.rpartition('_')
+        timeframe = timeframe.upper()
+        if timeframe not in TIMEFRAME_SECONDS or (wanted and symbol.upper() not in wanted):
+            continue
+        series: Series = {column: [] for column in BAR_COLUMNS + ('spread',)}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                series['time'].append(_parse_time(row.get('timestamp') or row['time']))
+                for column in ('open', 'high', 'low', 'close'):
+                    series[column].append(float(row[column]))
+                series['volume'].append(int(float(row.get('tick_volume') or row.get('volume') or 0)))
+                series['spread'].append(int(float(row.get('spread') or 0)))
+        if series['time']:
+            order = sorted(range(len(series['time'])), key=series['time'].__getitem__)
+            history.setdefault(symbol, {})[timeframe] = {k: [v[i] for i in order] for k, v in series.items()}
+    return history
+
+
+# ═══════════════════════════════════════════════════════════
+# REPLAY MARKET
+# ═══════════════════════════════════════════════════════════
+
+class ReplayClock:
+    """Simulated server time (callable, like time.time)"""
+
+    def __init__(self, start: float, step_seconds: int = 60):
+        self.now = float(start)
+        self.step_seconds = step_seconds
+
+    def __call__(self) -> float:
+        return self.now
+
+    def step(self, bars: int = 1) -> float:
+        self.now += bars * self.step_seconds
+        return self.now
+
+
+class ReplayMarket(SyntheticMarket):
+    """
+    Historical bars served as MT5 would at the clock's time.
+
+    Keeps SyntheticMarket's interface (tick, bars, spec, digits, symbols), so
+    MT5StandIn and its servers work on replayed data unchanged.
+    """
+
+    def __init__(self, history: Dict[str, Dict[str, Series]], base_timeframe: str = 'M1',
+                 start: Optional[float] = None, warmup: int = 100, spread_widen_max: float = 3.0):
+        """
+        Args:
+            history: {symbol: {timeframe: columnar series}} (oldest bar first)
+            base_timeframe: Timeframe the clock steps by (ticks come from it)
+            start: Replay start (default: `warmup` base bars into the shortest history)
+            warmup: Base bars of history before the default start
+            spread_widen_max: Cap on the range-based spread multiplier
+        """
+        missing = [s for s, tfs in history.items() if base_timeframe not in tfs]
+        if missing:
+            raise ValueError(f"No {base_timeframe} history for {', '.join(missing)}")
+
+        self.history = history
+        self.base_timeframe = base_timeframe
+        self.base_seconds = TIMEFRAME_SECONDS[base_timeframe]
+        self.spread_widen_max = spread_widen_max
+
+        base = [tfs[base_timeframe]['time'] for tfs in history.values()]
+        self.start_time = start if start is not None else max(t[min(warmup, len(t) - 1)] for t in base)
+        self.end_time = min(t[-1] for t in base) + self.base_seconds
+
+        self._mean_range = {}
+        self._digits = {}
+        for symbol, tfs in history.items():
+            series = tfs[base_timeframe]
+            ranges = [h - l for h, l in zip(series['high'], series['low'])]
+            self._mean_range[symbol] = sum(ranges) / len(ranges) if ranges else 0.0
+            self._digits[symbol] = 2 if series['close'] and series['close'][0] >= 50 else 5
+
+        super().__init__(list(history), clock=ReplayClock(self.start_time, self.base_seconds))
+
+    @classmethod
+    def from_csv(cls, directory: Union[str, Path], symbols: Optional[Iterable[str]] = None,
+                 **kwargs) -> 'ReplayMarket':
+        history = load_csv_history(directory, symbols)
+        if not history:
+            raise ValueError(f"No <SYMBOL>_<TF>.csv history in {directory}")
+        return cls(history, **kwargs)
+
+    @classmethod
+    def synthetic(cls, symbols: Iterable[str], bars: int = 1000, base_timeframe: str = 'M1',
+                  timeframes: Iterable[str] = REPLAY_TIMEFRAMES, warmup: int = 100,
+                  start: Optional[float] = None, **kwargs) -> 'ReplayMarket':
+        """History generated by SyntheticMarket: `warmup` bars per timeframe, then `bars` base bars to replay"""
+        base_seconds = TIMEFRAME_SECONDS[base_timeframe]
+        if start is None:
+            start = bar_open_time(time.time(), base_seconds) - bars * base_seconds
+        start = bar_open_time(start, base_seconds)
+        end = start + bars * base_seconds
+        generator = SyntheticMarket(clock=lambda: end)
+
+        history: Dict[str, Dict[str, Series]] = {}
+        for symbol in symbols:
+            for timeframe in dict.fromkeys([base_timeframe, *timeframes]):
+                seconds = TIMEFRAME_SECONDS[timeframe]
+                first = bar_open_time(start - warmup * seconds, seconds)
+                rows = [generator.bar(symbol, seconds, t, t + seconds)
+                        for t in range(first, bar_open_time(end, seconds) + 1, seconds)]
+                history.setdefault(symbol, {})[timeframe] = {c: [r[c] for r in rows] for c in BAR_COLUMNS}
+        return cls(history, base_timeframe=base_timeframe, start=start, **kwargs)
+
+    # ═══════════════════════════════════════════════════════════
+    # BARS / TICKS AT THE CLOCK'S TIME
+    # ═══════════════════════════════════════════════════════════
+
+    def _bar(self, series: Series, i: int, seconds: int, now: float, digits: int) -> Dict:
+        bar = {c: series[c][i] for c in BAR_COLUMNS}
+        elapsed = (now - bar['time']) / seconds
+        if elapsed >= 1.0:
+            return bar
+
+        # Forming bar: reveal the move and the wicks in proportion to elapsed time
+        o, c = bar['open'], bar['close']
+        close = o + (c - o) * elapsed
+        body_high, body_low = max(o, c), min(o, c)
+        bar['close'] = round(close, digits)
+        bar['high'] = round(max(o, close) + (bar['high'] - body_high) * elapsed, digits)
+        bar['low'] = round(min(o, close) - (body_low - bar['low']) * elapsed, digits)
+        bar['volume'] = max(1, int(bar['volume'] * elapsed))
+        return bar
+
+    def digits(self, symbol: str) -> int:
+        return self._digits.get(symbol) or super().digits(symbol)
+
+    def bars(self, symbol: str, timeframe: str, count: int, since: Optional[int] = None) -> List[Dict]:
+        """Last `count` bars at the clock's time, oldest first, ending with the forming bar"""
+        series = self.history.get(symbol, {}).get(timeframe.upper())
+        if not series:
+            return []
+        now = self.clock()
+        last = bisect_right(series['time'], now) - 1
+        if last < 0:
+            return []
+        first = max(0, last - max(1, count) + 1)
+        if since:
+            first = max(first, bisect_right(series['time'], since - 1))
+        seconds = TIMEFRAME_SECONDS[timeframe.upper()]
+        digits = self.digits(symbol)
+        return [self._bar(series, i, seconds, now, digits) for i in range(first, last + 1)]
+
+    def closed_bar(self, symbol: str) -> Optional[Dict]:
+        """Last fully closed base bar"""
+        series = self.history[symbol][self.base_timeframe]
+        i = bisect_right(series['time'], self.clock() - self.base_seconds) - 1
+        return {c: series[c][i] for c in BAR_COLUMNS} if i >= 0 else None
+
+    def price(self, symbol: str, t: Optional[float] = None) -> float:
+        bars = self.bars(symbol, self.base_timeframe, 1)
+        return bars[-1]['close'] if bars else self.spec(symbol)[1]
+
+    def point(self, symbol: str) -> float:
+        return 10 ** -self.digits(symbol)
+
+    def spread(self, symbol: str) -> float:
+        """Exported bar spread (points) if present, else the base spread widened by the bar range"""
+        series = self.history[symbol][self.base_timeframe]
+        i = bisect_right(series['time'], self.clock()) - 1
+        if i >= 0 and series.get('spread') and series['spread'][i]:
+            return series['spread'][i] * self.point(symbol)
+        base = self.spec(symbol)[2]
+        mean_range = self._mean_range.get(symbol)
+        bar = self.closed_bar(symbol)
+        if not bar or not mean_range:
+            return base
+        return base * min(self.spread_widen_max, max(1.0, (bar['high'] - bar['low']) / mean_range))
+
+    def tick(self, symbol: str, t: Optional[float] = None) -> Dict:
+        bid = self.price(symbol)
+        digits = self.digits(symbol)
+        return {'symbol': symbol, 'time': int(self.clock()), 'bid': bid,
+                'ask': round(bid + self.spread(symbol), digits)}
+
+
+# ═══════════════════════════════════════════════════════════
+# INDICATORS (the Ultimate EA's M1 indicator block)
+# ═══════════════════════════════════════════════════════════
+
+def _ema_series(values: List[float], period: int) -> List[float]:
+    k = 2.0 / (period + 1)
+    out = [values[0]]
+    for v in values[1:]:
+        out.append(v * k + out[-1] * (1 - k))
+    return out
+
+
+def _rsi(closes: List[float], period: int = 14) -> float:
+    if len(closes) <= period:
+        return 50.0
+    gains = [max(0.0, b - a) for a, b in zip(closes, closes[1:])]
+    losses = [max(0.0, a - b) for a, b in zip(closes, closes[1:])]
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    for g, l in zip(gains[period:], losses[period:]):  # Wilder smoothing
+        avg_gain = (avg_gain * (period - 1) + g) / period
+        avg_loss = (avg_loss * (period - 1) + l) / period
+    return 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1 + avg_gain / avg_loss)
+
+
+def indicator_snapshot(bars: List[Dict], digits: int) -> Dict[str, float]:
+    """ATR/RSI/MACD/Bollinger/MA values the EA reads from MT5 indicator buffers"""
+    if len(bars) < 2:
+        return {}
+    closes = [b['close'] for b in bars]
+    true_ranges = [max(b['high'], p['close']) - min(b['low'], p['close']) for p, b in zip(bars, bars[1:])]
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    macd = [a - b for a, b in zip(_ema_series(closes, 12), _ema_series(closes, 26))]
+    middle = mean(closes[-20:])
+    std = math.sqrt(mean([(c - middle) ** 2 for c in closes[-20:]]))
+    values = {
+        'atr_14': mean(true_ranges[-14:]), 'atr_20': mean(true_ranges[-20:]), 'atr_50': mean(true_ranges[-50:]),
+        'rsi_14': _rsi(closes),
+        'macd_main': macd[-1], 'macd_signal': _ema_series(macd, 9)[-1],
+        'bb_upper': middle + 2 * std, 'bb_middle': middle, 'bb_lower': middle - 2 * std,
+        'sma_20': middle, 'sma_50': mean(closes[-50:]), 'ema_20': _ema_series(closes, 20)[-1],
+    }
+    return {k: round(v, 2 if k == 'rsi_14' else digits) for k, v in values.items()}
+
+
+# ═══════════════════════════════════════════════════════════
+# SIMULATED EA
+# ═══════════════════════════════════════════════════════════
+
+class SimulatedEA(MT5StandIn):
+    """
+    MT5StandIn on a ReplayMarket with replay fills, SL/TP and deal history.
+    """
+
+    def __init__(self, market: ReplayMarket, balance: float = 100000.0, leverage: int = 100,
+                 slippage_points: float = 1.0, commission_per_lot: float = 0.0,
+                 magic: int = 123456):
+        """
+        Args:
+            market: Replayed market (its clock is the EA's server time)
+            balance: Starting (and FTMO initial) balance
+            leverage: Account leverage (margin)
+            slippage_points: Adverse slippage per market fill, in points
+            commission_per_lot: Commission charged per lot on entry
+            magic: Magic number reported in payloads
+        """
+        super().__init__(market, balance=balance, leverage=leverage)
+        self.market: ReplayMarket = market
+        self.clock: ReplayClock = market.clock
+        self.slippage_points = slippage_points
+        self.commission_per_lot = commission_per_lot
+        self.magic = magic
+
+        self.initial_balance = balance
+        self.peak_balance = balance
+        self.daily_start_balance = balance
+        self._day = int(self.clock() // 86400)
+        self.deals: List[Dict] = []
+        self._deal_tickets = 500000
+
+        self.handlers['modify_position'] = self._modify
+        self.handlers['get_history'] = self._history
+
+    # ═══════════════════════════════════════════════════════════
+    # FILLS (call with self._lock held)
+    # ═══════════════════════════════════════════════════════════
+
+    def _fill_price(self, symbol: str, side: str) -> float:
+        tick = self.market.tick(symbol)
+        slippage = self.slippage_points * self.market.point(symbol)
+        price = tick['ask'] + slippage if side == 'buy' else tick['bid'] - slippage
+        return round(price, self.market.digits(symbol))
+
+    def _deal(self, position: Dict, volume: float, price: float, entry: str,
+              profit: float = 0.0, commission: float = 0.0, reason: str = '') -> Dict:
+        self._deal_tickets += 1
+        deal = {'ticket': self._deal_tickets, 'position': position['ticket'], 'symbol': position['symbol'],
+                'type': position['type'], 'volume': round(volume, 2), 'price': price,
+                'profit': round(profit, 2), 'commission': round(commission, 2), 'swap': 0.0,
+                'entry_type': entry, 'time': int(self.clock()), 'reason': reason}
+        self.deals.append(deal)
+        return deal
+
+    def _open(self, command: Dict) -> Dict:
+        symbol = command['symbol']
+        side = str(command.get('type') or command.get('direction') or 'buy').lower()
+        volume = round(float(command.get('volume') or command.get('lots') or 0), 2)
+        if side not in ('buy', 'sell') or volume <= 0:
+            return {'success': False, 'error': 'Invalid order'}
+        price = self._fill_price(symbol, side)
+        commission = -self.commission_per_lot * volume
+        self.balance += commission
+        self._tickets += 1
+        position = {
+            'ticket': self._tickets, 'symbol': symbol, 'type': side, 'volume': volume,
+            'open_price': price, 'sl': float(command.get('sl') or 0), 'tp': float(command.get('tp') or 0),
+            'time': int(self.clock()),
+        }
+        self.positions[self._tickets] = position
+        self._deal(position, volume, price, 'IN', commission=commission)
+        return {'success': True, 'ticket': self._tickets, 'price': price, 'volume': volume}
+
+    def _close_position(self, position: Dict, volume: Optional[float] = None,
+                        price: Optional[float] = None, reason: str = '') -> Dict:
+        volume = min(position['volume'], volume or position['volume'])
+        if price is None:
+            price = self._fill_price(position['symbol'], 'sell' if position['type'] == 'buy' else 'buy')
+        direction = 1 if position['type'] == 'buy' else -1
+        profit = (price - position['open_price']) * direction * volume * self.market.spec(position['symbol'])[3]
+        self.balance += profit
+        self.peak_balance = max(self.peak_balance, self.balance)
+        position['volume'] = round(position['volume'] - volume, 2)
+        if position['volume'] <= 0:
+            del self.positions[position['ticket']]
+        self._deal(position, volume, price, 'OUT', profit=profit, reason=reason)
+        return {'success': True, 'ticket': position['ticket'], 'price': price, 'profit': round(profit, 2)}
+
+    def _close(self, command: Dict) -> Dict:
+        position = self.positions.get(int(command.get('ticket', 0)))
+        if position is None:
+            return {'success': False, 'error': 'Position not found'}
+        return self._close_position(position, float(command.get('volume') or 0) or None)
+
+    def _modify(self, command: Dict) -> Dict:
+        position = self.positions.get(int(command.get('ticket', 0)))
+        if position is None:
+            return {'success': False, 'error': 'Position not found'}
+        for key in ('sl', 'tp'):
+            if command.get(key) is not None:
+                position[key] = float(command[key])
+        return {'success': True, 'ticket': position['ticket'], 'sl': position['sl'], 'tp': position['tp']}
+
+    def _history(self, command: Dict) -> Dict:
+        return {'success': True, 'deals': self.deals[-int(command.get('count', 100)):]}
+
+    # ═══════════════════════════════════════════════════════════
+    # REPLAY
+    # ═══════════════════════════════════════════════════════════
+
+    def advance(self, bars: int = 1) -> int:
+        """Step the clock by `bars` base bars; returns SL/TP exits triggered on the closed bars"""
+        exits = 0
+        for _ in range(bars):
+            self.clock.step()
+            with self._lock:
+                exits += self._check_stops()
+                day = int(self.clock() // 86400)
+                if day != self._day:
+                    self._day = day
+                    self.daily_start_balance = self.balance
+        return exits
+
+    def _check_stops(self) -> int:
+        """Close positions whose SL/TP lies inside the bar that just closed (SL first if both)"""
+        exits = 0
+        for position in list(self.positions.values()):
+            bar = self.market.closed_bar(position['symbol'])
+            if bar is None:
+                continue
+            sl, tp = position['sl'], position['tp']
+            if position['type'] == 'buy':
+                hit_sl, hit_tp = sl and bar['low'] <= sl, tp and bar['high'] >= tp
+            else:
+                spread = self.market.spread(position['symbol'])  # Sells close at the ask
+                hit_sl, hit_tp = sl and bar['high'] + spread >= sl, tp and bar['low'] + spread <= tp
+            if hit_sl or hit_tp:
+                self._close_position(position, price=sl if hit_sl else tp, reason='sl' if hit_sl else 'tp')
+                exits += 1
+        return exits
+
+    def equity(self) -> float:
+        return self.balance + sum(self._position_profit(p) for p in self.positions.values())
+
+    # ═══════════════════════════════════════════════════════════
+    # WEBREQUEST PAYLOADS
+    # ═══════════════════════════════════════════════════════════
+
+    def decision_payload(self, symbol: str, style: str = 'ultimate', trigger: str = 'M1') -> Dict:
+        """The JSON body the EA POSTs to /api/ai/trade_decision ('multi' or 'ultimate')"""
+        with self._lock:
+            if style == 'multi':
+                return self._multi_payload(symbol)
+            return self._ultimate_payload(symbol, trigger)
+
+    def _timeframes(self, symbol: str, layout: list, with_time: bool) -> Dict[str, list]:
+        frames = {}
+        for key, timeframe, count in layout:
+            bars = self.market.bars(symbol, timeframe, count)
+            frames[key] = [bar if with_time else {c: bar[c] for c in BAR_COLUMNS[1:]} for bar in bars]
+        return frames
+
+    def _multi_payload(self, symbol: str) -> Dict:
+        tick = self.market.tick(symbol)
+        account = self._account({})
+        return {
+            'symbol': symbol,
+            'current_price': {'bid': tick['bid'], 'ask': tick['ask']},
+            'account': {'balance': account['balance'], 'equity': account['equity'], 'margin': account['margin']},
+            'timeframes': self._timeframes(symbol, MULTI_TIMEFRAMES, with_time=False),
+        }
+
+    def _ultimate_payload(self, symbol: str, trigger: str) -> Dict:
+        market = self.market
+        digits = market.digits(symbol)
+        point = market.point(symbol)
+        tick = market.tick(symbol)
+        spec = market.spec(symbol)
+        account = self._account({})
+        now = int(self.clock())
+
+        positions = []
+        for p in self.positions.values():
+            current = market.tick(p['symbol'])
+            positions.append({
+                'symbol': p['symbol'], 'ticket': p['ticket'], 'type': 0 if p['type'] == 'buy' else 1,
+                'volume': p['volume'], 'price_open': p['open_price'],
+                'price_current': current['bid'] if p['type'] == 'buy' else current['ask'],
+                'sl': p['sl'], 'tp': p['tp'], 'profit': self._position_profit(p), 'swap': 0.0,
+                'time': p['time'], 'age_minutes': (now - p['time']) // 60,
+            })
+        recent = [{k: d[k] for k in ('ticket', 'profit', 'swap', 'commission', 'symbol', 'volume', 'entry_type')}
+                  for d in reversed(self.deals) if d['entry_type'] != 'IN' and d['time'] >= now - 86400][:50]
+        held = [p for p in self.positions.values() if p['symbol'] == symbol]
+
+        return {
+            'trigger_timeframe': trigger,
+            'current_price': {
+                'bid': tick['bid'], 'ask': tick['ask'], 'last': tick['bid'],
+                'spread': int(round((tick['ask'] - tick['bid']) / point)),
+                'spread_points': round(tick['ask'] - tick['bid'], digits),
+            },
+            'account': {
+                'balance': account['balance'], 'equity': account['equity'], 'margin': account['margin'],
+                'free_margin': account['free_margin'],
+                'margin_level': round(account['equity'] / account['margin'] * 100, 2) if account['margin'] else 0.0,
+                'profit': account['profit'], 'currency': 'USD',
+                'initial_balance': round(self.initial_balance, 2),
+                'daily_pnl': round(account['equity'] - self.daily_start_balance, 2),
+                'daily_realized_pnl': round(sum(d['profit'] for d in self.deals
+                                                if d['entry_type'] == 'OUT' and d['time'] // 86400 == self._day), 2),
+                'daily_start_balance': round(self.daily_start_balance, 2),
+                'max_daily_loss': round(self.initial_balance * 0.05, 2),
+                'max_total_drawdown': round(self.initial_balance * 0.10, 2),
+                'peak_balance': round(self.peak_balance, 2),
+            },
+            'symbol_info': {
+                'symbol': symbol, 'digits': digits, 'point': point, 'contract_size': spec[3],
+                'tick_value': round(spec[3] * point, 2), 'tick_size': point,
+                'min_lot': 0.01, 'max_lot': 100.0, 'lot_step': 0.01,
+            },
+            'timeframes': self._timeframes(symbol, ULTIMATE_TIMEFRAMES, with_time=True),
+            'indicators': indicator_snapshot(market.bars(symbol, 'M1', 100), digits),
+            'positions': positions,
+            'recent_trades': recent,
+            'order_book': self._order_book(symbol, tick, digits),
+            'calendar_events': [],
+            'metadata': {
+                'timestamp': datetime.fromtimestamp(now, timezone.utc).strftime('%Y.%m.%d %H:%M:%S'),
+                'server_time': now,
+                'bars_held': (now - held[0]['time']) // self.market.base_seconds if held else 0,
+                'magic_number': self.magic,
+            },
+        }
+
+    def _order_book(self, symbol: str, tick: Dict, digits: int, levels: int = 5) -> Dict:
+        """Synthetic depth around the spread (deterministic per bar)"""
+        step = max(self.market.point(symbol), tick['ask'] - tick['bid'])
+        volume = self.market.closed_bar(symbol) or {'volume': 100}
+        bids = [{'price': round(tick['bid'] - i * step, digits), 'volume': int(volume['volume'] // (i + 1)) + 1}
+                for i in range(levels)]
+        asks = [{'price': round(tick['ask'] + i * step, digits), 'volume': int(volume['volume'] // (i + 2)) + 1}
+                for i in range(levels)]
+        bid_volume = sum(b['volume'] for b in bids)
+        ask_volume = sum(a['volume'] for a in asks)
+        return {'bids': bids, 'asks': asks,
+                'imbalance': round((bid_volume - ask_volume) / (bid_volume + ask_volume), 4)}
+
+    # ═══════════════════════════════════════════════════════════
+    # DECISIONS (ExecuteAIDecision)
+    # ═══════════════════════════════════════════════════════════
+
+    def apply_decision(self, response: Dict, symbol: str) -> List[str]:
+        """Execute an API response like the Ultimate EA; returns the actions taken"""
+        taken = []
+        with self._lock:
+            for decision in response.get('portfolio_decisions') or []:
+                action = str(decision.get('action', '')).strip().upper()
+                target = str(decision.get('symbol', '')).strip()
+                if action == 'SCALE_IN' and float(decision.get('add_lots') or 0) > 0:
+                    taken += self._scale_in(target, float(decision['add_lots']), 0.0)
+                elif action == 'SCALE_OUT' and float(decision.get('reduce_lots') or 0) > 0:
+                    taken += self._scale_out(target, float(decision['reduce_lots']))
+                elif action == 'CLOSE':
+                    taken += self._close_symbol(target)
+
+            action = str(response.get('action', '')).strip().upper()
+            symbol = str(response.get('symbol') or symbol).strip()
+            lots = float(response.get('lot_size') or 0) or float(response.get('add_lots') or 0) \
+                or float(response.get('reduce_lots') or 0)
+            stop_loss = float(response.get('stop_loss') or 0)
+            take_profit = float(response.get('take_profit') or 0)
+            held = any(p['symbol'] == symbol for p in self.positions.values())
+
+            if action in ('BUY', 'SELL') and lots > 0 and not held:
+                result = self._open({'symbol': symbol, 'type': action.lower(), 'volume': lots,
+                                     'sl': stop_loss, 'tp': take_profit})
+                if result.get('success'):
+                    taken.append(action)
+            elif action == 'CLOSE':
+                taken += self._close_symbol(symbol)
+            elif action in ('DCA', 'SCALE_IN') and lots > 0:
+                taken += self._scale_in(symbol, lots, stop_loss)
+            elif action == 'SCALE_OUT' and lots > 0:
+                taken += self._scale_out(symbol, lots)
+            elif action == 'MODIFY_SL' and float(response.get('new_sl') or 0) > 0:
+                for p in self.positions.values():
+                    if p['symbol'] == symbol:
+                        p['sl'] = float(response['new_sl'])
+                        taken.append(action)
+        return taken
+
+    def _scale_in(self, symbol: str, lots: float, stop_loss: float) -> List[str]:
+        held = next((p for p in self.positions.values() if p['symbol'] == symbol), None)
+        if held is None:
+            return []
+        result = self._open({'symbol': symbol, 'type': held['type'], 'volume': lots,
+                             'sl': stop_loss or held['sl']})
+        return ['SCALE_IN'] if result.get('success') else []
+
+    def _scale_out(self, symbol: str, lots: float) -> List[str]:
+        held = next((p for p in self.positions.values() if p['symbol'] == symbol), None)
+        if held is None:
+            return []
+        self._close_position(held, lots, reason='scale_out')
+        return ['SCALE_OUT']
+
+    def _close_symbol(self, symbol: str) -> List[str]:
+        closing = [p for p in self.positions.values() if p['symbol'] == symbol]
+        for position in closing:
+            self._close_position(position, reason='ai')
+        return ['CLOSE'] * len(closing)
+
+
+# ═══════════════════════════════════════════════════════════
+# API DRIVER
+# ═══════════════════════════════════════════════════════════
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class EADriver:
+    """
+    Drives /api/ai/trade_decision like the EAs do: on every new base bar, one
+    POST per symbol (`concurrency` at a time - 1 = a single EA scanning its
+    symbols in turn), executing each response on the simulated account.
+    """
+
+    def __init__(self, ea: SimulatedEA, url: str = DEFAULT_API_URL, style: str = 'ultimate',
+                 symbols: Optional[List[str]] = None, concurrency: int = 1, timeout: float = 5.0,
+                 bars_per_second: float = 0.0):
+        """
+        Args:
+            ea: Simulated EA (account, positions, replayed market)
+            url: Decision endpoint
+            style: Payload format - 'ultimate' (AI_Trading_EA_Ultimate) or 'multi' (AI_MultiSymbol_EA)
+            symbols: Symbols to drive (default: all replayed symbols)
+            concurrency: Requests in flight at once
+            timeout: WebRequest timeout in seconds (the EAs use 5000ms)
+            bars_per_second: Replay speed (0 = next bar as soon as the scan finishes)
+        """
+        self.ea = ea
+        self.url = url
+        self.style = style
+        self.symbols = symbols or list(ea.market.symbols)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.bars_per_second = bars_per_second
+
+        self.latencies_ms: List[float] = []
+        self.payload_bytes = 0
+        self.errors = Counter()
+        self.actions = Counter()
+        self.taken = Counter()
+        self.late_bars = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _post(self, symbol: str) -> None:
+        body = json.dumps(self.ea.decision_payload(symbol, self.style)).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as reply:
+                response = json.loads(reply.read().decode('utf-8') or '{}')
+        except urllib.error.HTTPError as e:
+            error = f"HTTP {e.code}"
+        except (urllib.error.URLError, OSError) as e:
+            error = type(getattr(e, 'reason', e)).__name__
+        except ValueError:
+            error = 'invalid JSON'
+        else:
+            error = None
+        latency = (time.perf_counter() - start) * 1000.0
+
+        with self._lock:
+            self.latencies_ms.append(latency)
+            self.payload_bytes += len(body)
+            if error:
+                self.errors[error] += 1
+                return
+            self.actions[str(response.get('action', '?')).upper()] += 1
+        for action in self.ea.apply_decision(response, symbol):
+            with self._lock:
+                self.taken[action] += 1
+
+    def run(self, bars: int) -> Dict:
+        """Replay `bars` base bars through the API; returns report()"""
+        exits = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='EA') as pool:
+            for _ in range(bars):
+                if self.ea.clock() >= self.ea.market.end_time:
+                    break
+                bar_start = time.perf_counter()
+                list(pool.map(self._post, self.symbols))
+                scan = time.perf_counter() - bar_start
+                self.busy_seconds += scan
+
+                if self.bars_per_second:
+                    budget = 1.0 / self.bars_per_second
+                    if scan > budget:
+                        self.late_bars += 1  # API could not keep up with this bar speed
+                    else:
+                        time.sleep(budget - scan)
+                exits += self.ea.advance()
+        self.taken['SL/TP'] += exits
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        latencies = self.latencies_ms
+        requests = len(latencies)
+        return {
+            'requests': requests,
+            'errors': dict(self.errors),
+            'elapsed_s': elapsed,
+            'throughput_rps': requests / self.busy_seconds if self.busy_seconds else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50), 'p90': percentile(latencies, 0.90),
+                'p99': percentile(latencies, 0.99), 'max': max(latencies) if latencies else 0.0,
+                'mean': sum(latencies) / requests if requests else 0.0,
+            },
+            'payload_kb': self.payload_bytes / requests / 1024 if requests else 0.0,
+            'late_bars': self.late_bars,
+            'actions': dict(self.actions),
+            'executed': dict(self.taken),
+            'balance': round(self.ea.balance, 2),
+            'equity': round(self.ea.equity(), 2),
+            'open_positions': len(self.ea.positions),
+        }
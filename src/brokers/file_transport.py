@@ -0,0 +1,362 @@
+"""
+File Transport - Request/response IPC with the MT5 EA through shared files
+
+The original protocol used one ai_command.txt / ai_response.txt pair: a
+global lock serialised every command, the client polled every 100-200ms and
+then slept another 100ms "to let MT5 finish writing". This transport keeps
+files as the medium but removes the fixed waits:
+
+1. Request IDs - every command goes to its own file ({prefix}_cmd_<id>.json)
+   and the EA answers in {prefix}_resp_<id>.json, so many commands can be in
+   flight at once and responses can never be mixed up
+2. Atomic writes - both sides write a temp file and rename it into place, so
+   a *.json file is always complete when it appears
+3. Framed responses - "<length>\\n<json>"; a short body means a writer that
+   does not rename and is simply re-read on the next event (never slept on)
+4. Event driven - inotify on Linux wakes the watcher the moment a response is
+   renamed into the directory; elsewhere an adaptive poll starts at 1ms and
+   backs off to 50ms while requests are pending (idle = no polling). inotify
+   can miss events (queue overflow, SMB/9p mounts), so the directory is also
+   rescanned on IN_Q_OVERFLOW and every quiet 0.5s while requests are pending
+5. Timeouts withdraw the command file if the EA has not picked it up yet, so
+   a late EA never executes a command the caller already gave up on
+
+One watcher thread per directory is shared by every client (see
+get_file_transport()).
+
+EA side: SimpleMT5Bridge.mq5 v2.10+ and MT5_Socket_Server.mq5 v1.20+ serve
+this protocol alongside the legacy single-file one.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from ..utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    """libc handle with inotify, or None where it is unavailable"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1  # Raises AttributeError if missing
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def parse_response(data: bytes) -> Optional[Dict]:
+    """
+    Decode a response file, or None if it is not complete yet.
+
+    Accepts length-framed ("<n>\\n<json>") and bare JSON bodies, with or
+    without a BOM (MT5 writes ANSI, UTF-8 or UTF-16 depending on flags).
+    """
+    if data.startswith(b'\xff\xfe') or data.startswith(b'\xfe\xff'):
+        data = data.decode('utf-16').encode('utf-8')
+    elif data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+
+    header, sep, body = data.partition(b'\n')
+    header = header.strip()
+    if sep and header.isdigit():
+        length = int(header)
+        if len(body) < length:
+            return None  # Writer still going
+        body = body[:length]
+    else:
+        body = data
+
+    try:
+        response = json.loads(body.decode('utf-8', errors='replace'))
+    except ValueError:
+        return None  # Truncated bare JSON
+    return response if isinstance(response, dict) else None
+
+
+class _Pending:
+    __slots__ = ('request_id', 'command_file', 'response_file', 'event', 'response')
+
+    def __init__(self, request_id: str, command_file: Path, response_file: Path):
+        self.request_id = request_id
+        self.command_file = command_file
+        self.response_file = response_file
+        self.event = threading.Event()
+        self.response: Optional[Dict] = None
+
+
+class FileTransport:
+    """
+    Concurrent request/response over files in one directory.
+
+    Usage:
+        transport = get_file_transport(mt5_common_files)
+        response = transport.request({"action": "GET_BARS", ...}, timeout=10)
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        prefix: str = "ai",
+        poll_min: float = 0.001,
+        poll_max: float = 0.05,
+        use_inotify: bool = True,
+    ):
+        """
+        Args:
+            directory: Directory shared with the EA
+            prefix: File name prefix ({prefix}_cmd_<id>.json / {prefix}_resp_<id>.json)
+            poll_min: First poll interval after a request (fallback mode)
+            poll_max: Poll interval cap while requests are pending (fallback mode)
+            use_inotify: Use inotify where available
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+
+        self._cmd_prefix = f"{prefix}_cmd_"
+        self._resp_prefix = f"{prefix}_resp_"
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._inotify_fd = -1
+        libc = _load_inotify() if use_inotify else None
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(self.directory), IN_MOVED_TO | IN_CLOSE_WRITE) >= 0:
+                self._inotify_fd = fd
+            elif fd >= 0:
+                os.close(fd)
+        self.mode = 'inotify' if self._inotify_fd >= 0 else 'poll'
+
+        # Stats
+        self.requests = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=f"FileTransport[{self.directory.name}]", daemon=True)
+        self._thread.start()
+
+        logger.info(f"File transport on {self.directory} ({self.mode})")
+
+    # ═══════════════════════════════════════════════════════════
+    # CLIENT API
+    # ═══════════════════════════════════════════════════════════
+
+    def request(self, command: Dict, timeout: float = 10.0) -> Optional[Dict]:
+        """
+        Send a command and wait for its response.
+
+        Returns:
+            Response dict, or None on timeout
+        """
+        start = time.time()
+        pending = self._submit(command)
+        if pending.event.wait(timeout):
+            latency = time.time() - start
+            with self._lock:
+                self.requests += 1
+                self.total_latency += latency
+            logger.debug(f"Response {pending.request_id} in {latency * 1000:.1f}ms")
+            return pending.response
+
+        with self._lock:
+            self._pending.pop(pending.request_id, None)
+            self.timeouts += 1
+        # Withdraw the command if the EA never picked it up
+        try:
+            pending.command_file.unlink()
+            logger.warning(f"Command {command.get('action', command.get('command'))} timed out (not picked up by EA)")
+        except FileNotFoundError:
+            logger.warning(f"Command {command.get('action', command.get('command'))} timed out (EA did not respond)")
+        return pending.response  # May have landed in the meantime
+
+    def _submit(self, command: Dict) -> _Pending:
+        request_id = uuid.uuid4().hex[:16]
+        pending = _Pending(
+            request_id,
+            self.directory / f"{self._cmd_prefix}{request_id}.json",
+            self.directory / f"{self._resp_prefix}{request_id}.json",
+        )
+        with self._lock:
+            self._pending[request_id] = pending
+
+        payload = dict(command)
+        payload['request_id'] = request_id
+        tmp_path = self.directory / f".{self._cmd_prefix}{request_id}.tmp"
+        # Compact JSON without spaces for EA compatibility
+        tmp_path.write_text(json.dumps(payload, separators=(',', ':')))
+        os.replace(tmp_path, pending.command_file)
+
+        self._wake.set()
+        return pending
+
+    def close(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+        if self._inotify_fd >= 0:
+            os.close(self._inotify_fd)
+            self._inotify_fd = -1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'in_flight': len(self._pending),
+                'requests': self.requests,
+                'timeouts': self.timeouts,
+                'avg_latency_ms': self.total_latency / self.requests * 1000 if self.requests else 0.0,
+            }
+
+    # ═══════════════════════════════════════════════════════════
+    # WATCHER
+    # ═══════════════════════════════════════════════════════════
+
+    def _deliver(self, name: str):
+        """Hand a response file to its waiter (or drop it if nobody is waiting)"""
+        if not (name.startswith(self._resp_prefix) and name.endswith('.json')):
+            return
+        request_id = name[len(self._resp_prefix):-len('.json')]
+        path = self.directory / name
+        with self._lock:
+            pending = self._pending.get(request_id)
+        if pending is None:
+            self._drop_orphan(path)
+            return
+
+        try:
+            response = parse_response(path.read_bytes())
+        except FileNotFoundError:
+            return
+        if response is None:
+            return  # Incomplete - the next write/close event re-delivers it
+
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._pending.pop(request_id, None)
+        pending.response = response
+        pending.event.set()
+
+    def _drop_orphan(self, path: Path, max_age: float = 60.0):
+        """Remove responses to requests that already timed out"""
+        try:
+            if time.time() - path.stat().st_mtime > max_age:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        try:
+            with os.scandir(self.directory) as entries:
+                names = [e.name for e in entries if e.name.startswith(self._resp_prefix)]
+        except FileNotFoundError:
+            return
+        for name in names:
+            self._deliver(name)
+
+    def _run(self):
+        self._scan()  # Anything that arrived before we started watching
+        if self._inotify_fd >= 0:
+            self._run_inotify()
+        else:
+            self._run_poll()
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._inotify_fd], [], [], 0.5)
+            if not ready:
+                with self._lock:
+                    waiting = bool(self._pending)
+                if waiting:
+                    self._scan()  # Safety net for missed events (network mounts, watch-setup race)
+                continue
+            try:
+                data = os.read(self._inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            overflow = False
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name:
+                    self._deliver(name)
+            if overflow:
+                logger.warning("inotify queue overflowed - rescanning the response directory")
+                self._scan()
+
+    def _run_poll(self):
+        interval = self.poll_min
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._pending
+            if idle:
+                self._wake.wait(1.0)  # Nothing in flight - sleep until a request is submitted
+                self._wake.clear()
+                interval = self.poll_min
+                continue
+
+            before = len(self._pending)
+            self._scan()
+            if len(self._pending) < before:
+                interval = self.poll_min  # EA is responding - stay tight
+            else:
+                interval = min(interval * 2, self.poll_max)
+
+            if self._wake.wait(interval):
+                self._wake.clear()
+                interval = self.poll_min
+
+
+# ═══════════════════════════════════════════════════════════
+# SHARED TRANSPORTS
+# ═══════════════════════════════════════════════════════════
+
+_transports: Dict[tuple, FileTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_file_transport(directory: Union[str, Path], prefix: str = "ai") -> FileTransport:
+    """Shared transport for a directory (one watcher thread per directory and prefix)"""
+    key = (os.path.abspath(directory), prefix)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = FileTransport(directory, prefix=prefix)
+            _transports[key] = transport
+        return transport
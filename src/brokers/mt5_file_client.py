@@ -2,15 +2,14 @@
 MT5 File Client - Connects to MT5 via file-based communication
 Works on macOS by communicating with MT5 Expert Advisor via shared files
 """
-import json
-import time
-import os
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
+from .file_transport import get_file_transport
+from ..data.bar_cache import BarCache
 from ..utils.logger import get_logger
 
 
@@ -43,11 +42,13 @@ class MT5FileClient:
     """
     File-based client for MT5 connection
     Communicates with MT5 Expert Advisor via shared files
+    (MT5_Socket_Server.mq5 v1.20+: ai_cmd_<id>.json / ai_resp_<id>.json)
     """
 
-    def __init__(self, timeout: int = 5):
+    def __init__(self, timeout: int = 5, bar_cache: Optional[BarCache] = None):
         self.timeout = timeout
         self.connected = False
+        self.bar_cache = bar_cache or BarCache()
 
         # MQL5/Files directory (default for file operations without FILE_COMMON)
         self.mt5_files_path = Path.home() / "Library" / "Application Support" / \
@@ -57,12 +58,11 @@ class MT5FileClient:
         # Ensure directory exists
         self.mt5_files_path.mkdir(parents=True, exist_ok=True)
 
-        self.command_file = self.mt5_files_path / "ai_command.txt"
-        self.response_file = self.mt5_files_path / "ai_response.txt"
+        # Request-id command/response files, watched by one shared thread
+        self.transport = get_file_transport(self.mt5_files_path)
 
         logger.info(f"Initialized MT5 File Client")
-        logger.info(f"Command file: {self.command_file}")
-        logger.info(f"Response file: {self.response_file}")
+        logger.info(f"Files: {self.mt5_files_path} ({self.transport.mode})")
 
     def connect(self) -> Tuple[bool, str]:
         """
@@ -90,16 +90,8 @@ class MT5FileClient:
             return False, str(e)
 
     def disconnect(self):
-        """Disconnect (cleanup files)"""
+        """Disconnect (timed-out commands are withdrawn by the transport)"""
         self.connected = False
-        # Clean up files
-        try:
-            if self.command_file.exists():
-                self.command_file.unlink()
-            if self.response_file.exists():
-                self.response_file.unlink()
-        except:
-            pass
         logger.info("Disconnected from MT5")
 
     def _send_command(self, command: Dict, retries: int = 3) -> Optional[Dict]:
@@ -115,44 +107,12 @@ class MT5FileClient:
         """
         for attempt in range(retries):
             try:
-                # Delete old response file if exists
-                if self.response_file.exists():
-                    self.response_file.unlink()
-
-                # Write command to file
-                command_json = json.dumps(command)
-                self.command_file.write_text(command_json)
-
-                logger.debug(f"Sent command: {command_json}")
-
-                # Wait for response file
-                start_time = time.time()
-                while time.time() - start_time < self.timeout:
-                    if self.response_file.exists():
-                        # Give MT5 a moment to finish writing
-                        time.sleep(0.1)
-
-                        # Read response (try different encodings)
-                        try:
-                            response_text = self.response_file.read_text(encoding='utf-8-sig')  # Handles BOM
-                        except:
-                            try:
-                                response_text = self.response_file.read_text(encoding='utf-16-le')
-                            except:
-                                response_text = self.response_file.read_text(encoding='latin-1')
+                logger.debug(f"Sent command: {command}")
+                response = self.transport.request(command, timeout=self.timeout)
 
-                        if response_text:
-                            # Strip any remaining BOM or whitespace
-                            response_text = response_text.strip('\ufeff').strip()
-                            response = json.loads(response_text)
-                            logger.debug(f"Received response: {response_text}")
-
-                            # Clean up
-                            self.response_file.unlink()
-
-                            return response
-
-                    time.sleep(0.1)
+                if response is not None:
+                    logger.debug(f"Received response: {response}")
+                    return response
 
                 logger.warning(f"Timeout waiting for response (attempt {attempt + 1}/{retries})")
 
@@ -362,6 +322,21 @@ class MT5FileClient:
         symbol: str,
         timeframe: str = "H1",
         count: int = 100,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get historical rates through the bar cache
+
+        Repeated reads within bar_cache.max_age are served from memory; later
+        ones only fetch the bars that can have changed since.
+        """
+        return self.bar_cache.get(symbol, timeframe, count,
+                                  lambda n, since: self._fetch_rates(symbol, timeframe, n))
+
+    def _fetch_rates(
+        self,
+        symbol: str,
+        timeframe: str = "H1",
+        count: int = 100,
     ) -> Optional[pd.DataFrame]:
         """
         Get historical rates directly from MT5
@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from ..data.bar_cache import BarCache
 from ..utils.logger import get_logger
 
 
@@ -47,11 +48,13 @@ class MT5HybridConnector:
     macOS: Uses alternative connection methods
     """
 
-    def __init__(self, account: Optional[int] = None, password: Optional[str] = None, server: Optional[str] = None):
+    def __init__(self, account: Optional[int] = None, password: Optional[str] = None, server: Optional[str] = None,
+                 bar_cache: Optional[BarCache] = None):
         self.account = account
         self.password = password
         self.server = server
         self.connected = False
+        self.bar_cache = bar_cache or BarCache()
         self.is_windows = sys.platform == "win32"
         self.mt5 = None
 
@@ -259,6 +262,21 @@ class MT5HybridConnector:
         symbol: str,
         timeframe: str = "1H",
         count: int = 100,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get historical rates through the bar cache
+
+        Repeated reads within bar_cache.max_age are served from memory; later
+        ones only fetch the bars that can have changed since.
+        """
+        return self.bar_cache.get(symbol, timeframe, count,
+                                  lambda n, since: self._fetch_rates(symbol, timeframe, n))
+
+    def _fetch_rates(
+        self,
+        symbol: str,
+        timeframe: str = "1H",
+        count: int = 100,
     ) -> Optional[pd.DataFrame]:
         """Get historical rates"""
         if not self.connected:
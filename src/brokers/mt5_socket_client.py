@@ -1,19 +1,75 @@
 """
 MT5 Socket Client - Connects to MT5 via socket bridge
 Works on macOS by communicating with MT5 Expert Advisor
+
+Wire protocol (one persistent TCP connection, many requests in flight):
+1. Framing - every message is a 4-byte big-endian length followed by that
+   many bytes of UTF-8 JSON (no re-parsing of partial buffers)
+2. Multiplexing - requests carry an integer "request_id" and the server
+   echoes it, so responses may come back in any order and commands are
+   pipelined instead of waiting for each other
+3. Reconnect - a dropped connection fails its in-flight requests and the
+   next request reconnects with exponential backoff (capped at max_backoff)
+
+MT5SocketClient is the threaded client, AsyncMT5SocketClient the asyncio one.
+MT5StandInServer (mt5_standin.py) implements the server side for tests and
+benchmark_mt5_socket.py.
 """
+import asyncio
+import itertools
 import socket
+import struct
 import json
+import threading
+import time
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from ..data.bar_cache import BarCache
 from ..utils.logger import get_logger
 
 
 logger = get_logger(__name__)
 
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024  # Refuse absurd lengths from a corrupt stream
+
+
+def encode_frame(message: Dict) -> bytes:
+    """Length-prefixed JSON frame"""
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_frame(payload: bytes) -> Dict:
+    return json.loads(payload.decode('utf-8'))
+
+
+class Backoff:
+    """Exponential reconnect backoff shared by the sync and async clients"""
+
+    def __init__(self, initial: float = 0.25, maximum: float = 30.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+        self.next_attempt = 0.0
+
+    def ready(self) -> bool:
+        return time.monotonic() >= self.next_attempt
+
+    def wait_time(self) -> float:
+        return max(0.0, self.next_attempt - time.monotonic())
+
+    def failed(self):
+        self.delay = min(self.maximum, self.delay * 2 if self.delay else self.initial)
+        self.next_attempt = time.monotonic() + self.delay
+
+    def succeeded(self):
+        self.delay = 0.0
+        self.next_attempt = 0.0
+
 
 @dataclass
 class Position:
@@ -37,18 +93,132 @@ class Tick:
     ask: float
 
 
+class _Pending:
+    __slots__ = ('event', 'response', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response: Optional[Dict] = None
+        self.error: Optional[Exception] = None
+
+
+class _Connection:
+    """One persistent framed socket with a reader thread dispatching by request_id"""
+
+    def __init__(self, host: str, port: int, connect_timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(None)  # Reader blocks; callers time out on their own events
+        self.pending: Dict[int, _Pending] = {}
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, name=f"MT5Socket[{host}:{port}]", daemon=True)
+        self.reader.start()
+
+    def send(self, request_id: int, frame: bytes) -> _Pending:
+        pending = _Pending()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError("connection closed")
+            self.pending[request_id] = pending
+        try:
+            with self.send_lock:
+                self.sock.sendall(frame)
+        except OSError as e:
+            self._fail(e)
+            raise ConnectionError(str(e)) from e
+        return pending
+
+    def forget(self, request_id: int):
+        with self.lock:
+            self.pending.pop(request_id, None)
+
+    def in_flight(self) -> int:
+        return len(self.pending)
+
+    def _recv_exact(self, n: int) -> bytes:
+        buf = bytearray(n)
+        view = memoryview(buf)
+        got = 0
+        while got < n:
+            read = self.sock.recv_into(view[got:], n - got)
+            if read == 0:
+                raise ConnectionError("connection closed by server")
+            got += read
+        return bytes(buf)
+
+    def _read_loop(self):
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(self._recv_exact(FRAME_HEADER.size))
+                if length > MAX_FRAME_SIZE:
+                    raise ConnectionError(f"frame of {length} bytes exceeds limit")
+                response = decode_frame(self._recv_exact(length))
+                with self.lock:
+                    pending = self.pending.pop(response.get('request_id'), None)
+                if pending is not None:
+                    pending.response = response
+                    pending.event.set()
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error: Exception):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        for p in pending.values():
+            p.error = error
+            p.event.set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Wakes the reader and tells the server
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        if not isinstance(error, ConnectionAbortedError):
+            logger.warning(f"MT5 socket connection lost: {error}")
+
+    def close(self):
+        self._fail(ConnectionAbortedError("closed by client"))
+
+
 class MT5SocketClient:
     """
     Socket client for MT5 connection
     Connects to MT5 Expert Advisor running socket server
+
+    Thread-safe: any number of threads can have requests in flight on the
+    pooled connections at once.
     """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 9090, timeout: int = 5):
+    def __init__(self, host: str = "127.0.0.1", port: int = 9090, timeout: int = 5,
+                 pool_size: int = 1, max_backoff: float = 30.0, bar_cache: Optional[BarCache] = None):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            timeout: Seconds to wait for a response (also the connect timeout)
+            pool_size: Persistent connections to spread requests over
+            max_backoff: Cap on the reconnect backoff in seconds
+            bar_cache: Incremental bar cache for get_rates (default: in-memory)
+        """
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.pool_size = max(1, pool_size)
         self.connected = False
 
+        self._connections: List[Optional[_Connection]] = [None] * self.pool_size
+        self._pool_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._backoff = Backoff(maximum=max_backoff)
+        self.bar_cache = bar_cache or BarCache()
+
         logger.info(f"Initialized MT5 Socket Client (will connect to {host}:{port})")
 
     def connect(self) -> Tuple[bool, str]:
@@ -77,10 +247,73 @@ class MT5SocketClient:
             return False, str(e)
 
     def disconnect(self):
-        """Disconnect (nothing to do for stateless socket)"""
+        """Close the pooled connections"""
         self.connected = False
+        with self._pool_lock:
+            connections, self._connections = self._connections, [None] * self.pool_size
+        for conn in connections:
+            if conn is not None:
+                conn.close()
         logger.info("Disconnected from MT5")
 
+    def _connection(self) -> _Connection:
+        """Least busy open connection, (re)connecting a free slot if the backoff allows"""
+        with self._pool_lock:
+            live = [c for c in self._connections if c is not None and not c.closed]
+            if len(live) == self.pool_size:
+                return min(live, key=_Connection.in_flight)
+            if not self._backoff.ready():
+                if live:
+                    return min(live, key=_Connection.in_flight)
+                raise ConnectionError(f"reconnecting in {self._backoff.wait_time():.1f}s")
+            slot = next(i for i, c in enumerate(self._connections) if c is None or c.closed)
+            try:
+                conn = _Connection(self.host, self.port, self.timeout)
+            except OSError as e:
+                self._backoff.failed()
+                if live:
+                    return min(live, key=_Connection.in_flight)
+                raise ConnectionError(str(e)) from e
+            self._backoff.succeeded()
+            self._connections[slot] = conn
+            return conn
+
+    def submit(self, command: Dict) -> Tuple[_Connection, int, _Pending]:
+        """Send a command without waiting (pipelining) - pass the result to wait()"""
+        request_id = next(self._ids)
+        message = dict(command)
+        message['request_id'] = request_id
+        conn = self._connection()
+        return conn, request_id, conn.send(request_id, encode_frame(message))
+
+    def wait(self, handle: Tuple[_Connection, int, _Pending], timeout: Optional[float] = None) -> Optional[Dict]:
+        """Response for a submitted command (None on timeout); raises ConnectionError if the link dropped"""
+        conn, request_id, pending = handle
+        if not pending.event.wait(self.timeout if timeout is None else timeout):
+            conn.forget(request_id)
+            raise socket.timeout(f"no response to request {request_id}")
+        if pending.error is not None:
+            raise ConnectionError(str(pending.error))
+        return pending.response
+
+    def request_many(self, commands: List[Dict]) -> List[Optional[Dict]]:
+        """Pipeline several commands and collect their responses (None for failures)"""
+        handles = []
+        for command in commands:
+            try:
+                handles.append(self.submit(command))
+            except ConnectionError as e:
+                logger.warning(f"Socket error: {e}")
+                handles.append(None)
+        results = []
+        for handle in handles:
+            try:
+                results.append(self.wait(handle) if handle else None)
+            except (ConnectionError, socket.timeout) as e:
+                logger.warning(f"Socket error: {e}")
+                results.append(None)
+        return results
+
     def _send_command(self, command: Dict, retries: int = 3) -> Optional[Dict]:
         """
         Send command to MT5 socket server
@@ -94,50 +327,18 @@ class MT5SocketClient:
         """
         for attempt in range(retries):
             try:
-                # Create socket
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(self.timeout)
-
-                # Connect
-                sock.connect((self.host, self.port))
-
-                # Send command as JSON
-                command_json = json.dumps(command)
-                sock.sendall(command_json.encode('utf-8'))
-
-                # Receive response
-                response_data = b""
-                while True:
-                    chunk = sock.recv(4096)
-                    if not chunk:
-                        break
-                    response_data += chunk
-
-                    # Try to parse JSON (check if complete)
-                    try:
-                        response = json.loads(response_data.decode('utf-8'))
-                        sock.close()
-                        return response
-                    except json.JSONDecodeError:
-                        # Not complete yet, continue reading
-                        continue
-
-                sock.close()
-
-                # Try to parse final response
-                if response_data:
-                    return json.loads(response_data.decode('utf-8'))
-
-                return None
+                return self.wait(self.submit(command))
 
             except socket.timeout:
                 logger.warning(f"Socket timeout (attempt {attempt + 1}/{retries})")
                 if attempt == retries - 1:
                     return None
 
-            except ConnectionRefusedError:
-                logger.error("Connection refused - Is MT5 EA running?")
-                return None
+            except ConnectionError as e:
+                if attempt == retries - 1:
+                    logger.error(f"Connection failed - Is MT5 EA running? ({e})")
+                    return None
+                time.sleep(min(self._backoff.wait_time(), self.timeout))
 
             except Exception as e:
                 logger.error(f"Socket error: {e}")
@@ -320,6 +521,21 @@ class MT5SocketClient:
         symbol: str,
         timeframe: str = "H1",
         count: int = 100,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get historical rates through the bar cache
+
+        Repeated reads within bar_cache.max_age are served from memory; later
+        ones only fetch the bars that can have changed since.
+        """
+        return self.bar_cache.get(symbol, timeframe, count,
+                                  lambda n, since: self._fetch_rates(symbol, timeframe, n))
+
+    def _fetch_rates(
+        self,
+        symbol: str,
+        timeframe: str = "H1",
+        count: int = 100,
     ) -> Optional[pd.DataFrame]:
         """
         Get historical rates
@@ -390,3 +606,122 @@ class MT5SocketClient:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
         self.disconnect()
+
+
+class AsyncMT5SocketClient:
+    """
+    asyncio variant of the framed, multiplexed MT5 socket client.
+
+    Usage:
+        client = AsyncMT5SocketClient()
+        response = await client.request({"command": "get_account"})
+        responses = await client.request_many([...])   # pipelined
+        await client.close()
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9090, timeout: float = 5.0,
+                 max_backoff: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._backoff = Backoff(maximum=max_backoff)
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self):
+        if self.connected:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if not self._backoff.ready():
+                raise ConnectionError(f"reconnecting in {self._backoff.wait_time():.1f}s")
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                self._backoff.failed()
+                raise ConnectionError(str(e) or 'connect timeout') from e
+            sock = self._writer.get_extra_info('socket')
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._backoff.succeeded()
+            self._read_task = asyncio.ensure_future(self._read_loop(self._reader))
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                if length > MAX_FRAME_SIZE:
+                    raise ConnectionError(f"frame of {length} bytes exceeds limit")
+                response = decode_frame(await reader.readexactly(length))
+                future = self._pending.pop(response.get('request_id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, asyncio.IncompleteReadError):
+                logger.warning(f"MT5 socket connection lost: {e}")
+            self._fail(ConnectionError(str(e) or 'connection closed by server'))
+
+    def _fail(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+    async def request(self, command: Dict, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Send a command and await its response.
+
+        Returns None on timeout; raises ConnectionError if the server is unreachable
+        or the connection drops while waiting.
+        """
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        message = dict(command)
+        message['request_id'] = request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(encode_frame(message))
+            await self._writer.drain()
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Socket timeout (request {request_id})")
+            return None
+        except OSError as e:
+            self._fail(ConnectionError(str(e)))
+            raise ConnectionError(str(e)) from e
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def request_many(self, commands: List[Dict]) -> List[Optional[Dict]]:
+        """Pipeline several commands; failures come back as None"""
+        results = await asyncio.gather(*(self.request(c) for c in commands), return_exceptions=True)
+        return [None if isinstance(r, BaseException) else r for r in results]
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._read_task = None
+        self._fail(ConnectionAbortedError("closed by client"))
@@ -0,0 +1,433 @@
+"""
+MT5 Stand-In - Local EA replacement for tests and benchmarks
+
+Speaks the framed socket protocol of MT5SocketClient (see
+mt5_socket_client.py) without a MetaTrader terminal:
+
+1. SyntheticMarket - deterministic prices per symbol (the same bar always has
+   the same OHLC, and the forming bar keeps moving), so repeated fetches and
+   caches can be checked against each other
+2. MT5StandIn - command handler for both vocabularies the clients use
+   ("command": "get_account" ... and "action": "GET_BARS" ...), with
+   simulated fills, positions and P&L
+3. MT5StandInServer - asyncio TCP server on a background thread; every
+   request is handled as its own task, so pipelined requests overlap like
+   they would against a real EA. `latency` adds per-command EA processing time
+4. MT5StandInFileServer - the EA side of the request-id file protocol
+   (file_transport.py), for MT5DataFetcher / MT5FileClient
+
+Usage:
+    with MT5StandInServer(latency=0.002) as server:
+        client = MT5SocketClient(port=server.port)
+
+    with MT5StandInFileServer(tmp_dir) as ea:
+        fetcher = MT5DataFetcher(files_dir=tmp_dir)
+"""
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from .mt5_socket_client import FRAME_HEADER, MAX_FRAME_SIZE, decode_frame, encode_frame
+from ..data.bars_bulk import TIMEFRAME_SECONDS, bars_to_columns, decode_requests
+from ..utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# (symbol prefix, base price, spread in price units, contract size)
+SYMBOL_SPECS = [
+    ('US30', 44000.0, 2.0, 1.0),
+    ('US100', 21000.0, 1.5, 1.0),
+    ('US500', 6000.0, 0.5, 1.0),
+    ('XAU', 2650.0, 0.3, 100.0),
+    ('USOIL', 70.0, 0.03, 1000.0),
+    ('EURUSD', 1.08, 0.00008, 100000.0),
+    ('GBPUSD', 1.27, 0.0001, 100000.0),
+    ('USDJPY', 150.0, 0.01, 1000.0),
+]
+DEFAULT_SPEC = ('', 100.0, 0.02, 1.0)
+
+
+def _noise(symbol: str, key: int, salt: str = '') -> float:
+    """Deterministic uniform [0, 1) per symbol and key"""
+    return zlib.crc32(f"{symbol}:{salt}:{key}".encode()) / 4294967296.0
+
+
+class SyntheticMarket:
+    """
+    Deterministic intraday-looking price paths.
+
+    price(symbol, t) is a sum of slow waves plus per-minute noise, so bars are
+    reproducible for any (symbol, timeframe, open time).
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, clock: Callable[[], float] = time.time):
+        self.symbols = symbols or ['US30', 'US100', 'US500', 'XAUUSD', 'EURUSD', 'GBPUSD', 'USDJPY', 'USOIL']
+        self.clock = clock
+
+    @staticmethod
+    def spec(symbol: str) -> tuple:
+        upper = symbol.upper()
+        for spec in SYMBOL_SPECS:
+            if upper.startswith(spec[0]):
+                return spec
+        return DEFAULT_SPEC
+
+    def digits(self, symbol: str) -> int:
+        return 2 if self.spec(symbol)[1] >= 50 else 5
+
+    def price(self, symbol: str, t: float) -> float:
+        base = self.spec(symbol)[1]
+        phase = _noise(symbol, 0, 'phase') * 2 * math.pi
+        wave = (0.010 * math.sin(2 * math.pi * t / 86400 + phase)
+                + 0.004 * math.sin(2 * math.pi * t / 14400 + 2 * phase)
+                + 0.0015 * math.sin(2 * math.pi * t / 2700 + 3 * phase))
+        jitter = 0.0006 * (_noise(symbol, int(t // 60)) - 0.5)
+        return round(base * (1 + wave + jitter), self.digits(symbol))
+
+    def tick(self, symbol: str, t: Optional[float] = None) -> Dict:
+        t = self.clock() if t is None else t
+        bid = self.price(symbol, t)
+        spread = self.spec(symbol)[2]
+        return {'symbol': symbol, 'time': int(t), 'bid': bid, 'ask': round(bid + spread, self.digits(symbol))}
+
+    def bar(self, symbol: str, seconds: int, open_time: int, now: float) -> Dict:
+        close_time = min(open_time + seconds, now)  # Forming bar closes at "now"
+        o = self.price(symbol, open_time)
+        c = self.price(symbol, close_time)
+        wiggle = self.spec(symbol)[1] * 0.0004 * math.sqrt(seconds / 60)
+        digits = self.digits(symbol)
+        return {
+            'time': open_time,
+            'open': o,
+            'high': round(max(o, c) + wiggle * _noise(symbol, open_time, f'h{seconds}'), digits),
+            'low': round(min(o, c) - wiggle * _noise(symbol, open_time, f'l{seconds}'), digits),
+            'close': c,
+            'volume': int(100 + 900 * _noise(symbol, open_time, f'v{seconds}')),
+        }
+
+    def bars(self, symbol: str, timeframe: str, count: int, since: Optional[int] = None) -> List[Dict]:
+        """Last `count` bars, oldest first, ending with the forming bar (optionally only bars opened at/after since)"""
+        seconds = TIMEFRAME_SECONDS.get(timeframe.upper(), 3600)
+        now = self.clock()
+        current = int(now // seconds) * seconds
+        first = current - (max(1, count) - 1) * seconds
+        if since is not None:
+            first = max(first, (int(since) // seconds) * seconds)
+        return [self.bar(symbol, seconds, t, now) for t in range(first, current + 1, seconds)]
+
+
+class MT5StandIn:
+    """
+    EA command handler with simulated account and positions.
+
+    handle(command) returns the response dict the EA would send; it accepts
+    both the "command": "get_*" and the "action": "GET_*" vocabularies.
+    """
+
+    def __init__(self, market: Optional[SyntheticMarket] = None, balance: float = 100000.0,
+                 leverage: int = 100):
+        self.market = market or SyntheticMarket()
+        self.balance = balance
+        self.leverage = leverage
+        self.positions: Dict[int, Dict] = {}
+        self._tickets = 100000
+        self._lock = threading.Lock()
+
+        self.handlers: Dict[str, Callable[[Dict], Dict]] = {
+            'get_account': self._account,
+            'get_account_info': self._account,
+            'get_tick': self._tick,
+            'get_prices': self._prices,
+            'get_symbols': self._symbols,
+            'get_positions': self._positions,
+            'open_trade': self._open,
+            'open_position': self._open,
+            'close_trade': self._close,
+            'close_position': self._close,
+            'get_rates': self._rates,
+            'get_bars': self._rates,
+            'get_bars_bulk': self._bars_bulk,
+        }
+        self.commands = 0
+
+    def handle(self, command: Dict) -> Dict:
+        name = str(command.get('command') or command.get('action') or '').lower()
+        handler = self.handlers.get(name)
+        with self._lock:
+            self.commands += 1
+            if handler is None:
+                return {'success': False, 'error': 'Unknown command'}
+            try:
+                return handler(command)
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+
+    # ═══════════════════════════════════════════════════════════
+    # ACCOUNT / POSITIONS
+    # ═══════════════════════════════════════════════════════════
+
+    def _position_profit(self, position: Dict) -> float:
+        tick = self.market.tick(position['symbol'])
+        contract = self.market.spec(position['symbol'])[3]
+        if position['type'] == 'buy':
+            move = tick['bid'] - position['open_price']
+        else:
+            move = position['open_price'] - tick['ask']
+        return round(move * position['volume'] * contract, 2)
+
+    def _account(self, command: Dict) -> Dict:
+        profit = sum(self._position_profit(p) for p in self.positions.values())
+        margin = sum(p['open_price'] * p['volume'] * self.market.spec(p['symbol'])[3] / self.leverage
+                     for p in self.positions.values())
+        equity = self.balance + profit
+        return {
+            'success': True, 'status': 'success', 'action': 'GET_ACCOUNT_INFO',
+            'balance': round(self.balance, 2), 'equity': round(equity, 2),
+            'margin': round(margin, 2), 'free_margin': round(equity - margin, 2),
+            'margin_free': round(equity - margin, 2), 'profit': round(profit, 2),
+            'leverage': self.leverage, 'login': 1,
+        }
+
+    def _positions(self, command: Dict) -> Dict:
+        positions = []
+        for p in self.positions.values():
+            positions.append({**p, 'price_open': p['open_price'], 'profit': self._position_profit(p)})
+        return {'success': True, 'positions': positions}
+
+    def _open(self, command: Dict) -> Dict:
+        symbol = command['symbol']
+        side = str(command.get('type') or command.get('direction') or 'buy').lower()
+        volume = float(command.get('volume') or command.get('lots') or 0)
+        if side not in ('buy', 'sell') or volume <= 0:
+            return {'success': False, 'error': 'Invalid order'}
+        tick = self.market.tick(symbol)
+        price = tick['ask'] if side == 'buy' else tick['bid']
+        self._tickets += 1
+        self.positions[self._tickets] = {
+            'ticket': self._tickets, 'symbol': symbol, 'type': side, 'volume': volume,
+            'open_price': price, 'sl': float(command.get('sl') or 0), 'tp': float(command.get('tp') or 0),
+            'time': tick['time'],
+        }
+        return {'success': True, 'ticket': self._tickets, 'price': price}
+
+    def _close(self, command: Dict) -> Dict:
+        position = self.positions.get(int(command.get('ticket', 0)))
+        if position is None:
+            return {'success': False, 'error': 'Position not found'}
+        profit = self._position_profit(position)
+        self.balance += profit
+        del self.positions[position['ticket']]
+        return {'success': True, 'ticket': position['ticket'], 'profit': profit}
+
+    # ═══════════════════════════════════════════════════════════
+    # MARKET DATA
+    # ═══════════════════════════════════════════════════════════
+
+    def _tick(self, command: Dict) -> Dict:
+        return {'success': True, **self.market.tick(command['symbol'])}
+
+    def _prices(self, command: Dict) -> Dict:
+        return {'success': True, 'prices': {s: self.market.tick(s)['bid'] for s in command.get('symbols', [])}}
+
+    def _symbols(self, command: Dict) -> Dict:
+        return {'success': True, 'symbols': list(self.market.symbols)}
+
+    def _rates(self, command: Dict) -> Dict:
+        symbol = command['symbol']
+        timeframe = command.get('timeframe', 'H1')
+        bars = self.market.bars(symbol, timeframe, int(command.get('count', 100)))
+        return {'success': True, 'symbol': symbol, 'timeframe': timeframe, 'count': len(bars), 'bars': bars}
+
+    def _bars_bulk(self, command: Dict) -> Dict:
+        results = []
+        for request in decode_requests(command.get('requests', '')):
+            bars = self.market.bars(request.symbol, request.timeframe, request.count, since=request.since or None)
+            results.append({'symbol': request.symbol, 'timeframe': request.timeframe, 'success': True,
+                            **bars_to_columns(bars[-request.count:])})
+        return {'success': True, 'results': results}
+
+
+class MT5StandInServer:
+    """
+    Framed-protocol TCP server for an MT5StandIn, running on its own thread.
+
+    Commands are handled one at a time across all connections, like the EA's
+    single-threaded OnTimer loop: pipelining saves round-trips, not EA time.
+    """
+
+    def __init__(self, standin: Optional[MT5StandIn] = None, host: str = '127.0.0.1',
+                 port: int = 0, latency: float = 0.0):
+        """
+        Args:
+            standin: Command handler (default: fresh MT5StandIn)
+            host: Bind address
+            port: Bind port (0 = pick a free one, see .port)
+            latency: Simulated EA processing time per command in seconds
+        """
+        self.standin = standin or MT5StandIn()
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connections = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._ea_lock: Optional[asyncio.Lock] = None  # One command at a time (created on the loop)
+
+    def start(self) -> int:
+        """Start serving; returns the bound port"""
+        self._thread = threading.Thread(target=self._run, name='MT5StandInServer', daemon=True)
+        self._thread.start()
+        self._started.wait(5.0)
+        logger.info(f"MT5 stand-in listening on {self.host}:{self.port}")
+        return self.port
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5.0)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    async def _shutdown(self):
+        self._server.close()
+        for task, writer in list(self._clients.items()):
+            writer.close()  # Client loops end on EOF - cancelling them upsets asyncio.streams
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ea_lock = asyncio.Lock()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_client, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        client = asyncio.current_task()
+        self._clients[client] = writer
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                if length > MAX_FRAME_SIZE:
+                    break
+                command = decode_frame(await reader.readexactly(length))
+                task = asyncio.ensure_future(self._reply(command, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            self._clients.pop(client, None)
+
+    async def _reply(self, command: Dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        async with self._ea_lock:  # FIFO, so pipelined commands run in arrival order
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            response = self.standin.handle(command)
+        if 'request_id' in command:
+            response = {**response, 'request_id': command['request_id']}
+        async with write_lock:
+            writer.write(encode_frame(response))
+            await writer.drain()
+
+
+class MT5StandInFileServer:
+    """
+    EA side of the request-id file protocol: answers {prefix}_cmd_<id>.json
+    with framed {prefix}_resp_<id>.json (temp file + rename), polling the
+    directory like the EA's millisecond timer.
+    """
+
+    def __init__(self, directory: Union[str, Path], standin: Optional[MT5StandIn] = None,
+                 prefix: str = 'ai', interval: float = 0.005, latency: float = 0.0):
+        """
+        Args:
+            directory: Directory shared with the client
+            standin: Command handler (default: fresh MT5StandIn)
+            prefix: File name prefix used by the client transport
+            interval: Seconds between directory scans (the EA timer period)
+            latency: Simulated EA processing time per command in seconds
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.standin = standin or MT5StandIn()
+        self.prefix = prefix
+        self.interval = interval
+        self.latency = latency
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='MT5StandInFileServer', daemon=True)
+        self._thread.start()
+        logger.info(f"MT5 stand-in serving files in {self.directory}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        cmd_prefix = f"{self.prefix}_cmd_"
+        while not self._stop.wait(self.interval):
+            try:
+                names = sorted(n for n in os.listdir(self.directory)
+                               if n.startswith(cmd_prefix) and n.endswith('.json'))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                self._serve(name, name[len(cmd_prefix):-len('.json')])
+
+    def _serve(self, name: str, request_id: str):
+        path = self.directory / name
+        try:
+            command = json.loads(path.read_text())
+            path.unlink()
+        except (FileNotFoundError, ValueError):
+            return
+        if self.latency:
+            time.sleep(self.latency)
+
+        body = json.dumps(self.standin.handle(command), separators=(',', ':')).encode('utf-8')
+        tmp_path = self.directory / f"{self.prefix}_resp_{request_id}.tmp"
+        tmp_path.write_bytes(str(len(body)).encode() + b'\r\n' + body)  # MQL5 text mode writes \r\n
+        os.replace(tmp_path, self.directory / f"{self.prefix}_resp_{request_id}.json")
@@ -0,0 +1,233 @@
+"""
+Bar Cache - Incremental per-(symbol, timeframe) OHLCV cache
+
+Scanners re-read the same 100-bar windows every 60-180s although at most a
+bar or two has changed. BarCache keeps each series and only asks the source
+for what can have changed:
+
+1. Fresh hits - a series fetched less than `max_age` seconds ago is served
+   straight from memory (no EA round-trip)
+2. Incremental - otherwise only the bars that can have opened since the last
+   fetch are requested, plus the newest cached bar (it may still have been
+   forming), using a since-cursor where the source supports one
+3. Forming bar - fetched bars replace cached bars with the same or a later
+   open time, so the forming bar is always overwritten by its newer state
+4. Elapsed time, not wall clock - MT5 bar times are broker server time, so how
+   many bars can be new is derived from the time since the last fetch
+5. Parquet tier (optional) - series persist to <dir>/<symbol>_<tf>.parquet and
+   are reloaded on start, so a restart only fetches the gap
+
+Usage:
+    cache = BarCache(parquet_dir='cache/bars')
+    df = cache.get('EURUSD', 'H1', 100, lambda count, since: fetch(count, since))
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from src.data.bars_bulk import TIMEFRAME_SECONDS
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BarFetch(NamedTuple):
+    """What to ask the source for"""
+    count: int  # Bars to request (newest `count`)
+    since: int  # Open time (epoch s) of the newest cached bar, 0 = full window
+
+
+def _epoch(ts) -> int:
+    """Epoch seconds of an index value (naive timestamps are UTC)"""
+    return int(pd.Timestamp(ts).timestamp())
+
+
+class _Series:
+    __slots__ = ('frame', 'fetched_at', 'lock')
+
+    def __init__(self):
+        self.frame: Optional[pd.DataFrame] = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+
+class BarCache:
+    """
+    Thread-safe incremental bar cache (one per data source).
+    """
+
+    def __init__(self, max_age: float = 30.0, max_bars: int = 5000,
+                 parquet_dir: Optional[str] = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_age: Seconds a fetched series is served without asking the source
+            max_bars: Bars kept per series
+            parquet_dir: Directory for the on-disk tier (None = memory only)
+            clock: Time source (seconds)
+        """
+        self.max_age = max_age
+        self.max_bars = max_bars
+        self.parquet_dir = Path(parquet_dir) if parquet_dir else None
+        self.clock = clock
+
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+        if self.parquet_dir:
+            self.parquet_dir.mkdir(parents=True, exist_ok=True)
+
+        # Stats
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+        self.bars_fetched = 0
+        self.disk_loads = 0
+
+    # ═══════════════════════════════════════════════════════════
+    # SERIES / DISK TIER
+    # ═══════════════════════════════════════════════════════════
+
+    def _path(self, symbol: str, timeframe: str) -> Path:
+        return self.parquet_dir / f"{symbol}_{timeframe}.parquet"
+
+    def _get_series(self, symbol: str, timeframe: str) -> _Series:
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is not None:
+            return series
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series()
+                self._load(symbol, timeframe, series)
+                self._series[key] = series
+        return series
+
+    def _load(self, symbol: str, timeframe: str, series: _Series):
+        if not self.parquet_dir:
+            return
+        path = self._path(symbol, timeframe)
+        if not path.exists():
+            return
+        try:
+            series.frame = pd.read_parquet(path)
+            series.fetched_at = path.stat().st_mtime  # Next read fetches the gap since then
+            self.disk_loads += 1
+        except Exception as e:
+            logger.warning(f"Bar cache load failed for {symbol} {timeframe}: {e}")
+
+    def _save(self, symbol: str, timeframe: str, frame: pd.DataFrame):
+        if not self.parquet_dir:
+            return
+        path = self._path(symbol, timeframe)
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            frame.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Bar cache save failed for {symbol} {timeframe}: {e}")
+
+    # ═══════════════════════════════════════════════════════════
+    # READ PATH
+    # ═══════════════════════════════════════════════════════════
+
+    def plan(self, symbol: str, timeframe: str, count: int) -> Tuple[Optional[pd.DataFrame], Optional[BarFetch]]:
+        """
+        (bars, None) for a fresh hit, otherwise (None, BarFetch) describing the
+        fetch whose result goes to update()
+        """
+        series = self._get_series(symbol, timeframe)
+        with series.lock:
+            frame = series.frame
+            if frame is None or len(frame) < count:
+                return None, BarFetch(count, 0)
+
+            age = self.clock() - series.fetched_at
+            if age < self.max_age:
+                self.hits += 1
+                return frame.iloc[-count:].copy(), None
+
+            # Bars opened since the last fetch, plus the cached forming bar
+            seconds = TIMEFRAME_SECONDS.get(timeframe.upper(), 3600)
+            new_bars = int(age // seconds) + 2
+            if new_bars >= count:
+                return None, BarFetch(count, 0)
+            return None, BarFetch(new_bars, _epoch(frame.index[-1]))
+
+    def update(self, symbol: str, timeframe: str, fetched: Optional[pd.DataFrame],
+               fetch: BarFetch, count: int) -> Optional[pd.DataFrame]:
+        """Merge fetched bars (newest last, indexed by time) and return the last `count`"""
+        if fetched is None or len(fetched) == 0:
+            return None
+
+        series = self._get_series(symbol, timeframe)
+        with series.lock:
+            cached = series.frame
+            if fetch.since and cached is not None and len(cached):
+                first = fetched.index[0]
+                if first > cached.index[-1]:
+                    # Source skipped bars we do not have - keep only what is contiguous
+                    merged = fetched
+                else:
+                    merged = pd.concat([cached[cached.index < first], fetched])
+                self.incremental += 1
+            else:
+                merged = fetched
+                self.full += 1
+
+            merged = merged[~merged.index.duplicated(keep='last')]
+            if len(merged) > self.max_bars:
+                merged = merged.iloc[-self.max_bars:]
+            series.frame = merged
+            series.fetched_at = self.clock()
+            self.bars_fetched += len(fetched)
+            result = merged.iloc[-count:].copy()
+
+        self._save(symbol, timeframe, merged)
+        return result
+
+    def get(self, symbol: str, timeframe: str, count: int,
+            fetch: Callable[[int, int], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Last `count` bars, fetching through fetch(count, since) only what can have changed
+
+        Sources without a since-cursor can ignore it - the requested count already
+        covers the gap.
+        """
+        frame, needed = self.plan(symbol, timeframe, count)
+        if needed is None:
+            return frame
+        return self.update(symbol, timeframe, fetch(needed.count, needed.since), needed, count)
+
+    def peek(self, symbol: str, timeframe: str, count: int) -> Optional[pd.DataFrame]:
+        """Last `count` cached bars regardless of age, never fetching (None if fewer are cached)"""
+        series = self._get_series(symbol, timeframe)
+        with series.lock:
+            frame = series.frame
+            if frame is None or len(frame) < count:
+                return None
+            self.hits += 1
+            return frame.iloc[-count:].copy()
+
+    def last_completed(self, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """Open time of the newest cached bar that has closed (the last one may be forming)"""
+        frame = self._get_series(symbol, timeframe).frame
+        if frame is None or len(frame) < 2:
+            return None
+        return frame.index[-2]
+
+    def get_stats(self) -> Dict:
+        reads = self.hits + self.incremental + self.full
+        return {
+            'series': len(self._series),
+            'hits': self.hits,
+            'incremental': self.incremental,
+            'full': self.full,
+            'hit_rate': self.hits / reads if reads else 0.0,
+            'bars_fetched': self.bars_fetched,
+            'disk_loads': self.disk_loads,
+        }
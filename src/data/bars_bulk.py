@@ -0,0 +1,84 @@
+"""
+Bulk Bars - GET_BARS_BULK request/response helpers
+
+One round-trip for many (symbol, timeframe, count) windows instead of one
+GET_BARS command per symbol and timeframe:
+
+Request:
+    {"action": "GET_BARS_BULK", "requests": "EURUSD:H1:100:0;US30:H4:100:1760000000"}
+
+    One SYMBOL:TIMEFRAME:COUNT:SINCE item per window, ';'-separated (a flat
+    string the EA's hand-rolled JSON parser can read). SINCE is a cursor: the
+    open time (epoch seconds) of the newest bar the caller already has, so
+    only that bar (it may still have been forming) and newer ones come back,
+    capped at COUNT. 0 = no cursor, last COUNT bars.
+
+Response (columnar - one array per field, oldest bar first):
+    {"success": true, "results": [
+        {"symbol": "EURUSD", "timeframe": "H1", "success": true,
+         "time": [...], "open": [...], "high": [...], "low": [...],
+         "close": [...], "volume": [...]},
+        {"symbol": "US30", "timeframe": "H4", "success": false, "error": "..."}
+    ]}
+
+Results come back in request order.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+BAR_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H4': 14400, 'D1': 86400, 'W1': 604800,
+}
+
+
+class BarRequest(NamedTuple):
+    symbol: str
+    timeframe: str
+    count: int = 100
+    since: int = 0  # Open time of the newest bar already held (0 = none)
+
+
+RequestLike = Union[BarRequest, tuple, Dict]
+
+
+def as_request(item: RequestLike) -> BarRequest:
+    if isinstance(item, BarRequest):
+        return item
+    if isinstance(item, dict):
+        return BarRequest(item['symbol'], item.get('timeframe', 'H1'),
+                          int(item.get('count', 100)), int(item.get('since') or 0))
+    return BarRequest(*item)
+
+
+def encode_requests(requests: Iterable[RequestLike]) -> str:
+    """'SYM:TF:COUNT:SINCE;...' spec for the EA"""
+    return ';'.join(f"{r.symbol}:{r.timeframe}:{int(r.count)}:{int(r.since or 0)}"
+                    for r in map(as_request, requests))
+
+
+def decode_requests(spec: Union[str, List]) -> List[BarRequest]:
+    """Inverse of encode_requests (also accepts a JSON list of request dicts)"""
+    if not isinstance(spec, str):
+        return [as_request(item) for item in spec]
+    requests = []
+    for item in spec.split(';'):
+        parts = item.strip().split(':')
+        if len(parts) < 3 or not parts[0]:
+            continue
+        since = int(parts[3]) if len(parts) > 3 and parts[3] else 0
+        requests.append(BarRequest(parts[0], parts[1], int(parts[2]), since))
+    return requests
+
+
+def bars_to_columns(bars: List[Dict]) -> Dict[str, list]:
+    """Row-per-bar dicts (GET_BARS format) -> columnar arrays"""
+    return {column: [bar.get(column) for bar in bars] for column in BAR_COLUMNS}
+
+
+def result_columns(result: Dict) -> Optional[Dict[str, list]]:
+    """Columnar arrays from one bulk result (None if that window failed)"""
+    if not result.get('success', True) or 'time' not in result:
+        return None
+    return {column: result.get(column, []) for column in BAR_COLUMNS}
@@ -2,15 +2,15 @@
 MT5 Data Fetcher
 Fetches market data from MT5 via file-based API
 """
-import json
-import time
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
+from src.brokers.file_transport import get_file_transport
+from src.data.bar_cache import BarCache
+from src.data.bars_bulk import BarRequest, RequestLike, as_request, bars_to_columns, encode_requests, result_columns
 from src.utils.logger import get_logger
-from src.utils.mt5_lock import acquire_mt5_lock, release_mt5_lock
 
 logger = get_logger(__name__)
 
@@ -18,35 +18,29 @@ logger = get_logger(__name__)
 class MT5DataFetcher:
     """
     Fetches market data from MT5 via file-based communication
+    (request-id files, see src/brokers/file_transport.py)
     """
 
     def __init__(
         self,
-        command_file: str = "ai_command.txt",
-        response_file: str = "ai_response.txt",
-        timeout: float = 10.0
+        files_dir: Optional[str] = None,
+        timeout: float = 10.0,
+        bar_cache: Optional[BarCache] = None
     ):
         """
         Args:
-            command_file: Path to command file for MT5
-            response_file: Path to response file from MT5
+            files_dir: Directory shared with the EA (default: MT5 common files)
             timeout: Command timeout in seconds
+            bar_cache: Incremental bar cache (default: in-memory BarCache)
         """
         # Use MT5 TERMINAL_COMMONDATA_PATH (where EA actually writes files)
         mt5_common_files = Path.home() / "Library/Application Support/net.metaquotes.wine.metatrader5/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files"
 
-        # If paths are just filenames (not full paths), use MT5 directory
-        if not Path(command_file).is_absolute():
-            self.command_file = mt5_common_files / command_file
-        else:
-            self.command_file = Path(command_file)
-
-        if not Path(response_file).is_absolute():
-            self.response_file = mt5_common_files / response_file
-        else:
-            self.response_file = Path(response_file)
-
+        self.files_dir = Path(files_dir) if files_dir else mt5_common_files
+        self.transport = get_file_transport(self.files_dir)
         self.timeout = timeout
+        self.bulk_supported = True  # Cleared if the EA answers GET_BARS_BULK without bulk results
+        self.bar_cache = bar_cache or BarCache()
 
     def get_market_data(
         self,
@@ -65,18 +59,7 @@ class MT5DataFetcher:
         Returns:
             Dict of {symbol: {timeframe: dataframe}}
         """
-        all_data = {}
-
-        for symbol in symbols:
-            symbol_data = {}
-
-            for tf in timeframes:
-                df = self._fetch_bars(symbol, tf, bars)
-                if df is not None and len(df) > 0:
-                    symbol_data[tf] = df
-
-            if symbol_data:
-                all_data[symbol] = symbol_data
+        all_data = self.fetch_multi_timeframe(symbols, timeframes, bars)
 
         logger.info(f"Fetched market data for {len(all_data)}/{len(symbols)} symbols")
         return all_data
@@ -93,6 +76,13 @@ class MT5DataFetcher:
         Returns:
             DataFrame with OHLCV data or None
         """
+        bars_data = self._fetch_bar_list(symbol, timeframe, bars)
+        if bars_data:
+            return self._bars_frame(pd.DataFrame(bars_data))
+        return None
+
+    def _fetch_bar_list(self, symbol: str, timeframe: str, bars: int) -> Optional[List[Dict]]:
+        """Single GET_BARS round-trip - list of bar dicts"""
         command = {
             "action": "GET_BARS",
             "symbol": symbol,
@@ -104,20 +94,119 @@ class MT5DataFetcher:
         success, response = self._send_command(command)
 
         if success and response:
-            bars_data = response.get('bars', [])
+            return response.get('bars', [])
+        return None
+
+    @staticmethod
+    def _bars_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Index bars by time (epoch seconds from the EA, or timestamp strings)"""
+        if 'time' in df.columns:
+            if pd.api.types.is_numeric_dtype(df['time']):
+                df['time'] = pd.to_datetime(df['time'], unit='s')
+            else:
+                df['time'] = pd.to_datetime(df['time'])
+            df.set_index('time', inplace=True)
+        return df
+
+    def get_bars_bulk(self, requests: List[RequestLike]) -> Dict[Tuple[str, str], Dict[str, list]]:
+        """
+        Fetch many (symbol, timeframe, count[, since]) windows in one round-trip
+
+        Args:
+            requests: BarRequest / (symbol, timeframe, count[, since]) tuples / dicts.
+                      since = open time of the newest bar already held (only it and
+                      newer bars are returned)
+
+        Returns:
+            {(symbol, timeframe): {'time': [...], 'open': [...], ..., 'volume': [...]}}
+            (failed windows are left out)
+        """
+        requests = [as_request(r) for r in requests]
+        if not requests:
+            return {}
+
+        if self.bulk_supported:
+            success, response = self._send_command({
+                "action": "GET_BARS_BULK",
+                "requests": encode_requests(requests),
+                "timestamp": datetime.now().isoformat()
+            })
+            if success and isinstance(response.get('results'), list):
+                results = {}
+                for request, result in zip(requests, response['results']):
+                    columns = result_columns(result)
+                    if columns is not None:
+                        results[(request.symbol, request.timeframe)] = columns
+                return results
+            if response is None:
+                return {}  # EA not answering - per-window commands would only time out too
+            # Answered, but not with bulk results: "Unknown command", or an EA whose
+            # GET_BARS handler swallowed GET_BARS_BULK (empty symbol -> "Failed to get rates")
+            self.bulk_supported = False
+            logger.warning(f"EA does not support GET_BARS_BULK ({response.get('error', 'no results')}) "
+                           f"- falling back to one GET_BARS per window")
+
+        # Older EA: one GET_BARS per window (the request-id transport lets them overlap)
+        results = {}
+        for request in requests:
+            bars_data = self._fetch_bar_list(request.symbol, request.timeframe, request.count)
             if bars_data:
-                df = pd.DataFrame(bars_data)
-                # Convert timestamp to datetime
-                if 'time' in df.columns:
-                    df['time'] = pd.to_datetime(df['time'])
-                    df.set_index('time', inplace=True)
-                return df
+                if request.since:
+                    bars_data = [b for b in bars_data if b.get('time', 0) >= request.since]
+                results[(request.symbol, request.timeframe)] = bars_to_columns(bars_data)
+        return results
 
-        return None
+    def fetch_bars_bulk(self, requests: List[RequestLike]) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        get_bars_bulk() as DataFrames indexed by time
+
+        Returns:
+            {(symbol, timeframe): DataFrame[open, high, low, close, volume]}
+        """
+        frames = {}
+        for key, columns in self.get_bars_bulk(requests).items():
+            if columns['time']:
+                frames[key] = self._bars_frame(pd.DataFrame(columns))
+        return frames
+
+    def fetch_multi_timeframe(
+        self,
+        symbols: List[str],
+        timeframes: List[str] = ['H1', 'H4', 'D1'],
+        bars: int = 100
+    ) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """
+        Multi-timeframe data for several symbols in one round-trip
+
+        Windows fetched less than bar_cache.max_age ago are served from the
+        cache; the rest go out as one GET_BARS_BULK with since-cursors.
+
+        Returns:
+            {symbol: {timeframe: DataFrame}} (missing windows are left out)
+        """
+        data: Dict[str, Dict[str, pd.DataFrame]] = {}
+        pending = []
+        for symbol in symbols:
+            for tf in timeframes:
+                df, needed = self.bar_cache.plan(symbol, tf, bars)
+                if needed is None:
+                    data.setdefault(symbol, {})[tf] = df
+                else:
+                    pending.append((BarRequest(symbol, tf, needed.count, needed.since), needed))
+
+        # Everything not served from the cache: one round-trip, only the bars that can have changed
+        if pending:
+            frames = self.fetch_bars_bulk([request for request, _ in pending])
+            for request, needed in pending:
+                key = (request.symbol, request.timeframe)
+                df = self.bar_cache.update(request.symbol, request.timeframe, frames.get(key), needed, bars)
+                if df is not None:
+                    data.setdefault(request.symbol, {})[request.timeframe] = df
+        return data
 
     def fetch_symbol_data(self, symbol: str, timeframe: str = 'H1', bars: int = 100) -> Optional[pd.DataFrame]:
         """
-        Fetch single symbol data (alias for _fetch_bars for backward compatibility)
+        Fetch single symbol data through the bar cache (only new bars hit the EA)
 
         Args:
             symbol: Trading symbol
@@ -127,7 +216,8 @@ class MT5DataFetcher:
         Returns:
             DataFrame with OHLCV data or None
         """
-        return self._fetch_bars(symbol, timeframe, bars)
+        return self.bar_cache.get(symbol, timeframe, bars,
+                                  lambda count, since: self._fetch_bars(symbol, timeframe, count))
 
     def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
         """
@@ -162,73 +252,22 @@ class MT5DataFetcher:
         Returns:
             (success, response_dict)
         """
-        # CRITICAL FIX: Use shared lock to prevent command file overwriting
-        acquire_mt5_lock()
+        # Each command has its own request-id files - no shared lock needed,
+        # several fetches can be in flight at once
         try:
-            # Clear old response
-            if self.response_file.exists():
-                self.response_file.unlink()
-
-            # Write command (compact JSON without spaces for EA compatibility)
-            with open(self.command_file, 'w') as f:
-                json.dump(command, f, separators=(',', ':'))
-
-            # Wait for response
-            start_time = time.time()
-
-            while time.time() - start_time < self.timeout:
-                if self.response_file.exists():
-                    time.sleep(0.1)  # Ensure write complete
-                    logger.debug(f"Response file found, reading...")
-
-                    try:
-                        # MT5 writes responses in ANSI/UTF-8 (FILE_ANSI in v1.16+)
-                        with open(self.response_file, 'r', encoding='utf-8') as f:
-                            response = json.load(f)
-
-                        logger.debug(f"Response parsed: action={response.get('action')}, has bars={('bars' in response)}, symbol={response.get('symbol')}")
-
-                        # Check response validity BEFORE deleting file
-                        # GET_BARS returns: {"success": true, "symbol": "XXX", "bars": [...]}
-                        # GET_SYMBOLS returns: {"success": true, "symbols": [...]}
-                        # GET_ACCOUNT_INFO returns: {"action": "GET_ACCOUNT_INFO", "status": "success"}
-
-                        is_valid_response = False
-
-                        if command['action'] == 'GET_BARS':
-                            # For GET_BARS, check for 'bars' field and matching symbol
-                            if response.get('bars') is not None and response.get('symbol') == command.get('symbol'):
-                                is_valid_response = True
-                        elif response.get('action') == command['action'] or response.get('success') is not None:
-                            if response.get('status') == 'success' or response.get('success') == True:
-                                is_valid_response = True
-                            else:
-                                logger.warning(f"Command failed: {response.get('error')}")
-                                self.response_file.unlink()
-                                return False, response
-
-                        # Delete response file after validation
-                        self.response_file.unlink()
-
-                        if is_valid_response:
-                            return True, response
-                        # Wrong response - deleted it, keep waiting for correct one
-
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        time.sleep(0.2)
-                        continue
-                    except FileNotFoundError:
-                        # Response file disappeared - likely race condition
-                        time.sleep(0.2)
-                        continue
-
-                time.sleep(0.2)
-
-            logger.warning(f"Command timeout: {command['action']}")
-            return False, None
-
+            response = self.transport.request(command, timeout=self.timeout)
         except Exception as e:
             logger.error(f"Error sending command: {e}")
             return False, None
-        finally:
-            release_mt5_lock()
+
+        if response is None:
+            return False, None
+
+        # GET_BARS returns: {"success": true, "symbol": "XXX", "bars": [...]}
+        # GET_SYMBOLS returns: {"success": true, "symbols": [...]}
+        # GET_ACCOUNT_INFO returns: {"action": "GET_ACCOUNT_INFO", "status": "success"}
+        if response.get('status') == 'success' or response.get('success') == True:
+            return True, response
+
+        logger.warning(f"Command failed: {response.get('error')}")
+        return False, response
@@ -12,6 +12,7 @@ import joblib
 # Import our deep learning models
 from src.models.lstm_model import LSTMPredictor
 from src.models.transformer_model import TransformerPredictor
+from src.models.streaming_inference import StreamingInference
 
 
 class DeepLearningEnsemble:
@@ -58,6 +59,9 @@ class DeepLearningEnsemble:
         self.lstm_model = None
         self.transformer_model = None
 
+        # Per-symbol streaming state for the sequence models (built lazily)
+        self._streams: Dict[str, StreamingInference] = {}
+
         # Load models
         self.load_models()
 
@@ -112,7 +116,10 @@ class DeepLearningEnsemble:
 
         logger.info(f"🧠 Ensemble ready: {active_models}/3 models active")
 
-    def predict(self, features: np.ndarray) -> Dict:
+    def predict(self,
+                features: np.ndarray,
+                symbol: Optional[str] = None,
+                bar_time: Optional[float] = None) -> Dict:
         """
         Make ensemble prediction
 
@@ -120,6 +127,9 @@ class DeepLearningEnsemble:
             features: Feature array (n_samples, n_features)
                      For XGBoost: Use last row only
                      For LSTM/Transformer: Use full sequence
+            symbol: Optional symbol - with bar_time enables streaming mode
+                    (per-symbol state, one step per new bar, cached per bar)
+            bar_time: Close time of the last row in `features` (epoch seconds)
 
         Returns:
             {
@@ -171,7 +181,7 @@ class DeepLearningEnsemble:
         # 2. LSTM prediction (use full sequence)
         if self.lstm_model is not None and self.lstm_model.is_trained:
             try:
-                lstm_pred = self.lstm_model.predict(features)
+                lstm_pred = self._predict_sequence_model('lstm', self.lstm_model, features, symbol, bar_time)
                 predictions['lstm'] = lstm_pred
                 logger.debug(f"LSTM: {lstm_pred['direction']} ({lstm_pred['confidence']:.1f}%)")
             except Exception as e:
@@ -181,7 +191,8 @@ class DeepLearningEnsemble:
         # 3. Transformer prediction (use full sequence)
         if self.transformer_model is not None and self.transformer_model.is_trained:
             try:
-                transformer_pred = self.transformer_model.predict(features)
+                transformer_pred = self._predict_sequence_model('transformer', self.transformer_model,
+                                                                features, symbol, bar_time)
                 predictions['transformer'] = transformer_pred
                 logger.debug(f"Transformer: {transformer_pred['direction']} ({transformer_pred['confidence']:.1f}%)")
             except Exception as e:
@@ -205,6 +216,48 @@ class DeepLearningEnsemble:
 
         return ensemble_result
 
+    def _predict_sequence_model(self,
+                                name: str,
+                                predictor,
+                                features: np.ndarray,
+                                symbol: Optional[str],
+                                bar_time: Optional[float]) -> Dict:
+        """
+        Predict with LSTM/Transformer, streaming when symbol and bar_time are given
+
+        Streaming pushes the new bar into the symbol's rolling window and runs
+        one compiled pass (same output as predict); repeated requests for a
+        bar are cached, and a gap recomputes from `features`.
+        """
+        if symbol is None or bar_time is None or len(features.shape) < 2:
+            return predictor.predict(features)
+
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = StreamingInference(
+                predictor.model,
+                sequence_length=self.sequence_length,
+                n_features=self.n_features
+            )
+            self._streams[name] = stream
+
+        probs = stream.update(symbol, bar_time, features[-1], window=features)
+        if probs is None:
+            return predictor.predict(features)
+
+        # 0=BUY, 1=HOLD, 2=SELL (same as predictor.predict)
+        pred_class = int(np.argmax(probs))
+        direction_map = {0: 'BUY', 1: 'HOLD', 2: 'SELL'}
+        return {
+            'direction': direction_map[pred_class],
+            'confidence': float(probs[pred_class] * 100),
+            'probabilities': {
+                'buy': float(probs[0]),
+                'hold': float(probs[1]),
+                'sell': float(probs[2])
+            }
+        }
+
     def _combine_predictions(self, predictions: Dict) -> Dict:
         """
         Combine multiple model predictions using weighted average
@@ -308,7 +361,8 @@ class DeepLearningEnsemble:
                     'lstm': bool,
                     'transformer': bool
                 },
-                'weights': dict
+                'weights': dict,
+                'streaming': {model_name: stream stats}
             }
         """
         active_models = {
@@ -321,5 +375,6 @@ class DeepLearningEnsemble:
             'total_models': 3,
             'active_models': sum(active_models.values()),
             'models': active_models,
-            'weights': self.weights
+            'weights': self.weights,
+            'streaming': {name: stream.get_stats() for name, stream in self._streams.items()}
         }
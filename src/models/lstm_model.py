@@ -12,6 +12,8 @@ from typing import Dict, Tuple, Optional
 import joblib
 from pathlib import Path
 
+from src.models.streaming_inference import compile_forward
+
 
 class LSTMPredictor:
     """
@@ -47,6 +49,7 @@ class LSTMPredictor:
         self.model_path = Path(model_path)
 
         self.model = None
+        self._forward = None  # Compiled forward pass (built on first predict)
         self.scaler = None
         self.is_trained = False
 
@@ -204,6 +207,7 @@ class LSTMPredictor:
         )
 
         self.is_trained = True
+        self._forward = None  # Rebuild compiled call for the trained model
 
         # Save model
         self.save_model()
@@ -256,8 +260,10 @@ class LSTMPredictor:
         sequence = features[-self.sequence_length:]
         sequence = sequence.reshape(1, self.sequence_length, self.n_features)
 
-        # Predict
-        probs = self.model.predict(sequence, verbose=0)[0]
+        # Predict (direct compiled call - model.predict has heavy per-call overhead)
+        if self._forward is None:
+            self._forward = compile_forward(self.model, tf)
+        probs = self._forward(sequence)[0]
 
         # Get prediction (0=BUY, 1=HOLD, 2=SELL)
         pred_class = np.argmax(probs)
@@ -286,6 +292,7 @@ class LSTMPredictor:
         """Load model from disk"""
         try:
             self.model = keras.models.load_model(self.model_path)
+            self._forward = None
             self.is_trained = True
             logger.info(f"✅ LSTM model loaded from {self.model_path}")
         except Exception as e:
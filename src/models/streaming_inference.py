@@ -0,0 +1,338 @@
+"""
+Streaming Inference for Sequence Models
+=======================================
+
+Per-symbol incremental inference for the LSTM/Transformer models.
+
+`model.predict(X, verbose=0)` on a single (1, seq_len, n_features) sample
+pays for Keras' data-adapter/callback machinery on every call and re-runs all
+60 timesteps even though only the last bar changed. This module keeps one
+stream per symbol and advances it by one bar at a time:
+
+- Every model keeps a rolling window buffer per symbol and runs one compiled
+  forward pass per new bar - never `predict`. Outputs equal a full-window
+  predict over the same last `sequence_length` bars.
+- Opt-in (carry_state=True): unidirectional Sequential RNNs (LSTM/GRU/
+  SimpleRNN stacks followed by Dense/Dropout heads) carry their hidden state
+  per symbol and step the recurrent cells once per new bar. Cheaper, but
+  approximate: the carried state still remembers bars that have left the
+  window, until the next resync.
+- Repeated requests for the same bar are served from the per-symbol cache.
+- A gap (missed bar, out-of-order bar, shape change) or the periodic resync
+  interval falls back to a full-window recompute from the caller's window.
+
+Author: AI Trading System
+Created: 2025-01-13
+"""
+
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+
+# Layers that are the identity at inference time
+_PASSTHROUGH_LAYERS = ('InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise',
+                       'GaussianDropout', 'AlphaDropout')
+_RECURRENT_LAYERS = ('LSTM', 'GRU', 'SimpleRNN')
+
+
+def compile_forward(model: Any, tf_module: Any = None) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Build a direct forward function for a Keras model.
+
+    Wraps `model(X, training=False)` in a `tf.function` with a fixed
+    signature so it is traced once and then called without the overhead
+    of `model.predict`. Falls back to calling the model eagerly if
+    TensorFlow tracing is not available.
+
+    Args:
+        model: Keras model
+        tf_module: Already-imported tensorflow module (optional)
+
+    Returns:
+        Callable taking a numpy batch and returning numpy probabilities
+    """
+    tf = tf_module
+    if tf is None:
+        try:
+            import tensorflow as tf
+        except ImportError:
+            tf = None
+
+    call = None
+    if tf is not None:
+        try:
+            input_shape = tuple(model.inputs[0].shape[1:])
+            signature = [tf.TensorSpec(shape=(None, *input_shape), dtype=tf.float32)]
+            call = tf.function(lambda x: model(x, training=False), input_signature=signature)
+        except Exception as e:
+            logger.debug(f"tf.function tracing unavailable, calling model eagerly: {e}")
+            call = None
+
+    def forward(X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        out = call(X) if call is not None else model(X, training=False)
+        return np.asarray(out)
+
+    return forward
+
+
+class _RecurrentStepper:
+    """
+    Single-step runner for a Sequential stack of unidirectional RNN layers.
+
+    Steps each recurrent layer's cell once per bar and applies the
+    post-recurrent head (Dense/Dropout/Activation...) to the last output.
+    """
+
+    def __init__(self, recurrent_layers: List[Any], head_layers: List[Any]):
+        self.recurrent_layers = recurrent_layers
+        self.head_layers = head_layers
+
+    @classmethod
+    def from_model(cls, model: Any) -> Optional['_RecurrentStepper']:
+        """Return a stepper if the model can be advanced one bar at a time, else None"""
+        if type(model).__name__ != 'Sequential':
+            return None
+
+        recurrent, head = [], []
+        for layer in model.layers:
+            name = type(layer).__name__
+            if name in _RECURRENT_LAYERS:
+                # Anything non-trivial between RNN layers breaks stepping
+                if head or getattr(layer, 'go_backwards', False) or not hasattr(layer, 'cell'):
+                    return None
+                recurrent.append(layer)
+            elif name in _PASSTHROUGH_LAYERS:
+                continue
+            elif recurrent:
+                head.append(layer)
+            else:
+                # Pre-recurrent transforms (Conv1D, attention...) need the full window
+                return None
+
+        if not recurrent:
+            return None
+        # Only the last recurrent layer may drop the time axis
+        for layer in recurrent[:-1]:
+            if not getattr(layer, 'return_sequences', False):
+                return None
+        if getattr(recurrent[-1], 'return_sequences', False):
+            return None
+        return cls(recurrent, head)
+
+    def initial_states(self) -> List[List[np.ndarray]]:
+        states = []
+        for layer in self.recurrent_layers:
+            sizes = layer.cell.state_size
+            sizes = sizes if isinstance(sizes, (list, tuple)) else [sizes]
+            states.append([np.zeros((1, int(s)), dtype=np.float32) for s in sizes])
+        return states
+
+    def step(self, row: np.ndarray, states: List[List[np.ndarray]]):
+        """Advance all recurrent layers by one timestep; returns (probs, new_states)"""
+        x = np.asarray(row, dtype=np.float32).reshape(1, -1)
+        new_states = []
+        for layer, layer_states in zip(self.recurrent_layers, states):
+            x, cell_states = layer.cell(x, list(layer_states), training=False)
+            cell_states = cell_states if isinstance(cell_states, (list, tuple)) else [cell_states]
+            new_states.append([np.asarray(s) for s in cell_states])
+            x = np.asarray(x)
+        for layer in self.head_layers:
+            x = np.asarray(layer(x, training=False))
+        return x[0], new_states
+
+
+class _SymbolStream:
+    """Mutable per-symbol stream state"""
+
+    __slots__ = ('window', 'filled', 'last_bar_time', 'bar_seconds', 'states',
+                 'steps_since_sync', 'last_probs')
+
+    def __init__(self, sequence_length: int, n_features: int):
+        self.window = np.zeros((sequence_length, n_features), dtype=np.float32)
+        self.filled = 0
+        self.last_bar_time: Optional[float] = None
+        self.bar_seconds: Optional[float] = None
+        self.states = None
+        self.steps_since_sync = 0
+        self.last_probs: Optional[np.ndarray] = None
+
+
+class StreamingInference:
+    """
+    Per-symbol streaming inference for a Keras sequence model.
+
+    Usage:
+        stream = StreamingInference(model, sequence_length=60, n_features=230)
+        probs = stream.update('US30', bar_time, features[-1], window=features)
+
+    Parity with a full-window predict: test_streaming_parity.py
+    """
+
+    def __init__(self,
+                 model: Any,
+                 sequence_length: int,
+                 n_features: int,
+                 bar_seconds: Optional[float] = None,
+                 resync_every: Optional[int] = None,
+                 carry_state: bool = False,
+                 tf_module: Any = None):
+        """
+        Initialize streaming inference.
+
+        Args:
+            model: Keras model taking (batch, sequence_length, n_features)
+            sequence_length: Window length the model was trained on
+            n_features: Features per timestep
+            bar_seconds: Expected seconds between bars (inferred per symbol if None)
+            resync_every: Recompute the full window after this many stepped bars
+                          (bounds drift of carried state; default sequence_length)
+            carry_state: Step recurrent cells with carried state where the model
+                         allows it (approximate - see module docstring)
+            tf_module: Already-imported tensorflow module (optional)
+        """
+        self.model = model
+        self.sequence_length = sequence_length
+        self.n_features = n_features
+        self.bar_seconds = bar_seconds
+        self.resync_every = resync_every or sequence_length
+
+        self._forward = compile_forward(model, tf_module)
+        self._stepper = _RecurrentStepper.from_model(model) if carry_state else None
+        self._streams: Dict[str, _SymbolStream] = {}
+
+        self.stats = {'cached': 0, 'stepped': 0, 'windowed': 0, 'resynced': 0}
+
+        mode = 'stateful step' if self._stepper is not None else 'compiled window'
+        logger.info(f"✓ Streaming inference ready ({mode}, seq_len={sequence_length})")
+
+    @property
+    def stateful(self) -> bool:
+        """True if recurrent state is carried between bars"""
+        return self._stepper is not None
+
+    def reset(self, symbol: Optional[str] = None):
+        """Drop stream state for one symbol (or all symbols)"""
+        if symbol is None:
+            self._streams.clear()
+        else:
+            self._streams.pop(symbol, None)
+
+    def update(self,
+               symbol: str,
+               bar_time: float,
+               features_row: np.ndarray,
+               window: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Advance the symbol's stream to `bar_time` and return class probabilities.
+
+        Args:
+            symbol: Symbol key
+            bar_time: Close time of the bar `features_row` belongs to (epoch seconds)
+            features_row: (n_features,) feature vector of the newest bar
+            window: Optional (n_samples, n_features) history ending at this bar,
+                    used to resync after a gap. Without it the stream refills
+                    bar by bar and returns None until the window is full.
+
+        Returns:
+            (n_classes,) probability array, or None while warming up
+        """
+        stream = self._streams.get(symbol)
+        if stream is None:
+            stream = _SymbolStream(self.sequence_length, self.n_features)
+            self._streams[symbol] = stream
+
+        # Same bar again (multiple requests per bar) - serve from cache
+        if stream.last_bar_time is not None and bar_time == stream.last_bar_time \
+                and stream.last_probs is not None:
+            self.stats['cached'] += 1
+            return stream.last_probs
+
+        row = np.asarray(features_row, dtype=np.float32).reshape(-1)
+        if row.shape[0] != self.n_features:
+            logger.warning(f"{symbol}: feature row has {row.shape[0]} values, expected {self.n_features}")
+            self.reset(symbol)
+            return None
+
+        contiguous = self._is_contiguous(stream, bar_time)
+        can_step = self._stepper is None or stream.states is not None
+        if contiguous and can_step and stream.filled >= self.sequence_length \
+                and stream.steps_since_sync < self.resync_every:
+            probs = self._advance(stream, row)
+        elif window is not None and len(window) >= self.sequence_length:
+            probs = self._resync(stream, np.asarray(window, dtype=np.float32))
+        else:
+            # No caller history - rebuild from our own buffer (restart it after a gap)
+            if not contiguous:
+                stream.filled = 0
+                stream.states = None
+            self._push(stream, row)
+            probs = self._resync(stream, stream.window.copy()) \
+                if stream.filled >= self.sequence_length else None
+
+        if stream.last_bar_time is not None and bar_time > stream.last_bar_time and stream.bar_seconds is None:
+            stream.bar_seconds = bar_time - stream.last_bar_time
+        stream.last_bar_time = bar_time
+        stream.last_probs = probs
+        return probs
+
+    def _is_contiguous(self, stream: _SymbolStream, bar_time: float) -> bool:
+        """True if bar_time is exactly one bar after the stream's last bar"""
+        if stream.last_bar_time is None:
+            return False
+        delta = bar_time - stream.last_bar_time
+        if delta <= 0:
+            return False
+        expected = self.bar_seconds or stream.bar_seconds
+        if expected is None:
+            return True  # Interval not known yet - trust the caller
+        return abs(delta - expected) < 0.5 * expected
+
+    def _push(self, stream: _SymbolStream, row: np.ndarray):
+        """Append a row to the rolling window without reallocating"""
+        if stream.filled < self.sequence_length:
+            stream.window[stream.filled] = row
+            stream.filled += 1
+        else:
+            stream.window[:-1] = stream.window[1:]
+            stream.window[-1] = row
+
+    def _advance(self, stream: _SymbolStream, row: np.ndarray) -> np.ndarray:
+        """Advance one bar from existing state"""
+        self._push(stream, row)
+        stream.steps_since_sync += 1
+        if self._stepper is not None:
+            probs, stream.states = self._stepper.step(row, stream.states)
+            self.stats['stepped'] += 1
+            return probs
+        self.stats['windowed'] += 1
+        return self._forward(stream.window[np.newaxis])[0]
+
+    def _resync(self, stream: _SymbolStream, window: np.ndarray) -> np.ndarray:
+        """Full-window recompute; re-seeds carried state for stateful models"""
+        window = window[-self.sequence_length:]
+        stream.window[:] = window
+        stream.filled = self.sequence_length
+        stream.steps_since_sync = 0
+        self.stats['resynced'] += 1
+
+        if self._stepper is not None:
+            states = self._stepper.initial_states()
+            probs = None
+            for row in window:
+                probs, states = self._stepper.step(row, states)
+            stream.states = states
+            return probs
+
+        return self._forward(window[np.newaxis])[0]
+
+    def get_stats(self) -> Dict:
+        """Counters for how each update was served"""
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            'total': total,
+            'symbols': len(self._streams),
+            'stateful': self.stateful,
+        }
@@ -11,6 +11,8 @@ from loguru import logger
 from typing import Dict, Tuple, Optional
 from pathlib import Path
 
+from src.models.streaming_inference import compile_forward
+
 
 class TransformerPredictor:
     """
@@ -56,6 +58,7 @@ class TransformerPredictor:
         self.model_path = Path(model_path)
 
         self.model = None
+        self._forward = None  # Compiled forward pass (built on first predict)
         self.is_trained = False
 
         # Try to load existing model
@@ -253,6 +256,7 @@ class TransformerPredictor:
         )
 
         self.is_trained = True
+        self._forward = None  # Rebuild compiled call for the trained model
 
         # Save model
         self.save_model()
@@ -305,8 +309,10 @@ class TransformerPredictor:
         sequence = features[-self.sequence_length:]
         sequence = sequence.reshape(1, self.sequence_length, self.n_features)
 
-        # Predict
-        probs = self.model.predict(sequence, verbose=0)[0]
+        # Predict (direct compiled call - model.predict has heavy per-call overhead)
+        if self._forward is None:
+            self._forward = compile_forward(self.model, tf)
+        probs = self._forward(sequence)[0]
 
         # Get prediction (0=BUY, 1=HOLD, 2=SELL)
         pred_class = np.argmax(probs)
@@ -335,6 +341,7 @@ class TransformerPredictor:
         """Load model from disk"""
         try:
             self.model = keras.models.load_model(self.model_path)
+            self._forward = None
             self.is_trained = True
             logger.info(f"✅ Transformer model loaded from {self.model_path}")
         except Exception as e:
@@ -1,12 +1,37 @@
 """
 Portfolio Optimization for Multi-Symbol Trading
 Modern Portfolio Theory + Risk Management
+
+Allocation engine (optimize_position_sizes):
+1. Closed form first - the max-Sharpe tangency portfolio (w ~ inv(Cov) mu)
+   or risk parity (inverse volatility for constant correlation, a few
+   coordinate-descent sweeps otherwise). Used whenever the solution already
+   satisfies the bounds and risk constraint, so no solver runs.
+2. Warm start - when the closed form violates a constraint, SLSQP (with an
+   analytic gradient) starts from the previous solution if the signal set
+   is the same and expected returns/risks moved only slightly.
+3. Cache - results are kept per (signal set, correlation epoch, limits).
+4. Background mode - start_background() keeps a target allocation current
+   from submit_signals(); the request path only reads get_target_allocation().
+
+Benchmark with `python benchmark_portfolio_optimizer.py`.
 """
+import logging
+import threading
+import time
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from scipy.optimize import minimize
 
+WARM_START_TOLERANCE = 0.10  # Max relative change in expected return/risk to reuse the previous solution
+CACHE_SIZE = 256
+BOUND_TOLERANCE = 1e-9
+
+logger = logging.getLogger(__name__)
+
 
 class PortfolioOptimizer:
     """
@@ -15,7 +40,7 @@ class PortfolioOptimizer:
     Uses:
     - Modern Portfolio Theory (MPT)
     - Correlation-based risk management
-    - Sharpe ratio maximization
+    - Sharpe ratio maximization (or risk parity)
     - FTMO constraint compliance
     """
     
@@ -30,6 +55,20 @@ class PortfolioOptimizer:
         self.n_symbols = len(symbols)
         self.correlations = None
         self.returns_history = {}
+        self.correlation_epoch = 0  # Bumped whenever correlations change (cache key)
+        
+        # Solver state
+        self._cache: OrderedDict = OrderedDict()
+        self._previous: Optional[Dict] = None  # Last numeric solution (warm start)
+        self._lock = threading.Lock()
+        self.stats = {'closed_form': 0, 'warm_start': 0, 'cold_start': 0, 'cache_hits': 0, 'fallback': 0}
+        
+        # Background mode
+        self._pending: Optional[Tuple] = None
+        self._target: Dict[str, float] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
         
     def update_correlations(self, price_data: Dict[str, List[float]]):
         """
@@ -45,19 +84,32 @@ class PortfolioOptimizer:
         returns = df.pct_change().dropna()
         
         # Calculate correlation matrix
-        self.correlations = returns.corr().values
+        self.set_correlations(returns.corr().values)
         
         # Store returns for later use
         for symbol in self.symbols:
             if symbol in price_data:
                 self.returns_history[symbol] = returns[symbol].values
     
+    def set_correlations(self, correlations: np.ndarray):
+        """
+        Use an externally maintained correlation matrix (ordered like self.symbols),
+        e.g. a CovarianceSnapshot/CrossAssetCorrelationMatrix sub-matrix
+        """
+        with self._lock:
+            self.correlations = np.nan_to_num(np.asarray(correlations, dtype=float))
+            np.fill_diagonal(self.correlations, 1.0)
+            self.correlation_epoch += 1
+            self._cache.clear()
+        self._wake.set()  # Background target must be re-solved
+    
     def optimize_position_sizes(
         self,
         signals: List[Dict],
         account_balance: float,
         max_total_risk: float = 0.10,  # 10% max total portfolio risk
-        max_per_symbol: float = 0.30   # 30% max per symbol
+        max_per_symbol: float = 0.30,  # 30% max per symbol
+        method: str = 'sharpe'         # 'sharpe' or 'risk_parity'
     ) -> Dict[str, float]:
         """
         Optimize position sizes across portfolio
@@ -73,6 +125,7 @@ class PortfolioOptimizer:
             account_balance: Current account balance
             max_total_risk: Maximum total portfolio risk
             max_per_symbol: Maximum allocation per symbol
+            method: 'sharpe' (max Sharpe) or 'risk_parity' (equal risk contribution)
             
         Returns:
             {symbol: position_size_dollars}
@@ -84,65 +137,241 @@ class PortfolioOptimizer:
         if self.correlations is None:
             return self._equal_weight_allocation(signals, account_balance, max_per_symbol)
         
-        # Extract signal data
-        symbols = [s['symbol'] for s in signals]
-        expected_returns = np.array([s.get('expected_return', 0.01) for s in signals])
-        risks = np.array([s.get('risk', 0.02) for s in signals])
-        confidences = np.array([s.get('confidence', 0.5) for s in signals])
+        weights = self.optimize_weights(signals, max_total_risk, max_per_symbol, method)
+        if weights is None:
+            # Fallback to confidence-weighted
+            self._count('fallback')
+            return self._confidence_weighted_allocation(signals, account_balance, max_per_symbol)
+        
+        # Convert weights to dollar amounts
+        return {
+            signal['symbol']: weights[i] * account_balance
+            for i, signal in enumerate(signals)
+        }
+    
+    # ═══════════════════════════════════════════════════════════
+    # ALLOCATION ENGINE
+    # ═══════════════════════════════════════════════════════════
+    
+    def optimize_weights(
+        self,
+        signals: List[Dict],
+        max_total_risk: float = 0.10,
+        max_per_symbol: float = 0.30,
+        method: str = 'sharpe'
+    ) -> Optional[np.ndarray]:
+        """Portfolio weights (sum 1) for the signals, or None if infeasible/unsolved"""
+        symbols = tuple(s['symbol'] for s in signals)
+        expected_returns = np.array([s.get('expected_return', 0.01) for s in signals], dtype=float)
+        risks = np.array([s.get('risk', 0.02) for s in signals], dtype=float)
+        confidences = np.array([s.get('confidence', 0.5) for s in signals], dtype=float)
+        
+        # Weights sum to 1 with each <= max_per_symbol - impossible below this
+        if len(signals) * max_per_symbol < 1.0 - BOUND_TOLERANCE:
+            return None
+        
+        key = (symbols, expected_returns.tobytes(), risks.tobytes(), confidences.tobytes(),
+               self.correlation_epoch, max_total_risk, max_per_symbol, method)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+            correlations = self.correlations
         
         # Get correlation submatrix for these symbols
         symbol_indices = [self.symbols.index(s) if s in self.symbols else 0 for s in symbols]
-        corr_matrix = self.correlations[np.ix_(symbol_indices, symbol_indices)]
-        
-        # Objective: Maximize Sharpe ratio
-        def portfolio_sharpe(weights):
-            """Calculate negative Sharpe ratio (for minimization)"""
-            portfolio_return = np.dot(weights, expected_returns)
-            portfolio_variance = np.dot(weights, np.dot(corr_matrix * np.outer(risks, risks), weights))
-            portfolio_std = np.sqrt(portfolio_variance)
-            
-            if portfolio_std == 0:
-                return 0
-            
+        corr_matrix = correlations[np.ix_(symbol_indices, symbol_indices)]
+        cov = corr_matrix * np.outer(risks, risks)
+        
+        if method == 'risk_parity':
+            weights = self._risk_parity(cov, corr_matrix, risks, max_per_symbol)
+            if not self._feasible(weights, risks, max_total_risk, max_per_symbol):
+                return None
+            self._count('closed_form')
+        else:
+            weights = self._tangency(cov, expected_returns)
+            if weights is not None and self._feasible(weights, risks, max_total_risk, max_per_symbol):
+                self._count('closed_form')
+            else:
+                weights = self._solve_numeric(symbols, expected_returns, risks, confidences, cov,
+                                              max_total_risk, max_per_symbol)
+        
+        if weights is not None:
+            weights.setflags(write=False)
+            with self._lock:
+                self._cache[key] = weights
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return weights
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    @staticmethod
+    def _feasible(weights: np.ndarray, risks: np.ndarray, max_total_risk: float, max_per_symbol: float) -> bool:
+        return (weights.min() >= -BOUND_TOLERANCE
+                and weights.max() <= max_per_symbol + BOUND_TOLERANCE
+                and np.dot(weights, risks) <= max_total_risk + BOUND_TOLERANCE)
+    
+    @staticmethod
+    def _tangency(cov: np.ndarray, expected_returns: np.ndarray) -> Optional[np.ndarray]:
+        """Max-Sharpe weights with only sum(w) = 1 (None if there is no positive-return tangency)"""
+        try:
+            direction = np.linalg.solve(cov, expected_returns)
+        except np.linalg.LinAlgError:
+            return None
+        total = direction.sum()
+        if not np.isfinite(total) or total <= 0:
+            return None
+        return direction / total
+    
+    @staticmethod
+    def _risk_parity(cov: np.ndarray, corr_matrix: np.ndarray, risks: np.ndarray,
+                     max_per_symbol: float, sweeps: int = 50) -> np.ndarray:
+        """
+        Equal risk contribution weights. Inverse volatility is exact when all
+        pairwise correlations are equal; otherwise cyclical coordinate descent
+        (each step solves one quadratic) starting from inverse volatility.
+        Weights above max_per_symbol are capped and the excess spread over the rest.
+        """
+        n = len(risks)
+        weights = (1.0 / risks) / (1.0 / risks).sum()
+        off_diagonal = corr_matrix[~np.eye(n, dtype=bool)]
+        if n > 2 and np.ptp(off_diagonal) > 1e-9:
+            y = weights.copy()
+            budget = 1.0 / n
+            for _ in range(sweeps):
+                previous = y.copy()
+                for i in range(n):
+                    c = cov[i] @ y - cov[i, i] * y[i]
+                    y[i] = (-c + np.sqrt(c * c + 4.0 * cov[i, i] * budget)) / (2.0 * cov[i, i])
+                if np.max(np.abs(y - previous)) < 1e-10 * y.max():
+                    break
+            weights = y / y.sum()
+        
+        # Water-fill the per-symbol cap
+        for _ in range(n):
+            over = weights > max_per_symbol + BOUND_TOLERANCE
+            if not over.any():
+                break
+            excess = (weights[over] - max_per_symbol).sum()
+            weights[over] = max_per_symbol
+            free = weights < max_per_symbol - BOUND_TOLERANCE
+            weights[free] += excess * weights[free] / weights[free].sum()
+        return weights
+    
+    def _solve_numeric(self, symbols: Tuple[str, ...], expected_returns: np.ndarray, risks: np.ndarray,
+                       confidences: np.ndarray, cov: np.ndarray,
+                       max_total_risk: float, max_per_symbol: float) -> Optional[np.ndarray]:
+        """SLSQP with analytic gradients, warm-started from the previous solution when signals barely moved"""
+        
+        # Objective: Maximize Sharpe ratio (negative for minimization)
+        def negative_sharpe(weights):
+            cov_w = cov @ weights
+            portfolio_return = weights @ expected_returns
+            portfolio_std = np.sqrt(max(weights @ cov_w, 1e-18))
             sharpe = portfolio_return / portfolio_std
-            return -sharpe  # Negative for minimization
+            gradient = expected_returns / portfolio_std - portfolio_return * cov_w / portfolio_std ** 3
+            return -sharpe, -gradient
         
-        # Constraints
+        ones = np.ones(len(symbols))
         constraints = [
             # Weights sum to 1
-            {'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0},
+            {'type': 'eq', 'fun': lambda w: w.sum() - 1.0, 'jac': lambda w: ones},
             # Total risk constraint
-            {'type': 'ineq', 'fun': lambda w: max_total_risk - np.dot(w, risks)}
+            {'type': 'ineq', 'fun': lambda w: max_total_risk - w @ risks, 'jac': lambda w: -risks},
         ]
         
         # Bounds: 0 to max_per_symbol for each weight
-        bounds = [(0, max_per_symbol) for _ in range(len(signals))]
-        
-        # Initial guess: weighted by confidence
-        initial_weights = confidences / confidences.sum()
+        bounds = [(0, max_per_symbol)] * len(symbols)
+        
+        # Initial guess: previous solution if only slightly changed, else weighted by confidence
+        with self._lock:
+            previous = self._previous
+        if (previous is not None and previous['symbols'] == symbols
+                and np.all(np.abs(expected_returns - previous['expected_returns'])
+                           <= WARM_START_TOLERANCE * np.abs(previous['expected_returns']))
+                and np.all(np.abs(risks - previous['risks']) <= WARM_START_TOLERANCE * previous['risks'])):
+            initial_weights = previous['weights']
+            self._count('warm_start')
+        else:
+            initial_weights = confidences / confidences.sum()
+            self._count('cold_start')
         
         # Optimize
         result = minimize(
-            portfolio_sharpe,
+            negative_sharpe,
             x0=initial_weights,
+            jac=True,
             method='SLSQP',
             bounds=bounds,
             constraints=constraints,
             options={'maxiter': 1000}
         )
-        
         if not result.success:
-            # Fallback to confidence-weighted
-            return self._confidence_weighted_allocation(signals, account_balance, max_per_symbol)
-        
-        # Convert weights to dollar amounts
-        optimal_weights = result.x
-        position_sizes = {}
-        
-        for i, signal in enumerate(signals):
-            position_sizes[signal['symbol']] = optimal_weights[i] * account_balance
+            return None
         
-        return position_sizes
+        weights = np.clip(result.x, 0.0, max_per_symbol)
+        with self._lock:
+            self._previous = {'symbols': symbols, 'expected_returns': expected_returns,
+                              'risks': risks, 'weights': weights.copy()}
+        return weights
+    
+    # ═══════════════════════════════════════════════════════════
+    # BACKGROUND MODE
+    # ═══════════════════════════════════════════════════════════
+    
+    def start_background(self, interval: float = 1.0):
+        """Keep a target allocation current in a daemon thread (see submit_signals)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._background_loop, args=(interval,),
+                                        name='portfolio-optimizer', daemon=True)
+        self._thread.start()
+    
+    def stop_background(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+    
+    def submit_signals(self, signals: List[Dict], account_balance: float, **limits):
+        """Latest signals for the background solver (replaces anything not yet solved)"""
+        with self._lock:
+            self._pending = (list(signals), account_balance, limits)
+        self._wake.set()
+    
+    def get_target_allocation(self) -> Dict[str, float]:
+        """Most recent background allocation {symbol: dollars} - never solves on the caller"""
+        with self._lock:
+            return self._target
+    
+    def _background_loop(self, interval: float):
+        last_inputs, last_epoch = None, -1
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            with self._lock:
+                inputs, epoch = self._pending, self.correlation_epoch
+            if inputs is None:
+                continue
+            signals, account_balance, limits = inputs
+            if inputs is last_inputs and epoch == last_epoch:
+                continue
+            last_inputs, last_epoch = inputs, epoch
+            start = time.perf_counter()
+            try:
+                target = self.optimize_position_sizes(signals, account_balance, **limits)
+            except Exception as e:
+                logger.warning(f"⚠️ Background allocation failed (keeping previous target): {e}")
+                continue
+            with self._lock:
+                self._target = target
+                self.stats['background_ms'] = (time.perf_counter() - start) * 1000.0
     
     def _equal_weight_allocation(
         self,
@@ -1,6 +1,15 @@
 """
 Flash Crash Circuit Breaker
 Prevents black swan disaster events
+
+Detection runs on event time, so the same code drives live trading and
+backtest replays:
+- Every price/equity update carries its own timestamp (defaults to now)
+- Each symbol and the equity curve keep a time-based sliding window with
+  monotonic max/min deques - O(1) amortised per update, no rescans
+- Flash crash thresholds are instrument-relative: a multiple of the
+  symbol's ATR when known, otherwise a move in price points per instrument
+- Halt cooldowns are measured from the event that triggered them
 """
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
@@ -22,13 +31,83 @@ class CircuitBreakerStatus:
     should_close_positions: bool
     cooldown_minutes: int
 
+    @property
+    def can_trade(self) -> bool:
+        return not self.should_halt_trading
+
+
+class RollingExtrema:
+    """
+    Running max/min of (timestamp, value) events over a trailing time window.
+
+    Each deque keeps only values that can still become the extreme: a new
+    value evicts every older value it dominates, and expired values drop off
+    the front. Every value is pushed and popped at most once - O(1) amortised.
+    """
+
+    __slots__ = ('window_seconds', '_max', '_min', 'last_ts', 'last_value')
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._max: deque = deque()  # (ts, value), values decreasing
+        self._min: deque = deque()  # (ts, value), values increasing
+        self.last_ts: Optional[float] = None
+        self.last_value: Optional[float] = None
+
+    def push(self, ts: float, value: float):
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts  # Late event - keep the window monotonic in time
+
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+
+        self.last_ts = ts
+        self.last_value = value
+        self.expire(ts)
+
+    def expire(self, now: float):
+        """Drop values older than the window"""
+        cutoff = now - self.window_seconds
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def range(self) -> float:
+        return self._max[0][1] - self._min[0][1] if self._max else 0.0
+
+
+def pip_size(symbol: str) -> float:
+    """Conventional pip size - converts the legacy pip threshold to price points"""
+    s = symbol.upper().replace('.SIM', '').replace('.PRO', '')
+    if s.startswith('XAU'):
+        return 0.1
+    if s.startswith('XAG'):
+        return 0.01
+    if len(s) == 6 and s.isalpha():
+        return 0.01 if 'JPY' in s else 0.0001
+    return 1.0  # Indices, energies: whole points
+
 
 class FlashCrashCircuitBreaker:
     """
     Circuit breaker to prevent catastrophic losses
 
     Triggers on:
-    - Flash crash (>100 pips in 1 minute)
+    - Flash crash (>3 ATR, or the instrument's point threshold, in 1 minute)
     - Rapid drawdown (>3% in 5 minutes)
     - Connection loss
     - Consecutive losses (5+ in a row)
@@ -41,28 +120,39 @@ class FlashCrashCircuitBreaker:
         rapid_drawdown_pct: float = 3.0,
         rapid_drawdown_minutes: int = 5,
         max_consecutive_losses: int = 5,
-        daily_loss_critical_buffer: float = 1.0  # Stop when buffer < 1%
+        daily_loss_critical_buffer: float = 1.0,  # Stop when buffer < 1%
+        flash_crash_atr: float = 3.0,
+        flash_crash_seconds: int = 60,
+        flash_crash_points: Dict[str, float] = None
     ):
         """
         Args:
-            flash_crash_pips: Pip threshold for flash crash detection
+            flash_crash_pips: Fallback threshold in pips when neither ATR nor points are known
             rapid_drawdown_pct: % drawdown threshold
             rapid_drawdown_minutes: Time window for rapid drawdown
             max_consecutive_losses: Max consecutive losses before halt
             daily_loss_critical_buffer: FTMO daily loss buffer to trigger halt
+            flash_crash_atr: Flash crash threshold in ATR multiples (per symbol)
+            flash_crash_seconds: Time window for flash crash detection
+            flash_crash_points: Symbol -> price move threshold, used when no ATR is known
         """
         self.flash_crash_threshold = flash_crash_pips
+        self.flash_crash_atr = flash_crash_atr
+        self.flash_crash_seconds = flash_crash_seconds
+        self.flash_crash_points = {s.upper(): p for s, p in (flash_crash_points or {}).items()}
         self.rapid_drawdown_pct = rapid_drawdown_pct
         self.rapid_drawdown_minutes = rapid_drawdown_minutes
         self.max_consecutive_losses = max_consecutive_losses
         self.daily_loss_buffer_critical = daily_loss_critical_buffer
 
         # Tracking
-        self.price_history: Dict[str, deque] = {}  # symbol -> [(timestamp, price)]
-        self.equity_history: deque = deque(maxlen=100)  # (timestamp, equity)
+        self.price_windows: Dict[str, RollingExtrema] = {}  # symbol -> flash crash window
+        self.equity_window = RollingExtrema(rapid_drawdown_minutes * 60)
+        self.atr: Dict[str, float] = {}  # symbol -> latest ATR (price units)
         self.recent_trades: deque = deque(maxlen=20)  # Recent trade results
         self.last_connection_check: Optional[datetime] = None
         self.consecutive_losses: int = 0
+        self.last_event_time: Optional[datetime] = None
 
         # Circuit breaker state
         self.is_halted: bool = False
@@ -71,13 +161,61 @@ class FlashCrashCircuitBreaker:
 
         logger.info("Initialized Flash Crash Circuit Breaker")
 
+    # ═══════════════════════════════════════════════════════════
+    # EVENTS
+    # ═══════════════════════════════════════════════════════════
+
+    def _event_time(self, timestamp: Optional[datetime]) -> datetime:
+        now = timestamp or datetime.now()
+        self.last_event_time = now
+        return now
+
+    def update_atr(self, symbol: str, atr: float):
+        """Latest ATR (price units) for a symbol's flash crash threshold"""
+        if atr and atr > 0:
+            self.atr[symbol] = atr
+
+    def on_price(self, symbol: str, price: float, timestamp: datetime = None,
+                 atr: float = None) -> Optional[str]:
+        """
+        Record a price and check that symbol's flash crash window.
+
+        Returns:
+            Description if a flash crash is detected, None otherwise
+        """
+        now = self._event_time(timestamp)
+        if atr is not None:
+            self.update_atr(symbol, atr)
+        if not price or price <= 0:
+            return None
+
+        window = self.price_windows.get(symbol)
+        if window is None:
+            window = self.price_windows[symbol] = RollingExtrema(self.flash_crash_seconds)
+        window.push(now.timestamp(), price)
+        return self._detect_flash_crash(symbol)
+
+    def on_equity(self, equity: float, timestamp: datetime = None) -> Optional[str]:
+        """
+        Record account equity and check the rapid drawdown window.
+
+        Returns:
+            Description if a rapid drawdown is detected, None otherwise
+        """
+        now = self._event_time(timestamp)
+        if equity is None or equity <= 0:
+            return None
+        self.equity_window.push(now.timestamp(), equity)
+        return self._detect_rapid_drawdown()
+
     def check_circuit_breaker(
         self,
         current_equity: float,
         current_prices: Dict[str, float],
         ftmo_daily_loss_buffer: float,
         positions: List[Dict] = None,
-        connection_alive: bool = True
+        connection_alive: bool = True,
+        timestamp: datetime = None
     ) -> CircuitBreakerStatus:
         """
         Check all circuit breaker conditions
@@ -88,34 +226,23 @@ class FlashCrashCircuitBreaker:
             ftmo_daily_loss_buffer: FTMO daily loss buffer %
             positions: Open positions
             connection_alive: MT5 connection status
+            timestamp: Event time (default: now) - pass bar time when replaying
 
         Returns:
             CircuitBreakerStatus
         """
-        now = datetime.now()
+        now = self._event_time(timestamp)
 
         # Check if currently halted
-        if self.is_halted:
-            if self.halt_until and now >= self.halt_until:
-                # Cooldown expired
-                self.is_halted = False
-                self.halt_reason = ""
-                self.halt_until = None
-                logger.info("Circuit breaker reset - Trading resumed")
-            else:
-                remaining = (self.halt_until - now).total_seconds() / 60 if self.halt_until else 0
-                return CircuitBreakerStatus(
-                    is_triggered=True,
-                    reason=f"Trading halted: {self.halt_reason} (Cooldown: {remaining:.0f} min)",
-                    severity='CRITICAL',
-                    should_halt_trading=True,
-                    should_close_positions=False,
-                    cooldown_minutes=int(remaining)
-                )
-
-        # Update tracking
-        self._update_price_history(current_prices, now)
-        self._update_equity_history(current_equity, now)
+        halted = self._halt_status(now)
+        if halted:
+            return halted
+
+        # Update tracking (each update checks its own window)
+        flash_crash = None
+        for symbol, price in current_prices.items():
+            flash_crash = self.on_price(symbol, price, now) or flash_crash
+        rapid_dd = self.on_equity(current_equity, now)
 
         # Check conditions (in order of severity)
 
@@ -129,7 +256,6 @@ class FlashCrashCircuitBreaker:
             )
 
         # 2. Flash crash detection
-        flash_crash = self._detect_flash_crash()
         if flash_crash:
             return self._trigger_circuit_breaker(
                 reason=f"FLASH CRASH DETECTED: {flash_crash}",
@@ -139,7 +265,6 @@ class FlashCrashCircuitBreaker:
             )
 
         # 3. Rapid drawdown
-        rapid_dd = self._detect_rapid_drawdown()
         if rapid_dd:
             return self._trigger_circuit_breaker(
                 reason=f"RAPID DRAWDOWN: {rapid_dd}",
@@ -181,17 +306,39 @@ class FlashCrashCircuitBreaker:
                         cooldown_minutes=0
                     )
 
-        # All clear
-        return CircuitBreakerStatus(
-            is_triggered=False,
-            reason="All systems normal",
-            severity='OK',
-            should_halt_trading=False,
-            should_close_positions=False,
-            cooldown_minutes=0
-        )
+        return self._all_clear()
+
+    def check_for_crash(self, symbol: str, current_price: float = 0,
+                        timestamp: datetime = None) -> CircuitBreakerStatus:
+        """
+        Single-symbol check for the execution gate.
 
-    def record_trade_result(self, profit: float):
+        Records the price if one is given, then reports an active halt or a
+        flash crash in that symbol's window. Does not touch equity tracking.
+        """
+        now = self._event_time(timestamp)
+        halted = self._halt_status(now)
+        if halted:
+            return halted
+
+        if current_price and current_price > 0:
+            flash_crash = self.on_price(symbol, current_price, now)
+        else:
+            window = self.price_windows.get(symbol)
+            if window is not None:
+                window.expire(now.timestamp())
+            flash_crash = self._detect_flash_crash(symbol)
+
+        if flash_crash:
+            return self._trigger_circuit_breaker(
+                reason=f"FLASH CRASH DETECTED: {flash_crash}",
+                severity='CRITICAL',
+                should_close=True,
+                cooldown_minutes=60
+            )
+        return self._all_clear()
+
+    def record_trade_result(self, profit: float, timestamp: datetime = None):
         """Record trade result for consecutive loss tracking"""
         is_loss = profit < 0
 
@@ -201,7 +348,7 @@ class FlashCrashCircuitBreaker:
             self.consecutive_losses = 0  # Reset on win
 
         self.recent_trades.append({
-            'timestamp': datetime.now(),
+            'timestamp': self._event_time(timestamp),
             'profit': profit,
             'is_loss': is_loss
         })
@@ -216,47 +363,38 @@ class FlashCrashCircuitBreaker:
         self.halt_until = None
         logger.info("Circuit breaker manually reset")
 
-    def _update_price_history(self, prices: Dict[str, float], timestamp: datetime):
-        """Update price history for flash crash detection"""
-        for symbol, price in prices.items():
-            if symbol not in self.price_history:
-                self.price_history[symbol] = deque(maxlen=60)  # Keep 60 data points
-
-            self.price_history[symbol].append((timestamp, price))
-
-    def _update_equity_history(self, equity: float, timestamp: datetime):
-        """Update equity history for drawdown detection"""
-        self.equity_history.append((timestamp, equity))
-
-    def _detect_flash_crash(self) -> Optional[str]:
+    # ═══════════════════════════════════════════════════════════
+    # DETECTORS
+    # ═══════════════════════════════════════════════════════════
+
+    def flash_crash_move(self, symbol: str) -> Tuple[float, str]:
+        """Price move that counts as a flash crash for a symbol, and its unit label"""
+        atr = self.atr.get(symbol)
+        if atr:
+            return self.flash_crash_atr * atr, f"{self.flash_crash_atr:g} ATR"
+        points = self.flash_crash_points.get(symbol.upper())
+        if points:
+            return points, f"{points:g} points"
+        return self.flash_crash_threshold * pip_size(symbol), f"{self.flash_crash_threshold:g} pips"
+
+    def _detect_flash_crash(self, symbol: str) -> Optional[str]:
         """
-        Detect flash crash (>100 pips in 1 minute)
+        Detect flash crash (high-low range in the window beyond the symbol's threshold)
 
         Returns:
             Description if detected, None otherwise
         """
-        now = datetime.now()
-        one_minute_ago = now - timedelta(minutes=1)
-
-        for symbol, history in self.price_history.items():
-            if len(history) < 2:
-                continue
-
-            # Get prices from last minute
-            recent = [(ts, price) for ts, price in history if ts >= one_minute_ago]
-
-            if len(recent) < 2:
-                continue
-
-            # Calculate max price movement in last minute
-            prices = [p for _, p in recent]
-            max_price = max(prices)
-            min_price = min(prices)
-            movement_pips = (max_price - min_price) * 10000
-
-            if movement_pips > self.flash_crash_threshold:
-                return f"{symbol} moved {movement_pips:.0f} pips in 1 minute"
+        window = self.price_windows.get(symbol)
+        if window is None:
+            return None
 
+        movement = window.range
+        threshold, label = self.flash_crash_move(symbol)
+        if movement > threshold:
+            atr = self.atr.get(symbol)
+            size = f"{movement / atr:.1f} ATR" if atr else f"{movement:.5g}"
+            return (f"{symbol} moved {size} in {self.flash_crash_seconds}s "
+                    f"(limit {label})")
         return None
 
     def _detect_rapid_drawdown(self) -> Optional[str]:
@@ -266,23 +404,11 @@ class FlashCrashCircuitBreaker:
         Returns:
             Description if detected, None otherwise
         """
-        if len(self.equity_history) < 2:
-            return None
-
-        now = datetime.now()
-        window_start = now - timedelta(minutes=self.rapid_drawdown_minutes)
-
-        # Get equity values in window
-        window_values = [(ts, equity) for ts, equity in self.equity_history if ts >= window_start]
-
-        if len(window_values) < 2:
+        max_equity = self.equity_window.max
+        current_equity = self.equity_window.last_value
+        if not max_equity or current_equity is None:
             return None
 
-        # Calculate drawdown
-        equities = [e for _, e in window_values]
-        max_equity = max(equities)
-        current_equity = equities[-1]
-
         drawdown_pct = ((max_equity - current_equity) / max_equity) * 100
 
         if drawdown_pct > self.rapid_drawdown_pct:
@@ -290,6 +416,42 @@ class FlashCrashCircuitBreaker:
 
         return None
 
+    # ═══════════════════════════════════════════════════════════
+    # HALT STATE
+    # ═══════════════════════════════════════════════════════════
+
+    def _halt_status(self, now: datetime) -> Optional[CircuitBreakerStatus]:
+        """Active halt status, or None once the cooldown has expired"""
+        if not self.is_halted:
+            return None
+        if self.halt_until and now >= self.halt_until:
+            # Cooldown expired
+            self.is_halted = False
+            self.halt_reason = ""
+            self.halt_until = None
+            logger.info("Circuit breaker reset - Trading resumed")
+            return None
+
+        remaining = (self.halt_until - now).total_seconds() / 60 if self.halt_until else 0
+        return CircuitBreakerStatus(
+            is_triggered=True,
+            reason=f"Trading halted: {self.halt_reason} (Cooldown: {remaining:.0f} min)",
+            severity='CRITICAL',
+            should_halt_trading=True,
+            should_close_positions=False,
+            cooldown_minutes=int(remaining)
+        )
+
+    def _all_clear(self) -> CircuitBreakerStatus:
+        return CircuitBreakerStatus(
+            is_triggered=False,
+            reason="All systems normal",
+            severity='OK',
+            should_halt_trading=False,
+            should_close_positions=False,
+            cooldown_minutes=0
+        )
+
     def _trigger_circuit_breaker(
         self,
         reason: str,
@@ -297,10 +459,10 @@ class FlashCrashCircuitBreaker:
         should_close: bool,
         cooldown_minutes: int
     ) -> CircuitBreakerStatus:
-        """Trigger circuit breaker"""
+        """Trigger circuit breaker (cooldown runs from the triggering event's time)"""
         self.is_halted = True
         self.halt_reason = reason
-        self.halt_until = datetime.now() + timedelta(minutes=cooldown_minutes)
+        self.halt_until = (self.last_event_time or datetime.now()) + timedelta(minutes=cooldown_minutes)
 
         logger.critical(f"🚨 CIRCUIT BREAKER TRIGGERED: {reason}")
         logger.critical(f"Trading halted for {cooldown_minutes} minutes")
@@ -320,7 +482,8 @@ class FlashCrashCircuitBreaker:
     def get_status_report(self) -> str:
         """Generate circuit breaker status report"""
         if self.is_halted:
-            remaining = (self.halt_until - datetime.now()).total_seconds() / 60 if self.halt_until else 0
+            now = self.last_event_time or datetime.now()
+            remaining = (self.halt_until - now).total_seconds() / 60 if self.halt_until else 0
             return f"""
 CIRCUIT BREAKER STATUS
 ======================
@@ -335,6 +498,6 @@ CIRCUIT BREAKER STATUS
 ======================
 Status: ✓ ARMED (All systems normal)
 Consecutive Losses: {self.consecutive_losses}
-Flash Crash Threshold: {self.flash_crash_threshold} pips / 1 min
+Flash Crash Threshold: {self.flash_crash_atr:g} ATR / {self.flash_crash_seconds}s (fallback {self.flash_crash_threshold} pips)
 Rapid Drawdown Threshold: {self.rapid_drawdown_pct}% / {self.rapid_drawdown_minutes} min
 """
@@ -1,13 +1,18 @@
 """
 Circuit Breakers - Safety Limits for Trading System
 Prevents catastrophic losses through automatic trading halts
+
+Daily P&L, the midnight balance and the equity peak come from the FTMO rule
+engine's snapshot; this module only keeps its own counters (consecutive
+losses, trades today) and the halt state.
 """
 
-from datetime import datetime, date
+from datetime import date
 from typing import Dict, Optional
 from loguru import logger
-import json
-import os
+
+from src.risk.ftmo_rule_engine import FTMORuleEngine, get_ftmo_rule_engine
+from src.utils.json_state import get_json_state_writer
 
 
 class CircuitBreakers:
@@ -27,14 +32,24 @@ class CircuitBreakers:
         max_daily_loss_pct: float = 5.0,
         max_consecutive_losses: int = 5,
         max_drawdown_pct: float = 10.0,
-        state_file: str = "/tmp/circuit_breakers_state.json"
+        state_file: str = "/tmp/circuit_breakers_state.json",
+        rule_engine: Optional[FTMORuleEngine] = None
     ):
+        """
+        Args:
+            max_daily_loss_pct: Halt when equity is this % below the midnight balance
+            max_consecutive_losses: Halt after this many losing trades in a row
+            max_drawdown_pct: Halt when equity is this % below its peak
+            state_file: Counter/halt state (write-behind JSON)
+            rule_engine: Source of balance/equity figures (default: the shared engine)
+        """
+        self.rule_engine = rule_engine or get_ftmo_rule_engine()
         self.max_daily_loss_pct = max_daily_loss_pct
         self.max_consecutive_losses = max_consecutive_losses
         self.max_drawdown_pct = max_drawdown_pct
         self.state_file = state_file
 
-        # Load previous state
+        # Load previous state (changes are written behind, coalesced and atomic)
         self.state = self._load_state()
 
         # Initialize if new day
@@ -42,32 +57,22 @@ class CircuitBreakers:
             self._reset_daily_state()
 
     def _load_state(self) -> Dict:
-        """Load circuit breaker state from file"""
-        if os.path.exists(self.state_file):
-            try:
-                with open(self.state_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.warning(f"Failed to load circuit breaker state: {e}")
-
-        return self._get_default_state()
-
-    def _save_state(self):
-        """Save circuit breaker state to file"""
-        try:
-            with open(self.state_file, 'w') as f:
-                json.dump(self.state, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save circuit breaker state: {e}")
+        """Load circuit breaker state from file (missing keys filled with defaults)"""
+        state = get_json_state_writer().document(self.state_file)
+        for key, value in self._get_default_state().items():
+            if key not in state:
+                state[key] = value
+        return state
+
+    def flush_state(self):
+        """Write pending state changes to disk now"""
+        self.state.flush()
 
     def _get_default_state(self) -> Dict:
         """Get default state for circuit breakers"""
         return {
             'date': str(date.today()),
-            'daily_start_balance': 0,
-            'daily_pnl': 0,
             'consecutive_losses': 0,
-            'peak_balance': 0,
             'trades_today': 0,
             'breakers_triggered': [],
             'trading_halted': False,
@@ -77,32 +82,22 @@ class CircuitBreakers:
     def _reset_daily_state(self):
         """Reset state for new trading day"""
         logger.info("🔄 Circuit Breakers: New trading day, resetting state")
-        self.state = self._get_default_state()
-        self._save_state()
+        self.state.replace(self._get_default_state())
 
     def update_balance(self, current_balance: float, daily_start_balance: Optional[float] = None):
         """
-        Update balance tracking
+        Feed a balance update to the rule engine (it owns daily start, peaks and P&L)
 
         Args:
             current_balance: Current account balance
-            daily_start_balance: Balance at start of day (optional)
+            daily_start_balance: Broker's balance at midnight (optional, wins over the engine's rollover)
         """
         if daily_start_balance is not None:
-            self.state['daily_start_balance'] = daily_start_balance
-
-        # Set initial balance if not set
-        if self.state['daily_start_balance'] == 0:
-            self.state['daily_start_balance'] = current_balance
-
-        # Update peak balance
-        if current_balance > self.state['peak_balance']:
-            self.state['peak_balance'] = current_balance
-
-        # Calculate daily P&L
-        self.state['daily_pnl'] = current_balance - self.state['daily_start_balance']
-
-        self._save_state()
+            self.rule_engine.on_account({'balance': current_balance,
+                                         'equity': self.rule_engine.snapshot().equity,
+                                         'daily_start_balance': daily_start_balance})
+        else:
+            self.rule_engine.on_balance(current_balance)
 
     def record_trade_result(self, profit: float, was_winner: bool):
         """
@@ -123,12 +118,13 @@ class CircuitBreakers:
                    f"{'WIN' if was_winner else 'LOSS'} ${profit:.2f} | "
                    f"Consecutive losses: {self.state['consecutive_losses']}")
 
-        self._save_state()
-
-    def check_breakers(self, current_balance: float) -> Dict:
+    def check_breakers(self, current_balance: Optional[float] = None) -> Dict:
         """
         Check all circuit breakers
 
+        Args:
+            current_balance: Fed to the rule engine first (None = engine already up to date)
+
         Returns:
             {
                 'allow_trading': bool,
@@ -141,12 +137,13 @@ class CircuitBreakers:
         """
         triggered = []
 
-        # Update balance
-        self.update_balance(current_balance)
+        if current_balance is not None:
+            self.update_balance(current_balance)
+        ftmo = self.rule_engine.snapshot()
 
-        # 1. Daily loss limit
-        if self.state['daily_start_balance'] > 0:
-            daily_loss_pct = (self.state['daily_pnl'] / self.state['daily_start_balance']) * 100
+        # 1. Daily loss limit (equity vs the midnight balance)
+        if ftmo.daily_start_balance > 0:
+            daily_loss_pct = (ftmo.daily_pnl / ftmo.daily_start_balance) * 100
         else:
             daily_loss_pct = 0
 
@@ -157,11 +154,8 @@ class CircuitBreakers:
         if self.state['consecutive_losses'] >= self.max_consecutive_losses:
             triggered.append(f"Consecutive losses: {self.state['consecutive_losses']} (max: {self.max_consecutive_losses})")
 
-        # 3. Drawdown from peak
-        if self.state['peak_balance'] > 0:
-            drawdown_pct = ((self.state['peak_balance'] - current_balance) / self.state['peak_balance']) * 100
-        else:
-            drawdown_pct = 0
+        # 3. Drawdown from the equity peak
+        drawdown_pct = ftmo.drawdown_from_peak_pct
 
         if drawdown_pct > self.max_drawdown_pct:
             triggered.append(f"Drawdown from peak: {drawdown_pct:.2f}% (max: {self.max_drawdown_pct}%)")
@@ -171,7 +165,7 @@ class CircuitBreakers:
             self.state['trading_halted'] = True
             self.state['halt_reason'] = '; '.join(triggered)
             self.state['breakers_triggered'] = triggered
-            self._save_state()
+            self.flush_state()  # Halts must survive a crash right after
 
             logger.error("🚨 CIRCUIT BREAKERS TRIGGERED - TRADING HALTED 🚨")
             for breaker in triggered:
@@ -193,7 +187,7 @@ class CircuitBreakers:
         """Manually halt trading"""
         self.state['trading_halted'] = True
         self.state['halt_reason'] = reason
-        self._save_state()
+        self.flush_state()
         logger.warning(f"⚠️ Trading manually halted: {reason}")
 
     def manual_resume(self):
@@ -201,17 +195,18 @@ class CircuitBreakers:
         self.state['trading_halted'] = False
         self.state['halt_reason'] = None
         self.state['breakers_triggered'] = []
-        self._save_state()
+        self.flush_state()
         logger.info("✅ Trading manually resumed")
 
     def get_status(self) -> Dict:
         """Get current circuit breaker status"""
+        ftmo = self.rule_engine.snapshot()
         return {
             'trading_allowed': not self.state['trading_halted'],
             'halt_reason': self.state['halt_reason'],
-            'daily_pnl': self.state['daily_pnl'],
+            'daily_pnl': ftmo.daily_pnl,
             'consecutive_losses': self.state['consecutive_losses'],
             'trades_today': self.state['trades_today'],
-            'peak_balance': self.state['peak_balance'],
+            'peak_balance': ftmo.peak_balance,
             'breakers_triggered': self.state['breakers_triggered']
         }
@@ -1,11 +1,16 @@
 """
 Consistency Rule Validator
 Ensures no single day contributes >50% of total profit (FTMO Phase 2 requirement)
+
+Per-day profit comes from the FTMO rule engine: realized profit per CE(S)T
+trading day (its consistency buckets), and for today the snapshot's daily P&L
+(equity vs the midnight balance - realized plus floating).
 """
-from typing import List, Tuple, Dict
-from datetime import datetime, date
+from typing import Optional, Tuple, Dict
+from datetime import date
 from dataclasses import dataclass
 
+from src.risk.ftmo_rule_engine import FTMORuleEngine, get_ftmo_rule_engine
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -45,55 +50,66 @@ class ConsistencyRuleValidator:
         self,
         warning_threshold: float = 40.0,  # Warn at 40%
         critical_threshold: float = 45.0,  # Stop at 45%
-        max_single_day: float = 50.0       # FTMO limit
+        max_single_day: float = 50.0,      # FTMO limit
+        rule_engine: Optional[FTMORuleEngine] = None
     ):
         """
         Args:
             warning_threshold: Pct where we warn user
             critical_threshold: Pct where we stop trading
             max_single_day: FTMO maximum (50%)
+            rule_engine: Source of per-day profit (default: the shared engine)
         """
         self.warning_threshold = warning_threshold
         self.critical_threshold = critical_threshold
         self.max_single_day = max_single_day
+        self.rule_engine = rule_engine or get_ftmo_rule_engine()
 
-        # Track daily profits
-        self.daily_profits: Dict[date, float] = {}
+    @property
+    def daily_profits(self) -> Dict[str, float]:
+        """Realized profit per trading day (ISO date -> dollars)"""
+        return self.rule_engine.daily_profits()
 
     def record_daily_profit(self, trade_date: date, profit_dollars: float):
         """
-        Record profit for a specific day
+        Record a closed trade's profit
 
         Args:
-            trade_date: Date of trade
+            trade_date: Date of trade (informational - the engine books it on the current trading day)
             profit_dollars: Profit in dollars
         """
-        if trade_date not in self.daily_profits:
-            self.daily_profits[trade_date] = 0
-
-        self.daily_profits[trade_date] += profit_dollars
+        self.rule_engine.on_trade_close(profit_dollars)
         logger.debug(f"Recorded ${profit_dollars:.2f} profit for {trade_date}")
 
     def check_consistency(
         self,
         current_date: date = None,
-        current_day_profit: float = 0
+        current_day_profit: Optional[float] = None
     ) -> ConsistencyStatus:
         """
         Check if consistency rule is at risk
 
         Args:
-            current_date: Today's date
-            current_day_profit: Profit today so far (unrealized)
+            current_date: Today's date (default: the engine's trading day)
+            current_day_profit: Unrealized profit to add to today's realized profit
+                                (default: the engine's daily P&L, realized + floating)
 
         Returns:
             ConsistencyStatus with recommendation
         """
-        if current_date is None:
-            current_date = datetime.now().date()
+        ftmo = self.rule_engine.snapshot()
+        current_date = str(current_date) if current_date is not None else ftmo.trading_day
+        realized_days = self.rule_engine.daily_profits()
+        already_made_today = realized_days.get(current_date, 0)
+        if current_day_profit is None:
+            projected_today = ftmo.daily_pnl
+        else:
+            projected_today = already_made_today + current_day_profit
 
         # Calculate total profit
-        total_profit = sum(self.daily_profits.values()) + current_day_profit
+        all_days = dict(realized_days)
+        all_days[current_date] = projected_today
+        total_profit = sum(all_days.values())
 
         if total_profit <= 0:
             return ConsistencyStatus(
@@ -107,20 +123,15 @@ class ConsistencyRuleValidator:
             )
 
         # Calculate today's contribution
-        projected_today = self.daily_profits.get(current_date, 0) + current_day_profit
         today_pct = (projected_today / total_profit) * 100
 
         # Find largest day
-        all_days = self.daily_profits.copy()
-        all_days[current_date] = projected_today
-
         largest_day_profit = max(all_days.values())
         largest_day_pct = (largest_day_profit / total_profit) * 100
 
         # Calculate safe limit for today
         # Formula: Today's profit must keep it under critical_threshold
         # safe_limit = (critical_threshold / 100) * total_profit - already_made_today
-        already_made_today = self.daily_profits.get(current_date, 0)
         safe_limit = (self.critical_threshold / 100) * total_profit - already_made_today
         safe_limit = max(0, safe_limit)
 
@@ -139,7 +150,7 @@ class ConsistencyRuleValidator:
 
         # Create daily breakdown
         daily_pct = {
-            str(day): (profit / total_profit * 100)
+            day: (profit / total_profit * 100)
             for day, profit in all_days.items()
         }
 
@@ -158,7 +169,7 @@ class ConsistencyRuleValidator:
     def should_stop_trading_today(
         self,
         current_date: date = None,
-        current_day_profit: float = 0
+        current_day_profit: Optional[float] = None
     ) -> Tuple[bool, str]:
         """
         Check if should stop trading today
@@ -183,16 +194,17 @@ class ConsistencyRuleValidator:
         Returns:
             Dict of {date: profit_pct}
         """
-        total = sum(self.daily_profits.values())
+        daily_profits = self.rule_engine.daily_profits()
+        total = sum(daily_profits.values())
         if total <= 0:
             return {}
 
         return {
-            str(day): (profit / total * 100)
-            for day, profit in self.daily_profits.items()
+            day: (profit / total * 100)
+            for day, profit in daily_profits.items()
         }
 
     def reset(self):
         """Reset validator (for new challenge)"""
-        self.daily_profits = {}
+        self.rule_engine.reset_buckets()
         logger.info("Consistency validator reset")
@@ -4,8 +4,9 @@ Prevents correlation bombs (e.g., long EURUSD + long GBPUSD = double short USD)
 """
 import numpy as np
 from typing import Dict, List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+from src.risk.factor_loadings import FactorLoadings, get_factor_loadings
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -29,19 +30,26 @@ class PortfolioExposure:
     max_exposure: Tuple[str, float]  # (currency, exposure_pct)
     warnings: List[str]
     is_safe: bool
+    factor_exposure: Dict[str, float] = field(default_factory=dict)  # Every factor incl. asset classes
 
 
 class CurrencyExposureTracker:
     """
     Tracks net currency exposure across all positions
+
+    Exposure comes from the shared symbol -> factor loading matrix
+    (src/risk/factor_loadings.py): currency legs, USD sensitivity of indices
+    and metals, and asset class.
     """
 
-    def __init__(self, max_currency_exposure_pct: float = 4.0):
+    def __init__(self, max_currency_exposure_pct: float = 4.0, loadings: FactorLoadings = None):
         """
         Args:
             max_currency_exposure_pct: Maximum exposure to any single currency (% of account)
+            loadings: Factor loading matrix (default: shared instance)
         """
         self.max_exposure = max_currency_exposure_pct
+        self.loadings = loadings or get_factor_loadings()
 
     def calculate_exposure(
         self,
@@ -67,45 +75,47 @@ class CurrencyExposureTracker:
                 is_safe=True
             )
 
-        # Parse each position
-        currency_exposures = {}
-        total_risk = 0.0
-
-        for pos in positions:
-            symbol = pos['symbol']
-            direction = pos['direction']  # 'BUY' or 'SELL'
-            lots = pos['lots']
-            risk_pct = pos.get('risk_pct', 1.0)  # Estimated risk
-
-            # Parse currency pair (e.g., EURUSD → EUR, USD)
-            base_currency, quote_currency = self._parse_symbol(symbol)
-
-            # Calculate exposure
-            if direction == 'BUY':
-                # Long EURUSD = long EUR, short USD
-                self._add_exposure(currency_exposures, base_currency, risk_pct, symbol, 'LONG')
-                self._add_exposure(currency_exposures, quote_currency, -risk_pct, symbol, 'SHORT')
-            else:
-                # Short EURUSD = short EUR, long USD
-                self._add_exposure(currency_exposures, base_currency, -risk_pct, symbol, 'SHORT')
-                self._add_exposure(currency_exposures, quote_currency, risk_pct, symbol, 'LONG')
+        # Signed risk per position: long EURUSD = +risk on EUR, -risk on USD
+        symbols = [pos['symbol'] for pos in positions]
+        risk = np.array([
+            pos.get('risk_pct', 1.0) * (1.0 if pos['direction'] == 'BUY' else -1.0)  # Estimated risk
+            for pos in positions
+        ])
+        total_risk = float(np.abs(risk).sum())
+
+        # Net exposure: one matrix-vector product over per-symbol notionals
+        signed, gross = self.loadings.notionals(zip(symbols, risk))
+        net = self.loadings.exposure(signed, gross)
+        factors = self.loadings.factors[:len(net)]
+        factor_exposure = {factor: float(value) for factor, value in zip(factors, net)}
+
+        # Long/short breakdown per currency from per-position contributions
+        contributions = self.loadings.contributions(symbols, risk)[:, :len(net)]
+        long_exposure = np.clip(contributions, 0.0, None).sum(axis=0)
+        short_exposure = np.clip(-contributions, 0.0, None).sum(axis=0)
 
-            total_risk += risk_pct
-
-        # Convert to CurrencyExposure objects
         exposures = {}
-        for currency, data in currency_exposures.items():
+        for j in np.flatnonzero(np.abs(contributions).sum(axis=0) > 0):
+            currency = factors[j]
+            if not self.loadings.is_currency(currency):
+                continue
             exposures[currency] = CurrencyExposure(
                 currency=currency,
-                net_exposure_pct=data['net'],
-                long_exposure_pct=data['long'],
-                short_exposure_pct=data['short'],
-                positions=data['positions']
+                net_exposure_pct=float(net[j]),
+                long_exposure_pct=float(long_exposure[j]),
+                short_exposure_pct=float(short_exposure[j]),
+                positions=[
+                    f"{symbols[k]} ({'LONG' if contributions[k, j] > 0 else 'SHORT'})"
+                    for k in np.flatnonzero(contributions[:, j])
+                ]
             )
 
         # Find max exposure
-        max_currency = max(exposures.items(), key=lambda x: abs(x[1].net_exposure_pct))
-        max_exposure = (max_currency[0], abs(max_currency[1].net_exposure_pct))
+        if exposures:
+            max_currency = max(exposures.items(), key=lambda x: abs(x[1].net_exposure_pct))
+            max_exposure = (max_currency[0], abs(max_currency[1].net_exposure_pct))
+        else:
+            max_exposure = ('NONE', 0.0)
 
         # Generate warnings
         warnings = self._generate_warnings(exposures, total_risk)
@@ -120,7 +130,8 @@ class CurrencyExposureTracker:
             exposures=exposures,
             max_exposure=max_exposure,
             warnings=warnings,
-            is_safe=is_safe
+            is_safe=is_safe,
+            factor_exposure=factor_exposure
         )
 
     def check_new_trade(
@@ -133,28 +144,25 @@ class CurrencyExposureTracker:
         """
         Check if new trade would violate exposure limits
 
+        Incremental: only the factors in the new symbol's loading row are
+        touched, no recomputation of the portfolio.
+
         Returns:
             (is_allowed, reason)
         """
-        base, quote = self._parse_symbol(new_symbol)
+        sign = 1.0 if new_direction == 'BUY' else -1.0
 
-        # Calculate what new exposure would be
-        current_base = current_exposure.exposures.get(base)
-        current_quote = current_exposure.exposures.get(quote)
+        for factor, (loading, on_gross) in self.loadings.loadings(new_symbol).items():
+            if on_gross or not self.loadings.is_currency(factor):
+                continue
+            current = current_exposure.factor_exposure.get(factor)
+            if current is None:
+                exposure = current_exposure.exposures.get(factor)
+                current = exposure.net_exposure_pct if exposure else 0.0
+            new_exposure = current + sign * loading * new_risk_pct
 
-        if new_direction == 'BUY':
-            new_base_exposure = (current_base.net_exposure_pct if current_base else 0) + new_risk_pct
-            new_quote_exposure = (current_quote.net_exposure_pct if current_quote else 0) - new_risk_pct
-        else:
-            new_base_exposure = (current_base.net_exposure_pct if current_base else 0) - new_risk_pct
-            new_quote_exposure = (current_quote.net_exposure_pct if current_quote else 0) + new_risk_pct
-
-        # Check limits
-        if abs(new_base_exposure) > self.max_exposure:
-            return False, f"Would exceed {base} exposure limit: {abs(new_base_exposure):.1f}% > {self.max_exposure}%"
-
-        if abs(new_quote_exposure) > self.max_exposure:
-            return False, f"Would exceed {quote} exposure limit: {abs(new_quote_exposure):.1f}% > {self.max_exposure}%"
+            if abs(new_exposure) > self.max_exposure:
+                return False, f"Would exceed {factor} exposure limit: {abs(new_exposure):.1f}% > {self.max_exposure}%"
 
         # Check total portfolio heat
         new_total_risk = current_exposure.total_risk_pct + new_risk_pct
@@ -171,40 +179,14 @@ class CurrencyExposureTracker:
         # Remove .sim suffix if present
         symbol = symbol.replace('.sim', '')
 
-        # Handle standard 6-character forex pairs
-        if len(symbol) == 6:
-            return symbol[:3], symbol[3:6]
+        legs = FactorLoadings.parse_legs(symbol)
+        if legs is not None:
+            return legs
 
         # Handle 7+ character pairs (e.g., USDMXN)
         # Assume first 3 chars are base, rest is quote
         return symbol[:3], symbol[3:]
 
-    def _add_exposure(
-        self,
-        exposures: Dict,
-        currency: str,
-        exposure_pct: float,
-        symbol: str,
-        direction: str
-    ):
-        """Add exposure to tracking dictionary"""
-        if currency not in exposures:
-            exposures[currency] = {
-                'net': 0.0,
-                'long': 0.0,
-                'short': 0.0,
-                'positions': []
-            }
-
-        exposures[currency]['net'] += exposure_pct
-
-        if exposure_pct > 0:
-            exposures[currency]['long'] += exposure_pct
-        else:
-            exposures[currency]['short'] += abs(exposure_pct)
-
-        exposures[currency]['positions'].append(f"{symbol} ({direction})")
-
     def _generate_warnings(
         self,
         exposures: Dict[str, CurrencyExposure],
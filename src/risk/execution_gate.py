@@ -66,6 +66,7 @@ class ExecutionGate:
         self,
         symbol: str,
         direction: str,
+        risk_pct: float,
         open_positions: List,
         account_balance: float,
         current_time: datetime,
@@ -80,6 +81,7 @@ class ExecutionGate:
         Args:
             symbol: Trading symbol
             direction: 'BUY' or 'SELL'
+            risk_pct: Account risk of the trade in % (as passed to open_trade)
             open_positions: List of currently open positions
             account_balance: Current account balance
             current_time: Current datetime
@@ -148,17 +150,11 @@ class ExecutionGate:
             violations.append(f"Currency exposure warnings: {exposure.warnings}")
             logger.warning(f"⚠️  GATE: Exposure warnings - {exposure.warnings}")
 
-        # Extract currencies from symbol (e.g., EURUSD -> EUR, USD)
-        if len(symbol) >= 6:
-            base_currency = symbol[:3]
-            quote_currency = symbol[3:6]
-
-            # Check if either currency is already at limit
-            for currency, pct in exposure.exposure.items():
-                if currency in [base_currency, quote_currency]:
-                    if pct >= 4.0:  # Max 4% per currency
-                        violations.append(f"{currency} exposure at limit: {pct:.1f}%")
-                        logger.warning(f"❌ GATE: {currency} exposure at {pct:.1f}% (max 4%)")
+        # Check if adding this symbol would push any of its factors over the limit
+        allowed, reason = self.exposure_tracker.check_new_trade(exposure, symbol, direction, risk_pct)
+        if not allowed:
+            violations.append(reason)
+            logger.warning(f"❌ GATE: {reason}")
 
         # ========================================
         # CHECK 6: Market Hours (US30 specific)
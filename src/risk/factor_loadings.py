@@ -0,0 +1,213 @@
+"""
+Factor Loadings - Precomputed symbol -> risk factor matrix
+
+Each symbol is described once by a row of loadings on a shared factor set:
+- Currency legs: base +1, quote -1 (long EURUSD = long EUR, short USD;
+  long XAUUSD = long XAU, short USD)
+- USD sensitivity for symbols without FX legs (indices, bare metals):
+  long US500 behaves like a partial short USD position
+- Asset class: +1 on the symbol's class, loaded on gross size (a hedged
+  pair still uses up class capacity)
+
+Portfolio exposure is then one matrix-vector product over per-symbol
+notionals instead of re-parsing every position, and a new trade is checked
+against only the handful of factors its row touches.
+"""
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Currencies recognised as FX legs (metals quote like currencies)
+CURRENCIES = frozenset({
+    'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'AUD', 'NZD', 'CAD',
+    'SEK', 'NOK', 'DKK', 'PLN', 'HUF', 'CZK', 'TRY', 'ZAR',
+    'MXN', 'SGD', 'HKD', 'CNH', 'XAU', 'XAG',
+})
+METALS = frozenset({'XAU', 'XAG'})
+
+ASSET_CLASSES = {
+    'FOREX_MAJOR': ['eurusd', 'gbpusd', 'usdjpy', 'usdchf', 'audusd', 'usdcad'],
+    'FOREX_CROSS': ['eurgbp', 'eurjpy', 'gbpjpy', 'audnzd'],
+    'INDICES_US': ['us30', 'us100', 'us500'],
+    'INDICES_EU': ['de40', 'uk100', 'eu50'],
+    'COMMODITIES_METALS': ['xau', 'xag'],
+    'COMMODITIES_ENERGY': ['usoil', 'ukoil', 'natgas'],
+    'RISK_PROXY': ['vix'],
+}
+
+# USD loading per unit long notional for symbols without FX legs
+USD_SENSITIVITY = {
+    'INDICES_US': -0.3,          # Risk-on equities, weaker USD
+    'INDICES_EU': -0.2,
+    'COMMODITIES_METALS': -1.0,  # Gold/silver are priced against USD
+}
+
+
+# Futures contract code: month letter + 2-digit year (Z25, F26, ...). Years are
+# pinned to 2x so index names ending in a month letter + digits (EU50) survive.
+CONTRACT_CODE = re.compile(r'[fghjkmnquvxz]2\d$')
+
+
+def clean_symbol(symbol: str) -> str:
+    """Lowercase and strip broker suffixes (.sim, .pro) and contract codes (US30Z25.sim -> us30)"""
+    return CONTRACT_CODE.sub('', symbol.lower().replace('.sim', '').replace('.pro', ''))
+
+
+class FactorLoadings:
+    """
+    Symbol -> factor loading matrix, grown as new symbols are seen.
+
+    Usage:
+        loadings = FactorLoadings()
+        signed, gross = loadings.notionals([('EURUSD', 1.0), ('GBPUSD', 1.0)])
+        net = loadings.exposure(signed, gross)     # indexed like loadings.factors
+        net[loadings.factor_index['USD']]          # -2.0
+    """
+
+    def __init__(self, asset_classes: Dict[str, List[str]] = None,
+                 clean: Callable[[str], str] = None):
+        """
+        Args:
+            asset_classes: Asset class -> cleaned symbols (default: ASSET_CLASSES)
+            clean: Symbol normalizer (default: clean_symbol)
+        """
+        self.symbol_to_class = {
+            symbol: asset_class
+            for asset_class, symbols in (asset_classes or ASSET_CLASSES).items()
+            for symbol in symbols
+        }
+        self._clean = clean or clean_symbol
+
+        self._lock = threading.Lock()  # Serializes registration; readers use published arrays
+        self.factors: List[str] = []
+        self.factor_index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.symbol_index: Dict[str, int] = {}
+        self.symbol_class: List[str] = []
+        self._rows: List[Dict[str, Tuple[float, bool]]] = []  # factor -> (loading, gross)
+        self._signed = np.zeros((0, 0))  # symbol x factor, loads signed notional
+        self._gross = np.zeros((0, 0))   # symbol x factor, loads gross notional
+
+    # ═══════════════════════════════════════════════════════════
+    # CLASSIFICATION
+    # ═══════════════════════════════════════════════════════════
+
+    @staticmethod
+    def parse_legs(symbol: str) -> Optional[Tuple[str, str]]:
+        """(base, quote) for FX-style symbols, e.g. eurusd -> (EUR, USD); None otherwise"""
+        s = symbol.upper()
+        if len(s) == 6 and s.isalpha() and (s[:3] in CURRENCIES or s[3:] in CURRENCIES):
+            return s[:3], s[3:]
+        return None
+
+    def asset_class(self, symbol: str) -> str:
+        return self.symbol_class[self.row(symbol)]
+
+    def _classify(self, symbol: str) -> Tuple[str, Dict[str, Tuple[float, bool]]]:
+        legs = self.parse_legs(symbol)
+        asset_class = self.symbol_to_class.get(symbol)
+        if asset_class is None and legs is not None:
+            if legs[0] in METALS:
+                asset_class = 'COMMODITIES_METALS'
+            else:
+                asset_class = 'FOREX_MAJOR' if 'USD' in legs else 'FOREX_CROSS'
+        asset_class = asset_class or 'UNKNOWN'
+
+        row = {}
+        if legs is not None:
+            base, quote = legs
+            row[base] = (1.0, False)
+            row[quote] = (-1.0, False)
+        elif asset_class in USD_SENSITIVITY:
+            row['USD'] = (USD_SENSITIVITY[asset_class], False)
+        row[asset_class] = (1.0, True)
+        return asset_class, row
+
+    # ═══════════════════════════════════════════════════════════
+    # MATRIX
+    # ═══════════════════════════════════════════════════════════
+
+    def row(self, symbol: str) -> int:
+        """Matrix row for a symbol, registering it (and any new factors) on first use"""
+        symbol = self._clean(symbol)
+        index = self.symbol_index.get(symbol)
+        if index is not None:
+            return index
+
+        with self._lock:
+            index = self.symbol_index.get(symbol)
+            if index is not None:
+                return index
+            asset_class, row = self._classify(symbol)
+            for factor in row:
+                if factor not in self.factor_index:
+                    self.factor_index[factor] = len(self.factors)
+                    self.factors.append(factor)
+
+            n_factors = len(self.factors)
+            signed = np.zeros((len(self.symbols) + 1, n_factors))
+            gross = np.zeros_like(signed)
+            signed[:-1, :self._signed.shape[1]] = self._signed
+            gross[:-1, :self._gross.shape[1]] = self._gross
+            for factor, (loading, on_gross) in row.items():
+                (gross if on_gross else signed)[-1, self.factor_index[factor]] = loading
+
+            # Publish the grown matrices before the index, so readers never see a missing row
+            self._signed, self._gross = signed, gross
+            self.symbols.append(symbol)
+            self.symbol_class.append(asset_class)
+            self._rows.append(row)
+            self.symbol_index[symbol] = index = len(self.symbols) - 1
+            return index
+
+    def loadings(self, symbol: str) -> Dict[str, Tuple[float, bool]]:
+        """Non-zero loadings of one symbol: factor -> (loading, loads gross notional)"""
+        return self._rows[self.row(symbol)]
+
+    def notionals(self, positions: Iterable[Tuple[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-symbol signed and gross notional vectors (indexed like self.symbols).
+
+        Args:
+            positions: (symbol, signed size) pairs - positive long, negative short
+        """
+        rows, sizes = [], []
+        for symbol, size in positions:
+            rows.append(self.row(symbol))
+            sizes.append(size)
+        rows = np.asarray(rows, dtype=np.int64)
+        sizes = np.asarray(sizes, dtype=float)
+        n = len(self.symbols)
+        signed = np.bincount(rows, weights=sizes, minlength=n)
+        gross = np.bincount(rows, weights=np.abs(sizes), minlength=n)
+        return signed, gross
+
+    def exposure(self, signed: np.ndarray, gross: np.ndarray) -> np.ndarray:
+        """Net factor exposure (indexed like self.factors) for per-symbol notionals"""
+        signed_matrix, gross_matrix = self._signed, self._gross
+        # Rows are append-only, so a shorter vector or matrix is a consistent prefix
+        n = min(signed_matrix.shape[0], len(signed))
+        return signed_matrix[:n].T @ signed[:n] + gross_matrix[:n].T @ gross[:n]
+
+    def contributions(self, symbols: List[str], sizes: np.ndarray) -> np.ndarray:
+        """Per-position factor contributions (position x factor), for long/short breakdowns"""
+        rows = np.fromiter((self.row(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        sizes = np.asarray(sizes, dtype=float)[:, None]
+        return self._signed[rows] * sizes + self._gross[rows] * np.abs(sizes)
+
+    def is_currency(self, factor: str) -> bool:
+        return len(factor) == 3 and factor.isupper()
+
+
+# Shared default-universe loadings
+_factor_loadings: Optional[FactorLoadings] = None
+
+
+def get_factor_loadings() -> FactorLoadings:
+    """Get singleton FactorLoadings instance (default asset classes)"""
+    global _factor_loadings
+    if _factor_loadings is None:
+        _factor_loadings = FactorLoadings()
+    return _factor_loadings
@@ -0,0 +1,423 @@
+"""
+FTMO Rule Engine - Incremental rule state over an account event stream
+=======================================================================
+
+FTMO limits used to be recomputed from whatever request dict happened to be
+at hand (api.py, EnhancedTradingContext, FTMORuleValidator callers), and a
+breach between two decision requests was never seen. This engine consumes
+account events instead and keeps every rule input up to date in O(1):
+
+1. Events: equity, balance, trade close, or a full EA account dict
+   (on_account maps it to the others). Feed it from decision requests AND
+   from the EA's account heartbeat (POST /api/account/event).
+2. State per event: daily-start balance (rolls over at midnight CE(S)T;
+   with nothing persisted, seeded from the first observed account),
+   intraday worst/best equity, trailing equity/balance peaks, realized
+   profit per day (consistency buckets) with a running best day.
+3. Breaches are checked on every event against the intraday WORST equity,
+   recorded once per rule and day, and pushed to listeners.
+4. After each event an immutable FTMOSnapshot is published; any component
+   reads one consistent view with snapshot() - no lock, no recomputation.
+   CircuitBreakers, ConsistencyRuleValidator and ProfitPacingManager read
+   their daily loss, drawdown, per-day profit and progress figures from it.
+
+FTMO formulas (ftmo.com):
+- Max daily loss: equity >= balance at midnight CE(S)T - 5% of initial balance
+- Max loss: equity >= 90% of initial balance
+- Consistency (challenge_2): best day <= 50% of total profit
+"""
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+    FTMO_TIMEZONE = ZoneInfo('Europe/Prague')  # Daily reset at midnight CE(S)T
+except Exception:  # pragma: no cover - tzdata missing
+    FTMO_TIMEZONE = None
+
+PHASE_RULES = {
+    'challenge_1': {'profit_target_pct': 10.0, 'consistency_pct': None},
+    'challenge_2': {'profit_target_pct': 5.0, 'consistency_pct': 50.0},
+    'funded': {'profit_target_pct': None, 'consistency_pct': None},
+}
+
+
+@dataclass(frozen=True)
+class FTMOSnapshot:
+    """Immutable FTMO rule state after one event"""
+    timestamp: float
+    trading_day: str  # CE(S)T date (ISO)
+    phase: str
+    initial_balance: float
+    balance: float
+    equity: float
+
+    # Daily loss rule
+    daily_start_balance: float
+    daily_pnl: float  # Equity vs midnight balance (floating included)
+    daily_realized_pnl: float
+    min_equity_today: float
+    max_equity_today: float
+    max_daily_loss: float
+    daily_loss: float
+    distance_to_daily_limit: float
+    daily_used_pct: float
+
+    # Max loss rule
+    peak_equity: float
+    peak_balance: float
+    max_total_drawdown: float
+    total_drawdown: float
+    distance_to_dd_limit: float
+    total_dd_pct: float
+    drawdown_from_peak_pct: float
+
+    # Profit / consistency
+    total_profit: float
+    profit_target: float
+    realized_profit: float
+    best_day_profit: float
+    best_day_share_pct: float
+    trading_days: int
+
+    # Rule state
+    violated: bool  # Current equity beyond a limit
+    breaches: Tuple[str, ...] = field(default_factory=tuple)  # Recorded breaches (incl. intraday worst)
+    events: int = 0
+
+    @property
+    def can_trade(self) -> bool:
+        return not self.violated
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class FTMORuleEngine:
+    """
+    Incremental FTMO rule state; thread-safe, O(1) per event.
+
+    Usage:
+        engine = get_ftmo_rule_engine()
+        engine.add_breach_listener(lambda rule, message, snap: ...)
+        snap = engine.on_account(request['account'], phase='challenge_1')
+        engine.on_equity(198450.0)
+        engine.on_trade_close(-320.0)
+        engine.snapshot().distance_to_daily_limit
+    """
+
+    def __init__(
+        self,
+        initial_balance: float = 200000.0,
+        phase: str = 'funded',
+        max_daily_loss_pct: float = 5.0,
+        max_total_loss_pct: float = 10.0,
+        state: Optional[Dict] = None
+    ):
+        """
+        Args:
+            initial_balance: Challenge/account starting balance (EA value wins when sent)
+            phase: 'challenge_1', 'challenge_2' or 'funded'
+            max_daily_loss_pct: Daily loss limit, % of initial balance
+            max_total_loss_pct: Max loss limit, % of initial balance
+            state: Dict to persist into (e.g. a state store PersistentDict); None = memory only
+        """
+        self.max_daily_loss_pct = max_daily_loss_pct
+        self.max_total_loss_pct = max_total_loss_pct
+        self._state = state if state is not None else {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str, FTMOSnapshot], None]] = []
+
+        saved = self._state.get('intraday') or {}
+        self.phase = saved.get('phase', phase)
+        self.initial_balance = saved.get('initial_balance', initial_balance)
+        self._day: Optional[str] = saved.get('day')
+        self._balance = saved.get('balance', self.initial_balance)
+        self._equity = saved.get('equity', self._balance)
+        self._daily_start = saved.get('daily_start', self._balance)
+        self._min_equity_today = saved.get('min_equity', self._equity)
+        self._max_equity_today = saved.get('max_equity', self._equity)
+        self._peak_equity = saved.get('peak_equity', max(self._equity, self.initial_balance))
+        self._peak_balance = saved.get('peak_balance', max(self._balance, self.initial_balance))
+
+        # Consistency buckets: day -> realized profit, with running total and best day
+        self._buckets: Dict[str, float] = dict(self._state.get('buckets') or {})
+        self._realized_total = sum(self._buckets.values())
+        self._best_day = max(self._buckets.items(), key=lambda kv: kv[1], default=(None, 0.0))
+
+        self._breaches: List[str] = list(self._state.get('breaches') or [])
+        self._breach_keys = {b.split(' | ')[0] for b in self._breaches}
+        self.events = 0
+        self._snapshot = self._build_snapshot(time.time())
+
+    # ═══════════════════════════════════════════════════════════
+    # EVENTS
+    # ═══════════════════════════════════════════════════════════
+
+    def on_equity(self, equity: float, balance: float = None, timestamp: float = None) -> FTMOSnapshot:
+        """Equity tick (optionally with the balance it belongs to)"""
+        return self._apply(timestamp, equity=equity, balance=balance)
+
+    def on_balance(self, balance: float, timestamp: float = None) -> FTMOSnapshot:
+        """Balance change (deposit, swap, commission, closed trade without profit info)"""
+        return self._apply(timestamp, balance=balance)
+
+    def on_trade_close(self, profit: float, balance: float = None, timestamp: float = None) -> FTMOSnapshot:
+        """Closed trade: adds profit to today's consistency bucket"""
+        return self._apply(timestamp, balance=balance, realized=profit)
+
+    def on_account(self, account: Dict, phase: str = None, timestamp: float = None) -> FTMOSnapshot:
+        """
+        Full EA account dict (balance, equity, initial_balance, daily_start_balance,
+        daily_realized_pnl). EA values are authoritative where present.
+        """
+        if not account:
+            return self._snapshot
+        balance = _float(account.get('balance'))
+        equity = _float(account.get('equity'), balance)
+        return self._apply(
+            timestamp,
+            equity=equity,
+            balance=balance,
+            initial_balance=_float(account.get('initial_balance')),
+            daily_start=_float(account.get('daily_start_balance')),
+            realized_today=_float(account.get('daily_realized_pnl')),
+            phase=phase,
+        )
+
+    def add_breach_listener(self, listener: Callable[[str, str, FTMOSnapshot], None]):
+        """listener(rule, message, snapshot) - called once per rule and day, outside the lock"""
+        self._listeners.append(listener)
+
+    def snapshot(self) -> FTMOSnapshot:
+        """Latest published snapshot (a single reference read - no lock)"""
+        return self._snapshot
+
+    def daily_profits(self) -> Dict[str, float]:
+        """Realized profit per trading day (the consistency buckets), a copy"""
+        with self._lock:
+            return dict(self._buckets)
+
+    def reset_buckets(self):
+        """Drop the consistency buckets (new challenge phase)"""
+        with self._lock:
+            self._buckets.clear()
+            self._realized_total = 0.0
+            self._best_day = (None, 0.0)
+            self._snapshot = self._build_snapshot(time.time())
+            self._persist_locked(True, False)
+
+    # ═══════════════════════════════════════════════════════════
+    # STATE UPDATE
+    # ═══════════════════════════════════════════════════════════
+
+    def _apply(self, timestamp: Optional[float], equity: float = None, balance: float = None,
+               realized: float = None, initial_balance: float = None, daily_start: float = None,
+               realized_today: float = None, phase: str = None) -> FTMOSnapshot:
+        ts = timestamp if timestamp is not None else time.time()
+        day = _trading_day(ts)
+
+        with self._lock:
+            if phase and phase in PHASE_RULES:
+                self.phase = phase
+            if initial_balance and initial_balance > 0:
+                self.initial_balance = initial_balance
+
+            first_event = self._day is None  # Nothing persisted yet
+            if day != self._day:
+                self._roll_day_locked(day)
+
+            if balance is not None and balance > 0:
+                self._balance = balance
+                self._peak_balance = max(self._peak_balance, balance)
+            if equity is not None and equity > 0:
+                self._equity = equity
+
+            if first_event:
+                # Started mid-day: today began at the first account we see, not at initial_balance
+                observed = balance if balance is not None and balance > 0 else equity
+                if observed is not None and observed > 0:
+                    self._daily_start = observed
+                self._min_equity_today = self._max_equity_today = self._equity
+
+            if daily_start is not None and daily_start > 0:
+                self._daily_start = daily_start  # Broker's midnight balance beats our own rollover
+
+            self._min_equity_today = min(self._min_equity_today, self._equity)
+            self._max_equity_today = max(self._max_equity_today, self._equity)
+            self._peak_equity = max(self._peak_equity, self._equity)
+
+            buckets_changed = False
+            if realized is not None:
+                self._set_bucket_locked(day, self._buckets.get(day, 0.0) + realized)
+                buckets_changed = True
+            elif realized_today is not None and realized_today != self._buckets.get(day):
+                self._set_bucket_locked(day, realized_today)
+                buckets_changed = True
+
+            new_breaches = self._check_breaches_locked(day)
+            self.events += 1
+            snapshot = self._build_snapshot(ts)
+            self._snapshot = snapshot
+            self._persist_locked(buckets_changed, bool(new_breaches))
+
+        for rule, message in new_breaches:
+            logger.critical(f"🚨 FTMO BREACH: {message}")
+            for listener in self._listeners:
+                try:
+                    listener(rule, message, snapshot)
+                except Exception as e:
+                    logger.error(f"FTMO breach listener failed: {e}")
+        return snapshot
+
+    def _roll_day_locked(self, day: str):
+        """Midnight CE(S)T: the current balance becomes the daily start"""
+        if self._day is not None:
+            logger.info(f"FTMO day rollover {self._day} → {day}: daily start ${self._balance:,.2f}")
+            self._daily_start = self._balance
+        self._day = day
+        self._min_equity_today = self._equity
+        self._max_equity_today = self._equity
+
+    def _set_bucket_locked(self, day: str, value: float):
+        """Update one consistency bucket; O(1) unless the best day shrinks"""
+        previous = self._buckets.get(day, 0.0)
+        self._buckets[day] = value
+        self._realized_total += value - previous
+        best_day, best_value = self._best_day
+        if value >= best_value:
+            self._best_day = (day, value)
+        elif day == best_day:
+            # The best day lost money - rare, rescan the (small) bucket set
+            self._best_day = max(self._buckets.items(), key=lambda kv: kv[1])
+
+    def _check_breaches_locked(self, day: str) -> List[Tuple[str, str]]:
+        new = []
+        daily_floor = self._daily_start - self.initial_balance * self.max_daily_loss_pct / 100.0
+        if self._min_equity_today <= daily_floor:
+            new.append(('daily_loss', f"{day} daily loss: equity ${self._min_equity_today:,.2f} "
+                                      f"<= ${daily_floor:,.2f} (start ${self._daily_start:,.2f})"))
+        total_floor = self.initial_balance * (1.0 - self.max_total_loss_pct / 100.0)
+        if self._min_equity_today <= total_floor:
+            new.append(('max_loss', f"{day} max loss: equity ${self._min_equity_today:,.2f} <= ${total_floor:,.2f}"))
+
+        recorded = []
+        for rule, message in new:
+            key = f"{rule}:{day}"
+            if key not in self._breach_keys:
+                self._breach_keys.add(key)
+                self._breaches.append(f"{key} | {message}")
+                recorded.append((rule, message))
+        return recorded
+
+    def _build_snapshot(self, ts: float) -> FTMOSnapshot:
+        initial = self.initial_balance
+        max_daily_loss = initial * self.max_daily_loss_pct / 100.0
+        max_total_drawdown = initial * self.max_total_loss_pct / 100.0
+        daily_loss = max(0.0, self._daily_start - self._equity)
+        total_drawdown = max(0.0, initial - self._equity)
+        day = self._day or _trading_day(ts)
+
+        rules = PHASE_RULES.get(self.phase, PHASE_RULES['funded'])
+        target_pct = rules['profit_target_pct']
+        total_profit = self._balance - initial
+        best_value = self._best_day[1]
+        best_share = best_value / self._realized_total * 100.0 if self._realized_total > 0 and best_value > 0 else 0.0
+
+        return FTMOSnapshot(
+            timestamp=ts,
+            trading_day=day,
+            phase=self.phase,
+            initial_balance=initial,
+            balance=self._balance,
+            equity=self._equity,
+            daily_start_balance=self._daily_start,
+            daily_pnl=self._equity - self._daily_start,
+            daily_realized_pnl=self._buckets.get(day, 0.0),
+            min_equity_today=self._min_equity_today,
+            max_equity_today=self._max_equity_today,
+            max_daily_loss=max_daily_loss,
+            daily_loss=daily_loss,
+            distance_to_daily_limit=max(0.0, max_daily_loss - daily_loss),
+            daily_used_pct=daily_loss / max_daily_loss * 100.0 if max_daily_loss > 0 else 0.0,
+            peak_equity=self._peak_equity,
+            peak_balance=self._peak_balance,
+            max_total_drawdown=max_total_drawdown,
+            total_drawdown=total_drawdown,
+            distance_to_dd_limit=max(0.0, max_total_drawdown - total_drawdown),
+            total_dd_pct=total_drawdown / initial * 100.0 if initial > 0 else 0.0,
+            drawdown_from_peak_pct=(self._peak_equity - self._equity) / self._peak_equity * 100.0
+                                   if self._peak_equity > 0 else 0.0,
+            total_profit=total_profit,
+            profit_target=initial * target_pct / 100.0 if target_pct else 0.0,
+            realized_profit=self._realized_total,
+            best_day_profit=best_value,
+            best_day_share_pct=best_share,
+            trading_days=sum(1 for value in self._buckets.values() if value != 0.0),
+            violated=daily_loss >= max_daily_loss or total_drawdown >= max_total_drawdown,
+            breaches=tuple(self._breaches),
+            events=self.events,
+        )
+
+    def _persist_locked(self, buckets_changed: bool, breaches_changed: bool):
+        """Small per-event record; buckets/breaches only when they change (write-behind store)"""
+        self._state['intraday'] = {
+            'day': self._day,
+            'phase': self.phase,
+            'initial_balance': self.initial_balance,
+            'balance': self._balance,
+            'equity': self._equity,
+            'daily_start': self._daily_start,
+            'min_equity': self._min_equity_today,
+            'max_equity': self._max_equity_today,
+            'peak_equity': self._peak_equity,
+            'peak_balance': self._peak_balance,
+        }
+        if buckets_changed:
+            self._state['buckets'] = dict(self._buckets)
+        if breaches_changed:
+            self._state['breaches'] = list(self._breaches)
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'events': snapshot.events,
+            'trading_day': snapshot.trading_day,
+            'daily_used_pct': round(snapshot.daily_used_pct, 2),
+            'total_dd_pct': round(snapshot.total_dd_pct, 2),
+            'min_equity_today': snapshot.min_equity_today,
+            'breaches': len(snapshot.breaches),
+        }
+
+
+def _trading_day(ts: float) -> str:
+    """FTMO trading day (CE(S)T date) of a unix timestamp"""
+    return datetime.fromtimestamp(ts, FTMO_TIMEZONE).date().isoformat()
+
+
+def _float(value, default: float = None) -> Optional[float]:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+# Global instance
+_ftmo_rule_engine: Optional[FTMORuleEngine] = None
+_ftmo_rule_engine_lock = threading.Lock()
+
+
+def get_ftmo_rule_engine() -> FTMORuleEngine:
+    """Shared engine for this process, persisted in the state store ('ftmo_rules')"""
+    global _ftmo_rule_engine
+    with _ftmo_rule_engine_lock:
+        if _ftmo_rule_engine is None:
+            from src.ai.state_store import get_state_store
+            _ftmo_rule_engine = FTMORuleEngine(state=get_state_store().mapping('ftmo_rules'))
+    return _ftmo_rule_engine
@@ -4,11 +4,26 @@ Prevents trading during high-impact economic news events
 
 Uses REAL data from Forex Factory API (faireconomy.media)
 NO FAKE/HARDCODED DATA - All events are fetched from live API
+
+Serving path (no network I/O on a trade decision):
+1. Background refresh - a daemon thread fetches the calendar every
+   `refresh_hours`; callers keep using the current calendar while it is
+   stale (stale-while-revalidate). A failed fetch retries after
+   `retry_minutes` and falls back to the file cache.
+2. Interval index - each refresh precompiles HIGH impact events into
+   per-currency blackout intervals [event - before, event + after], merged
+   and sorted, and publishes them as one immutable NewsCalendarIndex.
+   A blackout check is a bisect per relevant currency - O(log n).
+3. Swappable fetcher - pass `fetcher=` (e.g. fixture_fetcher(path)) to run
+   against a local calendar file in tests and replays.
 """
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, List, Tuple, Dict, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from bisect import bisect_left, bisect_right
+from heapq import merge
 import calendar
+import threading
 import requests
 import json
 from pathlib import Path
@@ -21,6 +36,26 @@ logger = get_logger(__name__)
 NEWS_CACHE_FILE = Path("cache/forex_factory_events.json")
 NEWS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+FOREX_FACTORY_URL = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
+
+# US indices and gold are heavily affected by USD news (NFP, CPI, PPI, FOMC)
+USD_AFFECTED_SYMBOLS = ['US30', 'US100', 'US500', 'XAU', 'GOLD', 'USOIL', 'OIL']
+
+
+def fetch_forex_factory(timeout: float = 15) -> List[Dict]:
+    """Raw Forex Factory calendar items for this week"""
+    response = requests.get(FOREX_FACTORY_URL, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def fixture_fetcher(path: str) -> Callable[[], List[Dict]]:
+    """Fetcher that serves a local Forex Factory-format JSON file (tests/replays)"""
+    def fetch() -> List[Dict]:
+        with open(path, 'r') as f:
+            return json.load(f)
+    return fetch
+
 
 @dataclass
 class NewsEvent:
@@ -41,6 +76,83 @@ class NewsFilterStatus:
     minutes_to_next_event: Optional[float]
 
 
+@dataclass(frozen=True)
+class BlackoutInterval:
+    """Merged no-trade window for one currency"""
+    start: datetime
+    end: datetime
+    events: Tuple[NewsEvent, ...]
+
+    def nearest_event(self, current_time: datetime) -> NewsEvent:
+        return min(self.events, key=lambda e: abs((e.scheduled_time - current_time).total_seconds()))
+
+
+class NewsCalendarIndex:
+    """
+    Immutable per-currency index of HIGH impact events and blackout intervals.
+
+    Built once per calendar refresh; every query is a bisect.
+    """
+
+    def __init__(self, events: List[NewsEvent], minutes_before: int, minutes_after: int):
+        before = timedelta(minutes=minutes_before)
+        after = timedelta(minutes=minutes_after)
+
+        by_currency: Dict[str, List[NewsEvent]] = {}
+        for event in events:
+            if event.impact == 'HIGH':
+                by_currency.setdefault(event.currency, []).append(event)
+
+        self.events: Dict[str, List[NewsEvent]] = {}
+        self.times: Dict[str, List[datetime]] = {}
+        self.blackouts: Dict[str, List[BlackoutInterval]] = {}
+        self.blackout_starts: Dict[str, List[datetime]] = {}
+
+        for currency, currency_events in by_currency.items():
+            currency_events.sort(key=lambda e: e.scheduled_time)
+            self.events[currency] = currency_events
+            self.times[currency] = [e.scheduled_time for e in currency_events]
+
+            # Merge overlapping windows - intervals end up disjoint and sorted
+            intervals: List[BlackoutInterval] = []
+            for event in currency_events:
+                start, end = event.scheduled_time - before, event.scheduled_time + after
+                if intervals and start <= intervals[-1].end:
+                    last = intervals[-1]
+                    intervals[-1] = BlackoutInterval(last.start, max(last.end, end), last.events + (event,))
+                else:
+                    intervals.append(BlackoutInterval(start, end, (event,)))
+            self.blackouts[currency] = intervals
+            self.blackout_starts[currency] = [i.start for i in intervals]
+
+    @property
+    def currencies(self) -> List[str]:
+        return list(self.events)
+
+    def blackout(self, currency: str, current_time: datetime) -> Optional[BlackoutInterval]:
+        """Blackout interval containing current_time for a currency, if any"""
+        starts = self.blackout_starts.get(currency)
+        if not starts:
+            return None
+        i = bisect_right(starts, current_time) - 1
+        if i >= 0 and current_time <= self.blackouts[currency][i].end:
+            return self.blackouts[currency][i]
+        return None
+
+    def upcoming(self, currencies, current_time: datetime, lookahead_hours: float) -> List[NewsEvent]:
+        """HIGH impact events for the currencies in [current_time, +lookahead], sorted by time"""
+        cutoff = current_time + timedelta(hours=lookahead_hours)
+        slices = []
+        for currency in currencies:
+            times = self.times.get(currency)
+            if times:
+                lo, hi = bisect_left(times, current_time), bisect_right(times, cutoff)
+                slices.append(self.events[currency][lo:hi])
+        if len(slices) == 1:
+            return list(slices[0])
+        return list(merge(*slices, key=lambda e: e.scheduled_time))
+
+
 class NewsEventFilter:
     """
     Filters out high-impact news events
@@ -159,101 +271,156 @@ class NewsEventFilter:
     def __init__(
         self,
         avoid_minutes_before: int = 30,
-        avoid_minutes_after: int = 30
+        avoid_minutes_after: int = 30,
+        fetcher: Callable[[], List[Dict]] = None,
+        cache_file: Path = None,
+        refresh_hours: float = 6,
+        retry_minutes: float = 5,
+        background_refresh: bool = True
     ):
         """
         Args:
             avoid_minutes_before: Minutes before event to stop trading
             avoid_minutes_after: Minutes after event to stop trading
+            fetcher: Returns raw Forex Factory-format items (default: live API)
+            cache_file: File cache used at startup and when a fetch fails
+            refresh_hours: Calendar refresh interval
+            retry_minutes: Delay before retrying a failed fetch
+            background_refresh: Refresh on a daemon thread (False: call refresh() yourself)
         """
         self.avoid_minutes_before = avoid_minutes_before
         self.avoid_minutes_after = avoid_minutes_after
-        self.cached_events = []
-        self.cache_expiry = None
-        
-        # Fetch real events on init
-        self._refresh_forex_factory_events()
-    
-    def _refresh_forex_factory_events(self):
+        self.fetcher = fetcher or fetch_forex_factory
+        self.cache_file = Path(cache_file) if cache_file else NEWS_CACHE_FILE
+        self.refresh_interval = timedelta(hours=refresh_hours)
+        self.retry_interval = timedelta(minutes=retry_minutes)
+
+        self.cached_events: List[NewsEvent] = []
+        self.cache_expiry: Optional[datetime] = None
+        self.index = NewsCalendarIndex([], avoid_minutes_before, avoid_minutes_after)
+        self.last_refresh_error: Optional[str] = None
+        self.refreshes = 0
+
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Startup: file cache if there is one, otherwise one blocking fetch (never on a request)
+        if not self._load_from_file_cache():
+            self.refresh()
+
+        if background_refresh:
+            self._thread = threading.Thread(target=self._run, name='NewsCalendarRefresh', daemon=True)
+            self._thread.start()
+
+    # ═══════════════════════════════════════════════════════════
+    # CALENDAR REFRESH
+    # ═══════════════════════════════════════════════════════════
+
+    def _run(self):
+        while not self._stop.is_set():
+            expiry = self.cache_expiry
+            if expiry is None or datetime.now() >= expiry:
+                self.refresh()
+                expiry = self.cache_expiry
+            wait = (expiry - datetime.now()).total_seconds() if expiry else self.retry_interval.total_seconds()
+            self._wake.wait(max(wait, 1.0))
+            self._wake.clear()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        self._wake.set()
+
+    def refresh(self) -> bool:
         """
-        Fetch REAL economic calendar data from Forex Factory API
+        Fetch REAL economic calendar data and publish a new index.
         This is the ONLY source of truth - NO hardcoded fake data
         """
-        # Check cache first
-        if self.cache_expiry and datetime.now() < self.cache_expiry and self.cached_events:
-            logger.debug(f"Using cached events ({len(self.cached_events)} events)")
-            return
-        
-        try:
-            url = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            
-            data = response.json()
-            events = []
-            
-            for item in data:
-                impact = item.get('impact', 'Low')
-                if impact not in ['High', 'Medium', 'Low']:
-                    impact = 'Medium'
-                
-                # Parse date - format: "2025-12-19T08:30:00-05:00"
-                date_str = item.get('date', '')
-                try:
-                    # Handle timezone in date string
-                    if '+' in date_str or date_str.count('-') > 2:
-                        # Has timezone, parse without it for simplicity
-                        date_str_clean = date_str[:19]  # "2025-12-19T08:30:00"
-                        scheduled_time = datetime.strptime(date_str_clean, "%Y-%m-%dT%H:%M:%S")
-                    else:
-                        scheduled_time = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-                except:
-                    continue
-                
-                events.append(NewsEvent(
-                    name=item.get('title', ''),
-                    impact=impact.upper(),
-                    currency=item.get('country', ''),
-                    scheduled_time=scheduled_time,
-                    description=f"{item.get('title', '')} - Forecast: {item.get('forecast', 'N/A')}, Previous: {item.get('previous', 'N/A')}"
-                ))
-            
-            self.cached_events = events
-            self.cache_expiry = datetime.now() + timedelta(hours=6)  # Cache for 6 hours
-            
-            # Save to file cache
+        with self._refresh_lock:
             try:
-                cache_data = [
-                    {
-                        'name': e.name,
-                        'impact': e.impact,
-                        'currency': e.currency,
-                        'scheduled_time': e.scheduled_time.isoformat(),
-                        'description': e.description
-                    }
-                    for e in events
-                ]
-                with open(NEWS_CACHE_FILE, 'w') as f:
-                    json.dump({'events': cache_data, 'expiry': self.cache_expiry.isoformat()}, f)
+                events = self._parse_events(self.fetcher())
             except Exception as e:
-                logger.debug(f"Could not save cache: {e}")
-            
+                self.last_refresh_error = str(e)
+                logger.warning(f"Could not fetch Forex Factory API: {e}")
+                # Keep serving what we have; fall back to the file cache if that is nothing
+                if not self.cached_events:
+                    self._load_from_file_cache()
+                self.cache_expiry = datetime.now() + self.retry_interval
+                return False
+
+            self._publish(events, datetime.now() + self.refresh_interval)
+            self.last_refresh_error = None
+            self.refreshes += 1
+            self._save_to_file_cache()
+
             # Log high-impact events for our symbols
-            high_impact_usd = [e for e in events if e.impact == 'HIGH' and e.currency == 'USD']
+            high_impact_usd = self.index.events.get('USD', [])
             logger.info(f"✓ Forex Factory API: {len(events)} events, {len(high_impact_usd)} high-impact USD")
-            
+            return True
+
+    def _publish(self, events: List[NewsEvent], expiry: Optional[datetime]):
+        """Swap in a new calendar - readers see the old or the new index, never a mix"""
+        self.index = NewsCalendarIndex(events, self.avoid_minutes_before, self.avoid_minutes_after)
+        self.cached_events = events
+        self.cache_expiry = expiry
+
+    def _parse_events(self, data: List[Dict]) -> List[NewsEvent]:
+        events = []
+        for item in data:
+            impact = item.get('impact', 'Low')
+            if impact not in ['High', 'Medium', 'Low']:
+                impact = 'Medium'
+
+            # Parse date - format: "2025-12-19T08:30:00-05:00"
+            date_str = item.get('date', '')
+            try:
+                # Handle timezone in date string
+                if '+' in date_str or date_str.count('-') > 2:
+                    # Has timezone, parse without it for simplicity
+                    date_str_clean = date_str[:19]  # "2025-12-19T08:30:00"
+                    scheduled_time = datetime.strptime(date_str_clean, "%Y-%m-%dT%H:%M:%S")
+                else:
+                    scheduled_time = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+            except:
+                continue
+
+            events.append(NewsEvent(
+                name=item.get('title', ''),
+                impact=impact.upper(),
+                currency=item.get('country', ''),
+                scheduled_time=scheduled_time,
+                description=f"{item.get('title', '')} - Forecast: {item.get('forecast', 'N/A')}, Previous: {item.get('previous', 'N/A')}"
+            ))
+        return events
+
+    def _save_to_file_cache(self):
+        try:
+            cache_data = [
+                {
+                    'name': e.name,
+                    'impact': e.impact,
+                    'currency': e.currency,
+                    'scheduled_time': e.scheduled_time.isoformat(),
+                    'description': e.description
+                }
+                for e in self.cached_events
+            ]
+            tmp_path = self.cache_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'events': cache_data, 'expiry': self.cache_expiry.isoformat()}, f)
+            tmp_path.replace(self.cache_file)
         except Exception as e:
-            logger.warning(f"Could not fetch Forex Factory API: {e}")
-            # Try to load from file cache
-            self._load_from_file_cache()
-    
-    def _load_from_file_cache(self):
-        """Load events from file cache if API fails"""
+            logger.debug(f"Could not save cache: {e}")
+
+    def _load_from_file_cache(self) -> bool:
+        """Load events from file cache (startup, or if the API fails)"""
         try:
-            if NEWS_CACHE_FILE.exists():
-                with open(NEWS_CACHE_FILE, 'r') as f:
+            if self.cache_file.exists():
+                with open(self.cache_file, 'r') as f:
                     data = json.load(f)
-                
+
                 events = []
                 for item in data.get('events', []):
                     events.append(NewsEvent(
@@ -263,16 +430,43 @@ class NewsEventFilter:
                         scheduled_time=datetime.fromisoformat(item['scheduled_time']),
                         description=item['description']
                     ))
-                
-                self.cached_events = events
+
                 expiry_str = data.get('expiry')
-                if expiry_str:
-                    self.cache_expiry = datetime.fromisoformat(expiry_str)
-                
+                self._publish(events, datetime.fromisoformat(expiry_str) if expiry_str else None)
                 logger.info(f"✓ Loaded {len(events)} events from file cache")
+                return bool(events)
         except Exception as e:
             logger.error(f"Could not load file cache: {e}")
-            self.cached_events = []
+        return False
+
+    def _ensure_fresh(self):
+        """Stale-while-revalidate: never fetch inline, just nudge the refresher"""
+        if self.cache_expiry is None or datetime.now() >= self.cache_expiry:
+            self._wake.set()
+
+    def get_stats(self) -> Dict:
+        index = self.index
+        return {
+            'events': len(self.cached_events),
+            'high_impact': {c: len(e) for c, e in index.events.items()},
+            'cache_expiry': self.cache_expiry.isoformat() if self.cache_expiry else None,
+            'stale': self.cache_expiry is None or datetime.now() >= self.cache_expiry,
+            'refreshes': self.refreshes,
+            'last_error': self.last_refresh_error,
+        }
+
+    # ═══════════════════════════════════════════════════════════
+    # QUERIES
+    # ═══════════════════════════════════════════════════════════
+
+    def _currencies_for(self, symbols: Optional[List[str]], index: NewsCalendarIndex) -> List[str]:
+        """
+        Currencies whose news affects the symbols.
+        No symbols: USD only - all our instruments (XAU, US30, US100, US500) trade on USD news
+        """
+        if not symbols:
+            return ['USD']
+        return [c for c in index.currencies if any(self._affects_symbol(c, s) for s in symbols)]
 
     def is_safe_to_trade(
         self,
@@ -291,26 +485,31 @@ class NewsEventFilter:
         """
         if current_time is None:
             current_time = datetime.now()
-
-        # Get upcoming events
-        upcoming = self._get_upcoming_events(current_time)
-
-        # Check if any event is too close
-        for event in upcoming:
-            minutes_away = (event.scheduled_time - current_time).total_seconds() / 60
-
-            # Check if in danger zone
-            if -self.avoid_minutes_after <= minutes_away <= self.avoid_minutes_before:
-                # Check if this event affects our symbols
-                if symbols and not self._affects_symbols(event, symbols):
-                    continue
-
-                return NewsFilterStatus(
-                    is_safe=False,
-                    reason=f"🚨 {event.name} in {abs(minutes_away):.0f} min - NO TRADING",
-                    upcoming_events=upcoming[:3],
-                    minutes_to_next_event=minutes_away
-                )
+        self._ensure_fresh()
+
+        index = self.index
+        currencies = self._currencies_for(symbols, index)
+        upcoming = index.upcoming(currencies, current_time, 24)
+
+        # Blackout lookup per relevant currency - nearest blocking event wins
+        blocking = None
+        for currency in currencies:
+            interval = index.blackout(currency, current_time)
+            if interval is None:
+                continue
+            event = interval.nearest_event(current_time)
+            if blocking is None or abs(event.scheduled_time - current_time) < abs(blocking.scheduled_time - current_time):
+                blocking = event
+
+        if blocking is not None:
+            minutes_away = (blocking.scheduled_time - current_time).total_seconds() / 60
+            when = f"in {minutes_away:.0f} min" if minutes_away >= 0 else f"{-minutes_away:.0f} min ago"
+            return NewsFilterStatus(
+                is_safe=False,
+                reason=f"🚨 {blocking.name} {when} - NO TRADING",
+                upcoming_events=[blocking] + [e for e in upcoming[:3] if e is not blocking][:2],
+                minutes_to_next_event=minutes_away
+            )
 
         # All clear
         next_minutes = (upcoming[0].scheduled_time - current_time).total_seconds() / 60 if upcoming else None
@@ -322,6 +521,27 @@ class NewsEventFilter:
             minutes_to_next_event=next_minutes
         )
 
+    def can_trade(self, symbol: str, current_time: datetime = None) -> bool:
+        """True if no blackout is active for the symbol's currencies"""
+        return self.is_safe_to_trade(current_time, [symbol]).is_safe
+
+    def get_upcoming_events(self, symbol: str, current_time: datetime = None, hours_ahead: float = 24) -> List[Dict]:
+        """Upcoming HIGH impact events affecting a symbol, as dicts"""
+        if current_time is None:
+            current_time = datetime.now()
+        self._ensure_fresh()
+        index = self.index
+        return [
+            {
+                'title': e.name,
+                'currency': e.currency,
+                'impact': e.impact,
+                'time': e.scheduled_time,
+                'minutes': (e.scheduled_time - current_time).total_seconds() / 60,
+            }
+            for e in index.upcoming(self._currencies_for([symbol], index), current_time, hours_ahead)
+        ]
+
     def _get_upcoming_events(
         self,
         current_time: datetime,
@@ -329,7 +549,7 @@ class NewsEventFilter:
     ) -> List[NewsEvent]:
         """
         Get upcoming high-impact events from REAL Forex Factory data
-        
+
         Only returns HIGH impact events that affect our trading symbols:
         - USD events affect: US30, US100, US500, XAU (gold priced in USD)
         - We filter to only USD events since those are our instruments
@@ -341,25 +561,8 @@ class NewsEventFilter:
         Returns:
             List of NewsEvent sorted by time
         """
-        # Refresh if cache expired
-        if not self.cached_events or (self.cache_expiry and datetime.now() >= self.cache_expiry):
-            self._refresh_forex_factory_events()
-        
-        # Filter to upcoming HIGH impact USD events only
-        # Our symbols: XAU, US30, US100, US500 - all affected by USD news
-        cutoff = current_time + timedelta(hours=lookahead_hours)
-        
-        upcoming = [
-            event for event in self.cached_events
-            if event.impact == 'HIGH'
-            and event.currency == 'USD'  # Only USD affects our symbols
-            and current_time <= event.scheduled_time <= cutoff
-        ]
-        
-        # Sort by time
-        upcoming.sort(key=lambda e: e.scheduled_time)
-        
-        return upcoming
+        self._ensure_fresh()
+        return self.index.upcoming(['USD'], current_time, lookahead_hours)
 
     def _get_first_friday(self, year: int, month: int) -> Optional[datetime]:
         """Get first Friday of the month"""
@@ -380,23 +583,20 @@ class NewsEventFilter:
         Returns:
             True if event currency is in any symbol
         """
-        event_curr = event.currency
-
-        # US indices and gold are heavily affected by USD news (NFP, CPI, PPI, FOMC)
-        USD_AFFECTED_SYMBOLS = ['US30', 'US100', 'US500', 'XAU', 'GOLD', 'USOIL', 'OIL']
-
-        for symbol in symbols:
-            symbol_upper = symbol.upper()
-            
-            # Direct currency match (e.g., USD in EURUSD)
-            if event_curr in symbol_upper:
-                return True
-            
-            # USD news affects indices, gold, and oil
-            if event_curr == 'USD':
-                for affected in USD_AFFECTED_SYMBOLS:
-                    if affected in symbol_upper:
-                        return True
+        return any(self._affects_symbol(event.currency, symbol) for symbol in symbols)
+
+    @staticmethod
+    def _affects_symbol(currency: str, symbol: str) -> bool:
+        """Does news for a currency move this symbol?"""
+        symbol_upper = symbol.upper()
+
+        # Direct currency match (e.g., USD in EURUSD)
+        if currency and currency in symbol_upper:
+            return True
+
+        # USD news affects indices, gold, and oil
+        if currency == 'USD':
+            return any(affected in symbol_upper for affected in USD_AFFECTED_SYMBOLS)
 
         return False
 
@@ -7,11 +7,15 @@ Key Insight:
 - If on track → maintain current approach
 - If ahead → reduce aggression (protect profits, higher confidence required)
 - If way ahead (>12%) → stop trading early (protect gains)
+
+Current profit defaults to the FTMO rule engine's snapshot (equity vs the
+initial balance), so pacing reads the same figures as the rule checks.
 """
-from typing import Tuple, Dict
+from typing import Optional, Tuple, Dict
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+from src.risk.ftmo_rule_engine import FTMORuleEngine, get_ftmo_rule_engine
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -49,15 +53,21 @@ class ProfitPacingManager:
     def __init__(
         self,
         phase: int = 1,
-        challenge_days: int = 30
+        challenge_days: int = 30,
+        challenge_start_date: Optional[datetime] = None,
+        rule_engine: Optional[FTMORuleEngine] = None
     ):
         """
         Args:
             phase: FTMO phase (1, 2, or 3)
             challenge_days: Total days in challenge (default 30)
+            challenge_start_date: Default start date for the pacing calls
+            rule_engine: Source of current profit (default: the shared engine)
         """
         self.phase = phase
         self.challenge_days = challenge_days
+        self.challenge_start_date = challenge_start_date
+        self.rule_engine = rule_engine or get_ftmo_rule_engine()
 
         # Set targets based on phase
         if phase == 1:
@@ -70,23 +80,34 @@ class ProfitPacingManager:
             self.profit_target = 10.0  # Monthly target
             self.max_safe_profit = 15.0
 
+    def current_profit_pct(self) -> float:
+        """Equity vs initial balance in %, from the rule engine snapshot"""
+        ftmo = self.rule_engine.snapshot()
+        if ftmo.initial_balance <= 0:
+            return 0.0
+        return (ftmo.equity - ftmo.initial_balance) / ftmo.initial_balance * 100
+
     def assess_pacing(
         self,
-        current_profit_pct: float,
-        challenge_start_date: datetime,
+        current_profit_pct: Optional[float] = None,
+        challenge_start_date: Optional[datetime] = None,
         current_date: datetime = None
     ) -> PacingStatus:
         """
         Assess current progress and recommend strategy adjustments
 
         Args:
-            current_profit_pct: Current profit percentage
-            challenge_start_date: When challenge started
+            current_profit_pct: Current profit percentage (default: from the rule engine)
+            challenge_start_date: When challenge started (default: the constructor's)
             current_date: Current date (default: now)
 
         Returns:
             PacingStatus with recommendations
         """
+        if current_profit_pct is None:
+            current_profit_pct = self.current_profit_pct()
+        if challenge_start_date is None:
+            challenge_start_date = self.challenge_start_date
         if current_date is None:
             current_date = datetime.now()
 
@@ -256,9 +277,9 @@ class ProfitPacingManager:
 
     def should_stop_trading(
         self,
-        current_profit_pct: float,
-        current_date: datetime,
-        challenge_start_date: datetime
+        current_profit_pct: Optional[float] = None,
+        current_date: datetime = None,
+        challenge_start_date: Optional[datetime] = None
     ) -> Tuple[bool, str]:
         """
         Determine if should stop trading for the challenge
@@ -266,6 +287,12 @@ class ProfitPacingManager:
         Returns:
             (should_stop, reason)
         """
+        if current_profit_pct is None:
+            current_profit_pct = self.current_profit_pct()
+        if current_date is None:
+            current_date = datetime.now()
+        if challenge_start_date is None:
+            challenge_start_date = self.challenge_start_date
         # Stop if target exceeded
         if current_profit_pct >= self.max_safe_profit:
             return True, f"Target exceeded ({current_profit_pct:.1f}% > {self.max_safe_profit}%). Protect profits!"
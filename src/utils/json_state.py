@@ -0,0 +1,344 @@
+"""
+JSON State - Write-coalescing persistence for small JSON state documents
+
+CircuitBreakers state, trade_entries.json, trade_journal_details.json and the
+EV exit manager's position_peaks.json used to be re-read, re-serialized in
+full and rewritten in place on every change. With many symbols that is a lot
+of redundant I/O, and a crash mid-write leaves a truncated file.
+JSONDocument keeps the same files with:
+
+1. dict interface - a JSONDocument is the loaded top-level dict; reads are
+   plain dict reads, writes mark only the changed key dirty
+2. Dirty keys only - each key's JSON text is cached; a change re-encodes just
+   that key and a flush splices the cached fragments into the file text
+3. Coalesced - a document is flushed at most once per `flush_interval`
+   seconds (counted from its first unflushed change) by one shared
+   background thread
+4. Atomic - temp file in the same directory + fsync + os.replace, so readers
+   and crashes only ever see the old or the new complete file
+5. Shutdown - atexit flushes every dirty document
+6. Other processes - if the file changed on disk since our last read/write,
+   keys we have not changed are reloaded from it before we write back
+
+Files stay plain JSON dicts (indent=2 by default), so existing files and
+readers work unchanged. Values must be JSON-serializable; nested values
+changed in place must be assigned back (doc[key] = value).
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JSONDocument(dict):
+    """
+    Top-level JSON dict bound to a file, persisted through a JSONStateWriter.
+
+    Usage:
+        doc = get_json_state_writer().document('data/trade_entries.json')
+        doc['12345'] = {...}      # queued, written within flush_interval
+        doc.flush()               # or force it now
+    """
+
+    def __init__(self, writer: 'JSONStateWriter', path: str, indent: Optional[int] = 2,
+                 flush_interval: Optional[float] = None):
+        super().__init__()
+        self.path = path
+        self.indent = indent
+        self.flush_interval = writer.flush_interval if flush_interval is None else flush_interval
+        self._writer = writer
+
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+        self._fragments: Dict[str, str] = {}  # JSON key -> encoded "key": value text
+        self._dirty: set = set()
+        self._dirty_since: Optional[float] = None
+        self._disk_version: Optional[Tuple[int, int]] = None
+
+        # Stats
+        self.puts = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.reloads = 0
+
+        self._load()
+
+    # ═══════════════════════════════════════════════════════════
+    # LOAD / SYNC
+    # ═══════════════════════════════════════════════════════════
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_disk(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read state file {self.path}: {e}")
+            return {}
+
+    def _load(self):
+        with self._lock:
+            self._disk_version = self._stat()
+            data = self._read_disk()
+            dict.clear(self)
+            self._fragments.clear()
+            for key, value in data.items():
+                dict.__setitem__(self, key, value)
+                self._fragments[key] = self._encode(key, value)
+
+    def refresh(self) -> bool:
+        """Reload keys we have not changed if another process rewrote the file"""
+        version = self._stat()
+        if version == self._disk_version:
+            return False
+        with self._lock:
+            self._disk_version = version
+            data = self._read_disk()
+            for key, value in data.items():
+                if key not in self._dirty:
+                    dict.__setitem__(self, key, value)
+                    self._fragments[key] = self._encode(key, value)
+            for key in [k for k in dict.keys(self) if k not in data and k not in self._dirty]:
+                dict.pop(self, key, None)
+                self._fragments.pop(key, None)
+            self.reloads += 1
+        return True
+
+    # ═══════════════════════════════════════════════════════════
+    # ENCODING
+    # ═══════════════════════════════════════════════════════════
+
+    def _encode(self, key: str, value: Any) -> str:
+        """One top-level member, formatted exactly as json.dump(doc, indent=indent) would"""
+        encoded = json.dumps(value, indent=self.indent, default=str)
+        if self.indent is None:
+            return f"{json.dumps(key)}: {encoded}"
+        pad = ' ' * self.indent
+        return f"{pad}{json.dumps(key)}: {encoded.replace(chr(10), chr(10) + pad)}"
+
+    def _render_locked(self) -> str:
+        if not self._fragments:
+            return '{}'
+        if self.indent is None:
+            return '{' + ', '.join(self._fragments.values()) + '}'
+        return '{\n' + ',\n'.join(self._fragments.values()) + '\n}'
+
+    # ═══════════════════════════════════════════════════════════
+    # WRITES
+    # ═══════════════════════════════════════════════════════════
+
+    def _mark_locked(self, key: str):
+        self._dirty.add(key)
+        self.puts += 1
+        if self._dirty_since is None:
+            self._dirty_since = time.time()
+
+    def __setitem__(self, key, value):
+        key = str(key)
+        fragment = self._encode(key, value)  # Snapshot now - callers mutate in place
+        with self._lock:
+            dict.__setitem__(self, key, value)
+            if self._fragments.get(key) == fragment:
+                return  # Unchanged on disk - nothing to write
+            self._fragments[key] = fragment
+            self._mark_locked(key)
+
+    def __delitem__(self, key):
+        key = str(key)
+        with self._lock:
+            dict.__delitem__(self, key)
+            self._fragments.pop(key, None)
+            self._mark_locked(key)
+
+    def pop(self, key, *default):
+        key = str(key)
+        with self._lock:
+            if key in self:
+                value = dict.pop(self, key)
+                self._fragments.pop(key, None)
+                self._mark_locked(key)
+                return value
+            return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        key = str(key)
+        with self._lock:
+            if key not in self:
+                self[key] = default
+            return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        with self._lock:
+            for key, value in dict(*args, **kwargs).items():
+                self[key] = value
+
+    def clear(self):
+        with self._lock:
+            for key in list(dict.keys(self)):
+                del self[key]
+
+    def replace(self, data: Dict[str, Any]):
+        """Make the document exactly `data` (only changed keys are marked dirty)"""
+        with self._lock:
+            for key in [k for k in dict.keys(self) if k not in data]:
+                del self[key]
+            for key, value in data.items():
+                self[key] = value
+
+    def __iter__(self):
+        return iter(list(dict.keys(self)))  # Safe against a concurrent refresh
+
+    # ═══════════════════════════════════════════════════════════
+    # FLUSH
+    # ═══════════════════════════════════════════════════════════
+
+    def is_due(self, now: float) -> bool:
+        since = self._dirty_since
+        return since is not None and now - since >= self.flush_interval
+
+    def flush(self) -> bool:
+        """Write the document now if it has unflushed changes"""
+        with self._io_lock:
+            self.refresh()
+            with self._lock:
+                if not self._dirty:
+                    return False
+                text = self._render_locked()
+                dirty, self._dirty = self._dirty, set()
+                self._dirty_since = None
+
+            try:
+                self._write_atomic(text)
+                with self._lock:
+                    self._disk_version = self._stat()
+                self.flushes += 1
+                return True
+            except Exception as e:
+                self.flush_errors += 1
+                logger.warning(f"⚠️ Could not write state file {self.path} ({len(dirty)} keys re-queued): {e}")
+                with self._lock:
+                    self._dirty |= dirty
+                    if self._dirty_since is None:
+                        self._dirty_since = time.time()
+                return False
+
+    def _write_atomic(self, text: str):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(self.path), suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'path': self.path,
+                'keys': len(self),
+                'dirty': len(self._dirty),
+                'puts': self.puts,
+                'flushes': self.flushes,
+                'flush_errors': self.flush_errors,
+                'reloads': self.reloads,
+            }
+
+
+class JSONStateWriter:
+    """
+    Shared background flusher for JSONDocuments (one thread per process).
+    """
+
+    def __init__(self, flush_interval: float = 1.0, tick: float = 0.25):
+        """
+        Args:
+            flush_interval: Default max seconds a change waits before its file is rewritten
+            tick: Seconds between checks for documents that are due
+        """
+        self.flush_interval = flush_interval
+        self.tick = tick
+
+        self._documents: Dict[str, JSONDocument] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name='JSONStateWriter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def document(self, path: str, indent: Optional[int] = 2,
+                 flush_interval: Optional[float] = None) -> JSONDocument:
+        """Document for a file, loaded on first use (one instance per path)"""
+        key = os.path.abspath(path)
+        with self._lock:
+            doc = self._documents.get(key)
+            if doc is None:
+                doc = JSONDocument(self, path, indent=indent, flush_interval=flush_interval)
+                self._documents[key] = doc
+            return doc
+
+    def flush(self):
+        """Write every document with unflushed changes now"""
+        for doc in list(self._documents.values()):
+            doc.flush()
+
+    def close(self):
+        """Stop the flusher thread and write everything pending (registered with atexit)"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            'documents': [doc.get_stats() for doc in list(self._documents.values())],
+            'flush_interval': self.flush_interval,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            now = time.time()
+            for doc in list(self._documents.values()):
+                if doc.is_due(now):
+                    doc.flush()
+
+
+# ═══════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════
+
+_json_state_writer: Optional[JSONStateWriter] = None
+_json_state_writer_lock = threading.Lock()
+
+
+def get_json_state_writer() -> JSONStateWriter:
+    """Shared JSON state writer for this process"""
+    global _json_state_writer
+    with _json_state_writer_lock:
+        if _json_state_writer is None:
+            _json_state_writer = JSONStateWriter()
+        return _json_state_writer
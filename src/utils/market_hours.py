@@ -2,11 +2,12 @@
 Market Hours Detection - US30 Trading Hours
 Knows when market is open/closed based on broker time
 """
-from datetime import datetime, time, timedelta
+from datetime import datetime
 from typing import Dict, Optional
 import pytz
 
 from src.utils.logger import get_logger
+from src.utils.session_calendar import get_session_calendar
 
 logger = get_logger(__name__)
 
@@ -25,24 +26,17 @@ class MarketHours:
     - London Open: 3:00 AM - 5:00 AM ET
     - NY Open: 9:30 AM - 11:30 AM ET (BEST!)
     - NY Afternoon: 1:00 PM - 4:00 PM ET
+    
+    Open/closed, sessions and holidays come from the precompiled
+    SessionCalendar (index class), so lookups are a single table index.
     """
     
     def __init__(self, timezone: str = 'America/New_York'):
         self.timezone = pytz.timezone(timezone)
         
-        # US30 trading hours (24/5 market)
-        self.sunday_open = time(18, 0)  # 6:00 PM Sunday
-        self.friday_close = time(17, 0)  # 5:00 PM Friday
-        
-        # Best trading sessions
-        self.sessions = {
-            'asian': {'start': time(0, 0), 'end': time(3, 0)},  # 12 AM - 3 AM
-            'london': {'start': time(3, 0), 'end': time(9, 30)},  # 3 AM - 9:30 AM
-            'ny_open': {'start': time(9, 30), 'end': time(11, 30)},  # 9:30 AM - 11:30 AM (BEST!)
-            'ny_lunch': {'start': time(11, 30), 'end': time(13, 0)},  # 11:30 AM - 1 PM (slow)
-            'ny_afternoon': {'start': time(13, 0), 'end': time(17, 0)},  # 1 PM - 5 PM
-            'after_hours': {'start': time(17, 0), 'end': time(18, 0)}  # 5 PM - 6 PM (thin)
-        }
+        # US30 trading hours (Sunday 6 PM - Friday 5 PM ET) and sessions
+        # (see MARKET_SESSIONS) are compiled into the shared session calendar
+        self.calendar = get_session_calendar()
         
         logger.info("Market Hours initialized")
         logger.info(f"  Timezone: {timezone}")
@@ -54,7 +48,7 @@ class MarketHours:
     
     def is_market_open(self, dt: Optional[datetime] = None) -> Dict:
         """
-        Check if US30 market is currently open
+        Check if US30 market is currently open (one session calendar lookup)
         
         Args:
             dt: Datetime to check (defaults to now)
@@ -76,95 +70,40 @@ class MarketHours:
         else:
             dt = dt.astimezone(self.timezone)
         
-        weekday = dt.weekday()  # 0=Monday, 6=Sunday
-        current_time = dt.time()
+        state = self.calendar.lookup('index', dt)
+        change = self.calendar.next_change('index', dt)
+        change = change.astimezone(self.timezone) if change else None
+        weekday = state.market_weekday  # 0=Monday, 6=Sunday
         
-        # Saturday - CLOSED
-        if weekday == 5:  # Saturday
-            # Next open: Sunday 6 PM
-            days_until_sunday = 1
-            next_open = dt.replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=days_until_sunday)
+        if not state.open:
+            if state.holiday:
+                reason = f'Market closed: {state.holiday}'
+            elif weekday == 5:
+                reason = 'Market closed: Saturday'
+            elif weekday == 6:
+                reason = f'Market closed: Sunday before 6 PM (opens in {(change - dt).total_seconds() / 3600:.1f} hours)' if change else 'Market closed: Sunday before 6 PM'
+            else:
+                reason = 'Market closed: Friday after 5 PM (weekend)'
             return {
                 'open': False,
-                'reason': 'Market closed: Saturday',
-                'next_open': next_open,
+                'reason': reason,
+                'next_open': change,
                 'next_close': None,
                 'session': 'closed'
             }
         
-        # Sunday - Opens at 6 PM
-        if weekday == 6:  # Sunday
-            if current_time < self.sunday_open:
-                next_open = dt.replace(hour=18, minute=0, second=0, microsecond=0)
-                return {
-                    'open': False,
-                    'reason': f'Market closed: Sunday before 6 PM (opens in {(next_open - dt).total_seconds() / 3600:.1f} hours)',
-                    'next_open': next_open,
-                    'next_close': None,
-                    'session': 'closed'
-                }
-            else:
-                # Open Sunday evening
-                next_close = (dt + timedelta(days=5)).replace(hour=17, minute=0, second=0, microsecond=0)
-                return {
-                    'open': True,
-                    'reason': 'Market open: Sunday evening',
-                    'next_open': None,
-                    'next_close': next_close,
-                    'session': self._get_current_session(current_time)
-                }
-        
-        # Friday - Closes at 5 PM
-        if weekday == 4:  # Friday
-            if current_time >= self.friday_close:
-                # Closed Friday evening
-                days_until_sunday = 2
-                next_open = dt.replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=days_until_sunday)
-                return {
-                    'open': False,
-                    'reason': 'Market closed: Friday after 5 PM (weekend)',
-                    'next_open': next_open,
-                    'next_close': None,
-                    'session': 'closed'
-                }
-            else:
-                # Open Friday
-                next_close = dt.replace(hour=17, minute=0, second=0, microsecond=0)
-                return {
-                    'open': True,
-                    'reason': 'Market open: Friday',
-                    'next_open': None,
-                    'next_close': next_close,
-                    'session': self._get_current_session(current_time)
-                }
-        
-        # Monday-Thursday - Open 24 hours
-        if weekday in [0, 1, 2, 3]:  # Monday-Thursday
-            next_close = (dt + timedelta(days=(4 - weekday))).replace(hour=17, minute=0, second=0, microsecond=0)
-            return {
-                'open': True,
-                'reason': f'Market open: {["Monday", "Tuesday", "Wednesday", "Thursday"][weekday]}',
-                'next_open': None,
-                'next_close': next_close,
-                'session': self._get_current_session(current_time)
-            }
-        
-        # Fallback
+        if weekday == 6:
+            reason = 'Market open: Sunday evening'
+        else:
+            reason = f'Market open: {["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"][weekday]}'
         return {
-            'open': False,
-            'reason': 'Unknown market state',
+            'open': True,
+            'reason': reason,
             'next_open': None,
-            'next_close': None,
-            'session': 'unknown'
+            'next_close': change,
+            'session': state.market_session
         }
     
-    def _get_current_session(self, current_time: time) -> str:
-        """Determine which trading session we're in"""
-        for session_name, times in self.sessions.items():
-            if times['start'] <= current_time < times['end']:
-                return session_name
-        return 'unknown'
-    
     def get_session_info(self, dt: Optional[datetime] = None) -> Dict:
         """
         Get detailed session information
@@ -6,6 +6,10 @@ that communicate with MT5 via ai_command.txt / ai_response.txt files.
 
 This prevents race conditions where multiple threads try to send commands
 simultaneously, which would overwrite each other's command files.
+
+Only the legacy single-file protocol needs it (TradeExecutor). MT5DataFetcher
+and MT5FileClient use request-id files (src/brokers/file_transport.py) and
+run concurrently without it.
 """
 import threading
 import time
@@ -0,0 +1,390 @@
+"""
+Scan Scheduler - Adaptive, rate-limited (symbol, timeframe) scan jobs
+
+The tier loops scanned their symbols one after another at a fixed interval
+per tier (SYMBOL_TIERS), whether or not anything had changed, and paced the
+EA with hardcoded sleeps. The scheduler instead:
+
+1. Keeps a priority queue of (symbol, timeframe) jobs keyed by next-due time
+   - every timeframe is due at its next bar close (new closed bar = new
+     features); the primary (fastest) timeframe is also due after an adaptive
+     interval so the forming bar is re-read
+2. Adapts the interval - the tier's scan_interval divided by the symbol's
+   volatility ratio (recent range / average range) and shortened while a
+   position is open, clamped to [min_interval, max_interval]
+3. Coalesces - all of a symbol's due timeframes run as one scan (one bulk
+   fetch through the bar cache)
+4. Rate-limits with a token bucket (one token per scan = one EA round-trip)
+   instead of sleeps, and runs up to max_in_flight scans concurrently, so
+   EA latency overlaps instead of adding up
+5. Reports per-symbol staleness: age of the last scan and how late scans
+   started relative to their due time
+
+Usage:
+    scheduler = ScanScheduler(scan_fn, rate=5.0, max_in_flight=4)
+    scheduler.add_symbol('US30', interval=60, tier='HIGH_PRIORITY')
+    scheduler.start()
+
+scan_fn(symbol, due_timeframes) runs the scan and may return the symbol's
+volatility ratio (1.0 = normal) to adapt its next interval.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.data.bars_bulk import TIMEFRAME_SECONDS
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ScanFn = Callable[[str, Tuple[str, ...]], Optional[float]]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `burst` banked
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waits = 0  # Acquisitions that had to wait for a token
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available"""
+        with self._lock:
+            self._refill(self.clock())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are taken (False on timeout)"""
+        deadline = None if timeout is None else self.clock() + timeout
+        waited = False
+        while not self.try_acquire(tokens):
+            delay = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            waited = True
+            time.sleep(max(delay, 0.001))
+        if waited:
+            self.waits += 1
+        return True
+
+
+@dataclass
+class SymbolSchedule:
+    """Per-symbol scheduling state"""
+    symbol: str
+    base_interval: float
+    tier: str = ''
+    volatility: float = 1.0
+    has_position: bool = False
+    due: Dict[str, Optional[float]] = field(default_factory=dict)  # timeframe -> due time (None = running)
+    in_flight: bool = False
+    rerun: bool = False  # Became due again while in flight
+    last_scan: float = 0.0
+    scans: int = 0
+    total_lag: float = 0.0
+    max_lag: float = 0.0
+
+
+class ScanScheduler:
+    """
+    Priority-queue scan scheduler with token-bucket rate limiting
+    """
+
+    def __init__(
+        self,
+        scan_fn: ScanFn,
+        timeframes: Sequence[str] = ('H1', 'H4', 'D1'),
+        rate: float = 5.0,
+        burst: Optional[float] = None,
+        max_in_flight: int = 4,
+        min_interval: float = 15.0,
+        max_interval: float = 600.0,
+        position_factor: float = 0.5,
+        bar_close_grace: float = 2.0,
+        server_offset: float = 0.0,
+        report_interval: float = 300.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            scan_fn: scan_fn(symbol, due_timeframes) -> optional volatility ratio
+            timeframes: Timeframes per symbol, fastest first (the primary one)
+            rate: EA budget in scans per second
+            burst: Scans that may start back to back (default: max(1, rate))
+            max_in_flight: Concurrent scans
+            min_interval / max_interval: Clamp for the adaptive interval (s)
+            position_factor: Interval multiplier while a position is open
+            bar_close_grace: Seconds after a bar close before its job is due
+            server_offset: Broker server time - UTC in seconds (bar boundaries)
+            report_interval: Seconds between staleness log lines (0 = never)
+            clock: Time source (seconds)
+        """
+        self.scan_fn = scan_fn
+        self.timeframes = tuple(timeframes)
+        self.primary = self.timeframes[0]
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.position_factor = position_factor
+        self.bar_close_grace = bar_close_grace
+        self.server_offset = server_offset
+        self.report_interval = report_interval
+        self.clock = clock
+
+        self._symbols: Dict[str, SymbolSchedule] = {}
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self.is_running = False
+
+        # Stats
+        self.started_at = 0.0
+        self.scans = 0
+        self.errors = 0
+
+    # ═══════════════════════════════════════════════════════════
+    # SYMBOLS
+    # ═══════════════════════════════════════════════════════════
+
+    def add_symbol(self, symbol: str, interval: float, tier: str = ''):
+        """Schedule a symbol (all its timeframes due now)"""
+        with self._cond:
+            state = SymbolSchedule(symbol, float(interval), tier)
+            self._symbols[symbol] = state
+            now = self.clock()
+            for tf in self.timeframes:
+                self._push(state, tf, now)
+            self._cond.notify()
+
+    def remove_symbol(self, symbol: str):
+        with self._cond:
+            self._symbols.pop(symbol, None)  # Heap entries are dropped lazily
+
+    def set_volatility(self, symbol: str, ratio: float):
+        """Volatility ratio (recent range / average range, 1.0 = normal)"""
+        with self._cond:
+            state = self._symbols.get(symbol)
+            if state and ratio and ratio > 0:
+                state.volatility = ratio
+                self._pull_forward(state)
+
+    def set_open_positions(self, symbols: Iterable[str]):
+        """Symbols with open positions are scanned more often"""
+        held = set(symbols)
+        with self._cond:
+            for state in self._symbols.values():
+                has_position = state.symbol in held
+                if has_position != state.has_position:
+                    state.has_position = has_position
+                    self._pull_forward(state)
+
+    def interval(self, state: SymbolSchedule) -> float:
+        """Adaptive re-scan interval of the primary timeframe"""
+        interval = state.base_interval / min(3.0, max(0.5, state.volatility))
+        if state.has_position:
+            interval *= self.position_factor
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def next_bar_close(self, timeframe: str, now: float) -> float:
+        seconds = TIMEFRAME_SECONDS.get(timeframe, 3600)
+        server_now = now + self.server_offset
+        return (server_now // seconds + 1) * seconds - self.server_offset
+
+    # ═══════════════════════════════════════════════════════════
+    # QUEUE (call with self._cond held)
+    # ═══════════════════════════════════════════════════════════
+
+    def _push(self, state: SymbolSchedule, timeframe: str, due: float):
+        state.due[timeframe] = due
+        heapq.heappush(self._heap, (due, next(self._seq), state.symbol, timeframe))
+
+    def _schedule_next(self, state: SymbolSchedule, timeframe: str, now: float):
+        due = self.next_bar_close(timeframe, now) + self.bar_close_grace
+        if timeframe == self.primary:
+            due = min(due, now + self.interval(state))
+        self._push(state, timeframe, due)
+
+    def _pull_forward(self, state: SymbolSchedule):
+        """Re-apply a shorter interval to an already scheduled primary job"""
+        current = state.due.get(self.primary)
+        if current is None or not state.last_scan:
+            return
+        due = max(self.clock(), state.last_scan + self.interval(state))
+        if due < current:
+            self._push(state, self.primary, due)
+            self._cond.notify()
+
+    def _pop_due(self, now: float) -> Optional[Tuple[SymbolSchedule, Tuple[str, ...], float]]:
+        """Next due symbol with all of its due timeframes (None if nothing is due)"""
+        while self._heap and self._heap[0][0] <= now:
+            due, _, symbol, tf = heapq.heappop(self._heap)
+            state = self._symbols.get(symbol)
+            if state is None or state.due.get(tf) != due:
+                continue  # Removed symbol or superseded entry
+            if state.in_flight:
+                state.due[tf] = None
+                state.rerun = True
+                continue
+            timeframes = tuple(t for t in self.timeframes
+                               if state.due.get(t) is not None and state.due[t] <= now)
+            earliest = min(state.due[t] for t in timeframes)
+            for t in timeframes:
+                state.due[t] = None
+            state.in_flight = True
+            return state, timeframes, earliest
+        return None
+
+    # ═══════════════════════════════════════════════════════════
+    # DISPATCH
+    # ═══════════════════════════════════════════════════════════
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.started_at = self.clock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='Scan')
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name='ScanScheduler')
+        self._thread.start()
+        logger.info(f"Scan scheduler started: {len(self._symbols)} symbols x {len(self.timeframes)} timeframes, "
+                    f"{self.bucket.rate:g} scans/s, {self.max_in_flight} in flight")
+
+    def stop(self, wait: bool = True):
+        with self._cond:
+            self.is_running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+
+    def _dispatch_loop(self):
+        last_report = self.clock()
+        while self.is_running:
+            with self._cond:
+                job = None
+                while self.is_running:
+                    now = self.clock()
+                    if self._in_flight < self.max_in_flight:
+                        job = self._pop_due(now)
+                        if job:
+                            self._in_flight += 1
+                            break
+                    timeout = self._heap[0][0] - now if self._heap else 1.0
+                    self._cond.wait(timeout=min(1.0, max(0.001, timeout)))
+            if job is None:
+                break
+
+            # One token per scan (one bulk round-trip) - paces the EA instead of sleeps
+            self.bucket.acquire()
+            if not self.is_running:
+                break
+            self._executor.submit(self._run, *job)
+
+            if self.report_interval and self.clock() - last_report >= self.report_interval:
+                last_report = self.clock()
+                logger.info(self.format_staleness())
+
+    def _run(self, state: SymbolSchedule, timeframes: Tuple[str, ...], due: float):
+        start = self.clock()
+        volatility = None
+        try:
+            volatility = self.scan_fn(state.symbol, timeframes)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Scan failed for {state.symbol} {'/'.join(timeframes)}: {e}")
+
+        with self._cond:
+            now = self.clock()
+            lag = max(0.0, start - due)
+            state.scans += 1
+            state.total_lag += lag
+            state.max_lag = max(state.max_lag, lag)
+            state.last_scan = now
+            state.in_flight = False
+            self.scans += 1
+            self._in_flight -= 1
+            if volatility:
+                state.volatility = volatility
+
+            if state.symbol in self._symbols:
+                for tf in self.timeframes:
+                    if state.due.get(tf) is None:
+                        if state.rerun and tf not in timeframes:
+                            self._push(state, tf, now)  # Came due while this scan ran
+                        else:
+                            self._schedule_next(state, tf, now)
+            state.rerun = False
+            self._cond.notify()
+
+    # ═══════════════════════════════════════════════════════════
+    # REPORTING
+    # ═══════════════════════════════════════════════════════════
+
+    def staleness(self) -> Dict[str, Dict]:
+        """Per symbol: seconds since the last scan, start lag vs due time, interval"""
+        now = self.clock()
+        with self._cond:
+            return {
+                symbol: {
+                    'tier': state.tier,
+                    'age_s': now - state.last_scan if state.last_scan else None,
+                    'avg_lag_s': state.total_lag / state.scans if state.scans else 0.0,
+                    'max_lag_s': state.max_lag,
+                    'interval_s': self.interval(state),
+                    'scans': state.scans,
+                    'has_position': state.has_position,
+                }
+                for symbol, state in self._symbols.items()
+            }
+
+    def format_staleness(self) -> str:
+        parts = []
+        for symbol, info in self.staleness().items():
+            age = f"{info['age_s']:.0f}s" if info['age_s'] is not None else '-'
+            parts.append(f"{symbol} age {age} lag {info['avg_lag_s']:.1f}s every {info['interval_s']:.0f}s")
+        stats = self.get_stats()
+        return f"Scan staleness ({stats['scans_per_minute']:.1f} scans/min): " + '; '.join(parts)
+
+    def get_stats(self) -> Dict:
+        elapsed = self.clock() - self.started_at if self.started_at else 0.0
+        return {
+            'symbols': len(self._symbols),
+            'scans': self.scans,
+            'errors': self.errors,
+            'in_flight': self._in_flight,
+            'queued': len(self._heap),
+            'scans_per_minute': self.scans * 60.0 / elapsed if elapsed > 0 else 0.0,
+            'rate_limited': self.bucket.waits,
+        }
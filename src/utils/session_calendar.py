@@ -0,0 +1,346 @@
+"""
+Session Calendar - Precomputed minute-of-week session tables
+
+Session logic used to be re-derived on every request, in several places:
+MarketHours localized timestamps and branched on weekday/time, while the EV
+exit manager, the unified entry system, FTMOStrategy and the trade journal
+each re-implemented the UTC session hours. This module is the one source:
+
+1. Compiled once per UTC week (Monday 00:00 UTC) - every minute of the week
+   gets its liquidity session, market (New York) session, open/closed flag
+   and liquidity multiplier per instrument class, minutes to the Friday
+   close, and holiday. DST and holidays are resolved at compile time.
+2. Lookups are one array index: minute-of-week = (timestamp - week start) / 60.
+3. Weeks are compiled lazily and cached, so replays over any date work.
+
+Instrument classes: index, forex, gold, other (see instrument_class()).
+"""
+import logging
+import math
+import threading
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from src.risk.factor_loadings import clean_symbol
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TIMEZONE = ZoneInfo('America/New_York')  # Weekly open/close and market sessions
+except Exception:  # pragma: no cover - tzdata missing
+    MARKET_TIMEZONE = timezone(timedelta(hours=-5))
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+_EPOCH_MONDAY_OFFSET = 3 * MINUTES_PER_DAY  # 1970-01-01 was a Thursday
+
+# ═══════════════════════════════════════════════════════════
+# SESSION DEFINITIONS
+# ═══════════════════════════════════════════════════════════
+
+# Liquidity sessions (UTC hours). Overlap wins over New York, New York over London.
+SESSIONS = {
+    'asian': {'start': 0, 'end': 8, 'indices_mult': 0.5, 'forex_mult': 0.7, 'patience_boost': 1.3, 'entry_boost': 0.7},
+    'london': {'start': 8, 'end': 16, 'indices_mult': 0.8, 'forex_mult': 1.0, 'patience_boost': 1.0, 'entry_boost': 1.0},
+    'new_york': {'start': 13, 'end': 21, 'indices_mult': 1.0, 'forex_mult': 1.0, 'patience_boost': 1.0, 'entry_boost': 1.0},
+    'overlap': {'start': 13, 'end': 16, 'indices_mult': 1.2, 'forex_mult': 1.2, 'patience_boost': 0.8, 'entry_boost': 1.2},  # Best liquidity
+}
+SESSION_NAMES = ('asian', 'london', 'new_york', 'overlap')
+
+# Market sessions (America/New_York minutes of day) - 18:00-24:00 is 'unknown'
+MARKET_SESSIONS = (
+    ('asian', 0, 3 * 60),
+    ('london', 3 * 60, 9 * 60 + 30),
+    ('ny_open', 9 * 60 + 30, 11 * 60 + 30),      # BEST
+    ('ny_lunch', 11 * 60 + 30, 13 * 60),
+    ('ny_afternoon', 13 * 60, 17 * 60),
+    ('after_hours', 17 * 60, 18 * 60),
+)
+MARKET_SESSION_NAMES = tuple(name for name, _, _ in MARKET_SESSIONS) + ('unknown',)
+
+INSTRUMENT_CLASSES = ('index', 'forex', 'gold', 'other')
+
+# Sunday open (New York minute of day); every class closes Friday 17:00 New York
+WEEKLY_OPEN = {'index': 18 * 60, 'forex': 17 * 60, 'gold': 18 * 60, 'other': 18 * 60}
+FRIDAY_CLOSE = 17 * 60
+
+# Full-day closures by New York calendar date (month, day)
+HOLIDAYS = {(1, 1): "New Year's Day", (12, 25): 'Christmas Day'}
+
+_INDEX_MARKERS = ('us30', 'us100', 'us500', 'nas100', 'spx', 'dax', 'de30', 'de40', 'ger40', 'ftse', 'uk100',
+                  'eu50', 'stoxx', 'fra40', 'jp225', 'nikkei', 'aus200', 'hk50')
+_FOREX_MARKERS = ('eur', 'gbp', 'jpy', 'aud', 'nzd', 'cad', 'chf')
+_class_cache: Dict[str, str] = {}
+
+
+def instrument_class(symbol: str) -> str:
+    """index / forex / gold / other (broker suffixes and contract codes ignored)"""
+    cls = _class_cache.get(symbol)
+    if cls is None:
+        s = clean_symbol(symbol)
+        if s in INSTRUMENT_CLASSES:
+            cls = s
+        elif any(m in s for m in _INDEX_MARKERS):
+            cls = 'index'
+        elif any(m in s for m in _FOREX_MARKERS):
+            cls = 'forex'
+        elif 'xau' in s or 'gold' in s:
+            cls = 'gold'
+        else:
+            cls = 'other'
+        _class_cache[symbol] = cls
+    return cls
+
+
+def utc_session(hour: int) -> str:
+    """Liquidity session for a UTC hour"""
+    if 13 <= hour < 16:
+        return 'overlap'
+    if 13 <= hour < 21:
+        return 'new_york'
+    if 8 <= hour < 16:
+        return 'london'
+    return 'asian'
+
+
+def session_multiplier(session: str, cls: str) -> float:
+    """Position size multiplier for a liquidity session and instrument class"""
+    config = SESSIONS[session]
+    if cls == 'index':
+        return config['indices_mult']
+    if cls == 'gold':
+        return max(0.8, config['forex_mult'])  # Gold trades well in all sessions
+    return config['forex_mult']
+
+
+@dataclass(frozen=True)
+class SessionState:
+    """Everything the calendar knows about one minute for one instrument class"""
+    instrument_class: str
+    open: bool
+    session: str            # Liquidity session (asian/london/new_york/overlap)
+    market_session: str     # New York session (asian/london/ny_open/.../unknown)
+    liquidity: float        # Session size multiplier for the class
+    minutes_to_close: int   # Until the Friday close (0 once past it)
+    is_friday: bool         # UTC Friday
+    hour_utc: int
+    market_weekday: int     # New York weekday (0=Monday)
+    holiday: Optional[str]
+
+    @property
+    def hours_to_close(self) -> int:
+        """Whole hours to the Friday close (999 on other days)"""
+        return math.ceil(self.minutes_to_close / 60) if self.is_friday else 999
+
+
+class SessionWeek:
+    """Compiled per-minute tables for one UTC week"""
+
+    def __init__(self, week: int, holidays: Dict[date, str]):
+        self.week = week
+        self.start_minute = week * MINUTES_PER_WEEK - _EPOCH_MONDAY_OFFSET
+        self.start = datetime.fromtimestamp(self.start_minute * 60, tz=timezone.utc)
+
+        self.session = array('b', bytes(MINUTES_PER_WEEK))
+        self.market_session = array('b', bytes(MINUTES_PER_WEEK))
+        self.market_weekday = array('b', bytes(MINUTES_PER_WEEK))
+        self.holiday = array('b', bytes(MINUTES_PER_WEEK))  # Index into holiday_names (0 = none)
+        self.holiday_names = [None]
+        self.open = {cls: array('b', bytes(MINUTES_PER_WEEK)) for cls in INSTRUMENT_CLASSES}
+        self.liquidity = {cls: array('d', bytes(8 * MINUTES_PER_WEEK)) for cls in INSTRUMENT_CLASSES}
+        self.next_flip = {cls: array('i', bytes(4 * MINUTES_PER_WEEK)) for cls in INSTRUMENT_CLASSES}
+        self.minutes_to_close = array('i', bytes(4 * MINUTES_PER_WEEK))
+
+        self._compile(holidays)
+
+    def _compile(self, holidays: Dict[date, str]):
+        market_session_at = array('b', bytes(MINUTES_PER_DAY))
+        for code in range(MINUTES_PER_DAY):
+            market_session_at[code] = len(MARKET_SESSIONS)
+        for code, (_, start, end) in enumerate(MARKET_SESSIONS):
+            for minute in range(start, end):
+                market_session_at[minute] = code
+
+        for hour in range(7 * 24):
+            # New York offsets are whole hours and change on hour boundaries
+            utc = self.start + timedelta(hours=hour)
+            local = utc.astimezone(MARKET_TIMEZONE)
+            session_code = SESSION_NAMES.index(utc_session(utc.hour))
+            weekday = local.weekday()
+            holiday = holidays.get(local.date()) or HOLIDAYS.get((local.month, local.day))
+            holiday_code = 0
+            if holiday:
+                if holiday not in self.holiday_names:
+                    self.holiday_names.append(holiday)
+                holiday_code = self.holiday_names.index(holiday)
+
+            for minute in range(60):
+                i = hour * 60 + minute
+                local_minute = local.hour * 60 + local.minute + minute
+                self.session[i] = session_code
+                self.market_session[i] = market_session_at[local_minute]
+                self.market_weekday[i] = weekday
+                self.holiday[i] = holiday_code
+                for cls in INSTRUMENT_CLASSES:
+                    is_open = not holiday and self._is_open(cls, weekday, local_minute)
+                    self.open[cls][i] = is_open
+                    self.liquidity[cls][i] = session_multiplier(SESSION_NAMES[session_code], cls)
+
+        # Friday close (New York) of this week, as a minute index
+        friday = (self.start + timedelta(days=4)).date()
+        close = datetime(friday.year, friday.month, friday.day, FRIDAY_CLOSE // 60, tzinfo=MARKET_TIMEZONE)
+        close_index = int((close - self.start).total_seconds() // 60)
+        for i in range(MINUTES_PER_WEEK):
+            self.minutes_to_close[i] = max(0, close_index - i)
+
+        # Next open/closed change per class (-1 = not within this week)
+        for cls in INSTRUMENT_CLASSES:
+            is_open, flip = self.open[cls], self.next_flip[cls]
+            following = -1
+            flip[MINUTES_PER_WEEK - 1] = -1
+            for i in range(MINUTES_PER_WEEK - 2, -1, -1):
+                if is_open[i + 1] != is_open[i]:
+                    following = i + 1
+                flip[i] = following
+
+    @staticmethod
+    def _is_open(cls: str, weekday: int, local_minute: int) -> bool:
+        if weekday == 5:  # Saturday
+            return False
+        if weekday == 6:  # Sunday - weekly open
+            return local_minute >= WEEKLY_OPEN[cls]
+        if weekday == 4:  # Friday - weekly close
+            return local_minute < FRIDAY_CLOSE
+        return True
+
+    def state(self, cls: str, i: int) -> SessionState:
+        return SessionState(
+            instrument_class=cls,
+            open=bool(self.open[cls][i]),
+            session=SESSION_NAMES[self.session[i]],
+            market_session=MARKET_SESSION_NAMES[self.market_session[i]],
+            liquidity=self.liquidity[cls][i],
+            minutes_to_close=self.minutes_to_close[i],
+            is_friday=(i // MINUTES_PER_DAY) == 4,
+            hour_utc=(i // 60) % 24,
+            market_weekday=self.market_weekday[i],
+            holiday=self.holiday_names[self.holiday[i]],
+        )
+
+
+class SessionCalendar:
+    """
+    Minute-of-week session lookups, compiled per week and cached.
+
+    Usage:
+        calendar = get_session_calendar()
+        state = calendar.lookup('US30')          # now
+        state.open, state.session, state.liquidity, state.hours_to_close
+        calendar.session_context('EURUSD')       # dict for the EV/entry systems
+    """
+
+    def __init__(self, holidays: Iterable[date] = None, cached_weeks: int = 8):
+        """
+        Args:
+            holidays: Extra full-day closures (New York dates) on top of HOLIDAYS
+            cached_weeks: Compiled weeks kept in memory
+        """
+        self.holidays: Dict[date, str] = {d: 'Holiday' for d in (holidays or [])}
+        self.cached_weeks = cached_weeks
+        self._weeks: Dict[int, SessionWeek] = {}
+        self._lock = threading.Lock()
+        self.compiles = 0
+
+    def _week(self, week: int) -> SessionWeek:
+        compiled = self._weeks.get(week)
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            compiled = self._weeks.get(week)
+            if compiled is None:
+                compiled = SessionWeek(week, self.holidays)
+                weeks = dict(self._weeks)
+                weeks[week] = compiled
+                while len(weeks) > self.cached_weeks:
+                    weeks.pop(max(weeks, key=lambda w: abs(w - week)))  # Furthest from the one in use
+                self._weeks = weeks  # Publish a new dict - readers never see it mid-update
+                self.compiles += 1
+                logger.debug(f"📅 Session calendar compiled for week of {compiled.start:%Y-%m-%d}")
+        return compiled
+
+    def _locate(self, dt: Optional[datetime]):
+        """(week tables, minute index) for a datetime - naive datetimes are UTC"""
+        if dt is None:
+            dt = datetime.now(timezone.utc)
+        elif dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        minute = int(dt.timestamp() // 60) + _EPOCH_MONDAY_OFFSET
+        week, i = divmod(minute, MINUTES_PER_WEEK)
+        return self._week(week), i
+
+    def lookup(self, symbol: str, dt: datetime = None) -> SessionState:
+        """Session state for a symbol (or instrument class name) at dt (default: now)"""
+        week, i = self._locate(dt)
+        return week.state(instrument_class(symbol), i)
+
+    def is_open(self, symbol: str, dt: datetime = None) -> bool:
+        week, i = self._locate(dt)
+        return bool(week.open[instrument_class(symbol)][i])
+
+    def liquidity(self, symbol: str, dt: datetime = None) -> float:
+        week, i = self._locate(dt)
+        return week.liquidity[instrument_class(symbol)][i]
+
+    def next_change(self, symbol: str, dt: datetime = None) -> Optional[datetime]:
+        """Next time the symbol's class opens (if closed) or closes (if open), UTC"""
+        cls = instrument_class(symbol)
+        week, i = self._locate(dt)
+        is_open = week.open[cls][i]
+        for _ in range(4):  # Never more than a holiday week ahead
+            flip = week.next_flip[cls][i]
+            if flip >= 0:
+                return week.start + timedelta(minutes=flip)
+            week = self._week(week.week + 1)
+            if week.open[cls][0] != is_open:
+                return week.start
+            i = 0
+        return None
+
+    def session_context(self, symbol: str, dt: datetime = None) -> Dict:
+        """Session context dict shared by the EV exit manager and the entry system"""
+        state = self.lookup(symbol, dt)
+        config = SESSIONS[state.session]
+        hours_to_close = state.hours_to_close
+        return {
+            'session_name': state.session,
+            'session_mult': state.liquidity,
+            'patience_boost': config['patience_boost'],
+            'entry_boost': config['entry_boost'],
+            'is_optimal': state.liquidity >= 1.0,
+            'current_hour_utc': state.hour_utc,
+            'symbol_type': state.instrument_class,
+            'market_open': state.open,
+            'holiday': state.holiday,
+            # Friday afternoon = last 3 hours before the weekly close, Friday close = last hour
+            'is_friday': state.is_friday,
+            'is_friday_afternoon': state.is_friday and hours_to_close <= 3,
+            'is_friday_close': state.is_friday and hours_to_close <= 1,
+            'hours_to_close': hours_to_close,
+        }
+
+    def get_stats(self) -> Dict:
+        return {'weeks_cached': len(self._weeks), 'compiles': self.compiles}
+
+
+_session_calendar: Optional[SessionCalendar] = None
+
+
+def get_session_calendar() -> SessionCalendar:
+    """Get singleton SessionCalendar instance"""
+    global _session_calendar
+    if _session_calendar is None:
+        _session_calendar = SessionCalendar()
+    return _session_calendar
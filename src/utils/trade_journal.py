@@ -14,16 +14,20 @@ Data is stored in:
 - data/trade_journal.csv (summary of all trades)
 - data/trade_journal_details.json (full AI context per trade)
 - data/trade_entries.json (entry context by ticket)
+
+The JSON files are JSONDocuments: only the changed ticket is re-encoded and
+the file is rewritten atomically in the background, coalesced per second.
 """
 
 import os
-import json
 import csv
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 import threading
 
+from src.utils.json_state import JSONDocument, get_json_state_writer
+
 logger = logging.getLogger(__name__)
 
 # File paths
@@ -38,12 +42,30 @@ _file_lock = threading.Lock()
 # Track which tickets we've already logged (to avoid duplicates)
 _logged_tickets = set()
 
+# Tickets kept in each JSON file
+MAX_JSON_TRADES = 500
+
 
 def _ensure_data_dir():
     """Ensure data directory exists"""
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
+def _journal_details() -> JSONDocument:
+    return get_json_state_writer().document(JOURNAL_JSON)
+
+
+def _entry_contexts() -> JSONDocument:
+    return get_json_state_writer().document(ENTRY_CONTEXT_JSON)
+
+
+def _put_trade(doc: JSONDocument, ticket: int, data: Dict):
+    """Store one ticket, keeping only the newest MAX_JSON_TRADES tickets"""
+    doc[str(ticket)] = data
+    while len(doc) > MAX_JSON_TRADES:
+        del doc[min(doc, key=int)]
+
+
 def _load_logged_tickets():
     """Load previously logged ticket numbers to avoid duplicates"""
     global _logged_tickets
@@ -180,27 +202,8 @@ def log_closed_trade(
 def _save_trade_details(ticket: int, details: Dict):
     """Save detailed trade context to JSON file"""
     try:
-        _ensure_data_dir()
-        
-        # Load existing details
-        all_details = {}
-        if os.path.exists(JOURNAL_JSON):
-            with open(JOURNAL_JSON, 'r') as f:
-                all_details = json.load(f)
-        
-        # Add new trade
-        all_details[str(ticket)] = details
-        
         # Keep only last 500 trades to prevent file from growing too large
-        if len(all_details) > 500:
-            # Sort by ticket number and keep newest
-            sorted_tickets = sorted(all_details.keys(), key=int, reverse=True)[:500]
-            all_details = {k: all_details[k] for k in sorted_tickets}
-        
-        # Save
-        with open(JOURNAL_JSON, 'w') as f:
-            json.dump(all_details, f, indent=2)
-            
+        _put_trade(_journal_details(), ticket, details)
     except Exception as e:
         logger.warning(f"Could not save trade details: {e}")
 
@@ -244,13 +247,10 @@ def get_recent_trades(days: int = 7, symbol: str = None) -> List[Dict]:
 
 def get_trade_details(ticket: int) -> Optional[Dict]:
     """Get detailed context for a specific trade"""
-    if not os.path.exists(JOURNAL_JSON):
-        return None
-    
     try:
-        with open(JOURNAL_JSON, 'r') as f:
-            all_details = json.load(f)
-            return all_details.get(str(ticket))
+        details = _journal_details()
+        details.refresh()
+        return details.get(str(ticket))
     except:
         return None
 
@@ -358,26 +358,8 @@ def log_entry_context(
                 'extra': extra_context or {}
             }
             
-            # Load existing entries
-            entries = {}
-            if os.path.exists(ENTRY_CONTEXT_JSON):
-                try:
-                    with open(ENTRY_CONTEXT_JSON, 'r') as f:
-                        entries = json.load(f)
-                except:
-                    entries = {}
-            
-            # Add new entry
-            entries[str(ticket)] = entry_data
-            
-            # Keep only last 500 entries
-            if len(entries) > 500:
-                sorted_tickets = sorted(entries.keys(), key=int, reverse=True)[:500]
-                entries = {k: entries[k] for k in sorted_tickets}
-            
-            # Save
-            with open(ENTRY_CONTEXT_JSON, 'w') as f:
-                json.dump(entries, f, indent=2)
+            # Add new entry (keeps only last 500 entries)
+            _put_trade(_entry_contexts(), ticket, entry_data)
             
             logger.info(f"📓 ENTRY LOGGED: #{ticket} {symbol} {direction} {lots}L @ {entry_price}")
             logger.info(f"   ML: {ml_confidence:.1f}% {ml_direction} | Score: {market_score} | Setup: {setup_type}")
@@ -432,14 +414,7 @@ def log_exit_context(
             _ensure_data_dir()
             
             # Load entry context if available
-            entry_context = None
-            if os.path.exists(ENTRY_CONTEXT_JSON):
-                try:
-                    with open(ENTRY_CONTEXT_JSON, 'r') as f:
-                        entries = json.load(f)
-                        entry_context = entries.get(str(ticket))
-                except:
-                    pass
+            entry_context = get_entry_context(ticket)
             
             exit_data = {
                 'ticket': ticket,
@@ -490,12 +465,10 @@ def log_exit_context(
 
 def get_entry_context(ticket: int) -> Optional[Dict]:
     """Get the entry context for a specific trade"""
-    if not os.path.exists(ENTRY_CONTEXT_JSON):
-        return None
     try:
-        with open(ENTRY_CONTEXT_JSON, 'r') as f:
-            entries = json.load(f)
-            return entries.get(str(ticket))
+        entries = _entry_contexts()
+        entries.refresh()
+        return entries.get(str(ticket))
     except:
         return None
 
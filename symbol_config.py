@@ -30,6 +30,21 @@ SYMBOL_TIERS = {
     }
 }
 
+# Adaptive scan scheduler (src/utils/scan_scheduler.py)
+# scan_interval above is each tier's base re-scan interval; the scheduler
+# shortens it for volatile symbols and open positions and also scans every
+# timeframe at its bar close. EA budget is shared by all tiers.
+SCAN_SCHEDULER = {
+    'timeframes': ('H1', 'H4', 'D1'),   # Fastest first (re-scanned between bar closes)
+    'ea_scans_per_second': 2.0,         # Token bucket rate (one bulk round-trip per scan)
+    'burst': 4,                         # Scans that may start back to back
+    'max_in_flight': 4,                 # Concurrent scans
+    'min_interval': 15,                 # Clamp for the adaptive interval (seconds)
+    'max_interval': 600,
+    'position_interval_factor': 0.5,    # Interval multiplier while a position is open
+    'server_utc_offset_hours': 0,       # Broker server time - UTC (bar close alignment)
+}
+
 def get_symbol_tier(symbol: str) -> str:
     """
     Get the priority tier for a given symbol.
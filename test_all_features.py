@@ -158,6 +158,39 @@ except Exception as e:
     print(f"   ❌ Feature Engineer FAILED: {e}")
     sys.exit(1)
 
+# Test 7: Currency / Factor Exposure
+print("\n7. Testing Currency Exposure (factor loadings)...")
+try:
+    from src.risk.currency_exposure import CurrencyExposureTracker
+    from src.risk.factor_loadings import FactorLoadings
+
+    tracker = CurrencyExposureTracker(max_currency_exposure_pct=4.0, loadings=FactorLoadings())
+    positions = [
+        {'symbol': 'EURUSD.sim', 'direction': 'BUY', 'risk_pct': 1.0},
+        {'symbol': 'US30Z25.sim', 'direction': 'BUY', 'risk_pct': 1.0},
+        {'symbol': 'XAUZ25.sim', 'direction': 'SELL', 'risk_pct': 1.0},
+    ]
+    exposure = tracker.calculate_exposure(positions, 100000)
+
+    # Broker contract codes must not leave symbols unclassified
+    classes = {s: tracker.loadings.asset_class(s) for s in ('US30Z25.sim', 'XAUZ25.sim', 'EU50.sim')}
+    assert classes == {'US30Z25.sim': 'INDICES_US', 'XAUZ25.sim': 'COMMODITIES_METALS',
+                       'EU50.sim': 'INDICES_EU'}, classes
+    assert 'UNKNOWN' not in exposure.factor_exposure, exposure.factor_exposure
+    # USD: -1 (long EURUSD) -0.3 (long US30) +1 (short XAU)
+    assert abs(exposure.factor_exposure['USD'] - (-0.3)) < 1e-9, exposure.factor_exposure
+
+    allowed, reason = tracker.check_new_trade(exposure, 'US30Z25.sim', 'BUY', 1.0)
+    assert allowed, reason
+
+    print(f"   ✅ Currency Exposure: Working")
+    print(f"   ✅ US30Z25.sim -> {classes['US30Z25.sim']}, XAUZ25.sim -> {classes['XAUZ25.sim']}")
+    print(f"   ✅ Net USD: {exposure.factor_exposure['USD']:+.1f}%, new US30 trade: {reason}")
+
+except Exception as e:
+    print(f"   ❌ Currency Exposure FAILED: {e}")
+    sys.exit(1)
+
 # Summary
 print("\n" + "="*70)
 print("TEST SUMMARY")
@@ -168,6 +201,7 @@ print("✅ News Sentiment: WORKING (install TextBlob for full features)")
 print("✅ Portfolio Optimizer: WORKING")
 print("✅ Original ProEnsemble: WORKING")
 print("✅ Feature Engineer: WORKING")
+print("✅ Currency Exposure: WORKING")
 print("="*70)
 print("\n🎉 ALL FEATURES ARE FUNCTIONAL!")
 print("\nNext Steps:")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Unit test: BarCache merge, gap, disk tier and timeframe handling
+
+Drives BarCache with a fake clock and a synthetic H1 source:
+1. Forming bar - an incremental fetch overwrites the cached forming bar with
+   its newer state and appends bars that opened since
+2. Gap - when the fetched window starts after the newest cached bar, only the
+   contiguous fetched bars are kept and the next read refills the window
+3. Parquet reload - a new cache on the same directory serves the series from
+   disk and fetches only the gap since the file was written
+4. Timeframe keys - names outside TIMEFRAME_SECONDS (MT5HybridConnector's
+   "1H") fall back to 3600s when sizing the incremental fetch
+
+Usage:
+    python test_bar_cache.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.data.bar_cache import BarCache, BarFetch
+
+H1 = 3600
+START = pd.Timestamp('2026-10-01 00:00:00')
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Source:
+    """H1 bars 0..n-1 (bar i opens at START + i hours); close = 100 + i + revision"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.revision = 0.0
+        self.requests = []
+
+    def bars(self, first: int, last: int) -> pd.DataFrame:
+        index = pd.date_range(START + pd.Timedelta(hours=first), periods=last - first, freq='h')
+        close = 100.0 + np.arange(first, last, dtype=float)
+        close[-1] += self.revision  # Newest bar is forming
+        return pd.DataFrame({'open': close - 0.5, 'high': close + 1.0, 'low': close - 1.0,
+                             'close': close, 'volume': 10.0}, index=index)
+
+    def fetch(self, count: int, since: int) -> pd.DataFrame:
+        self.requests.append((count, since))
+        return self.bars(max(0, self.n - count), self.n)
+
+
+def check(label: str, condition: bool) -> bool:
+    print(f"   {'✅' if condition else '❌'} {label}")
+    return condition
+
+
+def epoch(index: int) -> int:
+    return int((START + pd.Timedelta(hours=index)).timestamp())
+
+
+def test_forming_bar() -> bool:
+    print("\n1. Forming bar replacement")
+    print("-" * 70)
+    ok = True
+
+    clock = FakeClock(1000.0)
+    cache = BarCache(max_age=30, clock=clock)
+    source = Source(120)
+    first = cache.get('EURUSD', 'H1', 100, source.fetch)
+    ok &= check("cold read fetches the full window", source.requests == [(100, 0)] and len(first) == 100)
+
+    clock.now += 10
+    cache.get('EURUSD', 'H1', 100, source.fetch)
+    ok &= check("fresh read is a hit (no fetch)", len(source.requests) == 1 and cache.hits == 1)
+
+    # Ten minutes later the forming bar (119) has moved
+    clock.now += 600
+    source.revision = 0.75
+    bars = cache.get('EURUSD', 'H1', 100, source.fetch)
+    ok &= check(f"incremental fetch: newest cached bar + 1 ({source.requests[-1]})",
+                source.requests[-1] == (2, epoch(119)))
+    ok &= check(f"forming bar overwritten (close {bars['close'].iloc[-1]})",
+                bars['close'].iloc[-1] == 219.75 and len(bars) == 100)
+    ok &= check("no duplicate bar times", not bars.index.duplicated().any())
+
+    # An hour later bar 119 has closed and bar 120 is forming
+    clock.now += H1
+    source.n = 121
+    source.revision = 0.25
+    bars = cache.get('EURUSD', 'H1', 100, source.fetch)
+    ok &= check(f"new bar appended (count {source.requests[-1][0]} covers the elapsed hour)",
+                source.requests[-1] == (3, epoch(119)) and bars.index[-1] == START + pd.Timedelta(hours=120))
+    ok &= check("previous forming bar now holds its closed value",
+                bars['close'].iloc[-2] == 219.0 and bars['close'].iloc[-1] == 220.25)
+    ok &= check("last_completed is the bar before the forming one",
+                cache.last_completed('EURUSD', 'H1') == START + pd.Timedelta(hours=119))
+    ok &= check(f"stats: {cache.incremental} incremental, {cache.full} full",
+                cache.incremental == 2 and cache.full == 1)
+    return ok
+
+
+def test_gap() -> bool:
+    print("\n2. Gap (fetched window starts after the newest cached bar)")
+    print("-" * 70)
+    ok = True
+
+    clock = FakeClock(1000.0)
+    cache = BarCache(max_age=30, clock=clock)
+    source = Source(100)
+    cache.get('US30', 'H1', 50, source.fetch)
+
+    clock.now += 600
+    fetch = BarFetch(2, epoch(99))
+    fetched = source.bars(105, 107)  # Source skipped bars 100-104
+    result = cache.update('US30', 'H1', fetched, fetch, 50)
+    ok &= check(f"only the contiguous fetched bars are kept ({len(result)} bars)",
+                len(result) == 2 and result.index[0] == START + pd.Timedelta(hours=105))
+    ok &= check("counted as incremental", cache.incremental == 1)
+
+    clock.now += 10
+    source.n = 107
+    frame, needed = cache.plan('US30', 'H1', 50)
+    ok &= check(f"next read refills the whole window ({needed})",
+                frame is None and needed == BarFetch(50, 0))
+    bars = cache.update('US30', 'H1', source.fetch(needed.count, needed.since), needed, 50)
+    ok &= check("refilled window is contiguous",
+                len(bars) == 50 and (bars.index.to_series().diff().dropna() == pd.Timedelta(hours=1)).all())
+    return ok
+
+
+def test_parquet_reload() -> bool:
+    print("\n3. Parquet reload")
+    print("-" * 70)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Source(200)
+        writer = BarCache(max_age=30, parquet_dir=tmp)
+        written = writer.get('GBPUSD', 'H1', 150, source.fetch)
+        path = os.path.join(tmp, 'GBPUSD_H1.parquet')
+        ok &= check("series written to <symbol>_<tf>.parquet", os.path.exists(path))
+        mtime = os.path.getmtime(path)
+
+        # Restart within max_age of the write: served from disk, no fetch
+        clock = FakeClock(mtime + 5)
+        reader = BarCache(max_age=30, parquet_dir=tmp, clock=clock)
+        requests = len(source.requests)
+        bars = reader.get('GBPUSD', 'H1', 150, source.fetch)
+        ok &= check("reloaded series matches what was written",
+                    len(source.requests) == requests and bars.equals(written))
+        ok &= check("counted as a disk load and a hit", reader.disk_loads == 1 and reader.hits == 1)
+
+        # Restart two hours later: only the gap since the write is fetched
+        clock = FakeClock(mtime + 2 * H1 + 60)
+        reader = BarCache(max_age=30, parquet_dir=tmp, clock=clock)
+        source.n = 202
+        bars = reader.get('GBPUSD', 'H1', 150, source.fetch)
+        ok &= check(f"gap fetch since the newest stored bar ({source.requests[-1]})",
+                    source.requests[-1] == (4, epoch(199)))
+        ok &= check("merged window ends at the new forming bar",
+                    len(bars) == 150 and bars.index[-1] == START + pd.Timedelta(hours=201))
+    return ok
+
+
+def test_timeframe_keys() -> bool:
+    print("\n4. Timeframe keys")
+    print("-" * 70)
+    ok = True
+
+    for timeframe in ('H1', 'h1', '1H'):
+        clock = FakeClock(1000.0)
+        cache = BarCache(max_age=30, clock=clock)
+        source = Source(100)
+        cache.get('EURUSD', timeframe, 50, source.fetch)
+        clock.now += 2.5 * H1
+        _, needed = cache.plan('EURUSD', timeframe, 50)
+        ok &= check(f"'{timeframe}' after 2.5h: fetch {needed.count} bars (2 elapsed + 2)",
+                    needed == BarFetch(4, epoch(99)))
+
+    clock = FakeClock(1000.0)
+    cache = BarCache(max_age=30, clock=clock)
+    source = Source(100)
+    cache.get('EURUSD', 'M5', 50, source.fetch)
+    clock.now += 600
+    _, needed = cache.plan('EURUSD', 'M5', 50)
+    ok &= check(f"'M5' after 10 min: fetch {needed.count} bars (known timeframe, 300s)", needed.count == 4)
+
+    clock.now += 4 * H1
+    _, needed = cache.plan('EURUSD', 'M5', 50)
+    ok &= check("gap longer than the window falls back to a full fetch", needed == BarFetch(50, 0))
+    return ok
+
+
+def main():
+    print("=" * 70)
+    print("BAR CACHE")
+    print("=" * 70)
+
+    ok = test_forming_bar()
+    ok &= test_gap()
+    ok &= test_parquet_reload()
+    ok &= test_timeframe_keys()
+
+    print("\n" + "=" * 70)
+    print("✅ ALL BAR CACHE CHECKS PASSED" if ok else "❌ BAR CACHE CHECKS FAILED")
+    print("=" * 70)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
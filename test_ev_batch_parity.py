@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Parity test: EVExitManagerV2.analyze_exits() (batch) vs analyze_exit() (scalar)
+and IntelligentPositionManager.analyze_positions() (what api.py calls once per
+request) vs analyze_position() per position
+
+Replays recorded entries from training_logs/ as open positions and checks that
+the batch path returns the same decisions as calling analyze_exit() per position.
+The logs only carry ML/price/account fields, so HTF trends, momentum, RSI and
+structure are filled from a seeded RNG (same inputs for both paths).
+"""
+
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import src.ai.ev_exit_manager_v2 as ev_module
+import src.ai.regime_detector as regime_module
+from src.ai.enhanced_context import EnhancedTradingContext
+from src.ai.ev_exit_manager_v2 import EVExitManagerV2
+from src.ai.intelligent_position_manager import IntelligentPositionManager
+
+MAX_POSITIONS = 200
+TOLERANCE = 1e-9
+
+print("=" * 70)
+print("EV EXIT MANAGER - BATCH vs SCALAR PARITY")
+print("=" * 70)
+
+
+def load_recorded_entries(limit: int):
+    entries = []
+    for path in sorted(glob.glob('training_logs/entries_*.jsonl')):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('action') in ('BUY', 'SELL') and record.get('context', {}).get('current_price'):
+                    entries.append(record)
+                if len(entries) >= limit:
+                    return entries
+    return entries
+
+
+def build_position(record: dict, rng: random.Random):
+    """Turn a recorded entry into (position args, context)"""
+    symbol = record['symbol'].replace('.sim', '')
+    is_buy = record['action'] == 'BUY'
+    entry_price = float(record['context']['current_price'])
+    balance = float(record.get('account', {}).get('balance', 200000))
+
+    move_pct = rng.uniform(-0.8, 1.2) * (1 if is_buy else -1)
+    current_price = entry_price * (1 + move_pct / 100)
+    volume = rng.choice([1.0, 2.0, 3.0, 5.0, 8.0])
+    profit = (current_price - entry_price) * (1 if is_buy else -1) * volume * 10
+
+    context = EnhancedTradingContext(
+        symbol=symbol,
+        current_price=current_price,
+        account_balance=balance,
+        contract_size=10.0,
+    )
+    context.ml_direction = record['features'].get('ml_direction', 'HOLD')
+    context.ml_confidence = float(record['features'].get('ml_confidence', 50.0))
+    context.market_score = float(record['features'].get('market_score', 50.0))
+    for tf in ('m15', 'm30', 'h1', 'h4', 'd1'):
+        setattr(context, f'{tf}_trend', rng.random())
+        setattr(context, f'{tf}_momentum', rng.uniform(-1, 1))
+        setattr(context, f'{tf}_rsi', rng.uniform(20, 80))
+    for tf in ('h1', 'h4', 'd1', 'htf'):
+        setattr(context, f'{tf}_adx', rng.uniform(10, 50))
+    context.h4_volume_divergence = rng.uniform(0, 0.5)
+    context.d1_volume_divergence = rng.uniform(0, 0.5)
+    context.h4_market_structure = rng.uniform(-1, 1)
+    context.d1_market_structure = rng.uniform(-1, 1)
+    context.h4_dist_to_resistance = rng.uniform(0, 3)
+    context.h4_dist_to_support = rng.uniform(0, 3)
+    context.atr = entry_price * 0.004
+    context.has_position = True
+    context.position_type = 0 if is_buy else 1
+    context.position_entry_price = entry_price
+    context.position_current_profit = profit
+    context.position_volume = volume
+
+    position = {
+        'current_profit': profit,
+        'current_volume': volume,
+        'position_type': context.position_type,
+        'symbol': symbol,
+        'max_lots': 50.0,
+    }
+    return position, context
+
+
+def fresh_manager(tmp_dir: str, name: str) -> EVExitManagerV2:
+    """New manager with isolated peak storage and a clean regime detector"""
+    ev_module.PEAK_TRACKING_FILE = os.path.join(tmp_dir, f'{name}_peaks.json')
+    regime_module._regime_detectors.clear()
+    return EVExitManagerV2()
+
+
+def close(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(float(a) - float(b)) <= TOLERANCE
+    return a == b
+
+
+records = load_recorded_entries(MAX_POSITIONS)
+if not records:
+    print("❌ No recorded entries found in training_logs/")
+    sys.exit(1)
+
+rng = random.Random(42)
+built = [build_position(r, rng) for r in records]
+positions = [p for p, _ in built]
+contexts = [c for _, c in built]
+print(f"\n📊 Replaying {len(positions)} recorded positions")
+
+failures = 0
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    # 1. Batch inputs vs scalar helpers
+    print("\n1. Probabilities / ATR mult")
+    print("-" * 70)
+    manager = fresh_manager(tmp_dir, 'inputs')
+    batch_inputs = manager._precompute_exit_inputs(positions, contexts)
+    for position, context, pre in zip(positions, contexts, batch_inputs):
+        is_buy = position['position_type'] == 0
+        scalar_probs = manager._calculate_probabilities(pre['market_data'], is_buy, {}, pre['setup_type'])
+        scalar_atr = manager._calculate_ai_atr_mult(context, pre['setup_type'], is_buy)
+        mismatched = [k for k in scalar_probs if not close(scalar_probs[k], pre['probabilities'][k])]
+        if mismatched or not close(scalar_atr, pre['atr_mult']):
+            failures += 1
+            print(f"   ❌ {position['symbol']}: mismatched {mismatched or ['atr_mult']}")
+    print(f"   {'✅' if failures == 0 else '❌'} {len(positions) - failures}/{len(positions)} match")
+
+    # 2. Full decisions
+    print("\n2. Decisions")
+    print("-" * 70)
+    scalar_manager = fresh_manager(tmp_dir, 'scalar')
+    scalar_decisions = [scalar_manager.analyze_exit(context=c, **p) for p, c in zip(positions, contexts)]
+
+    batch_manager = fresh_manager(tmp_dir, 'batch')
+    batch_decisions = batch_manager.analyze_exits(positions, contexts)
+
+    decision_failures = 0
+    for position, s, b in zip(positions, scalar_decisions, batch_decisions):
+        evs_match = all(close(v, b.get('all_evs', {}).get(k)) for k, v in s.get('all_evs', {}).items())
+        if s['action'] != b['action'] or not evs_match:
+            decision_failures += 1
+            print(f"   ❌ {position['symbol']}: scalar={s['action']} batch={b['action']} evs_match={evs_match}")
+    failures += decision_failures
+    print(f"   {'✅' if decision_failures == 0 else '❌'} {len(positions) - decision_failures}/{len(positions)} decisions match")
+
+    # 3. Position manager entry point used by api.py
+    print("\n3. analyze_positions() vs analyze_position()")
+    print("-" * 70)
+    scalar_pm = IntelligentPositionManager()
+    scalar_pm.ev_exit_manager = fresh_manager(tmp_dir, 'pm_scalar')
+    scalar_decisions = [scalar_pm.analyze_position(c) for c in contexts]
+
+    batch_pm = IntelligentPositionManager()
+    batch_pm.ev_exit_manager = fresh_manager(tmp_dir, 'pm_batch')
+    batch_decisions = batch_pm.analyze_positions(contexts)
+
+    manager_failures = sum(
+        1 for s, b in zip(scalar_decisions, batch_decisions)
+        if s['action'] != b['action'] or s.get('all_evs') != b.get('all_evs')
+    )
+    failures += manager_failures
+    print(f"   {'✅' if manager_failures == 0 else '❌'} {len(contexts) - manager_failures}/{len(contexts)} decisions match")
+
+print("\n" + "=" * 70)
+print("PARITY OK" if failures == 0 else f"PARITY FAILED ({failures} mismatches)")
+print("=" * 70)
+sys.exit(1 if failures else 0)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Unit test: PortfolioOptimizer.optimize_weights against known solutions
+
+1. Tangency - uncorrelated assets have the textbook max-Sharpe weights
+   w_i ~ mu_i / sigma_i^2; with correlation the solution must satisfy the
+   first-order condition Cov w ~ mu
+2. Capped tangency - when the closed form breaks max_per_symbol, the SLSQP
+   solution must be at least as good as a brute-force grid over the simplex
+3. Risk parity - inverse volatility under constant correlation, equal risk
+   contributions w_i (Cov w)_i otherwise
+4. Background mode - the target allocation published by the solver thread
+   matches a direct solve
+
+Usage:
+    python test_portfolio_optimizer.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.portfolio.portfolio_optimizer import PortfolioOptimizer
+
+SYMBOLS = ['EURUSD', 'GBPUSD', 'US30']
+TOLERANCE = 1e-6
+
+
+def check(label: str, condition: bool) -> bool:
+    print(f"   {'✅' if condition else '❌'} {label}")
+    return condition
+
+
+def make_optimizer(correlations: np.ndarray) -> PortfolioOptimizer:
+    optimizer = PortfolioOptimizer(SYMBOLS)
+    optimizer.set_correlations(correlations)
+    return optimizer
+
+
+def make_signals(expected_returns, risks):
+    return [{'symbol': s, 'direction': 'buy', 'confidence': 0.7, 'expected_return': r, 'risk': v}
+            for s, r, v in zip(SYMBOLS, expected_returns, risks)]
+
+
+def sharpe(weights: np.ndarray, expected_returns: np.ndarray, cov: np.ndarray) -> float:
+    return float(weights @ expected_returns / np.sqrt(weights @ cov @ weights))
+
+
+def test_tangency() -> bool:
+    print("\n1. Tangency portfolio (closed form)")
+    print("-" * 70)
+    ok = True
+
+    mu = np.array([0.01, 0.01, 0.02])
+    risks = np.array([0.02, 0.02, 0.04])
+    optimizer = make_optimizer(np.eye(3))
+    weights = optimizer.optimize_weights(make_signals(mu, risks), max_total_risk=0.10, max_per_symbol=0.5)
+    expected = (mu / risks ** 2) / (mu / risks ** 2).sum()  # 0.4 / 0.4 / 0.2
+    ok &= check(f"uncorrelated: {np.round(weights, 4)} == mu/sigma^2 {np.round(expected, 4)}",
+                weights is not None and np.allclose(weights, expected, atol=TOLERANCE))
+    ok &= check("served by the closed form", optimizer.stats['closed_form'] == 1)
+
+    corr = np.array([[1.0, 0.6, 0.2],
+                     [0.6, 1.0, 0.1],
+                     [0.2, 0.1, 1.0]])
+    mu = np.array([0.012, 0.010, 0.015])
+    risks = np.array([0.02, 0.025, 0.03])
+    optimizer = make_optimizer(corr)
+    weights = optimizer.optimize_weights(make_signals(mu, risks), max_total_risk=0.10, max_per_symbol=0.6)
+    cov = corr * np.outer(risks, risks)
+    ratio = (cov @ weights) / mu if weights is not None else np.array([np.nan])
+    ok &= check(f"correlated: Cov w / mu constant (spread {np.ptp(ratio):.1e})",
+                weights is not None and np.ptp(ratio) < TOLERANCE * ratio.mean()
+                and abs(weights.sum() - 1.0) < TOLERANCE)
+    return ok
+
+
+def test_capped_tangency() -> bool:
+    print("\n2. Capped tangency (SLSQP) vs grid search")
+    print("-" * 70)
+
+    mu = np.array([0.01, 0.01, 0.02])
+    risks = np.array([0.02, 0.02, 0.04])
+    cap = 0.35
+    optimizer = make_optimizer(np.eye(3))
+    weights = optimizer.optimize_weights(make_signals(mu, risks), max_total_risk=0.10, max_per_symbol=cap)
+    cov = np.diag(risks ** 2)
+
+    best = -np.inf
+    step = 0.0025
+    for w0 in np.arange(0.0, cap + 1e-12, step):
+        for w1 in np.arange(0.0, cap + 1e-12, step):
+            w2 = 1.0 - w0 - w1
+            if -1e-12 <= w2 <= cap + 1e-12:
+                best = max(best, sharpe(np.array([w0, w1, w2]), mu, cov))
+
+    ok = check("solved numerically (closed form violates the cap)",
+               weights is not None and optimizer.stats['cold_start'] == 1)
+    if weights is None:
+        return False
+    ok &= check(f"bounds hold: max weight {weights.max():.4f} <= {cap}, sum {weights.sum():.6f}",
+                weights.max() <= cap + TOLERANCE and abs(weights.sum() - 1.0) < TOLERANCE)
+    solved = sharpe(weights, mu, cov)
+    ok &= check(f"Sharpe {solved:.6f} >= grid best {best:.6f}", solved >= best - TOLERANCE)
+    return ok
+
+
+def test_risk_parity() -> bool:
+    print("\n3. Risk parity")
+    print("-" * 70)
+    ok = True
+
+    risks = np.array([0.01, 0.02, 0.04])
+    mu = np.full(3, 0.01)
+    constant = np.full((3, 3), 0.3)
+    optimizer = make_optimizer(constant)
+    weights = optimizer.optimize_weights(make_signals(mu, risks), max_total_risk=0.10,
+                                         max_per_symbol=0.6, method='risk_parity')
+    expected = np.array([4.0, 2.0, 1.0]) / 7.0  # Inverse volatility
+    ok &= check(f"constant correlation: {np.round(weights, 4)} == 1/sigma {np.round(expected, 4)}",
+                weights is not None and np.allclose(weights, expected, atol=TOLERANCE))
+
+    corr = np.array([[1.0, 0.7, 0.0],
+                     [0.7, 1.0, 0.3],
+                     [0.0, 0.3, 1.0]])
+    optimizer = make_optimizer(corr)
+    weights = optimizer.optimize_weights(make_signals(mu, risks), max_total_risk=0.10,
+                                         max_per_symbol=0.8, method='risk_parity')
+    cov = corr * np.outer(risks, risks)
+    contributions = weights * (cov @ weights) if weights is not None else np.array([np.nan])
+    ok &= check(f"mixed correlation: risk contributions equal (spread {np.ptp(contributions) / contributions.mean():.1e})",
+                weights is not None and np.ptp(contributions) < TOLERANCE * contributions.mean())
+    return ok
+
+
+def test_background() -> bool:
+    print("\n4. Background mode")
+    print("-" * 70)
+
+    corr = np.array([[1.0, 0.6, 0.2],
+                     [0.6, 1.0, 0.1],
+                     [0.2, 0.1, 1.0]])
+    signals = make_signals([0.012, 0.010, 0.015], [0.02, 0.025, 0.03])
+    optimizer = make_optimizer(corr)
+    direct = optimizer.optimize_position_sizes(signals, 100000.0, max_per_symbol=0.6)
+
+    optimizer.start_background(interval=0.01)
+    try:
+        optimizer.submit_signals(signals, 100000.0, max_per_symbol=0.6)
+        deadline = time.time() + 5.0
+        while not optimizer.get_target_allocation() and time.time() < deadline:
+            time.sleep(0.01)
+        target = optimizer.get_target_allocation()
+    finally:
+        optimizer.stop_background()
+
+    return check(f"target {({s: round(v) for s, v in target.items()})} matches a direct solve",
+                 target.keys() == direct.keys()
+                 and all(abs(target[s] - direct[s]) < 1e-6 for s in direct)
+                 and 'background_ms' in optimizer.stats)
+
+
+def main():
+    print("=" * 70)
+    print("PORTFOLIO OPTIMIZER - KNOWN SOLUTIONS")
+    print("=" * 70)
+
+    ok = test_tangency()
+    ok &= test_capped_tangency()
+    ok &= test_risk_parity()
+    ok &= test_background()
+
+    print("\n" + "=" * 70)
+    print("✅ ALL OPTIMIZER CHECKS PASSED" if ok else "❌ OPTIMIZER CHECKS FAILED")
+    print("=" * 70)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
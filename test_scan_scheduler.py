@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Unit test: ScanScheduler queue logic and TokenBucket rate limiting
+
+Drives the scheduler's queue with a fake clock (no dispatch thread, no
+executor) so every due time is exact:
+1. TokenBucket - burst, refill rate, burst cap, blocking acquire pacing and
+   acquire timeout
+2. Heap supersession - pulling a job forward leaves the old heap entry
+   behind; it must be skipped, not run twice or mark a rerun
+3. Rerun while in flight - a timeframe that comes due while its symbol is
+   scanning is re-queued immediately when the scan finishes
+
+Usage:
+    python test_scan_scheduler.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.scan_scheduler import ScanScheduler, TokenBucket
+
+H1 = 3600
+H4 = 4 * 3600
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def check(label: str, condition: bool) -> bool:
+    print(f"   {'✅' if condition else '❌'} {label}")
+    return condition
+
+
+def make_scheduler(clock: FakeClock, calls: list) -> ScanScheduler:
+    def scan_fn(symbol, timeframes):
+        calls.append((symbol, timeframes, clock()))
+        return None
+
+    return ScanScheduler(scan_fn, timeframes=('H1', 'H4'), min_interval=15.0, max_interval=600.0,
+                         bar_close_grace=0.0, report_interval=0, clock=clock)
+
+
+def pop(scheduler: ScanScheduler, now: float):
+    """_dispatch_loop's dequeue step"""
+    with scheduler._cond:
+        job = scheduler._pop_due(now)
+        if job:
+            scheduler._in_flight += 1
+        return job
+
+
+def test_token_bucket() -> bool:
+    print("\n1. TokenBucket")
+    print("-" * 70)
+    ok = True
+
+    clock = FakeClock(100.0)
+    bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+    ok &= check("burst of 2 taken back to back", bucket.try_acquire() and bucket.try_acquire())
+    ok &= check("third token refused", not bucket.try_acquire())
+    ok &= check("wait_time = 1/rate = 0.5s", abs(bucket.wait_time() - 0.5) < 1e-9)
+    clock.now += 0.5
+    ok &= check("one token after 0.5s", bucket.try_acquire() and not bucket.try_acquire())
+    clock.now += 100.0
+    taken = sum(bucket.try_acquire() for _ in range(10))
+    ok &= check(f"idle refill capped at burst ({taken} taken)", taken == 2)
+
+    # Blocking acquire on the real clock: 10 tokens past the burst at 50/s ~ 0.2s
+    bucket = TokenBucket(rate=50.0, burst=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    ok &= check(f"acquire paces to rate ({elapsed:.3f}s for 10 tokens at 50/s)", 0.18 <= elapsed < 0.5)
+    ok &= check(f"waits counted ({bucket.waits})", bucket.waits == 10)
+
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.acquire()
+    start = time.monotonic()
+    acquired = bucket.acquire(timeout=0.05)
+    elapsed = time.monotonic() - start
+    ok &= check(f"acquire(timeout) gives up ({elapsed:.3f}s)", not acquired and elapsed < 0.5)
+    return ok
+
+
+def test_supersession() -> bool:
+    print("\n2. Heap supersession")
+    print("-" * 70)
+    ok = True
+
+    clock = FakeClock(1000.0)
+    calls = []
+    scheduler = make_scheduler(clock, calls)
+    scheduler.add_symbol('US30', interval=60)
+
+    job = pop(scheduler, clock.now)
+    ok &= check("new symbol: all timeframes due in one job", job is not None and job[1] == ('H1', 'H4'))
+    scheduler._run(*job)
+    state = scheduler._symbols['US30']
+    ok &= check("H1 re-scan after the interval", state.due['H1'] == 1060.0)
+    ok &= check("H4 at its next bar close", state.due['H4'] == H4)
+
+    # Volatility x3 -> interval 20s: pulled forward, the 1060 entry is now stale
+    scheduler.set_volatility('US30', 3.0)
+    ok &= check("pulled forward to 1020", state.due['H1'] == 1020.0)
+    ok &= check("nothing due before 1020", pop(scheduler, 1019.0) is None)
+
+    clock.now = 1020.0
+    job = pop(scheduler, clock.now)
+    ok &= check("pulled-forward job runs H1 only", job is not None and job[1] == ('H1',) and job[2] == 1020.0)
+
+    # Stale 1060 entry pops while H1 is in flight: superseded, not a rerun
+    clock.now = 1060.0
+    ok &= check("stale entry skipped", pop(scheduler, clock.now) is None)
+    ok &= check("stale entry does not mark a rerun", not state.rerun)
+
+    scheduler._run(*job)
+    ok &= check("next H1 from the shorter interval (1080)", state.due['H1'] == 1080.0)
+    ok &= check("nothing runs twice", pop(scheduler, 1079.0) is None and len(calls) == 2)
+    return ok
+
+
+def test_rerun_in_flight() -> bool:
+    print("\n3. Rerun while in flight")
+    print("-" * 70)
+    ok = True
+
+    clock = FakeClock(H4 - 100.0)
+    calls = []
+    scheduler = make_scheduler(clock, calls)
+    scheduler.add_symbol('EURUSD', interval=60)
+    scheduler._run(*pop(scheduler, clock.now))
+    state = scheduler._symbols['EURUSD']
+
+    # H1 re-scan starts at H4 - 40, the H4 bar closes while it runs
+    clock.now = H4 - 40.0
+    job = pop(scheduler, clock.now)
+    ok &= check("H1 re-scan dispatched", job is not None and job[1] == ('H1',))
+    clock.now = H4 + 1.0
+    ok &= check("H4 close while in flight is held back", pop(scheduler, clock.now) is None)
+    ok &= check("marked for rerun", state.rerun and state.due['H4'] is None)
+
+    clock.now = H4 + 5.0
+    scheduler._run(*job)
+    ok &= check("H4 re-queued at completion", state.due['H4'] == H4 + 5.0 and not state.rerun)
+    ok &= check("H1 scheduled normally", state.due['H1'] == min(H4 + H1, H4 + 5.0 + 60.0))
+
+    job = pop(scheduler, clock.now)
+    ok &= check("H4 scan runs right away", job is not None and job[1] == ('H4',))
+    scheduler._run(*job)
+    ok &= check("H4 back on its bar-close schedule", state.due['H4'] == 2 * H4)
+    ok &= check(f"scans: {[c[1] for c in calls]}", [c[1] for c in calls] == [('H1', 'H4'), ('H1',), ('H4',)])
+    ok &= check("in-flight count back to 0", scheduler._in_flight == 0)
+    return ok
+
+
+def main():
+    print("=" * 70)
+    print("SCAN SCHEDULER / TOKEN BUCKET")
+    print("=" * 70)
+
+    ok = test_token_bucket()
+    ok &= test_supersession()
+    ok &= test_rerun_in_flight()
+
+    print("\n" + "=" * 70)
+    print("✅ ALL SCHEDULER CHECKS PASSED" if ok else "❌ SCHEDULER CHECKS FAILED")
+    print("=" * 70)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())